@@ -0,0 +1,303 @@
+"""
+Measures the hot paths of the ELN and Inventory clients against the in-process
+fake RSpace server of the test suite: listing, bulk creation, tree import, Gallery
+uploads and downloads, export, and parsing of calculation tables.
+
+Run from the project root with ``python benchmarks/clients.py``, or e.g.
+``python benchmarks/clients.py stream_samples --latency 0.002 --scale 10``. Each
+benchmark runs in a new interpreter while the fake server runs in this one, so
+its peak RSS is that of the client alone. Throughput is the best of ``--runs``
+runs, peak RSS the highest.
+
+``--output results.json`` saves the results with the package version and
+platform, and ``--compare results.json`` prints the change from saved results,
+so that releases can be compared. Unix only: peak RSS comes from getrusage.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from rspace_client.tests.fake_server import FakeRSpaceServer  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "rspace_client", "tests", "data")
+
+FILE_SIZE = 256 * 1024
+
+
+# Each benchmark has a setup run in this process, seeding the fake server and
+# returning the arguments of its run, and a run in the worker process, returning
+# the number of items processed.
+
+
+def setup_stream_documents(server, count, workdir):
+    server.add_documents(count)
+    return {}
+
+
+def run_stream_documents(url, api_key, count, args):
+    from rspace_client.eln.eln import ELNClient
+
+    client = ELNClient(url, api_key)
+    return sum(1 for _ in client.stream_documents())
+
+
+def setup_stream_samples(server, count, workdir):
+    server.add_samples(count)
+    return {}
+
+
+def run_stream_samples(url, api_key, count, args):
+    from rspace_client.inv.inv import InventoryClient
+
+    client = InventoryClient(url, api_key)
+    return sum(1 for _ in client.stream_samples())
+
+
+def setup_bulk_create_sample(server, count, workdir):
+    return {}
+
+
+def run_bulk_create_sample(url, api_key, count, args):
+    from rspace_client.inv.inv import InventoryClient, SamplePost
+
+    client = InventoryClient(url, api_key)
+    created = 0
+    for start in range(0, count, InventoryClient.MAX_BULK):
+        posts = [
+            SamplePost(f"sample-{i}", tags=[], description="benchmark")
+            for i in range(start, min(count, start + InventoryClient.MAX_BULK))
+        ]
+        created += len(client.bulk_create_sample(*posts).success_results())
+    return created
+
+
+def setup_import_tree(server, count, workdir):
+    tree = os.path.join(workdir, "tree")
+    for i in range(count):
+        directory = os.path.join(tree, f"dir-{i % 10}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file-{i}.txt"), "wb") as f:
+            f.write(server.random_bytes(4096))
+    return {"tree": tree}
+
+
+def run_import_tree(url, api_key, count, args):
+    from rspace_client.eln.eln import ELNClient
+
+    result = ELNClient(url, api_key).import_tree(args["tree"])
+    if result["status"] != "OK":
+        raise RuntimeError(f"import_tree failed: {result}")
+    return count
+
+
+def setup_gallery_upload(server, count, workdir):
+    return {}
+
+
+def run_gallery_upload(url, api_key, count, args):
+    from rspace_client.eln.fs import GalleryFilesystem
+
+    content = os.urandom(FILE_SIZE)
+    with GalleryFilesystem(url, api_key) as gallery:
+        for i in range(count):
+            file = io.BytesIO(content)
+            file.name = f"file-{i}.bin"
+            gallery.upload("", file)
+    return count
+
+
+def setup_gallery_download(server, count, workdir):
+    content = server.random_bytes(FILE_SIZE)
+    return {"paths": [f"GL{server.add_file(content)['id']}" for _ in range(count)]}
+
+
+def run_gallery_download(url, api_key, count, args):
+    from rspace_client.eln.fs import GalleryFilesystem
+
+    with GalleryFilesystem(url, api_key) as gallery:
+        for path in args["paths"]:
+            gallery.download(path, io.BytesIO())
+    return count
+
+
+def setup_get_datatables(server, count, workdir):
+    return {}
+
+
+def run_get_datatables(url, api_key, count, args):
+    from rspace_client.eln.field_content import FieldContent
+
+    with open(os.path.join(DATA_DIR, "calculation_table.html")) as f:
+        html = f.read()
+    tables = 0
+    for _ in range(count):
+        tables += len(FieldContent(html).get_datatables())
+    return tables
+
+
+def setup_export_and_download(server, count, workdir):
+    server.export_size = 4 * 1024 * 1024
+    return {"directory": workdir}
+
+
+def run_export_and_download(url, api_key, count, args):
+    from rspace_client.eln.eln import ELNClient
+
+    client = ELNClient(url, api_key)
+    for _ in range(count):
+        client.export_and_download("xml", "user", args["directory"], wait_between_requests=0.05)
+    return count
+
+
+# name -> number of items at scale 1
+BENCHMARKS = {
+    "stream_documents": 2000,
+    "stream_samples": 2000,
+    "bulk_create_sample": 1000,
+    "import_tree": 100,
+    "gallery_upload": 50,
+    "gallery_download": 50,
+    "get_datatables": 200,
+    "export_and_download": 5,
+}
+
+
+def peak_rss():
+    """
+    :return: peak resident set size of this process in bytes, None where unknown
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def worker():
+    """
+    Runs one benchmark, as specified as JSON on stdin, and prints its results.
+    """
+    spec = json.load(sys.stdin)
+    run = globals()[f"run_{spec['name']}"]
+    start = time.perf_counter()
+    items = run(spec["url"], spec["api_key"], spec["count"], spec["args"])
+    seconds = time.perf_counter() - start
+    print(json.dumps({"items": items, "seconds": seconds, "peak_rss": peak_rss()}))
+
+
+def measure(name, count, runs, server_options):
+    """
+    :return: results of the best of 'runs' runs of benchmark 'name', each in a new
+     interpreter against a new fake server
+    """
+    best = None
+    peak = None
+    for _ in range(runs):
+        with FakeRSpaceServer(**server_options) as server, tempfile.TemporaryDirectory() as workdir:
+            args = globals()[f"setup_{name}"](server, count, workdir)
+            spec = {
+                "name": name,
+                "url": server.url,
+                "api_key": server.api_key,
+                "count": count,
+                "args": args,
+            }
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker"],
+                input=json.dumps(spec),
+                cwd=ROOT,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output)
+            result["requests"] = len(server.requests)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+        if result["peak_rss"] is not None:
+            peak = max(peak or 0, result["peak_rss"])
+    return {
+        "items": best["items"],
+        "seconds": round(best["seconds"], 4),
+        "items_per_sec": round(best["items"] / best["seconds"], 1),
+        "requests": best["requests"],
+        "peak_rss_mb": None if peak is None else round(peak / 2**20, 1),
+    }
+
+
+def change(new, old):
+    if not old:
+        return ""
+    return f"{100 * (new - old) / old:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"benchmarks to run, default is all of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--scale", type=float, default=1, help="multiplies the number of items")
+    parser.add_argument("--runs", type=int, default=3, help="runs per benchmark")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds the fake server takes to answer each request")
+    parser.add_argument("--output", help="file to save the results to as JSON")
+    parser.add_argument("--compare", help="JSON file of earlier results to compare with")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        package_version = version("rspace-client")
+    except PackageNotFoundError:
+        package_version = None
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"{'benchmark':<22} {'items':>7} {'items/s':>10} {'requests':>9} {'peak RSS':>9}  change")
+    for name in args.benchmarks or BENCHMARKS:
+        count = max(1, int(BENCHMARKS[name] * args.scale))
+        result = measure(name, count, args.runs, {"latency": args.latency})
+        results[name] = result
+        old = baseline.get(name, {})
+        rss = "-" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.1f}MB"
+        print(
+            f"{name:<22} {result['items']:>7} {result['items_per_sec']:>10.1f} "
+            f"{result['requests']:>9} {rss:>9}  "
+            f"{change(result['items_per_sec'], old.get('items_per_sec'))}"
+        )
+
+    if args.output:
+        report = {
+            "version": package_version,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "options": {"scale": args.scale, "runs": args.runs, "latency": args.latency},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
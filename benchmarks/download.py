@@ -0,0 +1,80 @@
+"""
+Measures the throughput of downloading a large file from the fake RSpace server
+with the client's download engine, in one stream and in parallel ranges, compared
+with copying the response in fixed-size chunks with iter_content, as the client
+did before.
+
+Run from the project root with ``python benchmarks/download.py``, e.g.
+``python benchmarks/download.py --size 512``. Throughput is the best of several
+runs. ``--bandwidth 50`` limits each connection to 50 MiB/s, as some servers and
+proxies do, which parallel downloads work around.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rspace_client.eln.eln import ELNClient  # noqa: E402
+from rspace_client.tests.fake_server import FakeRSpaceServer  # noqa: E402
+
+
+def iter_content_copy(client, url, path, chunk_size):
+    headers = {"apiKey": client.api_key, "Accept": "application/octet-stream"}
+    with client.session.get(url, headers=headers, stream=True) as response:
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+
+
+def best_throughput(download, size, runs, tmp):
+    """
+    Each run writes a new file, removed after it is timed: truncating a large file
+    that is still being written back to disk can take longer than downloading it.
+    """
+    best = None
+    path = os.path.join(tmp, "download.bin")
+    for _ in range(runs):
+        start = time.perf_counter()
+        download(path)
+        elapsed = time.perf_counter() - start
+        os.remove(path)
+        best = elapsed if best is None else min(best, elapsed)
+    return size / best / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=128, help="file size in MiB")
+    parser.add_argument("--runs", type=int, default=3, help="runs per method")
+    parser.add_argument(
+        "--bandwidth", type=int, help="MiB/s per connection, default is unlimited"
+    )
+    parser.add_argument(
+        "--parallel", type=int, default=4, help="connections of parallel downloads"
+    )
+    args = parser.parse_args()
+    size = args.size * 2**20
+    bandwidth = args.bandwidth * 2**20 if args.bandwidth else None
+    with FakeRSpaceServer(bandwidth=bandwidth) as server, tempfile.TemporaryDirectory() as tmp:
+        file_id = server.add_file(server.random_bytes(size))["id"]
+        client = ELNClient(server.url, server.api_key)
+        url = f"{client._get_api_url()}/files/{file_id}/file"
+        methods = [
+            ("iter_content, 128 byte chunks", lambda p: iter_content_copy(client, url, p, 128)),
+            ("iter_content, 64KiB chunks", lambda p: iter_content_copy(client, url, p, 65536)),
+            ("download_file", lambda p: client.download_file(file_id, p)),
+            (
+                f"download_file, parallel={args.parallel}",
+                lambda p: client.download_file(file_id, p, parallel=args.parallel),
+            ),
+        ]
+        print(f"{'method':<32} {'MiB/s':>8}")
+        for label, download in methods:
+            print(f"{label:<32} {best_throughput(download, size, args.runs, tmp):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures the time taken to import rspace_client and its clients in a fresh
+interpreter, as paid by each run of a short-lived script, CLI command or
+serverless function, and lists the heavy dependencies each import loads.
+
+Run from the project root with ``python benchmarks/import_time.py``. Times are the
+best of several runs, excluding the start-up of the interpreter itself.
+``python -X importtime -c "import rspace_client"`` breaks an import down by module.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+STATEMENTS = [
+    "import rspace_client",
+    "from rspace_client import ELNClient",
+    "from rspace_client import InventoryClient",
+    "from rspace_client import FieldContent",
+]
+
+HEAVY_MODULES = ["requests", "asyncio", "bs4", "fs", "httpx", "rspace_client.inv.inv"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def measure(statement, runs):
+    """
+    :return: best time in seconds of 'statement' in a new interpreter, and the
+     heavy modules it loaded
+    """
+    best = None
+    loaded = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        elapsed, loaded = json.loads(output)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="runs per statement")
+    args = parser.parse_args()
+    print(f"{'statement':<45} {'ms':>7}  heavy modules loaded")
+    for statement in STATEMENTS:
+        elapsed, loaded = measure(statement, args.runs)
+        print(f"{statement:<45} {elapsed * 1000:>7.1f}  {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
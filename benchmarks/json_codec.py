@@ -0,0 +1,75 @@
+"""
+Compares the JSON codecs available to the RSpace clients on realistic payloads:
+decoding a container with its content, decoding a page of 100 samples, and
+encoding a /bulk request creating 100 samples.
+
+Run from the project root with ``python benchmarks/json_codec.py``. orjson must be
+installed to compare it with the standard library.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rspace_client.inv.inv import SamplePost  # noqa: E402
+from rspace_client.json_codec import JsonCodec, OrjsonCodec  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "rspace_client", "tests", "data")
+
+
+def load_data(name):
+    with open(os.path.join(DATA_DIR, name), "rb") as f:
+        return f.read()
+
+
+def payloads():
+    container = load_data("container_by_id.json")
+    sample = json.loads(load_data("sample_by_id.json"))
+    samples_page = json.dumps(
+        {
+            "totalHits": 1000,
+            "pageNumber": 0,
+            "samples": [dict(sample, id=sample["id"] + i) for i in range(100)],
+            "_links": [],
+        }
+    ).encode()
+    bulk = {
+        "operationType": "CREATE",
+        "records": [
+            dict(SamplePost(f"sample-{i}", tags=[], description="x" * 50).data, type="SAMPLE")
+            for i in range(100)
+        ],
+    }
+    return [
+        ("decode container_by_id", "loads", container),
+        ("decode page of 100 samples", "loads", samples_page),
+        ("encode /bulk of 100 samples", "dumps", bulk),
+    ]
+
+
+def best_time(fn, arg, number):
+    return min(timeit.repeat(lambda: fn(arg), number=number, repeat=5)) / number
+
+
+def main():
+    codecs = [JsonCodec()]
+    try:
+        codecs.append(OrjsonCodec())
+    except ImportError:
+        print("orjson is not installed, only the standard library is measured")
+    print(f"{'payload':<30} {'bytes':>8} " + " ".join(f"{c.name:>10}" for c in codecs) + "  speedup")
+    for label, operation, payload in payloads():
+        size = len(payload) if isinstance(payload, bytes) else len(JsonCodec().dumps(payload))
+        times = [best_time(getattr(c, operation), payload, number=200) for c in codecs]
+        speedup = f"{times[0] / times[-1]:6.1f}x" if len(times) > 1 else ""
+        print(
+            f"{label:<30} {size:>8} "
+            + " ".join(f"{t * 1e6:>8.1f}us" for t in times)
+            + f"  {speedup}"
+        )
+
+
+if __name__ == "__main__":
+    main()
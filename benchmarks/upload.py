@@ -0,0 +1,141 @@
+"""
+Measures the throughput and peak memory of uploading a large file with
+upload_file, which streams the multipart body from disk, compared with posting
+it with requests, which encodes the whole body in memory, as the client did
+before.
+
+Run from the project root with ``python benchmarks/upload.py``, e.g.
+``python benchmarks/upload.py --size 512``. Files are posted to a server that
+reads and discards them, as parsing them in the fake RSpace server would be
+slower than sending them. Each upload runs in a new interpreter, so its peak
+memory is that of the client alone. Throughput is the best of several runs.
+Linux only: peak memory is the VmHWM of /proc/self/status.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+
+class DiscardingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        left = int(self.headers["Content-Length"])
+        while left:
+            left -= len(self.rfile.read(min(left, 2**20)))
+        body = b'{"id": 1}'
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def requests_upload(url, path):
+    import requests
+
+    with open(path, "rb") as f:
+        response = requests.post(
+            f"{url}/api/v1/files", files={"file": f}, headers={"apiKey": "key"}
+        )
+    response.raise_for_status()
+
+
+def client_upload(url, path, progress=None):
+    from rspace_client.eln.eln import ELNClient
+
+    client = ELNClient(url, "key")
+    with open(path, "rb") as f:
+        client.upload_file(f, progress=progress)
+
+
+METHODS = {
+    "requests, in memory": requests_upload,
+    "upload_file": client_upload,
+    "upload_file, progress": lambda url, path: client_upload(
+        url, path, progress=lambda p: None
+    ),
+}
+
+
+def peak_memory():
+    """
+    :return: peak resident set size of this process in bytes. Unlike getrusage,
+     it does not include the memory of the process that started this one.
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+
+def worker(method, url, path):
+    """
+    Uploads the file with one method, and prints the seconds taken and peak memory.
+    """
+    start = time.perf_counter()
+    METHODS[method](url, path)
+    seconds = time.perf_counter() - start
+    print(json.dumps({"seconds": seconds, "peak": peak_memory()}))
+
+
+def measure(url, method, path, runs):
+    best = None
+    peak = 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", method, url, path],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output)
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        peak = max(peak, result["peak"])
+    return best, peak
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(*sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=256, help="file size in MiB")
+    parser.add_argument("--runs", type=int, default=3, help="runs per method")
+    args = parser.parse_args()
+    size = args.size * 2**20
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DiscardingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "upload.bin")
+            with open(path, "wb") as f:
+                for _ in range(args.size):
+                    f.write(os.urandom(2**20))
+            print(f"{'method':<24} {'MiB/s':>8} {'peak memory':>12}")
+            for method in METHODS:
+                seconds, peak = measure(url, method, path, args.runs)
+                print(
+                    f"{method:<24} {size / seconds / 2**20:>8.1f} {peak / 2**20:>10.1f}MB"
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
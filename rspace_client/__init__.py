@@ -1,17 +1,104 @@
 """
  RSpace API client for interacting with RSpace ELN and Inventory
+
+The classes below are imported when first used, so that ``import rspace_client``
+does not load the Inventory client, BeautifulSoup or requests until needed.
 """
-from .eln.eln import ELNClient
-from .inv.inv import InventoryClient
-from .eln.advanced_query_builder import AdvancedQueryBuilder
-from .utils import createELNClient
-from .eln.field_content import FieldContent
+import importlib
+import importlib.util
+from typing import TYPE_CHECKING
+
+# public name -> module it is defined in
+_LAZY_IMPORTS = {
+    "ELNClient": ".eln.eln",
+    "InventoryClient": ".inv.inv",
+    "AsyncELNClient": ".eln.async_eln",
+    "AsyncInventoryClient": ".inv.async_inv",
+    "AdvancedQueryBuilder": ".eln.advanced_query_builder",
+    "createELNClient": ".utils",
+    "FieldContent": ".eln.field_content",
+    "RetryPolicy": ".retry",
+    "RateLimiter": ".rate_limit",
+    "ResponseCache": ".cache",
+    "SqliteResponseCache": ".cache",
+    "JsonCodec": ".json_codec",
+    "OrjsonCodec": ".json_codec",
+    "RequestEvent": ".events",
+    "MetricsRegistry": ".metrics",
+    "Timeouts": ".timeouts",
+    "deadline": ".timeouts",
+    "Transport": ".transport",
+    "RequestsTransport": ".transport",
+    "RecordingTransport": ".cassette",
+    "ReplayTransport": ".cassette",
+}
 
 __all__ = [
     "ELNClient",
     "InventoryClient",
+    "AsyncELNClient",
+    "AsyncInventoryClient",
     "AdvancedQueryBuilder",
     "createELNClient",
     "FieldContent",
+    "RetryPolicy",
+    "RateLimiter",
+    "ResponseCache",
+    "SqliteResponseCache",
+    "JsonCodec",
+    "OrjsonCodec",
+    "RequestEvent",
+    "MetricsRegistry",
+    "Timeouts",
+    "deadline",
+    "Transport",
+    "RequestsTransport",
+    "RecordingTransport",
+    "ReplayTransport",
     "notebook_sync"
 ]
+
+
+def _import_submodule(package: str, name: str):
+    """
+    Imports package.name on first access as an attribute of the package, as
+    ``rspace_client.utils`` or ``rspace_client.eln.field_content`` were available
+    when the package imported its modules eagerly.
+    """
+    if importlib.util.find_spec(f"{package}.{name}") is None:
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+    return importlib.import_module(f".{name}", package)
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+    else:
+        value = _import_submodule(__name__, name)
+    # later lookups find it without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .eln.eln import ELNClient
+    from .inv.inv import InventoryClient
+    from .eln.async_eln import AsyncELNClient
+    from .inv.async_inv import AsyncInventoryClient
+    from .eln.advanced_query_builder import AdvancedQueryBuilder
+    from .utils import createELNClient
+    from .eln.field_content import FieldContent
+    from .retry import RetryPolicy
+    from .rate_limit import RateLimiter
+    from .cache import ResponseCache, SqliteResponseCache
+    from .json_codec import JsonCodec, OrjsonCodec
+    from .events import RequestEvent
+    from .metrics import MetricsRegistry
+    from .timeouts import Timeouts, deadline
+    from .transport import Transport, RequestsTransport
+    from .cassette import RecordingTransport, ReplayTransport
@@ -0,0 +1,699 @@
+"""
+Base class for the asyncio-native RSpace API clients.
+These need the optional 'httpx' dependency: pip install rspace-client[async]
+"""
+import asyncio
+import collections
+import copy
+import itertools
+import os
+import time
+
+from rspace_client.client_base import (
+    ClientBase,
+    Pagination,
+    RequestKind,
+    _check_incremental,
+    _next_link,
+)
+from rspace_client.digests import HashingReader, hash_file, hexdigests, new_hashes
+from rspace_client.download import (
+    DownloadResult,
+    PartialDownload,
+    RangedDownload,
+    RangeMismatch,
+)
+from rspace_client.events import Exchange, emit
+from rspace_client.json_stream import JsonArrayParser
+from rspace_client.multipart import ProgressReader
+from rspace_client.single_flight import AsyncSingleFlight
+from rspace_client.timeouts import DeadlineExceededError, time_left
+
+
+def _import_httpx():
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError(
+            "The asyncio clients require httpx, install it with 'pip install rspace-client[async]'"
+        ) from e
+    return httpx
+
+
+class AsyncClientBase(ClientBase):
+    """
+    Asyncio counterpart of ClientBase, sending requests with httpx on the running event loop.
+
+    This class is placed ahead of a synchronous client in the bases of an async client, e.g.
+    ``class AsyncELNClient(AsyncClientBase, ELNClient)``. Methods of the synchronous client
+    that build a request and return ``self.retrieve_api_results(...)`` then return an
+    awaitable, so endpoint and parameter logic is shared with the synchronous clients.
+    Methods that post-process responses are overridden in the async clients.
+
+    A client must be used from a single event loop, and closed with ``await client.aclose()``
+    or by using it in an ``async with`` block.
+    """
+
+    def __init__(self, rspace_url, api_key, max_concurrency: int = 100, **kwargs):
+        """
+        Initializes an asyncio RSpace client.
+        :param api_key: RSpace API key of a user can be found on 'My Profile' page
+        :param max_concurrency: maximum number of requests in flight at once; further requests
+         wait for a free slot. Default is 100.
+        :param kwargs: other options as for ClientBase. pool_maxsize limits the number of open
+         connections, and defaults to max_concurrency. The transport of an asyncio client
+         is an httpx.AsyncClient, whose own transport can be replaced, e.g. to use HTTP/2.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be >= 1 but was {max_concurrency}")
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        kwargs.setdefault("pool_maxsize", max_concurrency)
+        super().__init__(rspace_url, api_key, **kwargs)
+
+    def _create_transport(self, pool_connections, pool_maxsize, pool_block):
+        httpx = _import_httpx()
+        limits = httpx.Limits(
+            max_connections=pool_maxsize,
+            max_keepalive_connections=pool_maxsize if self.keep_alive else 0,
+        )
+        return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(None))
+
+    @property
+    def session(self):
+        """
+        The httpx.AsyncClient sending the requests.
+        """
+        return self.transport
+
+    @session.setter
+    def session(self, session):
+        self.transport = session
+
+    @staticmethod
+    def _create_single_flight():
+        return AsyncSingleFlight()
+
+    def _get_semaphore(self):
+        # created lazily so that it belongs to the event loop the client is used from
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def aclose(self):
+        """
+        Closes all pooled connections. The client should not be used afterwards.
+        """
+        await self.session.aclose()
+
+    def close(self):
+        raise TypeError("Use 'await client.aclose()' to close an asyncio client")
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with an asyncio client")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def _send(
+        self,
+        method,
+        url,
+        kind: RequestKind = None,
+        cache_lookup: str = None,
+        stream=False,
+        exchange: Exchange = None,
+        **kwargs,
+    ):
+        """
+        Asyncio version of ClientBase._send, applying the same rate limiter, retry policy
+        and retry budget, and reporting to the same event handlers.
+        :param stream: if True, the response body is not read; the caller must read it and
+         then close the response with ``await response.aclose()``
+        :param exchange: the Exchange of the request's event, if the caller emits it
+         once it has read the response, as for ClientBase._send
+        :return: the httpx Response of the last attempt
+        """
+        kind = self._request_kind(method, kind, kwargs)
+        if not self._event_handlers:
+            return await self._send_attempts(method, url, kind, None, stream, **kwargs)
+        deferred = exchange is not None
+        if not deferred:
+            exchange = Exchange(method, url, kind.value, cache_lookup)
+        try:
+            response = await self._send_attempts(
+                method, url, kind, exchange, stream, **kwargs
+            )
+        except Exception as e:
+            emit(self._event_handlers, exchange.event(error=e))
+            raise
+        if deferred:
+            return response
+        emit(self._event_handlers, exchange.event(response, streamed=stream))
+        return response
+
+    async def _send_attempts(self, method, url, kind, exchange, stream, **kwargs):
+        httpx = _import_httpx()
+        if exchange is not None:
+            kwargs["extensions"] = {"trace": exchange.trace}
+        file_positions = self._file_positions(kwargs.get("files"))
+        self._retry_budget.deposit()
+        retry_number = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(kind)
+            try:
+                async with self._get_semaphore():
+                    if exchange is not None:
+                        exchange.begin_attempt(retry_number)
+                    connect, read = self._request_timeout(kind, url)
+                    timeout = httpx.Timeout(connect=connect, read=read, write=read, pool=None)
+                    request = self.session.build_request(
+                        method, url, timeout=timeout, **kwargs
+                    )
+                    response = await self.session.send(request, stream=stream)
+            except (httpx.NetworkError, httpx.RemoteProtocolError, httpx.TimeoutException):
+                delay = self._retry_delay_after_error(
+                    method, retry_number, file_positions is not None
+                )
+                if delay is None:
+                    raise
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.on_response(kind, response.status_code)
+                delay = self._retry_delay_after_response(
+                    method, response, retry_number, file_positions is not None
+                )
+                if delay is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+            self._rewind_files(kwargs.get("files"), file_positions)
+            retry_number += 1
+
+    async def retrieve_api_results(
+        self, endpoint, params=None, content_type="application/json", request_type="GET"
+    ):
+        """
+        Asyncio version of ClientBase.retrieve_api_results.
+        :return: parsed JSON response as a dictionary
+        """
+        httpx = _import_httpx()
+        url, kwargs = self._api_request_args(
+            endpoint, params, content_type, request_type
+        )
+        if kwargs.get("params"):
+            # requests drops parameters whose value is None, httpx would send them empty
+            kwargs["params"] = {k: v for k, v in kwargs["params"].items() if v is not None}
+        cache_key, cached = self._add_cache_validators(request_type, url, kwargs)
+        if cached is not None and cached.is_fresh():
+            return self._fresh_cached_result(url, cached)
+
+        async def fetch():
+            try:
+                response = await self._send(
+                    request_type,
+                    url,
+                    cache_lookup=self._cache_lookup(cache_key, cached),
+                    **kwargs,
+                )
+            except httpx.TransportError as e:
+                raise ClientBase.ConnectionError(e)
+            return self._handle_api_response(
+                request_type, url, response, cache_key, cached
+            )
+
+        if request_type == "GET" and self._in_flight is not None:
+            # only the caller sending the request handles the response, so it is
+            # counted and cached once, and each other caller gets a copy of the result
+            return await self._in_flight.do(
+                self._request_key(url, kwargs), fetch, share=copy.deepcopy
+            )
+        return await fetch()
+
+    @staticmethod
+    def _body_args(body: bytes) -> dict:
+        return {"content": body}
+
+    def stream_api_array(self, endpoint, key, params=None, chunk_size=65536):
+        """
+        Asyncio version of ClientBase.stream_api_array, an async generator of the
+        elements of a top-level array of a JSON response.
+        """
+        return self._stream_array(endpoint, JsonArrayParser(key), params, chunk_size)
+
+    async def _stream_array(self, endpoint, parser, params=None, chunk_size=65536):
+        httpx = _import_httpx()
+        url, kwargs = self._api_request_args(endpoint, params, "application/json", "GET")
+        if kwargs.get("params"):
+            kwargs["params"] = {k: v for k, v in kwargs["params"].items() if v is not None}
+        try:
+            response = await self._send("GET", url, stream=True, **kwargs)
+        except httpx.TransportError as e:
+            raise ClientBase.ConnectionError(e)
+        try:
+            if response.status_code >= 400:
+                await response.aread()
+                self._handle_response(response)
+            async for chunk in response.aiter_bytes(chunk_size):
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+        finally:
+            await response.aclose()
+
+    async def _stream_listing(self, endpoint, key, params=None):
+        """
+        Asyncio version of ClientBase._stream_listing.
+        """
+        while endpoint is not None:
+            parser = JsonArrayParser(key, keep=("_links",))
+            async for item in self._stream_array(endpoint, parser, params):
+                yield item
+            endpoint = _next_link(parser.values)
+            params = None
+
+    async def _multipart_post(
+        self, endpoint: str, files: dict, data: dict = None, digests=None, progress=None
+    ):
+        url = self._full_url(endpoint)
+        if not digests and progress is None:
+            response = await self._send(
+                "POST", url, files=files, data=data, headers=self._get_headers()
+            )
+            return self._handle_api_response("POST", url, response)
+        file = reader = HashingReader(files["file"], digests)
+        if progress is not None:
+            file = ProgressReader(reader, progress)
+        files = dict(files, file=file)
+        exchange = None
+        if self._event_handlers:
+            exchange = Exchange("POST", url, RequestKind.UPLOAD.value)
+        response = await self._send(
+            "POST", url, exchange=exchange, files=files, data=data, headers=self._get_headers()
+        )
+        if exchange is not None:
+            emit(
+                self._event_handlers,
+                exchange.event(response, digests=reader.hexdigests() or None),
+            )
+        result = self._handle_api_response("POST", url, response)
+        if digests and isinstance(result, dict):
+            result["digests"] = reader.hexdigests()
+        return result
+
+    async def download_link_to_file(
+        self, url, filename, chunk_size=None, resume=False, parallel=0, digests=None
+    ):
+        """
+        Asyncio version of ClientBase.download_link_to_file.
+        :param url: URL of the file to be downloaded
+        :param filename: file path to save the file to or an already opened file object
+        :param chunk_size: size of the chunks written at a time; default is None, writing
+         the data as it arrives
+        :param resume: if True and filename is a path, completes a file left incomplete
+         by an interrupted download, and resumes a download interrupted by a lost
+         connection, as ClientBase.download_link_to_file does. Default is False.
+        :param parallel: if above 1 and filename is a path, the file is downloaded in byte
+         ranges, up to this many at once, as ClientBase.download_link_to_file does
+        :param digests: name or names of hashlib algorithms whose digests of the file are
+         computed as it is written, as ClientBase.download_link_to_file does
+        :return: a DownloadResult giving the size, duration and throughput of the download,
+         and the digests asked for
+        """
+        httpx = _import_httpx()
+        try:
+            return await self._download_link_to_file(
+                url, filename, chunk_size, resume, parallel, digests
+            )
+        except httpx.TransportError as e:
+            raise ClientBase.ConnectionError(e)
+
+    async def _download_link_to_file(
+        self, url, filename, chunk_size, resume, parallel, digests
+    ):
+        headers = {"apiKey": self.api_key, "Accept": "application/octet-stream"}
+        hashes = new_hashes(digests)
+        to_path = isinstance(filename, str)
+        if resume and to_path and PartialDownload(filename, url).offset:
+            # the part on disk is completed rather than downloaded again in ranges
+            parallel = 0
+        sent = None
+        if parallel > 1 and to_path:
+            result, sent = await self._download_ranges(
+                url, filename, headers, chunk_size, parallel, hashes
+            )
+            if result is not None:
+                return result
+        if resume and to_path:
+            return await self._download_resumable(
+                url, filename, headers, chunk_size, hashes, sent
+            )
+        response, exchange = sent or await self._send_download(url, headers)
+        start = time.perf_counter()
+        size = 0
+        try:
+            with self._download_event(exchange, response) as report:
+                if response.status_code >= 400:
+                    await response.aread()
+                    self._handle_response(response)
+                fd = open(filename, "wb", buffering=0) if isinstance(filename, str) else filename
+                try:
+                    body = _within_deadline(response.aiter_bytes(chunk_size))
+                    async for chunk in body:
+                        fd.write(chunk)
+                        for h in hashes.values():
+                            h.update(chunk)
+                        size += len(chunk)
+                finally:
+                    report["received"] = size
+                    if fd is not filename:
+                        fd.close()
+                report["digests"] = hexdigests(hashes) or None
+        finally:
+            await response.aclose()
+        return DownloadResult(size, time.perf_counter() - start, digests=hexdigests(hashes))
+
+    async def _send_download(self, url, headers):
+        """
+        Asyncio version of ClientBase._send_download.
+        :return: the streamed response, and the Exchange of its event or None
+        """
+        exchange = None
+        if self._event_handlers:
+            exchange = Exchange("GET", url, RequestKind.DOWNLOAD.value)
+        response = await self._send(
+            "GET", url, kind=RequestKind.DOWNLOAD, stream=True, exchange=exchange, headers=headers
+        )
+        return response, exchange
+
+    async def _download_resumable(self, url, path, headers, chunk_size, hashes, sent=None):
+        httpx = _import_httpx()
+        partial = PartialDownload(path, url)
+        start = time.perf_counter()
+        offset = None
+        size = 0
+        # bytes at the start of the file that the hashes were updated with
+        hashed = 0
+        retry_number = 0
+        while True:
+            response, exchange = sent or await self._send_download(
+                url, dict(headers, **partial.request_headers())
+            )
+            sent = None
+            try:
+                with self._download_event(exchange, response) as report:
+                    if partial.is_complete(response):
+                        break
+                    if response.status_code == 416 or (
+                        response.status_code == 206 and not partial.continues(response)
+                    ):
+                        partial.restart()
+                        continue
+                    if response.status_code >= 400:
+                        await response.aread()
+                        self._handle_response(response)
+                    with partial.open(response) as fd:
+                        if offset is None:
+                            offset = partial.offset
+                        if hashed != partial.offset:
+                            hashes = new_hashes(list(hashes))
+                            hashed = hash_file(path, hashes, partial.offset)
+                        received = 0
+                        try:
+                            body = _within_deadline(response.aiter_bytes(chunk_size))
+                            async for chunk in body:
+                                fd.write(chunk)
+                                for h in hashes.values():
+                                    h.update(chunk)
+                                received += len(chunk)
+                            report["digests"] = hexdigests(hashes) or None
+                            break
+                        except (
+                            httpx.NetworkError,
+                            httpx.RemoteProtocolError,
+                            httpx.TimeoutException,
+                        ) as e:
+                            report["error"] = e
+                            delay = self._retry_delay_after_error("GET", retry_number)
+                            if delay is None:
+                                raise
+                        finally:
+                            report["received"] = received
+                            size += received
+                            hashed += received
+            finally:
+                await response.aclose()
+            partial.interrupted()
+            await asyncio.sleep(delay)
+            retry_number += 1
+        partial.complete()
+        if hashes and hashed != os.path.getsize(path):
+            # the file was complete on disk already
+            hashes = new_hashes(list(hashes))
+            hash_file(path, hashes)
+        elapsed = time.perf_counter() - start
+        return DownloadResult(
+            size, elapsed, partial.offset if offset is None else offset, hexdigests(hashes)
+        )
+
+    async def _download_ranges(self, url, path, headers, chunk_size, parallel, hashes):
+        start = time.perf_counter()
+        download = RangedDownload(path, parallel)
+        response, exchange = await self._send_download(
+            url, dict(headers, **download.first_request_headers())
+        )
+        if not download.start(response):
+            if response.status_code == 200:
+                # ranges are not supported, and this is the whole file
+                return None, (response, exchange)
+            try:
+                with self._download_event(exchange, response):
+                    if response.status_code >= 400 and response.status_code != 416:
+                        await response.aread()
+                        self._handle_response(response)
+            finally:
+                await response.aclose()
+            return None, None
+        semaphore = asyncio.Semaphore(parallel)
+
+        async def fetch(first, last):
+            async with semaphore:
+                await self._download_range(url, headers, download, first, last, chunk_size)
+
+        tasks = []
+        try:
+            first, last = download.first_range
+            await self._download_range(
+                url, headers, download, first, last, chunk_size, (response, exchange)
+            )
+            tasks = [asyncio.ensure_future(fetch(*r)) for r in download.ranges()]
+            await asyncio.gather(*tasks)
+        except RangeMismatch:
+            return None, None
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            download.close()
+        hash_file(path, hashes)
+        result = DownloadResult(
+            download.length, time.perf_counter() - start, digests=hexdigests(hashes)
+        )
+        return result, None
+
+    async def _download_range(
+        self, url, headers, download, first, last, chunk_size, sent=None
+    ):
+        httpx = _import_httpx()
+        writer = download.writer(first)
+        retry_number = 0
+        while True:
+            if sent is None:
+                sent = await self._send_download(
+                    url, dict(headers, **download.request_headers(writer.position, last))
+                )
+            response, exchange = sent
+            try:
+                with self._download_event(exchange, response) as report:
+                    if not download.matches(response, writer.position, last):
+                        if response.status_code >= 400 and response.status_code != 416:
+                            await response.aread()
+                            self._handle_response(response)
+                        raise RangeMismatch(
+                            f"Bytes {writer.position}-{last} of {url} were not served as "
+                            f"part of the same content (status {response.status_code})"
+                        )
+                    position = writer.position
+                    try:
+                        body = _within_deadline(response.aiter_bytes(chunk_size))
+                        async for chunk in body:
+                            writer.write(chunk)
+                    except (
+                        httpx.NetworkError,
+                        httpx.RemoteProtocolError,
+                        httpx.TimeoutException,
+                    ) as e:
+                        report["error"] = e
+                        delay = self._retry_delay_after_error("GET", retry_number)
+                        if delay is None:
+                            raise
+                    else:
+                        if writer.position != last + 1:
+                            raise RangeMismatch(
+                                f"Bytes {first}-{last} of {url} ended at {writer.position - 1}"
+                            )
+                        return
+                    finally:
+                        report["received"] = writer.position - position
+            finally:
+                await response.aclose()
+            await asyncio.sleep(delay)
+            retry_number += 1
+            sent = None
+
+    def _stream(
+        self,
+        endpoint: str,
+        pagination: Pagination = Pagination(),
+        prefetch: int = 0,
+        parallel: int = 0,
+        ordered: bool = True,
+        incremental: bool = False,
+    ):
+        """
+        Asyncio version of ClientBase._stream, an async generator of the items of a
+        paginated listing. With prefetch > 0, up to that many pages are fetched ahead
+        by a background task. With parallel > 1, up to that many pages are requested
+        concurrently. With incremental, each page is decoded as it is downloaded.
+        """
+        if incremental:
+            _check_incremental(prefetch, parallel)
+            return self._stream_listing(
+                self._first_page_url(endpoint, pagination), endpoint
+            )
+        return self._stream_pages(endpoint, pagination, prefetch, parallel, ordered)
+
+    async def _stream_pages(self, endpoint, pagination, prefetch, parallel, ordered):
+        if parallel > 1:
+            pages = self._iter_pages_parallel(endpoint, pagination, parallel, ordered)
+        else:
+            pages = self._iter_pages(endpoint, pagination)
+        if prefetch > 0:
+            pages = _prefetch(pages, prefetch)
+        async for page in pages:
+            for item in page[endpoint]:
+                yield item
+
+    async def _iter_pages(self, endpoint: str, pagination: Pagination):
+        page = await self.retrieve_api_results(
+            self._first_page_url(endpoint, pagination)
+        )
+        yield page
+        async for page in self._next_pages(page):
+            yield page
+
+    async def _next_pages(self, page):
+        while self.link_exists(page, "next"):
+            page = await self.retrieve_api_results(self.get_link(page, "next"))
+            yield page
+
+    async def _iter_pages_parallel(
+        self, endpoint: str, pagination: Pagination, parallel: int, ordered: bool
+    ):
+        first = await self.retrieve_api_results(
+            self._first_page_url(endpoint, pagination)
+        )
+        yield first
+        total_hits = first.get("totalHits")
+        if total_hits is None:
+            async for page in self._next_pages(first):
+                yield page
+            return
+        urls = self._page_urls(endpoint, pagination, total_hits)
+        async for page in _fan_out(self.retrieve_api_results, urls, parallel, ordered):
+            self._check_total_hits(endpoint, page, total_hits)
+            yield page
+
+
+async def _within_deadline(chunks):
+    """
+    Yields the chunks of a response body, waiting for each no longer than the time
+    left until the current deadline, as ClientBase downloads do.
+    :raises DeadlineExceededError: if the deadline passes
+    """
+    iterator = chunks.__aiter__()
+    while True:
+        left = time_left("while a response was read")
+        try:
+            if left is None:
+                chunk = await iterator.__anext__()
+            else:
+                chunk = await asyncio.wait_for(iterator.__anext__(), left)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceededError(
+                "The deadline passed while a response was read"
+            ) from e
+        yield chunk
+
+
+async def _fan_out(fn, args, window: int, ordered: bool):
+    """
+    Asyncio version of client_base._fan_out, running at most 'window' coroutines
+    fn(arg) as tasks at a time.
+    """
+    args = iter(args)
+    pending = collections.deque(
+        asyncio.ensure_future(fn(arg)) for arg in itertools.islice(args, window)
+    )
+    try:
+        while pending:
+            if ordered:
+                result = await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                task = done.pop()
+                pending.remove(task)
+                result = task.result()
+            for arg in itertools.islice(args, 1):
+                pending.append(asyncio.ensure_future(fn(arg)))
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _prefetch(pages, max_ahead: int):
+    """
+    Asyncio version of client_base._prefetch, iterating over an async iterator in a
+    background task up to max_ahead items ahead of the consumer.
+    """
+    buffer = asyncio.Queue(maxsize=max_ahead)
+
+    async def produce():
+        try:
+            async for page in pages:
+                await buffer.put(("item", page))
+            await buffer.put(("end", None))
+        except Exception as e:
+            await buffer.put(("error", e))
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            kind, value = await buffer.get()
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        task.cancel()
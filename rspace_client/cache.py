@@ -0,0 +1,430 @@
+"""
+Caches of GET responses for the RSpace API clients, in memory or in SQLite.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Mapping, Optional
+
+
+class CachedResponse:
+    """
+    Body and validators of a cached response. The body is kept as bytes and parsed
+    again on each hit, so callers may freely modify the dictionaries they get back.
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        expires: Optional[float] = None,
+    ):
+        """
+        :param expires: time.time() until which the response may be used without
+         revalidating it with the server; None if it must always be revalidated
+        """
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def is_fresh(self) -> bool:
+        return self.expires is not None and time.time() < self.expires
+
+    def has_validators(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def json(self, loads=json.loads):
+        return loads(self.body)
+
+
+class ResponseCache:
+    """
+    An LRU cache of JSON responses to GET requests, revalidated with the server on
+    every use. A cached response's ``ETag`` and ``Last-Modified`` validators are sent
+    as ``If-None-Match`` and ``If-Modified-Since``; when the server responds
+    304 Not Modified the cached body is returned without being downloaded again.
+
+    Only successful JSON responses carrying a validator, and not marked
+    ``Cache-Control: no-store``, are cached. PUT, POST and DELETE requests to a URL
+    evict the cached responses of that URL. The least recently used entries are
+    evicted once either ``max_entries`` or ``max_bytes`` is exceeded.
+
+    A cache is safe to share between threads, and between clients of the same user,
+    e.g. ``ELNClient(url, key, response_cache=ResponseCache())``.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        """
+        :param max_entries: maximum number of cached responses, default is 1024
+        :param max_bytes: maximum total size of cached response bodies, default is 32MB
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be >= 1 but was {max_entries}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def key(self, url: str, params: Optional[dict], headers: Optional[dict]) -> tuple:
+        """
+        Cache key of a GET request. Parameters with a value of None are not sent,
+        so are ignored. The API key and Accept header are part of the key, as
+        responses differ between users and representations.
+        """
+        query = tuple(
+            sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)
+        )
+        headers = headers or {}
+        return url, query, headers.get("apiKey"), headers.get("Accept")
+
+    def revalidated(self, key: Hashable, cached: CachedResponse):
+        """
+        Called when the server confirmed that a cached response is unchanged.
+        """
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: Hashable, response) -> bool:
+        """
+        Caches a response if it is cacheable.
+        :param response: a requests or httpx response to a GET request
+        :return: True if the response was cached
+        """
+        if not self.is_cacheable(response):
+            self.discard(key)
+            return False
+        entry = CachedResponse(
+            response.content,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        if entry.size > self.max_bytes:
+            self.discard(key)
+            return False
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    @staticmethod
+    def is_cacheable(response, require_validators: bool = True) -> bool:
+        headers = response.headers
+        return (
+            response.status_code == 200
+            and "application/json" in headers.get("Content-Type", "")
+            and (
+                not require_validators
+                or "ETag" in headers
+                or "Last-Modified" in headers
+            )
+            and "no-store" not in headers.get("Cache-Control", "")
+        )
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate(self, url: str):
+        """
+        Evicts all cached responses to GETs of a URL, whatever their parameters.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == url]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __repr__(self):
+        return (
+            f"ResponseCache(entries={len(self)}, bytes={self._bytes}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
+
+
+class SqliteResponseCache:
+    """
+    A persistent cache of JSON responses to GET requests, stored in a local SQLite
+    file so that it survives between runs and can be shared by several processes,
+    e.g. cron jobs and notebooks fetching the same forms and templates.
+
+    Each resource type (the first path segment after the API URL, e.g. 'forms' or
+    'sampleTemplates') has a time to live. While an entry is younger than its TTL it
+    is returned without contacting the server. Older entries are revalidated with
+    ``If-None-Match`` / ``If-Modified-Since`` if the server sent validators, and
+    are otherwise fetched again. Resource types not in ``ttls`` get ``default_ttl``.
+
+    Any PUT, POST or DELETE made through a client using the cache evicts all cached
+    responses of that resource type on that server, e.g. ``update_document`` evicts
+    cached documents and ``rename`` of a sample evicts cached samples. It also evicts
+    the listings in LISTED_RESOURCES that list records of that type, e.g.
+    ``upload_file`` evicts cached folder trees and moving a sample with /bulk evicts
+    cached workbenches. Changes made by other clients are only seen once entries
+    expire.
+
+    Entries are keyed by server URL, a hash of the API key (the key itself is not
+    stored), endpoint, parameters and Accept header.
+    """
+
+    DEFAULT_TTLS = {
+        "forms": 3600,
+        "sampleTemplates": 3600,
+        "instrumentTemplates": 3600,
+        "units": 86400,
+        "folders": 300,
+        "workbenches": 300,
+    }
+
+    #: resource types listing records of other resource types, and the resource types
+    #: whose changes evict them as well as their own
+    LISTED_RESOURCES = {
+        "folders": ("documents", "files", "import", "share"),
+        "workbenches": (
+            "bulk",
+            "containers",
+            "import",
+            "instruments",
+            "samples",
+            "subSamples",
+        ),
+    }
+
+    _RESOURCE_PATTERN = re.compile(r"/api/(?:inventory/)?v\d+/([^/?]+)")
+
+    def __init__(
+        self,
+        path: str,
+        ttls: Optional[Mapping[str, float]] = None,
+        default_ttl: float = 0,
+        max_entries: int = 10000,
+        timeout: float = 30.0,
+    ):
+        """
+        :param path: path of the SQLite database file, created if it does not exist
+        :param ttls: seconds for which responses of each resource type are used without
+         revalidation, default is DEFAULT_TTLS
+        :param default_ttl: TTL of other resource types, default is 0, i.e. always
+         revalidated
+        :param max_entries: maximum number of cached responses; the least recently used
+         are evicted, default is 10000
+        :param timeout: seconds to wait for a lock held by another process, default is 30
+        """
+        self.path = os.path.expanduser(path)
+        self.ttls = dict(ttls if ttls is not None else self.DEFAULT_TTLS)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, resource TEXT NOT NULL, body BLOB NOT NULL,"
+                " etag TEXT, last_modified TEXT, expires REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_resource ON responses (resource)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread and process; connections must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @classmethod
+    def resource_type(cls, url: str) -> str:
+        """
+        The resource type of an API URL, e.g. 'forms' for .../api/v1/forms/12
+        """
+        match = cls._RESOURCE_PATTERN.search(url)
+        return match.group(1) if match else ""
+
+    def _resource_key(self, url: str, resource_type: str = None) -> str:
+        server = url.split("/api/", 1)[0]
+        return f"{server} {resource_type or self.resource_type(url)}"
+
+    def ttl(self, url: str) -> float:
+        return self.ttls.get(self.resource_type(url), self.default_ttl)
+
+    def key(self, url: str, params: Optional[dict], headers: Optional[dict]) -> tuple:
+        """
+        Cache key of a GET request, as for ResponseCache but with a hash of the API key.
+        """
+        query = sorted([k, str(v)] for k, v in (params or {}).items() if v is not None)
+        headers = headers or {}
+        api_key = headers.get("apiKey") or ""
+        user = hashlib.sha256(api_key.encode()).hexdigest()[:32]
+        return url, json.dumps([url, query, user, headers.get("Accept")])
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        conn = self._connection()
+        with conn:
+            row = conn.execute(
+                "SELECT body, etag, last_modified, expires FROM responses WHERE key = ?",
+                (key[1],),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key[1])
+            )
+        return CachedResponse(bytes(row[0]), row[1], row[2], row[3])
+
+    def store(self, key: tuple, response) -> bool:
+        """
+        Caches a response if it is cacheable.
+        :param response: a requests or httpx response to a GET request
+        :return: True if the response was cached
+        """
+        url = key[0]
+        ttl = self.ttl(url)
+        if not ResponseCache.is_cacheable(response, require_validators=ttl <= 0):
+            self.discard(key)
+            return False
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key[1],
+                    self._resource_key(url),
+                    response.content,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now + ttl,
+                    now,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses"
+                " ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        return True
+
+    def revalidated(self, key: tuple, cached: CachedResponse):
+        """
+        Restarts the TTL of a cached response that the server confirmed unchanged.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE responses SET expires = ? WHERE key = ?",
+                (time.time() + self.ttl(key[0]), key[1]),
+            )
+
+    def discard(self, key: tuple):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key[1],))
+
+    def invalidate(self, url: str):
+        """
+        Evicts all cached responses of the resource type of a URL, and of the listings
+        of that type, on the URL's server.
+        """
+        changed = self.resource_type(url)
+        types = [changed] + [
+            listing
+            for listing, listed in self.LISTED_RESOURCES.items()
+            if changed in listed
+        ]
+        keys = [self._resource_key(url, t) for t in types]
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM responses WHERE resource IN ({})".format(
+                    ", ".join("?" * len(keys))
+                ),
+                keys,
+            )
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM responses")
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def close(self):
+        """
+        Closes the calling thread's database connection.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __repr__(self):
+        return (
+            f"SqliteResponseCache(path={self.path!r}, hits={self.hits}, "
+            f"misses={self.misses})"
+        )
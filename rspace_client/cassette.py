@@ -0,0 +1,251 @@
+"""
+Recording of the HTTP exchanges of a client to a cassette, and their replay
+without a server, e.g. to profile the client's own CPU and memory use of
+import_tree, streamed listings or Inventory bulk operations reproducibly::
+
+    with ELNClient(url, api_key, transport=RecordingTransport("tree.cassette")) as client:
+        client.import_tree("data")
+
+    client = ELNClient(url, "any key", transport=ReplayTransport("tree.cassette"))
+    client.import_tree("data")
+
+A cassette is a directory holding ``exchanges.jsonl``, one line per exchange in
+the order the requests were sent, and ``bodies/``, holding each binary response
+body once, named by its SHA-256 digest. JSON and text bodies are stored inline.
+"""
+import datetime
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from rspace_client.transport import RequestsTransport, Transport
+
+EXCHANGES = "exchanges.jsonl"
+BODIES = "bodies"
+
+# not recorded: the body is stored decoded, and connection details do not replay
+_DROPPED_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "date",
+    "keep-alive",
+    "server",
+    "set-cookie",
+    "transfer-encoding",
+}
+
+
+# request headers selecting the part of a response that is sent
+_KEY_HEADERS = ("Range", "If-Range")
+
+
+class CassetteMiss(LookupError):
+    """
+    Raised on replay for a request the cassette holds no (more) responses for.
+    """
+
+
+def request_key(
+    method: str, url: str, params: dict = None, headers: dict = None
+) -> str:
+    """
+    Identifies a request on replay by its method, path and query parameters, so
+    that a cassette can be replayed against any server URL, and by the headers in
+    _KEY_HEADERS it has, so that resumed and ranged downloads get their own parts
+    of a file.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(k, str(v)) for k, v in params.items() if v is not None]
+    key = f"{method.upper()} {parts.path}?{urlencode(sorted(query))}"
+    headers = CaseInsensitiveDict(headers or {})
+    for name in _KEY_HEADERS:
+        if headers.get(name) is not None:
+            key += f" {name}: {headers[name]}"
+    return key
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests with another transport, and records each response to a
+    cassette. Responses are read to the end while they are recorded, so streamed
+    bodies are written to the cassette as they arrive and then streamed from it.
+    Requests that fail without a response are not recorded.
+    """
+
+    def __init__(self, path: str, transport: Transport = None):
+        """
+        :param path: directory of the cassette, created or overwritten
+        :param transport: the transport sending the requests. Default is a new
+         RequestsTransport.
+        """
+        self.path = path
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.connection_errors = self.transport.connection_errors
+        os.makedirs(os.path.join(path, BODIES), exist_ok=True)
+        self._exchanges = open(os.path.join(path, EXCHANGES), "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def send(self, method, url, *, params=None, stream=False, **kwargs):
+        start = time.perf_counter()
+        response = self.transport.send(method, url, params=params, stream=stream, **kwargs)
+        elapsed = time.perf_counter() - start
+        with response:
+            record, body = self._record_body(response)
+        record.update(
+            key=request_key(method, url, params, kwargs.get("headers")),
+            status=response.status_code,
+            reason=response.reason,
+            headers={
+                k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS
+            },
+            elapsed=round(elapsed, 6),
+            transfer=round(time.perf_counter() - start - elapsed, 6),
+        )
+        with self._lock:
+            self._exchanges.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._exchanges.flush()
+        return _response(method, url, kwargs.get("headers"), record, body, elapsed, stream)
+
+    def _record_body(self, response):
+        """
+        Reads the body of a response into the record of the exchange if it is text,
+        else into the cassette's bodies.
+        :return: the record and the body, as bytes or an open file
+        """
+        content_type = response.headers.get("Content-Type", "")
+        if "json" in content_type or content_type.startswith("text/"):
+            content = response.content
+            try:
+                return {"text": content.decode("utf-8")}, content
+            except UnicodeDecodeError:
+                pass
+            chunks = [content]
+        else:
+            chunks = response.iter_content(chunk_size=65536)
+        digest = hashlib.sha256()
+        size = 0
+        temporary = os.path.join(self.path, BODIES, f"tmp-{uuid.uuid4().hex}")
+        try:
+            with open(temporary, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        name = digest.hexdigest()
+        os.replace(temporary, os.path.join(self.path, BODIES, name))
+        return {"body": name, "size": size}, open(os.path.join(self.path, BODIES, name), "rb")
+
+    def close(self):
+        with self._lock:
+            self._exchanges.close()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Answers requests from a cassette, without a server. A request is answered by
+    the next unused response recorded for the same method, path, query parameters
+    and Range / If-Range headers, so concurrent requests may be replayed in another
+    order than they were recorded.
+    """
+
+    def __init__(self, path: str, timing: Optional[float] = None):
+        """
+        :param path: directory of the cassette
+        :param timing: None (default) to answer at once, or a factor scaling the
+         recorded time of each exchange, e.g. 1 to replay as recorded or 0.5 twice
+         as fast. Streamed bodies are delivered over their recorded transfer time.
+        """
+        self.path = path
+        self.timing = timing
+        self._responses = defaultdict(deque)
+        with open(os.path.join(path, EXCHANGES), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self._responses[record["key"]].append(record)
+        self._lock = threading.Lock()
+
+    def remaining(self) -> int:
+        """
+        Number of recorded responses not replayed yet.
+        """
+        with self._lock:
+            return sum(len(records) for records in self._responses.values())
+
+    def send(self, method, url, *, params=None, stream=False, headers=None, **kwargs):
+        key = request_key(method, url, params, headers)
+        with self._lock:
+            records = self._responses.get(key)
+            if not records:
+                raise CassetteMiss(f"The cassette has no response left for {key}")
+            record = records.popleft()
+        scale = self.timing or 0
+        if scale:
+            time.sleep(record["elapsed"] * scale)
+        if "text" in record:
+            body = record["text"].encode("utf-8")
+        else:
+            body = open(os.path.join(self.path, BODIES, record["body"]), "rb")
+        if scale and record["transfer"]:
+            if stream and "body" in record:
+                body = _PacedReader(body, record["size"], record["transfer"] * scale)
+            else:
+                time.sleep(record["transfer"] * scale)
+        return _response(method, url, headers, record, body, record["elapsed"] * scale, stream)
+
+
+class _PacedReader(io.RawIOBase):
+    """
+    Reads a file at the rate its content was recorded at.
+    """
+
+    def __init__(self, file, size: int, seconds: float):
+        self._file = file
+        self._seconds_per_byte = seconds / size if size else 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._file.readinto(buffer)
+        time.sleep(n * self._seconds_per_byte)
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _response(method, url, request_headers, record, body, elapsed, stream):
+    """
+    A requests Response of a recorded exchange, whose body is bytes or a file that
+    is read when the response is, if it is streamed.
+    """
+    if not stream and not isinstance(body, bytes):
+        with body:
+            body = body.read()
+    response = requests.Response()
+    response.status_code = record["status"]
+    response.reason = record.get("reason")
+    response.headers = CaseInsensitiveDict(record["headers"])
+    response.url = url
+    response.elapsed = datetime.timedelta(seconds=elapsed)
+    response.request = requests.Request(method, url, headers=request_headers).prepare()
+    response.raw = io.BytesIO(body) if isinstance(body, bytes) else body
+    return response
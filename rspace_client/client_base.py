@@ -1,6 +1,61 @@
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import copy
+import itertools
+import math
+import os
+import queue
 import re
 import requests
 import sys
+import threading
+import time
+from enum import Enum
+
+from rspace_client.cache import ResponseCache
+from rspace_client.digests import HashingReader, hash_file, hexdigests, new_hashes
+from rspace_client.download import (
+    DownloadResult,
+    PartialDownload,
+    RangedDownload,
+    RangeMismatch,
+    copy_response,
+)
+from rspace_client.events import (
+    EventHandler,
+    Exchange,
+    cache_hit_event,
+    emit,
+    observe_connections,
+    record_operations,
+)
+from rspace_client.json_codec import JsonCodec, default_codec
+from rspace_client.json_stream import JsonArrayParser
+from rspace_client.multipart import ProgressReader
+from rspace_client.rate_limit import RateLimiter
+from rspace_client.retry import RetryPolicy
+from rspace_client.single_flight import SingleFlight
+from rspace_client.timeouts import (
+    DeadlineExceededError,
+    Timeouts,
+    bounded,
+    remaining,
+    time_left,
+)
+from rspace_client.transport import RequestsTransport, Transport
+
+
+class RequestKind(str, Enum):
+    """
+    What a request does, used to pick the rate-limit budget it counts against.
+    """
+
+    READ = "read"
+    WRITE = "write"
+    UPLOAD = "upload"
+    DOWNLOAD = "download"
 
 
 class Pagination:
@@ -22,20 +77,333 @@ class Pagination:
         if order_by is not None:
             self.data["orderBy"] = f"{order_by} {sort_order}"
 
+    @property
+    def page_number(self) -> int:
+        return self.data["pageNumber"]
+
+    @property
+    def page_size(self) -> int:
+        return self.data["pageSize"]
+
+    def for_page(self, page_number: int) -> "Pagination":
+        """
+        A copy of this pagination, including any filters added to its data, for
+        another page number.
+        """
+        other = Pagination()
+        other.data = {**self.data, "pageNumber": page_number}
+        return other
+
+    def page_count(self, total_hits: int) -> int:
+        """
+        Number of pages a listing of total_hits items is split into.
+        """
+        return math.ceil(total_hits / self.page_size)
+
 
+@record_operations
 class ClientBase:
     """Base class of common methods for all API clients"""
 
-    def __init__(self, rspace_url, api_key):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        record_operations(cls)
+
+    def __init__(
+        self,
+        rspace_url,
+        api_key,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        retry_policy: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        response_cache: ResponseCache = None,
+        json_codec: JsonCodec = None,
+        event_handlers: list = None,
+        coalesce_requests: bool = False,
+        timeouts: Timeouts = None,
+        transport: Transport = None,
+    ):
         """
         Initializes RSpace client.
+        All requests made by the client are sent by its transport, by default one pooled
+        HTTP session, so TCP and TLS connections are reused between calls. Use the client
+        as a context manager, or call close(), to release pooled connections when done.
         :param api_key: RSpace API key of a user can be found on 'My Profile' page
+        :param pool_connections: number of per-host connection pools to keep, default is 10
+        :param pool_maxsize: maximum number of connections kept open to a single host, default is 10
+        :param pool_block: if True, block when all connections to a host are busy rather than
+         opening extra connections that are discarded after use, default is False
+        :param keep_alive: if False, connections are closed after each request, default is True
+        :param retry_policy: when and how to retry failed requests. The default RetryPolicy()
+         retries GETs after 429/502/503/504 responses and connection errors; use
+         RetryPolicy.never() to disable retries.
+        :param rate_limiter: optional RateLimiter throttling requests sent by this client. It
+         can be shared between clients, threads and coroutines. Default is no rate limiting.
+        :param response_cache: optional cache of GET responses. A ResponseCache revalidates
+         responses with ETag / Last-Modified so unchanged resources are not downloaded
+         again; a SqliteResponseCache persists them between processes with a TTL per
+         resource type. Default is no caching.
+        :param json_codec: JsonCodec encoding request bodies and decoding responses. Default
+         is OrjsonCodec if orjson is installed, otherwise the standard library JsonCodec.
+        :param event_handlers: callables passed a RequestEvent after every HTTP exchange,
+         see add_event_handler. Default is none.
+        :param coalesce_requests: if True, identical GET requests made concurrently, e.g.
+         by threads all looking up the same folder or form, are sent once and share the
+         response. GETs made after a change to a resource by this client are not joined
+         to those sent before it. Default is False.
+        :param timeouts: connect and read timeouts of requests, per endpoint class
+         (metadata, upload, download, export polling). Default is Timeouts(); use
+         Timeouts.none() to wait forever.
+        :param transport: the Transport sending the client's requests. Default is a
+         RequestsTransport with the pool_* and keep_alive settings, which are otherwise
+         ignored.
         """
         self.rspace_url = rspace_url.rstrip('/')
         self.api_key = api_key
+        self.keep_alive = keep_alive
+        if transport is None:
+            transport = self._create_transport(pool_connections, pool_maxsize, pool_block)
+        self.transport = transport
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._retry_budget = self.retry_policy.new_budget()
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.json_codec = json_codec if json_codec is not None else default_codec()
+        self._event_handlers = tuple(event_handlers or ())
+        self._in_flight = self._create_single_flight() if coalesce_requests else None
+        self.timeouts = timeouts if timeouts is not None else Timeouts()
+
+    def _create_transport(self, pool_connections, pool_maxsize, pool_block):
+        return RequestsTransport(
+            pool_connections, pool_maxsize, pool_block, self.keep_alive
+        )
+
+    @property
+    def session(self):
+        """
+        The requests Session of the default transport.
+        """
+        return self.transport.session
+
+    @staticmethod
+    def _create_single_flight():
+        return SingleFlight()
+
+    def close(self):
+        """
+        Closes all pooled connections. The client should not be used afterwards.
+        """
+        self.transport.close()
+
+    def add_event_handler(self, handler: EventHandler):
+        """
+        Registers a callable that is passed a RequestEvent after every HTTP exchange
+        of this client, including downloads, multipart uploads and responses served
+        from the response cache. The event gives the endpoint, status, sizes, timings,
+        retries and cache outcome of the request, and the public method that made it.
+
+        Handlers run on the thread (or event loop) that made the request, so should
+        be quick, e.g. appending to a list or updating counters. Exceptions raised by
+        a handler are logged and otherwise ignored. When no handler is registered,
+        no events are created.
+        """
+        self._event_handlers = self._event_handlers + (handler,)
+
+    def remove_event_handler(self, handler: EventHandler):
+        self._event_handlers = tuple(h for h in self._event_handlers if h != handler)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _send(
+        self,
+        method,
+        url,
+        kind: RequestKind = None,
+        cache_lookup: str = None,
+        exchange: Exchange = None,
+        **kwargs,
+    ):
+        """
+        Sends an HTTP request with the client's transport, subject to the
+        client's rate limiter, and retrying it as allowed by the client's retry policy
+        and retry budget. All request paths (JSON calls, downloads and multipart
+        uploads) go through this method, which reports each exchange to the client's
+        event handlers.
+        :param method: 'GET', 'PUT', 'POST', 'DELETE'
+        :param url: full URL of the request
+        :param kind: what the request does; by default UPLOAD if it has files, READ for a
+         GET and WRITE otherwise
+        :param cache_lookup: for events, 'miss' or 'revalidate' if the request is a
+         cacheable GET without or with a cached response
+        :param exchange: the Exchange of the request's event, if the caller emits it
+         once it has read the response, e.g. of a download; the event is only emitted
+         here if no response was received
+        :param kwargs: further arguments of Transport.send, e.g. params, data, files, headers
+        :return: the Response of the last attempt
+        """
+        kind = self._request_kind(method, kind, kwargs)
+        if not self._event_handlers:
+            return self._send_attempts(method, url, kind, None, **kwargs)
+        deferred = exchange is not None
+        if not deferred:
+            exchange = Exchange(method, url, kind.value, cache_lookup)
+        try:
+            response = self._send_attempts(method, url, kind, exchange, **kwargs)
+        except Exception as e:
+            emit(self._event_handlers, exchange.event(error=e))
+            raise
+        if deferred:
+            return response
+        emit(
+            self._event_handlers,
+            exchange.event(response, streamed=kwargs.get("stream", False)),
+        )
+        return response
+
+    def _send_attempts(self, method, url, kind, exchange, **kwargs):
+        file_positions = self._file_positions(kwargs.get("files"))
+        self._retry_budget.deposit()
+        retry_number = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(kind)
+            if exchange is not None:
+                exchange.begin_attempt(retry_number)
+                observe_connections(exchange)
+            try:
+                response = self.transport.send(
+                    method, url, timeout=self._request_timeout(kind, url), **kwargs
+                )
+            except self.transport.connection_errors:
+                delay = self._retry_delay_after_error(
+                    method, retry_number, file_positions is not None
+                )
+                if delay is None:
+                    raise
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.on_response(kind, response.status_code)
+                delay = self._retry_delay_after_response(
+                    method, response, retry_number, file_positions is not None
+                )
+                if delay is None:
+                    return response
+                response.close()
+            finally:
+                if exchange is not None:
+                    observe_connections(None)
+            time.sleep(delay)
+            self._rewind_files(kwargs.get("files"), file_positions)
+            retry_number += 1
+
+    @staticmethod
+    def _request_kind(method, kind, kwargs):
+        if kind is not None:
+            return kind
+        if kwargs.get("files"):
+            return RequestKind.UPLOAD
+        if method.upper() == "GET":
+            return RequestKind.READ
+        return RequestKind.WRITE
+
+    def _request_timeout(self, kind, url):
+        """
+        (connect, read) timeouts of a request, shortened to the time left until the
+        current deadline.
+        :raises DeadlineExceededError: if the deadline has passed
+        """
+        left = time_left(f"before {url} was requested")
+        return bounded(self.timeouts.get(Timeouts.endpoint_class(kind.value, url)), left)
+
+    @staticmethod
+    def _within_deadline(delay):
+        left = remaining()
+        return left is None or delay < left
+
+    def _retry_delay_after_error(self, method, retry_number, rewindable=True):
+        """
+        Seconds to wait before retrying a request that failed with a connection
+        error, or None if it should not be retried.
+        :param rewindable: False if the files of the request cannot be sent again
+        """
+        policy = self.retry_policy
+        if not (
+            retry_number < policy.max_retries
+            and policy.is_retryable_error(method)
+            and rewindable
+        ):
+            return None
+        delay = policy.backoff(retry_number)
+        if not self._within_deadline(delay) or not self._retry_budget.withdraw():
+            return None
+        return delay
+
+    def _retry_delay_after_response(
+        self, method, response, retry_number, rewindable=True
+    ):
+        """
+        Seconds to wait before retrying a request after the given response, or None
+        if the response should be returned to the caller.
+        :param rewindable: False if the files of the request cannot be sent again
+        """
+        policy = self.retry_policy
+        if not (
+            retry_number < policy.max_retries
+            and policy.is_retryable_status(method, response.status_code)
+        ):
+            return None
+        delay = policy.delay_for_response(retry_number, response)
+        if (
+            delay is None
+            or not rewindable
+            or not self._within_deadline(delay)
+            or not self._retry_budget.withdraw()
+        ):
+            return None
+        return delay
+
+    @staticmethod
+    def _file_objects(files):
+        if not files:
+            return []
+        values = files.values() if isinstance(files, dict) else [f for _, f in files]
+        # each value is either a file object, or a tuple of (filename, file, ...)
+        objects = [v[1] if isinstance(v, tuple) else v for v in values]
+        return [o for o in objects if hasattr(o, "read")]
+
+    @staticmethod
+    def _file_positions(files):
+        """
+        Start positions of the files in a multipart upload, so they can be re-sent on
+        retry, or None if any of them cannot be rewound.
+        """
+        positions = []
+        for f in ClientBase._file_objects(files):
+            try:
+                if hasattr(f, "seekable") and not f.seekable():
+                    return None
+                positions.append(f.tell())
+            except (AttributeError, OSError, ValueError):
+                return None
+        return positions
+
+    @staticmethod
+    def _rewind_files(files, positions):
+        for f, position in zip(ClientBase._file_objects(files), positions):
+            f.seek(position)
 
     def _get_headers(self, content_type="application/json"):
-        return {"apiKey": self.api_key, "Accept": content_type}
+        headers = {"apiKey": self.api_key}
+        if content_type is not None:
+            headers["Accept"] = content_type
+        return headers
 
     @staticmethod
     def _get_numeric_record_id(global_id):
@@ -66,7 +434,7 @@ class ClientBase:
         )
 
     @staticmethod
-    def _handle_response(response):
+    def _handle_response(response, json_codec: JsonCodec = None):
         # Check whether response includes UNAUTHORIZED response code
         # print("status: {}, header: {}".format(response.headers, response.status_code))
         if response.status_code == 401:
@@ -76,6 +444,8 @@ class ClientBase:
             response.raise_for_status()
 
             if ClientBase._responseContainsJson(response):
+                if json_codec is not None:
+                    return json_codec.loads(response.content)
                 return response.json()
             elif response.text:
                 return response.text
@@ -116,33 +486,229 @@ class ClientBase:
         :param content_type: content type
         :return: parsed JSON response as a dictionary
         """
-        url = endpoint
-        if not endpoint.startswith(self._get_api_url()):
-            url = self._get_api_url() + endpoint
-
-        headers = self._get_headers(content_type)
         try:
-            if request_type == "GET":
-                response = requests.get(url, params=params, headers=headers)
-            elif (
-                request_type == "PUT"
-                or request_type == "POST"
-                or request_type == "DELETE"
-            ):
-                response = requests.request(
-                    request_type, url, json=params, headers=headers
+            url, kwargs = self._api_request_args(
+                endpoint, params, content_type, request_type
+            )
+            cache_key, cached = self._add_cache_validators(request_type, url, kwargs)
+            if cached is not None and cached.is_fresh():
+                return self._fresh_cached_result(url, cached)
+
+            def fetch():
+                response = self._send(
+                    request_type,
+                    url,
+                    cache_lookup=self._cache_lookup(cache_key, cached),
+                    **kwargs,
                 )
-            else:
-                raise ValueError(
-                    "Expected GET / PUT / POST / DELETE request type, received {} instead".format(
-                        request_type
-                    )
+                return self._handle_api_response(
+                    request_type, url, response, cache_key, cached
                 )
 
-            return self._handle_response(response)
-        except requests.exceptions.ConnectionError as e:
+            if request_type == "GET" and self._in_flight is not None:
+                # only the caller sending the request handles the response, so it is
+                # counted and cached once, and each other caller gets a copy of the result
+                return self._in_flight.do(
+                    self._request_key(url, kwargs), fetch, share=copy.deepcopy
+                )
+            return fetch()
+        except self.transport.connection_errors as e:
             raise ClientBase.ConnectionError(e)
 
+    def stream_api_array(self, endpoint, key, params=None, chunk_size=65536):
+        """
+        Makes a GET API call and yields the elements of the top-level array 'key' of
+        the JSON response one by one, decoding them as the response is downloaded,
+        rather than parsing the whole response at once. Memory use stays constant
+        however large the array is, e.g. the locations of a large container.
+        Streamed responses bypass the response cache.
+        :param endpoint: API endpoint, or a full URL
+        :param key: name of the array in the response, e.g. 'locations' or 'records'
+        :param params: arguments to be added to the API request
+        :param chunk_size: number of bytes read from the response at a time
+        :return: a generator of the array's elements
+        """
+        return self._stream_array(endpoint, JsonArrayParser(key), params, chunk_size)
+
+    def _stream_array(self, endpoint, parser, params=None, chunk_size=65536):
+        url, kwargs = self._api_request_args(endpoint, params, "application/json", "GET")
+        try:
+            response = self._send("GET", url, stream=True, **kwargs)
+        except self.transport.connection_errors as e:
+            raise ClientBase.ConnectionError(e)
+        with response:
+            if response.status_code >= 400:
+                self._handle_response(response)
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                yield from parser.feed(chunk)
+            yield from parser.close()
+
+    def _stream_listing(self, endpoint, key, params=None):
+        """
+        Yields the elements of the array 'key' of each page of a paginated listing,
+        decoding each page as it is downloaded, as stream_api_array does, and
+        following its 'next' link once its elements have been consumed.
+        """
+        while endpoint is not None:
+            parser = JsonArrayParser(key, keep=("_links",))
+            yield from self._stream_array(endpoint, parser, params)
+            endpoint = _next_link(parser.values)
+            params = None
+
+    def _add_cache_validators(self, request_type, url, kwargs):
+        """
+        Adds the validators of a cached response to the headers of a GET request.
+        :return: a tuple of the cache key (None if the request is not cacheable) and
+         the cached response, which is None if there is none or it can neither be used
+         as is nor revalidated
+        """
+        if self.response_cache is None or request_type != "GET":
+            return None, None
+        cache_key = self.response_cache.key(
+            url, kwargs.get("params"), kwargs.get("headers")
+        )
+        cached = self.response_cache.get(cache_key)
+        if cached is None or cached.is_fresh():
+            return cache_key, cached
+        if not cached.has_validators():
+            return cache_key, None
+        kwargs["headers"] = {**kwargs["headers"], **cached.conditional_headers()}
+        return cache_key, cached
+
+    @staticmethod
+    def _request_key(url, kwargs):
+        """
+        Identifies a GET request, for coalescing concurrent identical requests.
+        """
+        params = kwargs.get("params") or {}
+        return (
+            url,
+            tuple(sorted((k, str(v)) for k, v in params.items() if v is not None)),
+            tuple(sorted(kwargs["headers"].items())),
+        )
+
+    @staticmethod
+    def _cache_lookup(cache_key, cached):
+        if cache_key is None:
+            return None
+        return "miss" if cached is None else "revalidate"
+
+    def _fresh_cached_result(self, url, cached):
+        """
+        Answers a GET from a cached response that is still fresh.
+        """
+        self.response_cache.record(hit=True)
+        if self._event_handlers:
+            emit(self._event_handlers, cache_hit_event("GET", url, RequestKind.READ.value))
+        return cached.json(self.json_codec.loads)
+
+    def _handle_api_response(
+        self, request_type, url, response, cache_key=None, cached=None
+    ):
+        """
+        Handles the response of an API call, answering a 304 Not Modified from the
+        response cache and keeping the cache up to date.
+        """
+        if request_type != "GET" and self._in_flight is not None:
+            # GETs sent before the change must not answer those made after it
+            self._in_flight.forget(lambda key: _same_resource(key[0], url))
+        cache = self.response_cache
+        if cache is not None:
+            if request_type != "GET":
+                cache.invalidate(url)
+            elif cached is not None and response.status_code == 304:
+                cache.record(hit=True)
+                cache.revalidated(cache_key, cached)
+                return cached.json(self.json_codec.loads)
+            else:
+                cache.record(hit=False)
+        result = self._handle_response(response, self.json_codec)
+        if cache_key is not None:
+            cache.store(cache_key, response)
+        return result
+
+    def _full_url(self, endpoint):
+        """
+        Prefixes an API endpoint with the API URL, unless it is already a full URL.
+        """
+        if endpoint.startswith(self._get_api_url()):
+            return endpoint
+        return self._get_api_url() + endpoint
+
+    def _api_request_args(self, endpoint, params, content_type, request_type):
+        """
+        Builds the full URL and the request arguments for an API call.
+        :return: a tuple of URL and a dictionary of arguments for _send
+        """
+        url = self._full_url(endpoint)
+        headers = self._get_headers(content_type)
+        if request_type == "GET":
+            return url, {"params": params, "headers": headers}
+        elif (
+            request_type == "PUT"
+            or request_type == "POST"
+            or request_type == "DELETE"
+        ):
+            if params is None:
+                return url, {"headers": headers}
+            headers["Content-Type"] = "application/json"
+            return url, {**self._body_args(self.json_codec.dumps(params)), "headers": headers}
+        else:
+            raise ValueError(
+                "Expected GET / PUT / POST / DELETE request type, received {} instead".format(
+                    request_type
+                )
+            )
+
+    @staticmethod
+    def _body_args(body: bytes) -> dict:
+        """
+        Request arguments sending an already encoded body.
+        """
+        return {"data": body}
+
+    def _multipart_post(
+        self, endpoint: str, files: dict, data: dict = None, digests=None, progress=None
+    ):
+        """
+        Helper for multipart/form-data POSTs. The transport sets the correct
+        multipart Content-Type (with boundary) when ``files`` is supplied, and
+        adds each entry of ``data`` as an additional form field; the default
+        transport streams the files from disk, see rspace_client.multipart.
+        :param endpoint: API endpoint, or a full URL
+        :param digests: name or names of hashlib algorithms whose digests of the
+         'file' field are computed as it is sent, and added to the parsed response
+         and the request event as 'digests'
+        :param progress: optional callable, called with a TransferProgress giving the
+         bytes of the 'file' field sent, rate and ETA, at most every 0.1 seconds
+        :return: parsed response
+        """
+        url = self._full_url(endpoint)
+        if not digests and progress is None:
+            response = self._send(
+                "POST", url, files=files, data=data, headers=self._get_headers()
+            )
+            return self._handle_api_response("POST", url, response)
+        file = reader = HashingReader(files["file"], digests)
+        if progress is not None:
+            file = ProgressReader(reader, progress)
+        files = dict(files, file=file)
+        exchange = None
+        if self._event_handlers:
+            exchange = Exchange("POST", url, RequestKind.UPLOAD.value)
+        response = self._send(
+            "POST", url, exchange=exchange, files=files, data=data, headers=self._get_headers()
+        )
+        if exchange is not None:
+            emit(
+                self._event_handlers,
+                exchange.event(response, digests=reader.hexdigests() or None),
+            )
+        result = self._handle_api_response("POST", url, response)
+        if digests and isinstance(result, dict):
+            result["digests"] = reader.hexdigests()
+        return result
+
     @staticmethod
     def _get_links(response):
         """
@@ -181,25 +747,251 @@ class ClientBase:
             )
         )
 
-    def download_link_to_file(self, url, filename, chunk_size=128):
+    def download_link_to_file(
+        self, url, filename, chunk_size=None, resume=False, parallel=0, digests=None
+    ) -> DownloadResult:
         """
-        Downloads a file from the API server.
+        Downloads a file from the API server. The response is streamed to the file
+        through one reusable buffer, which grows from chunk_size up to 4MiB while
+        the data arrives faster than it is written, so memory use stays constant
+        and large files are copied in few reads and writes.
         :param url: URL of the file to be downloaded
         :param filename: file path to save the file to or an already opened file object
-        :param chunk_size: size of the chunks to download at a time, default is 128
+        :param chunk_size: initial size in bytes of the buffer, default is 64KiB
+        :param resume: if True and filename is a path, a file left incomplete by an
+         interrupted download of the same URL is completed with a Range request rather
+         than downloaded again, and a download interrupted by a lost connection is
+         resumed as often as the retry policy retries connection errors. Only content
+         whose length and ETag (or Last-Modified) match is appended, see
+         rspace_client.download.PartialDownload. Default is False.
+        :param parallel: if above 1 and filename is a path, the file is downloaded in byte
+         ranges over up to this many connections at once, for servers that limit the
+         throughput of each connection. Each range is checked to be part of the same
+         content, see rspace_client.download.RangedDownload, and ranges interrupted by a
+         lost connection are resumed as the retry policy allows. The file is downloaded
+         in a single stream if the server does not serve ranges of it, or with 'resume',
+         if part of it is on disk already. Default is 0.
+        :param digests: name or names of hashlib algorithms, e.g. "sha256", whose digests
+         of the file are computed as it is written and returned in the result and in the
+         request event, so the file need not be read again. Files downloaded in parallel
+         ranges, or completed on disk already, are read back to compute them.
+        :return: a DownloadResult giving the size, duration and throughput of the download,
+         and the digests asked for
         """
         headers = {"apiKey": self.api_key, "Accept": "application/octet-stream"}
-        if isinstance(filename, str):
-            with open(filename, "wb") as fd:
-                for chunk in requests.get(url, headers=headers).iter_content(
-                    chunk_size=chunk_size
+        hashes = new_hashes(digests)
+        to_path = isinstance(filename, str)
+        if resume and to_path and PartialDownload(filename, url).offset:
+            # the part on disk is completed rather than downloaded again in ranges
+            parallel = 0
+        try:
+            sent = None
+            if parallel > 1 and to_path:
+                result, sent = self._download_ranges(
+                    url, filename, headers, chunk_size, parallel, hashes
+                )
+                if result is not None:
+                    return result
+            if resume and to_path:
+                return self._download_resumable(
+                    url, filename, headers, chunk_size, hashes, sent
+                )
+            response, exchange = sent or self._send_download(url, headers)
+            with response, self._download_event(exchange, response) as report:
+                if response.status_code >= 400:
+                    self._handle_response(response)
+                result = copy_response(response, filename, chunk_size, hashes)
+                report.update(received=result.size, digests=result.digests or None)
+                return result
+        except self.transport.connection_errors as e:
+            raise ClientBase.ConnectionError(e)
+
+    def _send_download(self, url, headers):
+        """
+        Sends the request of a download, whose event is emitted by _download_event
+        once the body was read.
+        :return: the streamed response, and the Exchange of its event or None
+        """
+        exchange = None
+        if self._event_handlers:
+            exchange = Exchange("GET", url, RequestKind.DOWNLOAD.value)
+        response = self._send(
+            "GET", url, kind=RequestKind.DOWNLOAD, stream=True, exchange=exchange, headers=headers
+        )
+        return response, exchange
+
+    @contextlib.contextmanager
+    def _download_event(self, exchange, response):
+        """
+        Emits the event of a download request once its body was read, adding the
+        'received' bytes, 'digests' and transfer 'error' put in the dictionary yielded.
+        """
+        report = {}
+        try:
+            yield report
+        except BaseException as e:
+            if exchange is not None:
+                if response.status_code < 400:
+                    report["error"] = e
+                emit(self._event_handlers, exchange.event(response, streamed=True, **report))
+            raise
+        if exchange is not None:
+            emit(self._event_handlers, exchange.event(response, streamed=True, **report))
+
+    def _download_resumable(self, url, path, headers, chunk_size, hashes, sent=None):
+        """
+        Downloads a file that can be resumed if the download is interrupted.
+        :param sent: the response to a request for the whole file and its Exchange,
+         if the request was sent already
+        """
+        partial = PartialDownload(path, url)
+        start = time.perf_counter()
+        offset = None
+        size = 0
+        # bytes at the start of the file that the hashes were updated with
+        hashed = 0
+        retry_number = 0
+        while True:
+            response, exchange = sent or self._send_download(
+                url, dict(headers, **partial.request_headers())
+            )
+            sent = None
+            with response, self._download_event(exchange, response) as report:
+                if partial.is_complete(response):
+                    break
+                if response.status_code == 416 or (
+                    response.status_code == 206 and not partial.continues(response)
                 ):
-                    fd.write(chunk)
-        else:
-            for chunk in requests.get(url, headers=headers).iter_content(
-                chunk_size=chunk_size
+                    partial.restart()
+                    continue
+                if response.status_code >= 400:
+                    self._handle_response(response)
+                with partial.open(response) as f:
+                    if offset is None:
+                        offset = partial.offset
+                    if hashed != partial.offset:
+                        hashes = new_hashes(list(hashes))
+                        hashed = hash_file(path, hashes, partial.offset)
+                    position = f.tell()
+                    try:
+                        copy_response(response, f, chunk_size, hashes)
+                        report["digests"] = hexdigests(hashes) or None
+                        break
+                    except self.transport.connection_errors as e:
+                        report["error"] = e
+                        delay = self._retry_delay_after_error("GET", retry_number)
+                        if delay is None:
+                            raise
+                    finally:
+                        report["received"] = f.tell() - position
+                        size += report["received"]
+                        hashed += report["received"]
+            partial.interrupted()
+            time.sleep(delay)
+            retry_number += 1
+        partial.complete()
+        if hashes and hashed != os.path.getsize(path):
+            # the file was complete on disk already
+            hashes = new_hashes(list(hashes))
+            hash_file(path, hashes)
+        elapsed = time.perf_counter() - start
+        return DownloadResult(
+            size, elapsed, partial.offset if offset is None else offset, hexdigests(hashes)
+        )
+
+    def _download_ranges(self, url, path, headers, chunk_size, parallel, hashes):
+        """
+        Downloads a file in byte ranges, up to 'parallel' at once. The ranges arrive
+        out of order, so the file is read back to compute its digests.
+        :return: a DownloadResult and None, or, if the file must be downloaded in a
+         single stream instead, None and the response to the request for the first
+         range with its Exchange if it holds the whole file, else None
+        """
+        start = time.perf_counter()
+        download = RangedDownload(path, parallel)
+        response, exchange = self._send_download(
+            url, dict(headers, **download.first_request_headers())
+        )
+        if not download.start(response):
+            if response.status_code == 200:
+                # ranges are not supported, and this is the whole file
+                return None, (response, exchange)
+            with response, self._download_event(exchange, response):
+                if response.status_code >= 400 and response.status_code != 416:
+                    self._handle_response(response)
+            return None, None
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=parallel, thread_name_prefix="rspace-range"
+        )
+        try:
+            first, last = download.first_range
+            self._download_range(
+                url, headers, download, first, last, chunk_size, (response, exchange)
+            )
+            for _ in _fan_out(
+                executor,
+                lambda r: self._download_range(url, headers, download, *r, chunk_size),
+                download.ranges(),
+                parallel,
+                ordered=False,
             ):
-                filename.write(chunk)
+                pass
+        except RangeMismatch:
+            return None, None
+        finally:
+            download.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+            download.close()
+        hash_file(path, hashes)
+        result = DownloadResult(
+            download.length, time.perf_counter() - start, digests=hexdigests(hashes)
+        )
+        return result, None
+
+    def _download_range(
+        self, url, headers, download, first, last, chunk_size, sent=None
+    ):
+        """
+        Writes the bytes first to last of a ranged download to its file, continuing
+        from where it stopped if the connection is lost, as the retry policy allows.
+        :param sent: the response to the request for the range and its Exchange, if
+         the request was sent already
+        """
+        writer = download.writer(first)
+        retry_number = 0
+        while True:
+            if sent is None:
+                sent = self._send_download(
+                    url, dict(headers, **download.request_headers(writer.position, last))
+                )
+            response, exchange = sent
+            with response, self._download_event(exchange, response) as report:
+                if not download.matches(response, writer.position, last):
+                    if response.status_code >= 400 and response.status_code != 416:
+                        self._handle_response(response)
+                    raise RangeMismatch(
+                        f"Bytes {writer.position}-{last} of {url} were not served as "
+                        f"part of the same content (status {response.status_code})"
+                    )
+                position = writer.position
+                try:
+                    copy_response(response, writer, chunk_size)
+                except self.transport.connection_errors as e:
+                    report["error"] = e
+                    delay = self._retry_delay_after_error("GET", retry_number)
+                    if delay is None:
+                        raise
+                else:
+                    if writer.position != last + 1:
+                        raise RangeMismatch(
+                            f"Bytes {first}-{last} of {url} ended at {writer.position - 1}"
+                        )
+                    return
+                finally:
+                    report["received"] = writer.position - position
+            time.sleep(delay)
+            retry_number += 1
+            sent = None
 
     def link_exists(self, response, link_rel):
         """
@@ -217,6 +1009,10 @@ class ClientBase:
         self,
         endpoint: str,
         pagination: Pagination = Pagination(),
+        prefetch: int = 0,
+        parallel: int = 0,
+        ordered: bool = True,
+        incremental: bool = False,
     ):
         """
         Yields items, making paginated requests to the server as each page
@@ -232,24 +1028,110 @@ class ClientBase:
         pagination : Pagination, optional
             The pagination control. The default is Pagination().
          : Pagination
+        prefetch : int, optional
+            Number of pages to fetch ahead on a background thread while the
+            calling code processes the current page. The default is 0, fetching
+            each page only once the previous one has been consumed.
+        parallel : int, optional
+            If greater than 1, the number of pages requested concurrently. The
+            first page's 'totalHits' is used to request every other page by its
+            page number, rather than following 'next' links one after another.
+            If a page reports a different 'totalHits', items were added or
+            removed during the scan and ListingChangedError is raised.
+            Listings without 'totalHits' are streamed sequentially.
+        ordered : bool, optional
+            With parallel, whether to yield items in page order (the default) or
+            each page's items as soon as the page arrives.
+        incremental : bool, optional
+            Whether to decode each page's items as the page is downloaded, as
+            stream_api_array does, rather than parsing the whole page once it has
+            arrived, so that large pages are streamed in constant memory. Pages
+            are then not cached, and cannot be prefetched or requested in
+            parallel. The default is False.
 
         Yields
         ------
         item : A stream of items, depending on the endpoint called
         """
+        if incremental:
+            _check_incremental(prefetch, parallel)
+            return self._stream_listing(
+                self._first_page_url(endpoint, pagination), endpoint
+            )
+        return self._stream_pages(endpoint, pagination, prefetch, parallel, ordered)
+
+    def _stream_pages(self, endpoint, pagination, prefetch, parallel, ordered):
+        if parallel > 1:
+            pages = self._iter_pages_parallel(endpoint, pagination, parallel, ordered)
+        else:
+            pages = self._iter_pages(endpoint, pagination)
+        if prefetch > 0:
+            pages = _prefetch(pages, prefetch)
+        for page in pages:
+            for item in page[endpoint]:
+                yield item
+
+    def _iter_pages(self, endpoint: str, pagination: Pagination):
+        """
+        Yields the pages of a paginated listing, following 'next' links.
+        """
+        page = self.retrieve_api_results(self._first_page_url(endpoint, pagination))
+        yield page
+        yield from self._next_pages(page)
 
-        urlStr = f"{self._get_api_url()}/{endpoint}"
+    def _next_pages(self, page):
+        while self.link_exists(page, "next"):
+            page = self.retrieve_api_results(self.get_link(page, "next"))
+            yield page
 
-        next_link = requests.Request(url=urlStr, params=pagination.data).prepare().url
-        while True:
-            if next_link is not None:
-                items = self.retrieve_api_results(next_link)
-                for item in items[endpoint]:
-                    yield item
-                if self.link_exists(items, "next"):
-                    next_link = self.get_link(items, "next")
-                else:
-                    break
+    def _iter_pages_parallel(
+        self, endpoint: str, pagination: Pagination, parallel: int, ordered: bool
+    ):
+        """
+        Yields the pages of a paginated listing, requesting up to 'parallel' pages
+        at once once the first page has given the total number of items.
+        """
+        first = self.retrieve_api_results(self._first_page_url(endpoint, pagination))
+        yield first
+        total_hits = first.get("totalHits")
+        if total_hits is None:
+            yield from self._next_pages(first)
+            return
+        urls = self._page_urls(endpoint, pagination, total_hits)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=parallel, thread_name_prefix="rspace-page"
+        )
+        try:
+            for page in _fan_out(
+                executor, self.retrieve_api_results, urls, parallel, ordered
+            ):
+                self._check_total_hits(endpoint, page, total_hits)
+                yield page
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _page_urls(self, endpoint: str, pagination: Pagination, total_hits: int):
+        """
+        URLs of the pages of a listing of total_hits items that follow the first page.
+        """
+        return [
+            self._first_page_url(endpoint, pagination.for_page(page_number))
+            for page_number in range(
+                pagination.page_number + 1, pagination.page_count(total_hits)
+            )
+        ]
+
+    @staticmethod
+    def _check_total_hits(endpoint, page, total_hits):
+        if page.get("totalHits") != total_hits:
+            raise ClientBase.ListingChangedError(
+                f"The number of {endpoint} changed from {total_hits} to "
+                f"{page.get('totalHits')} while they were listed"
+            )
+
+    def _first_page_url(self, endpoint: str, pagination: Pagination) -> str:
+        urlStr = f"{self._get_api_url()}/{endpoint}"
+        return requests.Request(url=urlStr, params=pagination.data).prepare().url
 
     class ConnectionError(Exception):
         pass
@@ -260,7 +1142,117 @@ class ClientBase:
     class NoSuchLinkRel(Exception):
         pass
 
+    class ListingChangedError(Exception):
+        pass
+
+    DeadlineExceededError = DeadlineExceededError
+
     class ApiError(Exception):
         def __init__(self, error_message, response_status_code=None):
             Exception.__init__(self, error_message)
             self.response_status_code = response_status_code
+
+
+def _fan_out(executor, fn, args, window: int, ordered: bool):
+    """
+    Yields fn(arg) for each of args, computed on an executor with at most 'window'
+    calls submitted at a time, in the order of args or in order of completion.
+    """
+    args = iter(args)
+    if ordered:
+        pending = collections.deque(
+            _submit(executor, fn, arg) for arg in itertools.islice(args, window)
+        )
+        while pending:
+            result = pending.popleft().result()
+            for arg in itertools.islice(args, 1):
+                pending.append(_submit(executor, fn, arg))
+            yield result
+    else:
+        pending = {_submit(executor, fn, arg) for arg in itertools.islice(args, window)}
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                for arg in itertools.islice(args, 1):
+                    pending.add(_submit(executor, fn, arg))
+                yield future.result()
+
+
+def _submit(executor, fn, arg):
+    # run in a copy of the caller's context, so events report the calling operation
+    return executor.submit(contextvars.copy_context().run, fn, arg)
+
+
+def _prefetch(iterator, max_ahead: int):
+    """
+    Iterates over an iterator on a background thread, running up to max_ahead items
+    ahead of the consumer. Exceptions raised by the iterator are re-raised to the
+    consumer. If the consumer stops early, the background thread stops as well.
+    """
+    buffer = queue.Queue(maxsize=max_ahead)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(("item", item)):
+                    return
+            put(("end", None))
+        except Exception as e:
+            put(("error", e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(produce,),
+        name="rspace-prefetch",
+        daemon=True,
+    ).start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+
+def _same_resource(url: str, changed: str) -> bool:
+    """
+    Whether a GET of a URL reads the resource at 'changed', or one within it.
+    """
+    return url == changed or url.startswith(changed + "/")
+
+
+def _check_incremental(prefetch: int, parallel: int):
+    if prefetch > 0 or parallel > 1:
+        raise ValueError(
+            "Pages decoded incrementally cannot be prefetched or requested in parallel"
+        )
+
+
+def _next_link(values: dict):
+    """
+    The 'next' link of a page whose top-level values were kept by a JsonArrayParser,
+    None if it has none.
+    """
+    for link in values.get("_links", []):
+        if link["rel"] == "next":
+            return link["link"]
+    return None
@@ -0,0 +1,111 @@
+"""
+Digests of transferred files, computed as their bytes are downloaded or uploaded,
+so that files are read once, e.g. ``client.download_file(1, path, digests="sha256")``.
+"""
+import hashlib
+import io
+from typing import Optional, Sequence, Union
+
+# bytes read at a time when a file on disk has to be hashed
+_READ_SIZE = 1024 * 1024
+
+
+def new_hashes(digests: Union[str, Sequence[str], None]) -> dict:
+    """
+    New hash objects for the given digest names, e.g. "sha256" or ("sha256", "md5").
+    :param digests: a name, or sequence of names, of hashlib algorithms
+    :return: a dictionary of name to hash object, empty if digests is empty or None
+    :raises ValueError: if an algorithm is not available
+    """
+    if not digests:
+        return {}
+    if isinstance(digests, str):
+        digests = (digests,)
+    return {name: hashlib.new(name) for name in digests}
+
+
+def hexdigests(hashes: dict) -> dict:
+    return {name: h.hexdigest() for name, h in hashes.items()}
+
+
+def hash_file(path: str, hashes: dict, length: Optional[int] = None) -> int:
+    """
+    Updates hashes with the first 'length' bytes of a file, or all of it.
+    :return: the number of bytes hashed
+    """
+    hashed = 0
+    if not hashes:
+        return hashed
+    buffer = bytearray(_READ_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while length is None or hashed < length:
+            size = _READ_SIZE if length is None else min(_READ_SIZE, length - hashed)
+            n = f.readinto(view[:size])
+            if not n:
+                break
+            for h in hashes.values():
+                h.update(view[:n])
+            hashed += n
+    return hashed
+
+
+class HashingReader(io.RawIOBase):
+    """
+    Reads a binary file, updating digests of the bytes read. Seeking back to where
+    reading began, as a retried upload does, starts the digests over.
+    """
+
+    def __init__(self, file, digests: Union[str, Sequence[str]]):
+        """
+        :param file: a binary file object open for reading
+        :param digests: names of the hashlib algorithms to compute
+        """
+        self._file = file
+        self._digests = digests
+        self.hashes = new_hashes(digests)
+        try:
+            self._start = file.tell()
+        except (AttributeError, OSError, ValueError):
+            self._start = None
+        name = getattr(file, "name", None)
+        if name is not None:
+            # names the uploaded file in a multipart request
+            self.name = name
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        for h in self.hashes.values():
+            h.update(data)
+        return data
+
+    def readinto(self, buffer):
+        n = self._file.readinto(buffer)
+        if n:
+            view = memoryview(buffer)[:n]
+            for h in self.hashes.values():
+                h.update(view)
+        return n
+
+    def seekable(self):
+        return self._start is not None and (
+            not hasattr(self._file, "seekable") or self._file.seekable()
+        )
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        position = self._file.seek(offset, whence)
+        if position == self._start:
+            self.hashes = new_hashes(self._digests)
+        return position
+
+    def tell(self):
+        return self._file.tell()
+
+    def hexdigests(self) -> dict:
+        """
+        Hexadecimal digests of the bytes read, by algorithm name.
+        """
+        return hexdigests(self.hashes)
@@ -0,0 +1,521 @@
+"""
+Copying of downloaded files from streamed responses to files, and resuming of
+interrupted downloads.
+"""
+import io
+import json
+import os
+import re
+import socket
+import threading
+import time
+
+from rspace_client.digests import hexdigests
+from rspace_client.timeouts import DeadlineExceededError, remaining, time_left
+
+# buffer sizes of a download: it starts small, so small files need little memory, and
+# doubles while reads fill it, so large files are copied in few large reads and writes
+MIN_BUFFER_SIZE = 64 * 1024
+MAX_BUFFER_SIZE = 4 * 1024 * 1024
+
+# size of the first range of a parallel download, which is requested alone to learn
+# the size of the file, and the smallest size of the other ranges
+MIN_PART_SIZE = 1024 * 1024
+
+# appended to the path of a partly downloaded file to name the file saving its state
+RESUME_SUFFIX = ".resume"
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(?:(\d+)-(\d+)|\*)/(\d+|\*)")
+
+
+class DownloadResult:
+    """
+    Size and duration of a completed download.
+    """
+
+    def __init__(self, size: int, seconds: float, offset: int = 0, digests: dict = None):
+        """
+        :param size: bytes downloaded
+        :param seconds: duration of the download
+        :param offset: bytes of the file already on disk from an interrupted
+         download, which were not downloaded again
+        :param digests: hexadecimal digests of the file by algorithm name, e.g.
+         {"sha256": "9f86..."}, if they were asked for
+        """
+        self.size = size
+        self.seconds = seconds
+        self.offset = offset
+        self.digests = digests or {}
+
+    @property
+    def throughput(self) -> float:
+        """
+        Bytes per second, from the time the response headers arrived until the
+        last byte was written.
+        """
+        return self.size / self.seconds if self.seconds > 0 else float("inf")
+
+    def __repr__(self):
+        return (
+            f"DownloadResult(size={self.size}, offset={self.offset}, "
+            f"seconds={self.seconds:.3f}, throughput={self.throughput / 2**20:.1f} MiB/s)"
+        )
+
+
+class PartialDownload:
+    """
+    A download to a file that can be resumed if it is interrupted.
+
+    Until the download completes, '<path>.resume' holds its URL and the length
+    and validator (strong ETag, else Last-Modified) of the content. A download
+    is resumed with a Range request for the rest of the file, conditional on the
+    validator with If-Range, and a partial response is only appended to the file
+    if its Content-Range starts at the end of the file and its length and
+    validator are those saved, so that parts of different contents are never
+    spliced. Otherwise the file is downloaded again from the start.
+    """
+
+    def __init__(self, path: str, url: str):
+        self.path = path
+        self.url = url
+        self.state_path = path + RESUME_SUFFIX
+        # bytes of the file on disk that the download continues from
+        self.offset = 0
+        self.validator = None
+        self.length = None
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            size = os.path.getsize(path)
+        except (OSError, ValueError):
+            return
+        if state.get("url") != url or not state.get("validator"):
+            return
+        if state.get("length") is not None and size > state["length"]:
+            return
+        self.validator = state["validator"]
+        self.length = state.get("length")
+        self.offset = size
+
+    def request_headers(self) -> dict:
+        """
+        Headers asking for the rest of the file, if part of it is on disk.
+        """
+        if not self.offset:
+            return {}
+        return {"Range": f"bytes={self.offset}-", "If-Range": self.validator}
+
+    def is_complete(self, response) -> bool:
+        """
+        Whether the response to a request for the rest of the file is a 416 saying
+        the file on disk is complete already.
+        """
+        content_range = _content_range(response)
+        return (
+            response.status_code == 416
+            and self.offset > 0
+            and content_range is not None
+            and content_range[2] == self.offset == self.length
+        )
+
+    def continues(self, response) -> bool:
+        """
+        Whether the response holds the rest of the file on disk.
+        """
+        if response.status_code != 206 or not self.offset:
+            return False
+        if response.headers.get("Content-Encoding", "identity").lower() != "identity":
+            return False
+        content_range = _content_range(response)
+        return (
+            content_range is not None
+            and content_range[0] == self.offset
+            and content_range[2] is not None
+            and (self.length is None or content_range[2] == self.length)
+            and _validator(response) == self.validator
+        )
+
+    def restart(self):
+        """
+        Downloads the file from the start with the next request.
+        """
+        self.offset = 0
+
+    def open(self, response):
+        """
+        Opens the file to write the body of the response to: after the part on disk
+        if the response continues it, else truncated, saving the validator and
+        length of the response so that the download can be resumed.
+        :return: the file, unbuffered
+        """
+        if self.continues(response):
+            return open(self.path, "ab", buffering=0)
+        self.offset = 0
+        self.validator = _validator(response)
+        encoding = response.headers.get("Content-Encoding", "identity").lower()
+        self.length = _content_length(response) if encoding == "identity" else None
+        # truncated before the state is saved, so a state never describes another file
+        f = open(self.path, "wb", buffering=0)
+        try:
+            if self.validator:
+                state = {"url": self.url, "validator": self.validator, "length": self.length}
+                with open(self.state_path, "w", encoding="utf-8") as state_file:
+                    json.dump(state, state_file)
+            else:
+                self.complete()
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    def interrupted(self):
+        """
+        Resumes from the end of the file with the next request, if the content can
+        be validated, else downloads it from the start.
+        """
+        self.offset = os.path.getsize(self.path) if self.validator else 0
+
+    def complete(self):
+        """
+        Removes the saved state of the download.
+        """
+        _remove(self.state_path)
+
+
+class RangeMismatch(Exception):
+    """
+    Raised when a range of a parallel download is not part of the content of the
+    first range, e.g. because the file was replaced during the download.
+    """
+
+
+class RangedDownload:
+    """
+    A download of a file in byte ranges fetched over several connections at once,
+    each written in place, with positional writes, into the file preallocated to
+    its full size.
+
+    The first range is requested alone. A 206 response to it gives the length of
+    the file and its validator (strong ETag, else Last-Modified), and the other
+    ranges are requested conditional on that validator with If-Range. Every
+    response must have the Content-Range asked for and the same validator, and
+    hold exactly the bytes of its range, so that parts of different contents are
+    never mixed. Files whose first range is not served as such, because the
+    server does not support ranges or sends no validator, are downloaded in a
+    single stream instead.
+    """
+
+    def __init__(self, path: str, parallel: int):
+        """
+        :param path: path of the file to write
+        :param parallel: number of ranges to fetch at once
+        """
+        self.path = path
+        self.parallel = parallel
+        self.length = None
+        self.validator = None
+        self._fd = None
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    @property
+    def first_range(self):
+        """
+        The first and last byte of the first range.
+        """
+        last = MIN_PART_SIZE if self.length is None else min(MIN_PART_SIZE, self.length)
+        return 0, last - 1
+
+    def first_request_headers(self) -> dict:
+        return {"Range": "bytes={}-{}".format(*self.first_range)}
+
+    def start(self, response) -> bool:
+        """
+        Checks the response to the request for the first range, and if it is usable
+        creates the file at its full length.
+        :return: False if the file has to be downloaded in a single stream instead
+        """
+        content_range = _content_range(response)
+        if response.status_code != 206 or content_range is None:
+            return False
+        self.length = content_range[2]
+        self.validator = _validator(response)
+        if self.length is None or not self.validator:
+            return False
+        if not self.matches(response, *self.first_range):
+            return False
+        self._fd = os.open(
+            self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        )
+        try:
+            os.ftruncate(self._fd, self.length)
+            if hasattr(os, "posix_fallocate") and self.length:
+                try:
+                    os.posix_fallocate(self._fd, 0, self.length)
+                except OSError:
+                    pass  # not supported by the file system; the file stays sparse
+        except BaseException:
+            self.close()
+            raise
+        # the file no longer holds the download a saved state was for
+        _remove(self.path + RESUME_SUFFIX)
+        return True
+
+    def ranges(self) -> list:
+        """
+        The ranges after the first, as (first, last) byte positions, at least
+        MIN_PART_SIZE long and about four per connection, so that connections that
+        finish early take over the remaining ones.
+        """
+        start = self.first_range[1] + 1
+        size = max(MIN_PART_SIZE, -(-(self.length - start) // (4 * self.parallel)))
+        return [
+            (first, min(first + size, self.length) - 1)
+            for first in range(start, self.length, size)
+        ]
+
+    def request_headers(self, first: int, last: int) -> dict:
+        return {"Range": f"bytes={first}-{last}", "If-Range": self.validator}
+
+    def matches(self, response, first: int, last: int) -> bool:
+        """
+        Whether the response holds the bytes first to last of the file.
+        """
+        return (
+            response.status_code == 206
+            and response.headers.get("Content-Encoding", "identity").lower() == "identity"
+            and _content_range(response) == (first, last, self.length)
+            and _validator(response) == self.validator
+        )
+
+    def writer(self, position: int) -> "_PositionalWriter":
+        """
+        An unbuffered file object writing to the file from 'position' on.
+        """
+        return _PositionalWriter(self, position)
+
+    def cancel(self):
+        """
+        Makes further writes fail, to stop the ranges still being fetched.
+        """
+        self._cancelled = True
+
+    def close(self):
+        """
+        Closes the file, once no range is being fetched any more.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _PositionalWriter(io.RawIOBase):
+    """
+    Writes to a ranged download's file at a position of its own, so that several
+    threads can write to the file at once.
+    """
+
+    def __init__(self, download: RangedDownload, position: int):
+        self._download = download
+        self.position = position
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        download = self._download
+        if download._cancelled:
+            raise ValueError("The download was cancelled")
+        view = memoryview(b)
+        while view:
+            if hasattr(os, "pwrite"):
+                n = os.pwrite(download._fd, view, self.position)
+            else:
+                with download._lock:
+                    os.lseek(download._fd, self.position, os.SEEK_SET)
+                    n = os.write(download._fd, view)
+            self.position += n
+            view = view[n:]
+        return len(b)
+
+
+def copy_response(
+    response, target, buffer_size: int = None, hashes: dict = None
+) -> DownloadResult:
+    """
+    Writes the body of a streamed response to a file.
+
+    The body is read into one reusable buffer with ``readinto`` and written from
+    it without copies, to an unbuffered file if 'target' is a path. Bodies with a
+    Content-Encoding, and responses whose ``raw`` is not a file-like object, are
+    read with ``iter_content`` instead, which decodes them.
+
+    Within a deadline (see rspace_client.timeouts.deadline), the connection is
+    shut down when the deadline passes, ending a read that waits for data or
+    receives it slowly, and DeadlineExceededError is raised, so a slow body
+    cannot outlast the deadline.
+    :param response: a requests-compatible response, sent with stream=True
+    :param target: path of the file to write, or a binary file object
+    :param buffer_size: initial buffer size in bytes; it doubles while reads fill
+     it, up to MAX_BUFFER_SIZE. Default is MIN_BUFFER_SIZE.
+    :param hashes: hash objects by name, see rspace_client.digests.new_hashes,
+     updated with the body as it is written; the result has their digests
+    """
+    hashes = hashes or {}
+    start = time.perf_counter()
+    with _DeadlineWatch(response):
+        if isinstance(target, str):
+            with open(target, "wb", buffering=0) as f:
+                size = _copy(response, f, buffer_size, hashes)
+        else:
+            size = _copy(response, target, buffer_size, hashes)
+    return DownloadResult(size, time.perf_counter() - start, digests=hexdigests(hashes))
+
+
+def _copy(response, out, buffer_size, hashes):
+    size = max(buffer_size or MIN_BUFFER_SIZE, 1)
+    raw = getattr(response, "raw", None)
+    encoding = response.headers.get("Content-Encoding", "identity")
+    if not isinstance(raw, io.IOBase) or encoding.lower() != "identity":
+        return _copy_chunks(response, out, size, hashes)
+    length = _content_length(response)
+    if length is not None:
+        # no larger than needed to read the whole body in one go
+        size = min(size, length + 1)
+    write = _writer(out)
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    copied = 0
+    while True:
+        n = _read_within_deadline(raw.readinto, view)
+        if not n:
+            return copied
+        for h in hashes.values():
+            h.update(view[:n])
+        write(view[:n])
+        copied += n
+        if n == len(buffer) and len(buffer) < MAX_BUFFER_SIZE and (
+            length is None or copied < length
+        ):
+            view.release()
+            buffer = bytearray(min(2 * len(buffer), MAX_BUFFER_SIZE))
+            view = memoryview(buffer)
+
+
+def _copy_chunks(response, out, size, hashes):
+    write = _writer(out)
+    copied = 0
+    chunks = iter(response.iter_content(chunk_size=size))
+    while True:
+        chunk = _read_within_deadline(next, chunks, None)
+        if chunk is None:
+            return copied
+        for h in hashes.values():
+            h.update(chunk)
+        write(chunk)
+        copied += len(chunk)
+
+
+def _read_within_deadline(read, *args):
+    """
+    Calls read(*args) to read from a response, if the current deadline has not passed.
+    :raises DeadlineExceededError: if the deadline has passed, or passes during the read
+    """
+    time_left("while a response was read")
+    try:
+        return read(*args)
+    except Exception as e:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceededError(
+                "The deadline passed while a response was read"
+            ) from e
+        raise
+
+
+class _DeadlineWatch:
+    """
+    Shuts down the connection of a streamed urllib3 response when the current
+    deadline passes, so that a read blocked on it ends then rather than when its
+    read timeout or the body does.
+    """
+
+    def __init__(self, response):
+        raw = getattr(response, "raw", None)
+        self._sock = getattr(getattr(raw, "connection", None), "sock", None)
+        self._timer = None
+        self.fired = False
+
+    def __enter__(self):
+        left = time_left("before a response was read")
+        if left is not None and self._sock is not None:
+            self._timer = threading.Timer(left, self._shut_down)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def _shut_down(self):
+        self.fired = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._timer is not None:
+            self._timer.cancel()
+        if self.fired and exc_type is None:
+            # the body may have appeared to end when the connection was shut down
+            raise DeadlineExceededError("The deadline passed while a response was read")
+
+
+def _writer(out):
+    """
+    A function writing a memoryview of the buffer to 'out' in full.
+    """
+    if isinstance(out, io.RawIOBase):
+        # unbuffered files may write only part of the data
+        def write_all(data):
+            while data:
+                data = data[out.write(data):]
+
+        return write_all
+    if isinstance(out, io.IOBase):
+        return out.write
+    # other file-like objects might keep the buffer they are passed
+    return lambda data: out.write(bytes(data))
+
+
+def _content_length(response):
+    try:
+        return int(response.headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _content_range(response):
+    """
+    The first byte, last byte and total length given by a Content-Range header,
+    each None if unknown, or None if there is no valid header.
+    """
+    match = _CONTENT_RANGE.fullmatch(response.headers.get("Content-Range", "").strip())
+    if match is None:
+        return None
+    return tuple(int(g) if g and g != "*" else None for g in match.groups())
+
+
+def _validator(response):
+    """
+    The strong ETag of a response, else its Last-Modified date, as usable in If-Range.
+    """
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
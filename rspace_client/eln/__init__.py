@@ -0,0 +1,8 @@
+"""
+ELN client modules, imported when first accessed.
+"""
+from rspace_client import _import_submodule
+
+
+def __getattr__(name):
+    return _import_submodule(__name__, name)
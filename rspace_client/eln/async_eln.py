@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+
+from rspace_client.async_client_base import AsyncClientBase
+from rspace_client.eln.dcs import DocumentCreationStrategy
+from rspace_client.eln.eln import ELNClient
+from rspace_client.eln.filetree_importer import AsyncTreeImporter
+from rspace_client.timeouts import capped, deadline as operation_deadline
+
+
+class AsyncELNClient(AsyncClientBase, ELNClient):
+    """
+    Asyncio-native client for RSpace ELN API v1, requiring the optional 'httpx' dependency.
+
+    Methods have the same arguments as in ELNClient but must be awaited, e.g.
+    ``doc = await client.get_document(123)``. ``stream_documents`` returns an async generator
+    to be used with ``async for``. At most ``max_concurrency`` requests are in flight at once.
+
+    Supported are the methods of ELNClient that make a single request (documents, files,
+    forms, folders, sharing, activity, jobs etc.), ``prepend_content``/``append_content``,
+    ``stream_documents``, the export flow (``export_and_download``,
+    ``download_export_selection``) and ``import_tree``, which makes its requests one
+    at a time, as ELNClient does.
+    """
+
+    async def _add_content(self, document_id, html_content, field_index=0, append=True):
+        if document_id is None:
+            raise ValueError("No document ID was set")
+        if html_content is None:
+            raise ValueError("No HTML content was set")
+        doc = await self.get_document(document_id)
+        to_update = self._field_update(doc, document_id, html_content, field_index, append)
+        return await self.update_document(
+            document_id, form_id=doc["form"]["id"], fields=to_update
+        )
+
+    async def download_export_selection(
+        self,
+        export_format,
+        file_path,
+        item_ids=[],
+        include_revision_history=False,
+        wait_between_requests=30,
+        deadline=None,
+        parallel=0,
+    ):
+        with operation_deadline(deadline):
+            job = await self.start_export_selection(
+                export_format, item_ids, include_revision_history
+            )
+            return await self._wait_till_complete_then_download(
+                job["id"], file_path, wait_between_requests, parallel=parallel
+            )
+
+    async def _wait_till_complete_then_download(
+        self, job_id, file_path, wait_between_requests=30, progress_log=None, parallel=0
+    ):
+        while True:
+            status_response = await self.get_job_status(job_id)
+            download_url = self._export_download_url(status_response, progress_log)
+            if download_url is not None:
+                file_path = self._export_file_path(file_path, download_url)
+                await self.download_link_to_file(
+                    download_url, file_path, resume=True, parallel=parallel
+                )
+                return file_path
+            await asyncio.sleep(capped(wait_between_requests))
+
+    async def download_export(
+        self,
+        export_format,
+        scope,
+        file_path,
+        uid=None,
+        include_revisions=False,
+        wait_between_requests=30,
+        progress_log=None,
+        deadline=None,
+        parallel=0,
+    ):
+        self._log_progress(progress_log, f"{datetime.datetime.now()} - Starting export..")
+        with operation_deadline(deadline):
+            job = await self.start_export(
+                export_format=export_format,
+                scope=scope,
+                uid=uid,
+                include_revisions=include_revisions,
+            )
+            return await self._wait_till_complete_then_download(
+                job["id"], file_path, wait_between_requests, progress_log, parallel
+            )
+
+    async def import_tree(
+        self,
+        data_dir,
+        parent_folder_id=None,
+        ignore_hidden_folders=True,
+        halt_on_error=False,
+        doc_creation=DocumentCreationStrategy.DOC_PER_FILE,
+        deadline=None,
+    ):
+        with operation_deadline(deadline):
+            return await AsyncTreeImporter(self).import_tree(
+                data_dir,
+                parent_folder_id,
+                ignore_hidden_folders,
+                halt_on_error,
+                doc_creation,
+            )
@@ -1,11 +1,11 @@
 import datetime
 import time
 import os
-import requests
 import rspace_client.eln.filetree_importer as importer
 from rspace_client.eln.dcs import DocumentCreationStrategy
 
 from rspace_client.client_base import ClientBase, Pagination
+from rspace_client.timeouts import capped, deadline as operation_deadline
 
 
 class ELNClient(ClientBase):
@@ -45,8 +45,30 @@ class ELNClient(ClientBase):
 
         return self.retrieve_api_results("/documents", params)
 
-    def stream_documents(self, pagination: Pagination = Pagination()):
-        return self._stream("documents", pagination)
+    def stream_documents(
+        self,
+        pagination: Pagination = Pagination(),
+        prefetch: int = 0,
+        parallel: int = 0,
+        ordered: bool = True,
+        incremental: bool = False,
+    ):
+        """
+        Streams all documents, making paginated requests as they are consumed.
+        :param pagination: sets page size and ordering
+        :param prefetch: number of pages to fetch ahead in the background, default is 0
+        :param parallel: if greater than 1, number of pages to request concurrently, using
+         the total number of documents reported by the first page. Raises
+         ListingChangedError if documents are added or deleted during the scan.
+        :param ordered: with parallel, whether documents are yielded in page order (default)
+         or as pages arrive
+        :param incremental: whether to decode each page's documents as it is downloaded,
+         so that large pages are streamed in constant memory. Pages are then not cached,
+         prefetched or requested in parallel. Default is False.
+        """
+        return self._stream(
+            "documents", pagination, prefetch, parallel, ordered, incremental
+        )
 
     def get_documents_advanced_query(
         self, advanced_query, order_by="lastModified desc", page_number=0, page_size=20
@@ -189,6 +211,13 @@ class ELNClient(ClientBase):
         if html_content is None:
             raise ValueError("No HTML content was set")
         doc = self.get_document(document_id)
+        to_update = self._field_update(doc, document_id, html_content, field_index, append)
+        return self.update_document(
+            document_id, form_id=doc["form"]["id"], fields=to_update
+        )
+
+    @staticmethod
+    def _field_update(doc, document_id, html_content, field_index, append):
         field = None
 
         if field_index > 0:
@@ -207,10 +236,7 @@ class ELNClient(ClientBase):
             new_content = field["content"] + html_content
         else:
             new_content = html_content + field["content"]
-        to_update = [{"id": field["id"], "content": new_content}]
-        return self.update_document(
-            document_id, form_id=doc["form"]["id"], fields=to_update
-        )
+        return [{"id": field["id"], "content": new_content}]
 
     def update_document(
         self, document_id, name=None, tags=None, form_id=None, fields=None
@@ -334,27 +360,50 @@ class ELNClient(ClientBase):
         numeric_file_id = self._get_numeric_record_id(file_id)
         return self.retrieve_api_results("/files/{}".format(numeric_file_id))
 
-    def download_file(self, file_id, filename, chunk_size=128):
+    def download_file(
+        self, file_id, filename, chunk_size=None, resume=False, parallel=0, digests=None
+    ):
         """
         Downloads file contents. More information on
         https://community.researchspace.com/public/apiDocs (or your own instance's /public/apiDocs).
         :param file_id: numeric document ID or global ID
         :param filename: file path to save the file to or a file object
-        :param chunk_size: size of chunks to download at a time (optional, default is 128 bytes)
+        :param chunk_size: initial size of the download buffer in bytes (optional, default is
+         64KiB), see download_link_to_file
+        :param resume: if True, completes a file left incomplete by an interrupted download
+         rather than downloading it again, see download_link_to_file. Default is False.
+        :param parallel: number of connections to download a large file over at once, for
+         servers limiting the throughput of each connection, see download_link_to_file
+        :param digests: name or names of hashlib algorithms, e.g. "sha256", whose digests
+         of the file are computed as it is downloaded, see download_link_to_file
+        :return: a DownloadResult giving the size, duration and throughput of the download,
+         and the digests asked for
         """
         numeric_file_id = self._get_numeric_record_id(file_id)
         url_base = self._get_api_url()
         return self.download_link_to_file(
-            f"{url_base}/files/{numeric_file_id}/file", filename, chunk_size
+            f"{url_base}/files/{numeric_file_id}/file",
+            filename,
+            chunk_size,
+            resume,
+            parallel,
+            digests,
         )
 
-    def upload_file(self, file, folder_id=None, caption=None):
+    def upload_file(
+        self, file, folder_id=None, caption=None, digests=None, progress=None
+    ):
         """
         Upload a file to the gallery. More information on
         https://community.researchspace.com/public/apiDocs (or your own instance's /public/apiDocs).
         :param file: open file object
         :param folder_id: folder id of the destination folder
         :param caption: optional caption
+        :param digests: name or names of hashlib algorithms, e.g. "sha256", whose digests
+         of the file are computed as it is sent, and added to the response as 'digests'
+        :param progress: optional callable, called with a
+         rspace_client.multipart.TransferProgress giving the bytes sent, rate and ETA
+         as the file is uploaded
         :return: parsed response as a dictionary
         """
         data = {}
@@ -366,28 +415,32 @@ class ELNClient(ClientBase):
         if caption is not None:
             data["caption"] = caption
 
-        response = requests.post(
-            self._get_api_url() + "/files",
+        return self._multipart_post(
+            "/files",
             files={"file": file},
             data=data,
-            headers=self._get_headers(),
+            digests=digests,
+            progress=progress,
         )
-        return self._handle_response(response)
 
-    def update_file(self, file, fileId):
+    def update_file(self, file, fileId, digests=None, progress=None):
         """
         Upload a file to the gallery. More information on
         https://community.researchspace.com/public/apiDocs (or your own instance's /public/apiDocs).
         :param file: open file object
         :param fileId: Id of the file to replace
+        :param digests: name or names of hashlib algorithms whose digests of the file
+         are computed as it is sent, and added to the response as 'digests'
+        :param progress: optional callable, called with a TransferProgress as the
+         file is uploaded, see upload_file
         :return: updated File response as a dictionary
         """
-        response = requests.post(
-            self._get_api_url() + "/files/{}/file".format(fileId),
+        return self._multipart_post(
+            "/files/{}/file".format(fileId),
             files={"file": file},
-            headers=self._get_headers(),
+            digests=digests,
+            progress=progress,
         )
-        return self._handle_response(response)
 
     # Activity methods
     def get_activity(
@@ -523,6 +576,8 @@ class ELNClient(ClientBase):
         item_ids=[],
         include_revision_history=False,
         wait_between_requests=30,
+        deadline=None,
+        parallel=0,
     ):
         """
         Exports  record selection and downloads the exported archive to a specified location.
@@ -531,52 +586,75 @@ class ELNClient(ClientBase):
         :param uid: id of a user or a group depending on the scope (current user or group will be used if not provided)
         :param include_revision_history: whether to include all revisions
         :param wait_between_requests: seconds to wait between job status requests (30 seconds default)
+        :param deadline: optional seconds within which the export must be downloaded, else
+         ClientBase.DeadlineExceededError is raised
+        :param parallel: number of connections to download the archive over at once, for
+         servers limiting the throughput of each connection, see download_link_to_file
         :return: file path to the downloaded export archive
         """
-        job_id = self.start_export_selection(
-            export_format, item_ids, include_revision_history
-        )["id"]
-        return self._wait_till_complete_then_download(
-            job_id, file_path, wait_between_requests
-        )
+        with operation_deadline(deadline):
+            job_id = self.start_export_selection(
+                export_format, item_ids, include_revision_history
+            )["id"]
+            return self._wait_till_complete_then_download(
+                job_id, file_path, wait_between_requests, parallel=parallel
+            )
 
     def _wait_till_complete_then_download(
-        self, job_id, file_path, wait_between_requests=30, progress_log=None
+        self, job_id, file_path, wait_between_requests=30, progress_log=None, parallel=0
     ):
-        
         while True:
             status_response = self.get_job_status(job_id)
-
-            if status_response["status"] == "COMPLETED":
-                
-                download_url = self.get_link(status_response, "enclosure")
-                self._log_progress(progress_log, f"COMPLETED: download url is {download_url}")
-                if os.path.isdir(file_path):
-                    file_path = os.path.join(file_path, download_url.split("/")[-1])
-                self.download_link_to_file(download_url, file_path)
+            download_url = self._export_download_url(status_response, progress_log)
+            if download_url is not None:
+                file_path = self._export_file_path(file_path, download_url)
+                # resumed after a lost connection, as the retry policy allows; a later
+                # call exports again, to a new URL, so it cannot continue this download
+                self.download_link_to_file(
+                    download_url, file_path, resume=True, parallel=parallel
+                )
                 return file_path
-            elif status_response["status"] == "FAILED":
-                msg = "Export job failed: "
+            time.sleep(capped(wait_between_requests))
+
+    def _export_download_url(self, status_response, progress_log=None):
+        """
+        Checks the status of an export job.
+        :return: the URL to download the export from if the job has completed, or None if it
+         is still running
+        :raises ApiError: if the job failed, was abandoned or has an unknown status
+        """
+        if status_response["status"] == "COMPLETED":
+            download_url = self.get_link(status_response, "enclosure")
+            self._log_progress(progress_log, f"COMPLETED: download url is {download_url}")
+            return download_url
+        elif status_response["status"] == "FAILED":
+            msg = "Export job failed: " + self._get_formated_error_message(
+                status_response["result"]
+            )
+            self._log_progress(progress_log, msg)
+            raise ClientBase.ApiError(msg)
+        elif status_response["status"] == "ABANDONED":
+            raise ClientBase.ApiError(
+                "Export job was abandoned: "
                 + self._get_formated_error_message(status_response["result"])
-                self._log_progress(progress_log, msg)
-                raise ClientBase.ApiError(msg)
-            elif status_response["status"] == "ABANDONED":
-                raise ClientBase.ApiError(
-                    "Export job was abandoned: "
-                    + self._get_formated_error_message(status_response["result"])
-                )
-            elif (
-                status_response["status"] == "RUNNING"
-                or status_response["status"] == "STARTING"
-                or status_response["status"] == "STARTED"
-            ):
-                self._log_progress(progress_log, f"Running - {status_response['percentComplete']:2.2f}% complete")
-                time.sleep(wait_between_requests)
-                continue
-            else:
-                raise ClientBase.ApiError(
-                    "Unknown job status: " + status_response["status"]
-                )
+            )
+        elif (
+            status_response["status"] == "RUNNING"
+            or status_response["status"] == "STARTING"
+            or status_response["status"] == "STARTED"
+        ):
+            self._log_progress(progress_log, f"Running - {status_response['percentComplete']:2.2f}% complete")
+            return None
+        else:
+            raise ClientBase.ApiError(
+                "Unknown job status: " + status_response["status"]
+            )
+
+    @staticmethod
+    def _export_file_path(file_path, download_url):
+        if os.path.isdir(file_path):
+            return os.path.join(file_path, download_url.split("/")[-1])
+        return file_path
 
     def _log_progress(self, progress_log, msg: str):     
         if progress_log is not None:
@@ -588,7 +666,9 @@ class ELNClient(ClientBase):
     def export_and_download (self, export_format,scope,file_path, uid=None,
        include_revisions=False,
         wait_between_requests=30,
-        progress_log=None):
+        progress_log=None,
+        deadline=None,
+        parallel=0):
         """
         Exports user's or group's records and downloads the exported archive to a specified location.
         :param export_format: 'xml' or 'html'
@@ -598,9 +678,13 @@ class ELNClient(ClientBase):
         :param include_revision_history: whether to include all revisions
         :param wait_between_requests: seconds to wait between job status requests (30 seconds default)
         :param an optional file-path to a writable log file, to log progress.
+        :param deadline: optional seconds within which the export must be downloaded, else
+         ClientBase.DeadlineExceededError is raised
+        :param parallel: number of connections to download the archive over at once, for
+         servers limiting the throughput of each connection, see download_link_to_file
         :return: file path to the downloaded export archive.
         """
-        return self.download_export(export_format,scope,file_path,uid, include_revisions,wait_between_requests, progress_log)
+        return self.download_export(export_format,scope,file_path,uid, include_revisions,wait_between_requests, progress_log, deadline, parallel)
             
     def download_export(
         self,
@@ -610,7 +694,9 @@ class ELNClient(ClientBase):
         uid=None,
         include_revisions=False,
         wait_between_requests=30,
-        progress_log=None
+        progress_log=None,
+        deadline=None,
+        parallel=0,
     ):
         """
         DEPRECATED since 2.5.0. Use 'export_and_download' which better describes this method and works in exactly the same way.
@@ -622,18 +708,23 @@ class ELNClient(ClientBase):
         :param include_revision_history: whether to include all revisions
         :param wait_between_requests: seconds to wait between job status requests (30 seconds default)
         :param an optional file-path to a writable log file, to log progress.
+        :param deadline: optional seconds within which the export must be downloaded, else
+         ClientBase.DeadlineExceededError is raised
+        :param parallel: number of connections to download the archive over at once, for
+         servers limiting the throughput of each connection, see download_link_to_file
         :return: file path to the downloaded export archive.
         """
         self._log_progress(progress_log, f"{datetime.datetime.now()} - Starting export..")
-        job_id = self.start_export(
-            export_format=export_format,
-            scope=scope,
-            uid=uid,
-            include_revisions=include_revisions,
-        )["id"]
-        return self._wait_till_complete_then_download(
-            job_id, file_path, wait_between_requests, progress_log
-        )
+        with operation_deadline(deadline):
+            job_id = self.start_export(
+                export_format=export_format,
+                scope=scope,
+                uid=uid,
+                include_revisions=include_revisions,
+            )["id"]
+            return self._wait_till_complete_then_download(
+                job_id, file_path, wait_between_requests, progress_log, parallel
+            )
 
     def get_job_status(self, job_id):
         """
@@ -811,7 +902,25 @@ class ELNClient(ClientBase):
          will be restricted to these types
         :return a paginated folder listing
         """
-        url = ""
+        return self.retrieve_api_results(
+            *self._folder_tree_request(folder_id, typesToInclude)
+        )
+
+    def stream_folder_tree(self, folder_id=None, typesToInclude=[]):
+        """
+        Streams the records of a folder, following the pages of its listing and
+        decoding each record as the page is downloaded, so that folders with very
+        many records are listed in constant memory. Streamed pages are not cached.
+        :param folder_id: Optional folderId. If none, streams the Home Folder
+        :param typesToInclude: An optional list of any of 'folder', 'notebook' or 'document'. Results
+         will be restricted to these types
+        :return: a generator of the records, as in list_folder_tree()['records']
+        """
+        url, params = self._folder_tree_request(folder_id, typesToInclude)
+        return self._stream_listing(url, "records", params)
+
+    @staticmethod
+    def _folder_tree_request(folder_id, typesToInclude):
         if folder_id is not None:
             url = "/folders/tree/{}".format(folder_id)
         else:
@@ -827,7 +936,7 @@ class ELNClient(ClientBase):
                     'typesToInclude must be contain "document", "notebook" and/or "folder"'
                 )
             params["typesToInclude"] = ",".join(typesToInclude)
-        return self.retrieve_api_results(url, params)
+        return url, params
 
     # Groups methods
     def get_groups(self):
@@ -838,7 +947,7 @@ class ELNClient(ClientBase):
         return self.retrieve_api_results("/groups")
 
     # Import methods
-    def import_word(self, file, folder_id=None, image_folder_id=None):
+    def import_word(self, file, folder_id=None, image_folder_id=None, progress=None):
         """
         Imports a Word file into RSpace and creates an RSpace document from it.
         :param file: The Word file to import
@@ -847,6 +956,8 @@ class ELNClient(ClientBase):
         :param folder_id: Optionally, the ID of a folder in the image gallery
          into which images extracted from Word documents will be placed. By default, these
           will be placed in the top-level of the Gallery.
+        :param progress: optional callable, called with a TransferProgress as the
+         file is uploaded, see upload_file
         """
         data = {}
         if folder_id is not None:
@@ -856,13 +967,9 @@ class ELNClient(ClientBase):
             numeric_imagefolder_id = self._get_numeric_record_id(image_folder_id)
             data["imageFolderId"] = numeric_imagefolder_id
 
-        response = requests.post(
-            self._get_api_url() + "/import/word",
-            files={"file": file},
-            data=data,
-            headers=self._get_headers(),
+        return self._multipart_post(
+            "/import/word", files={"file": file}, data=data, progress=progress
         )
-        return self._handle_response(response)
 
     # Miscellaneous methods
     def get_status(self):
@@ -907,6 +1014,7 @@ class ELNClient(ClientBase):
         ignore_hidden_folders: bool = True,
         halt_on_error: bool = False,
         doc_creation=DocumentCreationStrategy.DOC_PER_FILE,
+        deadline: float = None,
     ) -> dict:
         """
         Imports a directory tree into RSpace, recreating the tree in RSpace,
@@ -923,6 +1031,9 @@ class ELNClient(ClientBase):
             Whether hidden folders (names starting  with '.') - should be ignored.  The default is True.
         halt_on_error : bool, optional
             Whether to halt the process in case of IO error reading files. The default is False.
+        deadline : float, optional
+            Seconds within which the import must complete. Requests that would be
+            made after it raise ClientBase.DeadlineExceededError. The default is no deadline.
 
         Returns
         -------
@@ -932,10 +1043,11 @@ class ELNClient(ClientBase):
 
         """
         tree_import = importer.TreeImporter(self)
-        return tree_import.import_tree(
-            data_dir,
-            parent_folder_id,
-            ignore_hidden_folders,
-            halt_on_error,
-            doc_creation,
-        )
+        with operation_deadline(deadline):
+            return tree_import.import_tree(
+                data_dir,
+                parent_folder_id,
+                ignore_hidden_folders,
+                halt_on_error,
+                doc_creation,
+            )
@@ -19,14 +19,40 @@ def assert_is_readable_dir(data_dir):
 
 
 class TreeImporter:
+    """
+    Imports a directory tree with an ELNClient.
+
+    The walk of the tree is a generator yielding the client calls to make, as
+    (method name, args, kwargs) tuples, and receiving their results, so the same
+    walk drives the calls of an asyncio client in AsyncTreeImporter.
+    """
+
     def __init__(self, eln_client):
         self.cli = eln_client
 
+    def _run(self, steps):
+        """
+        Makes the calls yielded by a walk, sending their results or throwing their
+        errors back into it.
+        :return: the value returned by the walk
+        """
+        try:
+            name, args, kwargs = next(steps)
+            while True:
+                try:
+                    outcome = getattr(self.cli, name)(*args, **kwargs)
+                except Exception as e:
+                    name, args, kwargs = steps.throw(e)
+                else:
+                    name, args, kwargs = steps.send(outcome)
+        except StopIteration as stop:
+            return stop.value
+
     def _create_file_linking_doc(self, content, parent_folder_id, name, path2Id):
-        rs_doc = self.cli.create_document(
-            name,
-            parent_folder_id=parent_folder_id,
-            fields=[{"content": content}],
+        rs_doc = yield (
+            "create_document",
+            (name,),
+            {"parent_folder_id": parent_folder_id, "fields": [{"content": content}]},
         )
         path2Id[name] = rs_doc["globalId"]
 
@@ -45,6 +71,24 @@ class TreeImporter:
         halt_on_error: bool = False,
         doc_creation=DCS.DOC_PER_FILE,
     ) -> dict:
+        return self._run(
+            self._import_steps(
+                data_dir,
+                parent_folder_id,
+                ignore_hidden_folders,
+                halt_on_error,
+                doc_creation,
+            )
+        )
+
+    def _import_steps(
+        self,
+        data_dir: str,
+        parent_folder_id: int,
+        ignore_hidden_folders: bool,
+        halt_on_error: bool,
+        doc_creation,
+    ):
         def _sanitize(path):
             return re.sub(r"/", "-", path)
 
@@ -68,8 +112,10 @@ class TreeImporter:
         result["path2Id"] = path2Id
         ## replace any forward slashes (e.g in windows path names)
 
-        folder = self.cli.create_folder(
-            _sanitize(os.path.basename(data_dir)), parent_folder_id
+        folder = yield (
+            "create_folder",
+            (_sanitize(os.path.basename(data_dir)), parent_folder_id),
+            {},
         )
         path2Id[data_dir] = folder["globalId"]
         all_rs_files = []
@@ -81,8 +127,10 @@ class TreeImporter:
             for sf in subdirList:
 
                 if _is_subfolder_tree_required(sf, doc_creation):
-                    rs_folder = self.cli.create_folder(
-                        _sanitize(os.path.basename(sf)), path2Id[dirName]
+                    rs_folder = yield (
+                        "create_folder",
+                        (_sanitize(os.path.basename(sf)), path2Id[dirName]),
+                        {},
                     )
                     sf_path = os.path.join(dirName, sf)
                     path2Id[sf_path] = rs_folder["globalId"]
@@ -91,9 +139,12 @@ class TreeImporter:
             for f in fileList:
                 try:
                     with open(os.path.join(dirName, f), "rb") as reader:
-                        rs_file = self.cli.upload_file(reader)
+                        rs_file = yield ("upload_file", (reader,), {})
                         all_rs_files.append((f, rs_file))
                         rs_files_in_subdir.append((f, rs_file))
+                except self.cli.DeadlineExceededError:
+                    # a TimeoutError, but not an error reading the file
+                    raise
                 except IOError as x:
                     if halt_on_error:
                         self.cli.serr(
@@ -110,7 +161,7 @@ class TreeImporter:
                 if DCS.DOC_PER_FILE == doc_creation:
                     parent_folder_id = path2Id[dirName]
                     content_string = f"<fileId={rs_file['id']}>"
-                    self._create_file_linking_doc(
+                    yield from self._create_file_linking_doc(
                         content_string, parent_folder_id, doc_name, path2Id
                     )
             if (DCS.DOC_PER_SUBFOLDER == doc_creation) and (
@@ -119,12 +170,33 @@ class TreeImporter:
                 parent_folder_id = path2Id[dirName]
                 content = self._generate_summary_content(rs_files_in_subdir)
                 summary_name = f"Summary-doc{rs_files_in_subdir[0][1]['created']}"
-                self._create_file_linking_doc(
+                yield from self._create_file_linking_doc(
                     content, parent_folder_id, summary_name, path2Id
                 )
         if (DCS.SUMMARY_DOC == doc_creation) and (len(all_rs_files) > 0):
             content = self._generate_summary_content(all_rs_files)
             summary_name = f"Summary-doc{all_rs_files[0][1]['created']}"
-            self._create_file_linking_doc(content, folder["id"], summary_name, path2Id)
+            yield from self._create_file_linking_doc(
+                content, folder["id"], summary_name, path2Id
+            )
         result["status"] = "OK"
         return result
+
+
+class AsyncTreeImporter(TreeImporter):
+    """
+    Imports a directory tree with an AsyncELNClient, ``await importer.import_tree(...)``.
+    """
+
+    async def _run(self, steps):
+        try:
+            name, args, kwargs = next(steps)
+            while True:
+                try:
+                    outcome = await getattr(self.cli, name)(*args, **kwargs)
+                except Exception as e:
+                    name, args, kwargs = steps.throw(e)
+                else:
+                    name, args, kwargs = steps.send(outcome)
+        except StopIteration as stop:
+            return stop.value
@@ -147,6 +147,12 @@ class GalleryFilesystem(FS):
         self.eln_client = eln.ELNClient(server, api_key)
         self.gallery_id = next(file['id'] for file in self.eln_client.list_folder_tree()['records'] if file['name'] == 'Gallery')
 
+    def close(self) -> None:
+        # FS.__del__ calls close() even if __init__ failed part way through
+        if hasattr(self, "eln_client"):
+            self.eln_client.close()
+        super(GalleryFilesystem, self).close()
+
     def getinfo(self, path, namespaces=None) -> Info:
         is_file = path.split('/')[-1][:2] == "GL"
         info = None
@@ -0,0 +1,406 @@
+"""
+Instrumentation of the HTTP requests made by the RSpace API clients.
+"""
+import contextvars
+import datetime
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+
+logger = logging.getLogger(__name__)
+
+# the public client method being run, e.g. 'import_tree', set by record_operations
+current_operation = contextvars.ContextVar("rspace_operation", default=None)
+
+_API_PREFIX = re.compile(r"^.*?/api/(?:inventory/)?v\d+(?=/|$)")
+_ID_SEGMENT = re.compile(r"^(?:[a-zA-Z]{2})?\d+$")
+
+
+def endpoint_template(url: str) -> str:
+    """
+    The endpoint of a URL relative to the API URL, with numeric and global IDs
+    replaced by '{id}', e.g. '/samples/{id}' for .../api/inventory/v1/samples/SA12
+    """
+    path = _API_PREFIX.sub("", urlsplit(url).path) or "/"
+    return "/".join(
+        "{id}" if _ID_SEGMENT.match(segment) else segment
+        for segment in path.split("/")
+    )
+
+
+class RequestEvent:
+    """
+    One HTTP exchange made by a client: a request and any retries of it.
+
+    Timings are in seconds. ``dns``, ``connect`` and ``ttfb`` describe the last
+    attempt: ``connect`` includes the TLS handshake, and both are 0 when a pooled
+    connection was reused. ``ttfb`` runs until the response headers arrived.
+    ``total`` runs from the first attempt until the response was returned, so it
+    includes rate-limit waits and retry backoff. A timing is None where the HTTP
+    library cannot measure it, e.g. ``dns`` when a new connection was opened,
+    as resolving the host is part of ``connect``.
+
+    ``cache`` is 'hit' when the response came from the response cache, either
+    without contacting the server (``status`` is then None) or after a 304
+    revalidation; 'miss' when a cacheable GET was downloaded; None when there is
+    no response cache or the request is not cacheable.
+
+    The event of a download is emitted once its body was read, so ``total``
+    includes the transfer, ``bytes_received`` counts the bytes read and ``error``
+    is set if the transfer failed. ``digests`` holds the digests of a downloaded
+    or uploaded file by algorithm name, e.g. {'sha256': '9f86...'}, when they
+    were asked for, in the event of the request that completed the transfer.
+    """
+
+    __slots__ = (
+        "method",
+        "url",
+        "endpoint",
+        "kind",
+        "operation",
+        "status",
+        "bytes_sent",
+        "bytes_received",
+        "dns",
+        "connect",
+        "ttfb",
+        "total",
+        "retries",
+        "cache",
+        "error",
+        "digests",
+    )
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        kind: str,
+        operation: Optional[str] = None,
+        status: Optional[int] = None,
+        bytes_sent: Optional[int] = 0,
+        bytes_received: Optional[int] = 0,
+        dns: Optional[float] = None,
+        connect: Optional[float] = None,
+        ttfb: Optional[float] = None,
+        total: float = 0.0,
+        retries: int = 0,
+        cache: Optional[str] = None,
+        error: Optional[BaseException] = None,
+        digests: Optional[dict] = None,
+    ):
+        """
+        :param kind: 'read', 'write', 'upload' or 'download'
+        :param operation: the public client method that made the request, e.g.
+         'get_document' or 'import_tree'
+        :param status: HTTP status of the response, None if no response was received
+        :param bytes_received: size of the response body, None if the response was
+         streamed to the caller without a Content-Length
+        :param error: the exception raised if no response was received
+        """
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint_template(url)
+        self.kind = kind
+        self.operation = operation
+        self.status = status
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.dns = dns
+        self.connect = connect
+        self.ttfb = ttfb
+        self.total = total
+        self.retries = retries
+        self.cache = cache
+        self.error = error
+        self.digests = digests
+
+    def __repr__(self):
+        return (
+            f"RequestEvent({self.method} {self.endpoint} status={self.status} "
+            f"operation={self.operation} total={self.total:.3f}s "
+            f"retries={self.retries} cache={self.cache})"
+        )
+
+
+EventHandler = Callable[[RequestEvent], None]
+
+
+def emit(handlers, event: RequestEvent):
+    """
+    Passes an event to each handler. A failing handler is logged, and does not
+    affect the request or the other handlers.
+    """
+    for handler in handlers:
+        try:
+            handler(event)
+        except Exception:
+            logger.exception("RSpace request event handler %r failed", handler)
+
+
+class Exchange:
+    """
+    Measures one call of ClientBase._send, for the RequestEvent describing it.
+    """
+
+    def __init__(self, method, url, kind, cache_lookup=None):
+        """
+        :param cache_lookup: None if the request is not cacheable, 'miss' if there
+         was no cached response, 'revalidate' if a cached response is revalidated
+        """
+        self.method = method
+        self.url = url
+        self.kind = kind
+        self.cache_lookup = cache_lookup
+        self.operation = current_operation.get()
+        self.start = time.perf_counter()
+        self.retries = 0
+        self.attempt_start = self.start
+        self.dns = 0.0
+        self.connect = 0.0
+        self.ttfb = None
+        self._connect_start = None
+
+    def begin_attempt(self, retry_number: int):
+        self.retries = retry_number
+        self.attempt_start = time.perf_counter()
+        self.dns = 0.0
+        self.connect = 0.0
+        self.ttfb = None
+
+    async def trace(self, name: str, info: dict):
+        """
+        Receives the timings of the asyncio clients, as an httpx 'trace' extension.
+        """
+        if name.endswith("connect_tcp.started"):
+            self.dns = None
+            self._connect_start = time.perf_counter()
+        elif name.endswith(("connect_tcp.complete", "start_tls.complete")):
+            self.connect = time.perf_counter() - self._connect_start
+        elif name.endswith("receive_response_headers.complete"):
+            self.ttfb = time.perf_counter() - self.attempt_start
+
+    def event(
+        self, response=None, streamed=False, error=None, received=None, digests=None
+    ) -> RequestEvent:
+        """
+        :param received: bytes of a streamed body read by the caller
+        :param digests: digests of the file transferred, see RequestEvent
+        """
+        status = None
+        bytes_sent = None
+        bytes_received = None
+        ttfb = self.ttfb
+        if response is not None:
+            status = response.status_code
+            bytes_sent = _content_length(response.request.headers) or 0
+            if received is not None:
+                bytes_received = received
+            elif streamed:
+                bytes_received = _content_length(response.headers)
+            else:
+                bytes_received = len(response.content)
+            if ttfb is None:
+                ttfb = _elapsed(response)
+        if self.cache_lookup is None:
+            cache = None
+        elif self.cache_lookup == "revalidate" and status == 304:
+            cache = "hit"
+        else:
+            cache = "miss"
+        return RequestEvent(
+            self.method,
+            self.url,
+            self.kind,
+            operation=self.operation,
+            status=status,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            dns=self.dns,
+            connect=self.connect,
+            ttfb=ttfb,
+            total=time.perf_counter() - self.start,
+            retries=self.retries,
+            cache=cache,
+            error=error,
+            digests=digests,
+        )
+
+
+def cache_hit_event(method, url, kind) -> RequestEvent:
+    """
+    Event of a request answered from the response cache without contacting the server.
+    """
+    return RequestEvent(
+        method,
+        url,
+        kind,
+        operation=current_operation.get(),
+        dns=0.0,
+        connect=0.0,
+        ttfb=0.0,
+        cache="hit",
+    )
+
+
+def _elapsed(response) -> Optional[float]:
+    # requests sets 'elapsed' once the headers arrived; httpx only once the body is read
+    try:
+        elapsed = response.elapsed
+    except (AttributeError, RuntimeError):
+        return None
+    return elapsed.total_seconds() if isinstance(elapsed, datetime.timedelta) else None
+
+
+def _content_length(headers) -> Optional[int]:
+    try:
+        return int(headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        return None
+
+
+# the Exchange of the request being sent by the current thread, if it is observed
+_attempt = threading.local()
+
+
+def observe_connections(exchange: Optional[Exchange]):
+    """
+    Sets the Exchange that connections opened by the calling thread report to.
+    """
+    _attempt.exchange = exchange
+
+
+class _TimedConnectionMixin:
+    """
+    Reports connection times to the Exchange of the calling thread. The public
+    connect() is timed, which includes resolving the host, so DNS resolution is
+    reported as part of the connect time and ``dns`` as None, as by the asyncio
+    clients.
+    """
+
+    def connect(self):
+        exchange = getattr(_attempt, "exchange", None)
+        if exchange is None:
+            return super().connect()
+        start = time.perf_counter()
+        super().connect()
+        exchange.dns = None
+        exchange.connect = time.perf_counter() - start
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter whose connections report DNS and connect times of the requests
+    observed with observe_connections.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def record_operations(cls):
+    """
+    Class decorator making the public methods of a client class record their name
+    in current_operation while they run, so that request events can tell which
+    method made a request. Only the outermost call is recorded, so events of
+    requests made by import_tree report 'import_tree' rather than the methods it
+    calls. Generators and coroutines returned by a method run under its name too.
+    """
+    for name, value in list(vars(cls).items()):
+        if (
+            name.startswith("_")
+            or not inspect.isfunction(value)
+            or hasattr(value, "__rspace_operation__")
+        ):
+            continue
+        setattr(cls, name, _record_operation(name, value))
+    return cls
+
+
+def _record_operation(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if current_operation.get() is not None:
+            return fn(*args, **kwargs)
+        token = current_operation.set(name)
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            current_operation.reset(token)
+        if inspect.isgenerator(result):
+            return _generator_as(name, result)
+        if inspect.iscoroutine(result):
+            return _coroutine_as(name, result)
+        if inspect.isasyncgen(result):
+            return _async_generator_as(name, result)
+        return result
+
+    wrapper.__rspace_operation__ = name
+    return wrapper
+
+
+def _generator_as(name, generator):
+    try:
+        while True:
+            token = current_operation.set(name)
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                current_operation.reset(token)
+            yield item
+    finally:
+        generator.close()
+
+
+async def _coroutine_as(name, coroutine):
+    token = current_operation.set(name)
+    try:
+        return await coroutine
+    finally:
+        current_operation.reset(token)
+
+
+async def _async_generator_as(name, generator):
+    try:
+        while True:
+            token = current_operation.set(name)
+            try:
+                item = await generator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                current_operation.reset(token)
+            yield item
+    finally:
+        await generator.aclose()
@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+
+from typing import Sequence, Union
+
+from rspace_client.async_client_base import AsyncClientBase, _import_httpx
+from rspace_client.events import record_operations
+from rspace_client.inv.inv import (
+    BarcodeFormat,
+    BulkOperationResult,
+    Id,
+    InventoryBatch,
+    InventoryClient,
+)
+
+
+class AsyncInventoryClient(AsyncClientBase, InventoryClient):
+    """
+    Asyncio-native client for the RSpace Inventory API, requiring the optional 'httpx'
+    dependency.
+
+    Methods have the same arguments as in InventoryClient but must be awaited, e.g.
+    ``sample = await client.get_sample_by_id("SA123")``. ``stream_samples`` and
+    ``stream_top_level_containers`` return async generators to be used with ``async for``.
+    At most ``max_concurrency`` requests are in flight at once.
+
+    Supported are the methods of InventoryClient that make a single request (get, list,
+    rename, delete, transfer etc.), the /bulk operations (``bulk_create_sample``,
+    ``bulk_create_container``, ``add_items_to_*_container``), attachment uploads and
+    downloads, and CSV import. Methods making several requests or post-processing a
+    response (``split_subsample``, ``duplicate``, ``get_workbenches``, ``barcode`` and the
+    DataCite settings) are overridden below. ``create_sample`` and ``create_instrument``
+    are supported without attachments. ``batch()`` returns an AsyncInventoryBatch, used
+    with ``async with``.
+    """
+
+    async def _do_bulk(self, post_json):
+        resp_json = await self.retrieve_api_results(
+            "/bulk", request_type="POST", params=post_json
+        )
+        return BulkOperationResult(resp_json)
+
+    def batch(self, max_records: int = None) -> "AsyncInventoryBatch":
+        return AsyncInventoryBatch(self, max_records)
+
+    async def split_subsample(
+        self,
+        subsample: Union[int, str, dict],
+        num_new_subsamples: int,
+        quantity_per_subsample: float = None,
+    ):
+        ss_id = Id(subsample)
+        if quantity_per_subsample is None:
+            return await self._split(ss_id, num_new_subsamples)
+        if isinstance(subsample, dict) and ss_id.is_subsample(True):
+            curr_quantity = subsample["quantity"]
+        else:
+            curr_quantity = (await self.get_subsample_by_id(ss_id.as_id()))["quantity"]
+        self._check_split_quantity(
+            ss_id, curr_quantity, num_new_subsamples, quantity_per_subsample
+        )
+        new_ss = await self._split(ss_id, num_new_subsamples)
+        return await self._do_bulk(
+            self._split_quantity_update(
+                ss_id, curr_quantity, new_ss, num_new_subsamples, quantity_per_subsample
+            )
+        )
+
+    async def duplicate(
+        self, item_to_duplicate: Union[str, dict], new_name: str = None
+    ) -> dict:
+        rc = await self._duplicate(item_to_duplicate)
+        if new_name is not None:
+            rc = await self.rename(rc, new_name)
+        return rc
+
+    async def get_workbenches(self) -> Sequence[dict]:
+        result = await self.retrieve_api_results("/workbenches")
+        return [wb for wb in result["containers"]]
+
+    async def barcode(
+        self,
+        global_id: Union[str, dict],
+        outfile: str = None,
+        barcode_type: BarcodeFormat = BarcodeFormat.BARCODE,
+    ) -> bytes:
+        url, kwargs = self._barcode_request(global_id, barcode_type)
+        resp = await self._send("GET", url, **kwargs)
+        resp.raise_for_status()
+        return self._save_barcode(resp.content, outfile)
+
+    async def get_datacite_settings(self, provider: str = "IGSN_DATACITE") -> dict:
+        result = await self.retrieve_api_results("/system/settings", request_type="GET")
+        return self._find_identifier_provider_settings(result, provider)
+
+    async def update_datacite_settings(
+        self,
+        enabled: bool,
+        provider: str = "IGSN_DATACITE",
+        server_url: str = None,
+        username: str = None,
+        password: str = None,
+        repository_prefix: str = None,
+    ) -> dict:
+        body = self._datacite_settings_body(
+            enabled, provider, server_url, username, password, repository_prefix
+        )
+        result = await self.retrieve_api_results(
+            "/system/settings", request_type="PUT", params=body
+        )
+        return self._find_identifier_provider_settings(result, provider)
+
+    async def test_datacite_connection(self, provider: str = "IGSN_DATACITE") -> bool:
+        httpx = _import_httpx()
+        url = self._datacite_connection_url(provider)
+        try:
+            response = await self._send("GET", url, headers=self._get_headers())
+            if response.status_code != 200:
+                return False
+            return bool(response.json())
+        except (httpx.HTTPError, ValueError):
+            return False
+
+
+@record_operations
+class AsyncInventoryBatch(InventoryBatch):
+    """
+    Asyncio version of InventoryBatch::
+
+        async with inv_client.batch() as b:
+            futures = [b.rename(sample, "new name") for sample in samples]
+
+    Queued operations are only sent by ``await flush()`` or at the end of the
+    ``async with`` block. The /bulk requests of each operation type are then sent
+    concurrently, one type after another.
+    """
+
+    def _on_full(self, operation):
+        pass
+
+    async def flush(self):
+        errors = []
+        requests = list(self._requests())
+        for _, group in itertools.groupby(requests, key=lambda r: r[0]):
+            outcomes = await asyncio.gather(
+                *[self._send(operation, entries) for operation, entries in group],
+                return_exceptions=True,
+            )
+            errors += [e for e in outcomes if isinstance(e, Exception)]
+        if errors:
+            raise errors[0]
+
+    async def _send(self, operation, entries):
+        try:
+            result = await self.client._do_bulk(self._bulk_post(operation, entries))
+        except Exception as e:
+            self._fail(entries, e)
+            raise
+        self._resolve(entries, result)
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with the batch of an asyncio client")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.flush()
+        else:
+            self.discard()
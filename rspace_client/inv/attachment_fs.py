@@ -24,6 +24,12 @@ class InventoryAttachmentFilesystem(FS):
         super(InventoryAttachmentFilesystem, self).__init__()
         self.inv_client = inv.InventoryClient(server, api_key)
 
+    def close(self) -> None:
+        # FS.__del__ calls close() even if __init__ failed part way through
+        if hasattr(self, "inv_client"):
+            self.inv_client.close()
+        super(InventoryAttachmentFilesystem, self).close()
+
     def getinfo(self, path, namespaces=None) -> Info:
         is_attachment = path.split('/')[-1][:2] == "IF"
         if not is_attachment:
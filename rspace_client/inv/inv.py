@@ -1,17 +1,19 @@
+from concurrent.futures import Future
 from dataclasses import dataclass
 from enum import Enum
-import datetime, math
+import datetime, itertools, math
 
 import json
 import re
 import sys, io, base64
 import requests
 import pprint
-import requests
-from typing import Optional, Sequence, Union, List, TypedDict, BinaryIO
+from typing import Callable, Optional, Sequence, Union, List, TypedDict, BinaryIO
 
 from rspace_client.client_base import ClientBase, Pagination
+from rspace_client.events import record_operations
 from rspace_client.inv import quantity_unit as qu
+from rspace_client.multipart import TransferProgress
 
 
 class DeletedItemFilter(Enum):
@@ -1289,6 +1291,277 @@ class GridContainerPost(ContainerPost):
         }
 
 
+@record_operations
+class InventoryBatch:
+    """
+    Queues Inventory writes and sends them as /bulk requests of up to
+    ``max_records`` records each, rather than one request per item. Create one
+    with ``InventoryClient.batch()``::
+
+        with inv_client.batch() as b:
+            futures = [b.rename(sample, sample["name"].upper()) for sample in samples]
+        renamed = [f.result() for f in futures]
+
+    Each queued call returns a ``concurrent.futures.Future`` that resolves, once its
+    request has been sent, to the item's record in the BulkOperationResult, or
+    raises ClientBase.ApiError with the error reported for that item.
+
+    Queued operations are sent when ``flush()`` is called, when the ``with`` block
+    ends, and, in the threaded client, as soon as ``max_records`` operations of one
+    type are queued. If the block raises an exception, queued operations are
+    discarded and their futures cancelled. Operations are grouped by bulk operation
+    type (CREATE, UPDATE, MOVE, DELETE, CHANGE_OWNER), and the groups are sent in
+    the order each type was first used. Updates of the same item, e.g. a rename and
+    new extra fields, are merged into one record.
+    """
+
+    def __init__(self, client: "InventoryClient", max_records: int = None):
+        """
+        Parameters
+        ----------
+        client : InventoryClient
+            The client sending the requests.
+        max_records : int, optional
+            Maximum number of records per /bulk request. The default is MAX_BULK.
+        """
+        max_records = max_records or InventoryClient.MAX_BULK
+        if not 1 <= max_records <= InventoryClient.MAX_BULK:
+            raise ValueError(
+                f"max_records must be between 1 and {InventoryClient.MAX_BULK} but was {max_records}"
+            )
+        self.client = client
+        self.max_records = max_records
+        # operation type -> {record key: [record, futures]}, in order of first use
+        self._queues = {}
+        self._keys = itertools.count()
+
+    def create_sample(self, name: str, **kwargs) -> Future:
+        """
+        Queues the creation of a sample.
+        Parameters
+        ----------
+        name : str
+            The name of the new sample
+        **kwargs :
+            Other arguments as for InventoryClient.create_sample, except attachments,
+            which cannot be uploaded through /bulk.
+
+        Returns
+        -------
+        Future
+            Resolves to the created sample.
+        """
+        if kwargs.get("attachments"):
+            raise ValueError("Attachments cannot be added to samples created in a batch")
+        return self.create(SamplePost(name, **kwargs))
+
+    def create(self, item_post: ItemPost) -> Future:
+        """
+        Queues the creation of an item from a SamplePost or ContainerPost.
+        """
+        return self._queue("CREATE", next(self._keys), dict(item_post.data))
+
+    def rename(self, item_id: Union[str, dict], new_name: str) -> Future:
+        """
+        Queues renaming an item, as InventoryClient.rename does.
+        Returns
+        -------
+        Future
+            Resolves to the updated item.
+        """
+        return self._update(item_id, {"name": new_name})
+
+    def add_extra_fields(self, item_id: Union[str, dict], *extra_fields) -> Future:
+        """
+        Queues adding extra fields to an item, as InventoryClient.add_extra_fields does.
+        Returns
+        -------
+        Future
+            Resolves to the updated item.
+        """
+        to_put = []
+        for ef in extra_fields:
+            ef.data["newFieldRequest"] = True
+            to_put.append(ef.data)
+        return self._update(item_id, {"extraFields": to_put})
+
+    def transfer_sample_owner(self, sample_id: Union[int, str], new_owner: str) -> Future:
+        """
+        Queues transferring a sample to a new owner.
+        Returns
+        -------
+        Future
+            Resolves to the updated sample.
+        """
+        s_id = self._item_id(sample_id, "SAMPLE")
+        record = {"owner": {"username": new_owner}}
+        return self._queue("CHANGE_OWNER", self._record_key(s_id), record, s_id)
+
+    def delete_sample(self, sample_id: Union[int, str]) -> Future:
+        """
+        Queues deleting a sample.
+        Returns
+        -------
+        Future
+            Resolves to the deleted sample.
+        """
+        s_id = self._item_id(sample_id, "SAMPLE")
+        return self._queue("DELETE", self._record_key(s_id), {}, s_id)
+
+    def add_items_to_list_container(
+        self, target_container_id: Union[str, int, dict], *item_ids
+    ) -> List[Future]:
+        """
+        Queues moving items into a list container, as
+        InventoryClient.add_items_to_list_container does.
+        Returns
+        -------
+        List[Future]
+            One future per item, resolving to the moved item.
+        """
+        id_target = self.client._id_as_container_id(target_container_id)
+        futures = []
+        for item_id in item_ids:
+            id_ob = Id(item_id)
+            if not id_ob.is_movable():
+                raise ValueError(
+                    f"Item to move '{item_id}' must be a container or subsample"
+                )
+            record = {"parentContainers": [{"id": id_target.as_id()}]}
+            futures.append(self._queue("MOVE", next(self._keys), record, id_ob))
+        return futures
+
+    def _update(self, item_id, fields):
+        i_id = Id(item_id)
+        return self._queue("UPDATE", self._record_key(i_id), fields, i_id)
+
+    @staticmethod
+    def _item_id(item_id, item_type):
+        i_id = Id(item_id)
+        if not hasattr(i_id, "prefix"):
+            i_id.prefix = {v: k for k, v in Id.PREFIX_TO_TYPE.items()}[item_type]
+        return i_id
+
+    @staticmethod
+    def _record_key(i_id):
+        return (i_id.get_type(), i_id.as_id())
+
+    def _queue(self, operation, key, fields, i_id=None):
+        future = Future()
+        queue = self._queues.setdefault(operation, {})
+        entry = queue.get(key)
+        if entry is None:
+            record = {"id": i_id.as_id(), "type": i_id.get_type()} if i_id else {}
+            queue[key] = [{**record, **fields}, [future]]
+        else:
+            # a further update of the same item
+            record = entry[0]
+            extra_fields = record.get("extraFields", []) + fields.get("extraFields", [])
+            record.update(fields)
+            if extra_fields:
+                record["extraFields"] = extra_fields
+            entry[1].append(future)
+        if len(queue) >= self.max_records:
+            self._on_full(operation)
+        return future
+
+    def _on_full(self, operation):
+        self._send(operation, list(self._queues.pop(operation).values()))
+
+    def _requests(self):
+        """
+        Takes the queued operations as (operation type, entries) pairs of at most
+        max_records entries each.
+        """
+        queues, self._queues = self._queues, {}
+        for operation, queue in queues.items():
+            entries = list(queue.values())
+            for start in range(0, len(entries), self.max_records):
+                yield operation, entries[start : start + self.max_records]
+
+    def flush(self):
+        """
+        Sends all queued operations.
+
+        Raises
+        ------
+        ClientBase.ApiError, ClientBase.ConnectionError
+            If a /bulk request failed. The futures of its operations raise the same
+            error; the other queued operations are still sent.
+        """
+        errors = []
+        for operation, entries in self._requests():
+            try:
+                self._send(operation, entries)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def _send(self, operation, entries):
+        try:
+            result = self.client._do_bulk(self._bulk_post(operation, entries))
+        except Exception as e:
+            self._fail(entries, e)
+            raise
+        self._resolve(entries, result)
+
+    @staticmethod
+    def _bulk_post(operation, entries):
+        return {"operationType": operation, "records": [record for record, _ in entries]}
+
+    @staticmethod
+    def _fail(entries, error):
+        for _, futures in entries:
+            for future in futures:
+                future.set_exception(error)
+
+    @staticmethod
+    def _resolve(entries, result: BulkOperationResult):
+        results = result.data.get("results") or []
+        if len(results) != len(entries):
+            InventoryBatch._fail(
+                entries,
+                ClientBase.ApiError(f"Bulk operation failed: {result.data}"),
+            )
+            return
+        for (_, futures), item in zip(entries, results):
+            for future in futures:
+                if item.get("error") is not None:
+                    future.set_exception(
+                        ClientBase.ApiError(
+                            ClientBase._get_formated_error_message(item["error"])
+                        )
+                    )
+                else:
+                    future.set_result(item["record"])
+
+    def discard(self):
+        """
+        Drops all queued operations, cancelling their futures.
+        """
+        queues, self._queues = self._queues, {}
+        for queue in queues.values():
+            for _, futures in queue.values():
+                for future in futures:
+                    future.cancel()
+
+    def __len__(self):
+        """
+        The number of queued records.
+        """
+        return sum(len(queue) for queue in self._queues.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+
+
 class InventoryClient(ClientBase):
     """
     Wrapper around RSpace Inventory API.
@@ -1307,6 +1580,25 @@ class InventoryClient(ClientBase):
         return f"{self.rspace_url}/api/inventory/{self.API_VERSION}"
 
     MAX_BULK = 100
+
+    def batch(self, max_records: int = None) -> InventoryBatch:
+        """
+        A context manager queueing writes (create_sample, rename, add_extra_fields,
+        transfer_sample_owner, delete_sample, add_items_to_list_container) and
+        sending them as /bulk requests of up to MAX_BULK records, e.g.
+        ``with client.batch() as b: b.rename(sample_id, "new name")``.
+        See InventoryBatch.
+        Parameters
+        ----------
+        max_records : int, optional
+            Maximum number of records per /bulk request. The default is MAX_BULK.
+
+        Returns
+        -------
+        InventoryBatch
+        """
+        return InventoryBatch(self, max_records)
+
     ## Helper method for generic bulk post
     def _do_bulk(self, post_json):
         resp_json = self.retrieve_api_results(
@@ -1457,13 +1749,30 @@ class InventoryClient(ClientBase):
         )
 
     def stream_samples(
-        self, pagination: Pagination = Pagination(), sample_filter: SearchFilter = None
+        self,
+        pagination: Pagination = Pagination(),
+        sample_filter: SearchFilter = None,
+        prefetch: int = 0,
+        parallel: int = 0,
+        ordered: bool = True,
+        incremental: bool = False,
     ):
         """
         Streams all samples. Pagination argument sets batch size and ordering.
         Parameters
         ----------
         pagination : Pagination, optional. The default is Pagination().
+        prefetch : int, optional. Number of pages to fetch ahead in the background
+            while the current page is processed. The default is 0.
+        parallel : int, optional. If greater than 1, number of pages to request
+            concurrently, using the total reported by the first page. Raises
+            ListingChangedError if items are added or deleted during the scan.
+        ordered : bool, optional. With parallel, whether items are yielded in page
+            order (the default) or as pages arrive.
+        incremental : bool, optional. Whether to decode each page's items as it is
+            downloaded, so that large pages are streamed in constant memory. Pages
+            are then not cached, prefetched or requested in parallel. The default
+            is False.
 
         Yields
         ------
@@ -1471,16 +1780,35 @@ class InventoryClient(ClientBase):
         """
         if sample_filter is not None:
             pagination.data.update(sample_filter.data)
-        return self._stream("samples", pagination)
+        return self._stream(
+            "samples", pagination, prefetch, parallel, ordered, incremental
+        )
 
     def stream_top_level_containers(
-        self, pagination: Pagination = Pagination(), sample_filter: SearchFilter = None
+        self,
+        pagination: Pagination = Pagination(),
+        sample_filter: SearchFilter = None,
+        prefetch: int = 0,
+        parallel: int = 0,
+        ordered: bool = True,
+        incremental: bool = False,
     ):
         """
         Streams all containers. Pagination argument sets batch size and ordering.
         Parameters
         ----------
         pagination : Pagination, optional. The default is Pagination().
+        prefetch : int, optional. Number of pages to fetch ahead in the background
+            while the current page is processed. The default is 0.
+        parallel : int, optional. If greater than 1, number of pages to request
+            concurrently, using the total reported by the first page. Raises
+            ListingChangedError if items are added or deleted during the scan.
+        ordered : bool, optional. With parallel, whether items are yielded in page
+            order (the default) or as pages arrive.
+        incremental : bool, optional. Whether to decode each page's items as it is
+            downloaded, so that large pages are streamed in constant memory. Pages
+            are then not cached, prefetched or requested in parallel. The default
+            is False.
 
         Yields
         ------
@@ -1488,7 +1816,45 @@ class InventoryClient(ClientBase):
         """
         if sample_filter is not None:
             pagination.data.update(sample_filter.data)
-        return self._stream("containers", pagination)
+        return self._stream(
+            "containers", pagination, prefetch, parallel, ordered, incremental
+        )
+
+    def stream_subsamples(
+        self,
+        pagination: Pagination = Pagination(),
+        sample_filter: SearchFilter = None,
+        prefetch: int = 0,
+        parallel: int = 0,
+        ordered: bool = True,
+        incremental: bool = False,
+    ):
+        """
+        Streams all subsamples. Pagination argument sets batch size and ordering.
+        Parameters
+        ----------
+        pagination : Pagination, optional. The default is Pagination().
+        prefetch : int, optional. Number of pages to fetch ahead in the background
+            while the current page is processed. The default is 0.
+        parallel : int, optional. If greater than 1, number of pages to request
+            concurrently, using the total reported by the first page. Raises
+            ListingChangedError if items are added or deleted during the scan.
+        ordered : bool, optional. With parallel, whether items are yielded in page
+            order (the default) or as pages arrive.
+        incremental : bool, optional. Whether to decode each page's items as it is
+            downloaded, so that large pages are streamed in constant memory. Pages
+            are then not cached, prefetched or requested in parallel. The default
+            is False.
+
+        Yields
+        ------
+        item : One SubSample at a time
+        """
+        if sample_filter is not None:
+            pagination.data.update(sample_filter.data)
+        return self._stream(
+            "subSamples", pagination, prefetch, parallel, ordered, incremental
+        )
 
     def rename(self, item_id: Union[str, dict], new_name: str) -> dict:
         """
@@ -1532,7 +1898,7 @@ class InventoryClient(ClientBase):
             f"/{endpoint}/{s_id.as_id()}", request_type="PUT", params=data
         )
 
-    def delete_sample(self, sample_id: Union[int, str]):
+    def delete_sample(self, sample_id: Union[int, str]) -> dict:
         """
         Parameters
         ----------
@@ -1541,10 +1907,11 @@ class InventoryClient(ClientBase):
 
         Returns
         -------
-        None.
+        dict
+            The deleted sample, as returned by the server.
         """
         id_to_delete = Id(sample_id)
-        self.doDelete("samples", id_to_delete.as_id())
+        return self.doDelete("samples", id_to_delete.as_id())
 
     def create_instrument(
         self,
@@ -1614,7 +1981,7 @@ class InventoryClient(ClientBase):
         """
         return self._do_simple_list("instruments", pagination, search_filter)
 
-    def delete_instrument(self, instrument_id: Union[int, str]):
+    def delete_instrument(self, instrument_id: Union[int, str]) -> dict:
         """
         Marks an instrument as deleted, so it won't appear in Inventory UI and
         default listings.
@@ -1625,10 +1992,11 @@ class InventoryClient(ClientBase):
 
         Returns
         -------
-        None.
+        dict
+            The deleted instrument, as returned by the server.
         """
         id_to_delete = Id(instrument_id)
-        self.doDelete("instruments", id_to_delete.as_id())
+        return self.doDelete("instruments", id_to_delete.as_id())
 
     def restore_instrument(self, instrument_id: Union[int, str]) -> dict:
         """
@@ -1776,7 +2144,13 @@ class InventoryClient(ClientBase):
         """
         return self.retrieve_api_results(f"/files/{attachment_id}")
 
-    def upload_attachment(self, inventory_item: Union[str, dict], file) -> dict:
+    def upload_attachment(
+        self,
+        inventory_item: Union[str, dict],
+        file,
+        digests: Union[str, Sequence[str]] = None,
+        progress: Callable[[TransferProgress], None] = None,
+    ) -> dict:
         """
         Uploads an attachment file to a sample, subsample or container.
         Parameters
@@ -1786,23 +2160,28 @@ class InventoryClient(ClientBase):
             If the item is a SampleField id, then the field must be of type 'Attachment'
         - file : an open file
             An open file stream.
+        - digests : str or sequence of str, optional
+            Names of hashlib algorithms, e.g. "sha256", whose digests of the file
+            are computed as it is sent.
+        - progress : callable, optional
+            Called with a TransferProgress giving the bytes sent, rate and ETA
+            as the file is uploaded.
 
         Returns
         -------
-        Dict of the created InventoryFile
+        Dict of the created InventoryFile, with the digests asked for as 'digests'
         """
         global_id = Id(inventory_item)
         fs = {"parentGlobalId": global_id.as_global_id()}
-        fsStr = json.dumps(fs)
-        headers = self._get_headers()
-        response = requests.post(
-            self._get_api_url() + "/files",
+        fsStr = self.json_codec.dumps(fs)
+        return self._multipart_post(
+            "/files",
             files={"file": file, "fileSettings": (None, fsStr, "application/json")},
-            headers=headers,
+            digests=digests,
+            progress=progress,
         )
-        return self._handle_response(response)
 
-    def delete_attachment_by_id(self, attachment_id: Union[str, int]) -> None:
+    def delete_attachment_by_id(self, attachment_id: Union[str, int]) -> dict:
         """
         Parameters
         ----------
@@ -1811,25 +2190,30 @@ class InventoryClient(ClientBase):
 
         Returns
         -------
-        None
+        dict
+            The deleted attachment, as returned by the server.
         """
-        self.doDelete("files", attachment_id)
+        return self.doDelete("files", attachment_id)
 
-    def download_attachment_by_id(self, attachment_id: Union[str, int], file_path: Union[str, BinaryIO], chunk_size=128) -> None:
+    def download_attachment_by_id(
+        self,
+        attachment_id: Union[str, int],
+        file_path: Union[str, BinaryIO],
+        chunk_size=None,
+        digests: Union[str, Sequence[str]] = None,
+    ):
         url_base = self._get_api_url()
         return self.download_link_to_file(
-            f"{url_base}/files/{attachment_id}/file", file_path, chunk_size
+            f"{url_base}/files/{attachment_id}/file", file_path, chunk_size, digests=digests
         )
 
     def upload_attachment_by_global_id(self, record_global_id: str, file: BinaryIO) -> None:
         print(record_global_id, json.dumps({"parentGlobalId": record_global_id}))
-        response = requests.post(
-            self._get_api_url() + "/files",
-            data={"fileSettings": json.dumps({"parentGlobalId": record_global_id})},
-            files={"file": file },
-            headers=self._get_headers(),
+        return self._multipart_post(
+            "/files",
+            files={"file": file},
+            data={"fileSettings": self.json_codec.dumps({"parentGlobalId": record_global_id})},
         )
-        return self._handle_response(response)
 
     def split_subsample(
         self,
@@ -1856,61 +2240,78 @@ class InventoryClient(ClientBase):
         A list of split subsamples
         """
 
-        def _do_call(ss_id, params):
-            return self.retrieve_api_results(
-                f"/subSamples/{ss_id.as_id()}/actions/split",
-                request_type="POST",
-                params=params,
-            )
-
         ss_id = Id(subsample)
         if quantity_per_subsample is None:
-            to_post = {"numSubSamples": num_new_subsamples + 1, "split": True}
-            return _do_call(ss_id, to_post)
+            return self._split(ss_id, num_new_subsamples)
+        if isinstance(subsample, dict) and ss_id.is_subsample(True):
+            ## we already have quantity info, don't need to call
+            curr_quantity = subsample["quantity"]
         else:
-            qu_to_decrement_from_original = num_new_subsamples * quantity_per_subsample
-            curr_quantity = None
-            if isinstance(subsample, dict) and ss_id.is_subsample(True):
-                ## we already have quantity info, don't need to call
-                curr_quantity = subsample["quantity"]
-            else:
-                full_ss = self.get_subsample_by_id(ss_id.as_id())
-                curr_quantity = full_ss["quantity"]
-            if qu_to_decrement_from_original > curr_quantity["numericValue"]:
-                raise ValueError(
-                    f"Attempting to remove {qu_to_decrement_from_original}, but original subsample {ss_id.as_id()} has amount {curr_quantity['numericValue']}."
-                )
-            to_post = {"numSubSamples": num_new_subsamples + 1, "split": True}
-            new_ss = _do_call(ss_id, to_post)
-            curr_quantity["numericValue"] = (
-                curr_quantity["numericValue"] - qu_to_decrement_from_original
+            curr_quantity = self.get_subsample_by_id(ss_id.as_id())["quantity"]
+        self._check_split_quantity(
+            ss_id, curr_quantity, num_new_subsamples, quantity_per_subsample
+        )
+        new_ss = self._split(ss_id, num_new_subsamples)
+        return self._do_bulk(
+            self._split_quantity_update(
+                ss_id, curr_quantity, new_ss, num_new_subsamples, quantity_per_subsample
+            )
+        )
+
+    def _split(self, ss_id: Id, num_new_subsamples: int):
+        return self.retrieve_api_results(
+            f"/subSamples/{ss_id.as_id()}/actions/split",
+            request_type="POST",
+            params={"numSubSamples": num_new_subsamples + 1, "split": True},
+        )
+
+    @staticmethod
+    def _check_split_quantity(
+        ss_id: Id, curr_quantity: dict, num_new_subsamples: int, quantity_per_subsample: float
+    ):
+        qu_to_decrement_from_original = num_new_subsamples * quantity_per_subsample
+        if qu_to_decrement_from_original > curr_quantity["numericValue"]:
+            raise ValueError(
+                f"Attempting to remove {qu_to_decrement_from_original}, but original subsample {ss_id.as_id()} has amount {curr_quantity['numericValue']}."
             )
-            unit_id = curr_quantity["unitId"]
-            records = []
+
+    @staticmethod
+    def _split_quantity_update(
+        ss_id: Id,
+        curr_quantity: dict,
+        new_ss: list,
+        num_new_subsamples: int,
+        quantity_per_subsample: float,
+    ) -> dict:
+        """
+        The /bulk UPDATE of a split, taking the quantity of the new subsamples from
+        the original one.
+        """
+        curr_quantity["numericValue"] = (
+            curr_quantity["numericValue"] - num_new_subsamples * quantity_per_subsample
+        )
+        unit_id = curr_quantity["unitId"]
+        records = []
+        records.append(
+            {
+                "id": ss_id.as_id(),
+                "type": ss_id.get_type(),
+                "quantity": curr_quantity,
+            }
+        )
+        for split_ss in new_ss:
+            split_ss_id = Id(split_ss)
             records.append(
                 {
-                    "id": ss_id.as_id(),
-                    "type": ss_id.get_type(),
-                    "quantity": curr_quantity,
+                    "id": split_ss_id.as_id(),
+                    "type": split_ss_id.get_type(),
+                    "quantity": {
+                        "unitId": unit_id,
+                        "numericValue": quantity_per_subsample,
+                    },
                 }
             )
-            for split_ss in new_ss:
-                split_ss_id = Id(split_ss)
-                records.append(
-                    {
-                        "id": split_ss_id.as_id(),
-                        "type": split_ss_id.get_type(),
-                        "quantity": {
-                            "unitId": unit_id,
-                            "numericValue": quantity_per_subsample,
-                        },
-                    }
-                )
-            bulk_post = {"records": records, "operationType": "UPDATE"}
-            rc = self.retrieve_api_results(
-                "/bulk", request_type="POST", params=bulk_post
-            )
-            return BulkOperationResult(rc)
+        return {"records": records, "operationType": "UPDATE"}
 
     def duplicate(
         self, item_to_duplicate: Union[str, dict], new_name: str = None
@@ -1926,15 +2327,18 @@ class InventoryClient(ClientBase):
         -------
         The duplicated item
         """
+        rc = self._duplicate(item_to_duplicate)
+        if new_name is not None:
+            rc = self.rename(rc, new_name)
+        return rc
+
+    def _duplicate(self, item_to_duplicate: Union[str, dict]):
         id_to_copy = Id(item_to_duplicate)
         endpoint = id_to_copy.get_api_endpoint()
-        rc = self.retrieve_api_results(
+        return self.retrieve_api_results(
             f"/{endpoint}/{id_to_copy.as_id()}/actions/duplicate",
             request_type="POST",
         )
-        if new_name is not None:
-            rc = self.rename(rc, new_name)
-        return rc
 
     def search(
         self, query: str, pagination=Pagination(), result_type: ResultType = None
@@ -1995,20 +2399,6 @@ class InventoryClient(ClientBase):
     ## containers (only simple LIST containers). Importing Instruments or
     ## Instrument Templates from CSV is NOT supported by the API.
 
-    def _multipart_post(self, endpoint: str, files: dict, data: dict) -> dict:
-        """
-        Helper for multipart/form-data POSTs. ``requests`` sets the correct
-        multipart Content-Type (with boundary) when ``files`` is supplied, and
-        adds each entry of ``data`` as an additional form field.
-        """
-        response = requests.post(
-            self._get_api_url() + endpoint,
-            files=files,
-            data=data,
-            headers=self._get_headers(),
-        )
-        return self._handle_response(response)
-
     def parse_csv_import_file(
         self, file: BinaryIO, record_type: Union[str, ImportRecordType]
     ) -> dict:
@@ -2100,7 +2490,7 @@ class InventoryClient(ClientBase):
         return self._multipart_post(
             "/import/importFiles",
             files=files,
-            data={"importSettings": json.dumps(import_settings)},
+            data={"importSettings": self.json_codec.dumps(import_settings)},
         )
 
     @staticmethod
@@ -2374,6 +2764,25 @@ class InventoryClient(ClientBase):
         c_id = Id(container_id)
         return self.retrieve_api_results(f"/containers/{c_id.as_id()}?includeContent={include_content}")
 
+    def stream_container_locations(self, container_id: Union[str, int]):
+        """
+        Streams the locations of a container with their content, decoding them one by
+        one as the response arrives, so that very large containers can be processed
+        in constant memory.
+        Parameters
+        ----------
+        container_id : Union[str, int]
+            Id or global id of the container.
+
+        Yields
+        ------
+        location : One location at a time, as in get_container_by_id(id, True)['locations']
+        """
+        c_id = Id(container_id)
+        return self.stream_api_array(
+            f"/containers/{c_id.as_id()}", "locations", params={"includeContent": "true"}
+        )
+
     def create_grid_container(
         self,
         name: str,
@@ -2752,7 +3161,7 @@ class InventoryClient(ClientBase):
         s_id = Id(sample_template_id)
         return self.retrieve_api_results(f"/sampleTemplates/{s_id.as_id()}")
 
-    def delete_sample_template(self, sample_template_id: Union[int, str]) -> None:
+    def delete_sample_template(self, sample_template_id: Union[int, str]) -> dict:
         """
         Parameters
         ----------
@@ -2761,11 +3170,12 @@ class InventoryClient(ClientBase):
 
         Returns
         -------
-        None.
+        dict
+            The deleted sample template, as returned by the server.
 
         """
         id_to_delete = Id(sample_template_id)
-        self.doDelete("sampleTemplates", id_to_delete.as_id())
+        return self.doDelete("sampleTemplates", id_to_delete.as_id())
 
     def set_sample_template_icon(self, sample_template_id: Union[int, str], file):
         """
@@ -2782,13 +3192,9 @@ class InventoryClient(ClientBase):
 
         """
         st_id = Id(sample_template_id)
-        headers = self._get_headers()
-        response = requests.post(
-            f"{self._get_api_url()}/sampleTemplates/{st_id.as_id()}/icon",
-            files={"file": file},
-            headers=headers,
+        return self._multipart_post(
+            f"/sampleTemplates/{st_id.as_id()}/icon", files={"file": file}
         )
-        return self._handle_response(response)
 
     def get_sample_template_icon(
         self, sample_template_id: Union[int, str], icon_id: int, outfile
@@ -2914,7 +3320,7 @@ class InventoryClient(ClientBase):
 
     def delete_instrument_template(
         self, instrument_template_id: Union[int, str]
-    ) -> None:
+    ) -> dict:
         """
         Parameters
         ----------
@@ -2923,11 +3329,12 @@ class InventoryClient(ClientBase):
 
         Returns
         -------
-        None.
+        dict
+            The deleted instrument template, as returned by the server.
 
         """
         id_to_delete = Id(instrument_template_id)
-        self.doDelete("instrumentTemplates", id_to_delete.as_id())
+        return self.doDelete("instrumentTemplates", id_to_delete.as_id())
 
     def set_instrument_template_icon(
         self, instrument_template_id: Union[int, str], file
@@ -2946,13 +3353,9 @@ class InventoryClient(ClientBase):
 
         """
         it_id = Id(instrument_template_id)
-        headers = self._get_headers()
-        response = requests.post(
-            f"{self._get_api_url()}/instrumentTemplates/{it_id.as_id()}/icon",
-            files={"file": file},
-            headers=headers,
+        return self._multipart_post(
+            f"/instrumentTemplates/{it_id.as_id()}/icon", files={"file": file}
         )
-        return self._handle_response(response)
 
     def get_instrument_template_icon(
         self, instrument_template_id: Union[int, str], icon_id: int, outfile
@@ -3120,15 +3523,24 @@ class InventoryClient(ClientBase):
         -------
             Bytes of the image.
 
+        """
+        url, kwargs = self._barcode_request(global_id, barcode_type)
+        resp = self._send("GET", url, **kwargs)
+        resp.raise_for_status()
+        return self._save_barcode(resp.content, outfile)
+
+    def _barcode_request(self, global_id, barcode_type: BarcodeFormat):
+        """
+        The URL and request arguments of a barcode image.
         """
         Id(global_id)  ## validate is identifier
         data = {"content": global_id, "barcodeType": barcode_type.name}
         url = f"{self._get_api_url()}/barcodes"
         headers = {"apiKey": self.api_key, "Accept": "image/png"}
+        return url, {"headers": headers, "params": data}
 
-        resp = requests.get(url, headers=headers, params=data)
-        resp.raise_for_status()
-        content = resp.content
+    @staticmethod
+    def _save_barcode(content: bytes, outfile: str = None) -> bytes:
         if outfile is not None:
             with open(outfile, "wb") as fd:
                 fd.write(content)
@@ -3191,6 +3603,20 @@ class InventoryClient(ClientBase):
         dict
             The updated settings for the given provider
         """
+        body = self._datacite_settings_body(
+            enabled, provider, server_url, username, password, repository_prefix
+        )
+        result = self.retrieve_api_results(
+            "/system/settings",
+            request_type="PUT",
+            params=body
+        )
+        return self._find_identifier_provider_settings(result, provider)
+
+    @staticmethod
+    def _datacite_settings_body(
+        enabled, provider, server_url, username, password, repository_prefix
+    ) -> dict:
         if enabled and (server_url is None or username is None or password is None or repository_prefix is None):
             raise ValueError("server_url, username, password, and repository_prefix are required when enabled=True")
 
@@ -3203,13 +3629,7 @@ class InventoryClient(ClientBase):
             body["password"] = password
         if repository_prefix is not None:
             body["repositoryPrefix"] = repository_prefix
-
-        result = self.retrieve_api_results(
-            "/system/settings",
-            request_type="PUT",
-            params=body
-        )
-        return self._find_identifier_provider_settings(result, provider)
+        return body
 
     def test_datacite_connection(self, provider: str = "IGSN_DATACITE") -> bool:
         """
@@ -3225,18 +3645,21 @@ class InventoryClient(ClientBase):
         bool
             True if the connection test passes, False otherwise
         """
-        endpoint_name = "testIgsnConnection" if provider == "IGSN_DATACITE" else "testPidinstConnection"
-        url = self._get_api_url() + f"/identifiers/{endpoint_name}"
+        url = self._datacite_connection_url(provider)
         headers = self._get_headers("application/json")
 
         try:
-            response = requests.get(url, headers=headers)
+            response = self._send("GET", url, headers=headers)
             if response.status_code != 200:
                 return False
             return bool(response.json())
-        except (requests.exceptions.RequestException, ValueError):
+        except (requests.exceptions.RequestException, ValueError, *self.transport.connection_errors):
             return False
 
+    def _datacite_connection_url(self, provider: str) -> str:
+        endpoint_name = "testIgsnConnection" if provider == "IGSN_DATACITE" else "testPidinstConnection"
+        return self._get_api_url() + f"/identifiers/{endpoint_name}"
+
 def _calculate_start_index(
     col_start, row_start, total_columns, total_rows, filling_strategy
 ):
@@ -0,0 +1,71 @@
+"""
+JSON encoding and decoding of request and response bodies.
+"""
+import json
+
+
+class JsonCodec:
+    """
+    Encodes request bodies and decodes response bodies with the standard library
+    json module. Subclass it and pass an instance as the ``json_codec`` option of a
+    client to use another JSON library.
+    """
+
+    name = "json"
+
+    def dumps(self, obj) -> bytes:
+        """
+        :return: obj encoded as UTF-8 JSON
+        """
+        return json.dumps(obj, allow_nan=False).encode("utf-8")
+
+    def loads(self, data):
+        """
+        :param data: JSON as bytes or str
+        """
+        return json.loads(data)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    A JsonCodec using orjson, which is several times faster than the standard
+    library at both encoding and decoding. Values orjson cannot handle, such as
+    integers larger than 64 bits, fall back to the standard library.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError(
+                "OrjsonCodec requires orjson, install it with 'pip install orjson'"
+            ) from e
+        self._orjson = orjson
+
+    def dumps(self, obj) -> bytes:
+        try:
+            return self._orjson.dumps(obj, option=self._orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, data):
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            return super().loads(data)
+
+
+def default_codec() -> JsonCodec:
+    """
+    The fastest codec available: OrjsonCodec if orjson is installed, otherwise the
+    standard library JsonCodec.
+    """
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JsonCodec()
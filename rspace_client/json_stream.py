@@ -0,0 +1,271 @@
+"""
+Incremental decoding of large JSON responses.
+"""
+import codecs
+import json
+import re
+from typing import Sequence
+
+_DECODER = json.JSONDecoder()
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'[\[\]{}", \t\n\r]')
+
+# parser states
+_START, _KEY, _COLON, _VALUE, _SCAN, _AFTER_VALUE = range(6)
+_ELEMENT, _AFTER_ELEMENT, _DONE = range(6, 9)
+
+# consumed input is dropped from the buffer once it grows beyond this
+_COMPACT_AT = 1 << 16
+
+
+class JsonArrayParser:
+    """
+    A push parser for a JSON object, yielding the elements of one of its top-level
+    arrays as soon as each element has been received, e.g. the 'locations' of a
+    container or the 'samples' of a listing page.
+
+    Only one element (and the text of the value being skipped) is held in memory at
+    a time, so arbitrarily large arrays are decoded in constant memory. Other
+    top-level values are skipped without being decoded, except those named in
+    'keep', e.g. the '_links' of a listing page, which are put in ``values``.
+
+    Feed it the bytes of a response as they arrive::
+
+        parser = JsonArrayParser("locations")
+        for chunk in response.iter_content(65536):
+            for location in parser.feed(chunk):
+                ...
+        for location in parser.close():
+            ...
+    """
+
+    def __init__(self, key: str, keep: Sequence[str] = ()):
+        """
+        :param key: name of the top-level array whose elements are yielded
+        :param keep: names of other top-level values to decode, which should be small
+        """
+        self.key = key
+        self.keep = frozenset(keep)
+        self.found = False
+        #: the top-level values named in 'keep' found so far
+        self.values = {}
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._state = _START
+        self._in_array = False
+        self._current_key = None
+        self._value_start = 0
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, data: bytes) -> list:
+        """
+        Adds the next chunk of the document.
+        :return: the array elements completed by this chunk, possibly none
+        """
+        self._buf += self._decoder.decode(data)
+        items = []
+        self._parse(items)
+        return items
+
+    def close(self) -> list:
+        """
+        Signals the end of the document.
+        :return: any remaining array elements
+        :raises ValueError: if the document is incomplete
+        :raises KeyError: if the document has no such top-level key
+        """
+        self._buf += self._decoder.decode(b"", final=True)
+        items = []
+        self._parse(items)
+        if self._state != _DONE:
+            raise ValueError("Incomplete JSON document")
+        if not self.found:
+            raise KeyError(self.key)
+        return items
+
+    def _error(self, expected):
+        found = self._buf[self._pos : self._pos + 20]
+        raise ValueError(f"Expected {expected} but found {found!r}")
+
+    def _parse(self, items):
+        buf = self._buf
+        while self._state != _DONE:
+            if self._state == _SCAN:
+                end = self._scan()
+                kept = not self._in_array and self._current_key in self.keep
+                if end is None:
+                    if not self._in_array and not kept and self._scan_pos > _COMPACT_AT:
+                        # the text of a skipped value is not needed
+                        self._buf = buf[self._scan_pos :]
+                        self._scan_pos = 0
+                    return
+                if self._in_array:
+                    items.append(json.loads(buf[self._value_start : end]))
+                    self._state = _AFTER_ELEMENT
+                else:
+                    if kept:
+                        self.values[self._current_key] = json.loads(
+                            buf[self._value_start : end]
+                        )
+                    self._state = _AFTER_VALUE
+                self._pos = end
+                continue
+
+            if self._pos > _COMPACT_AT:
+                buf = self._buf = buf[self._pos :]
+                self._pos = 0
+            pos = _JSON_WS.match(buf, self._pos).end()
+            if pos == len(buf):
+                self._pos = pos
+                return
+            self._pos = pos
+            c = buf[pos]
+            state = self._state
+            if state == _START:
+                if c != "{":
+                    self._error("'{'")
+                self._state = _KEY
+                self._pos += 1
+            elif state == _KEY:
+                if c == "}":
+                    self._state = _DONE
+                    self._pos += 1
+                elif c == '"':
+                    end = _string_end(buf, pos + 1)
+                    if end is None:
+                        return
+                    self._current_key = json.loads(buf[pos:end])
+                    self._state = _COLON
+                    self._pos = end
+                else:
+                    self._error("a key")
+            elif state == _COLON:
+                if c != ":":
+                    self._error("':'")
+                self._state = _VALUE
+                self._pos += 1
+            elif state == _VALUE:
+                if self._current_key == self.key and not self.found:
+                    if c != "[":
+                        self._error(f"an array for '{self.key}'")
+                    self.found = True
+                    self._in_array = True
+                    self._state = _ELEMENT
+                    self._pos += 1
+                else:
+                    self._begin_scan(pos)
+            elif state == _ELEMENT:
+                if c == "]":
+                    self._end_array()
+                    continue
+                try:
+                    item, end = _DECODER.raw_decode(buf, pos)
+                except ValueError:
+                    end = None
+                # a number at the end of the buffer may continue in the next chunk
+                if end is not None and end < len(buf):
+                    items.append(item)
+                    self._state = _AFTER_ELEMENT
+                    self._pos = end
+                else:
+                    # incomplete: scan it as it arrives, not decoding it again each time
+                    self._begin_scan(pos)
+            elif state == _AFTER_ELEMENT:
+                if c == ",":
+                    self._state = _ELEMENT
+                    self._pos += 1
+                elif c == "]":
+                    self._end_array()
+                else:
+                    self._error("',' or ']'")
+            elif state == _AFTER_VALUE:
+                if c == ",":
+                    self._state = _KEY
+                    self._pos += 1
+                elif c == "}":
+                    self._state = _DONE
+                    self._pos += 1
+                else:
+                    self._error("',' or '}'")
+
+    def _end_array(self):
+        self._in_array = False
+        self._state = _AFTER_VALUE
+        self._pos += 1
+
+    def _begin_scan(self, pos):
+        self._value_start = pos
+        self._scan_pos = pos
+        self._depth = 0
+        self._in_string = False
+        self._state = _SCAN
+
+    def _scan(self):
+        """
+        Continues scanning the value that starts at _value_start.
+        :return: the index just after the value, or None if more input is needed
+        """
+        buf = self._buf
+        i = self._scan_pos
+        while True:
+            if self._in_string:
+                m = _STRING_SPECIAL.search(buf, i)
+                if m is None:
+                    self._scan_pos = len(buf)
+                    return None
+                i = m.start()
+                if buf[i] == "\\":
+                    if i + 1 >= len(buf):
+                        self._scan_pos = i
+                        return None
+                    i += 2
+                    continue
+                self._in_string = False
+                i += 1
+                if self._depth == 0:
+                    return i
+                continue
+            m = _STRUCTURAL.search(buf, i)
+            if m is None:
+                self._scan_pos = len(buf)
+                return None
+            i = m.start()
+            c = buf[i]
+            if c == '"':
+                self._in_string = True
+                i += 1
+            elif c == "[" or c == "{":
+                self._depth += 1
+                i += 1
+            elif c == "]" or c == "}":
+                if self._depth == 0:
+                    # end of a number or literal, followed by the enclosing bracket
+                    return i
+                self._depth -= 1
+                i += 1
+                if self._depth == 0:
+                    return i
+            elif self._depth == 0:
+                # ',' or whitespace after a number or literal
+                return i
+            else:
+                i += 1
+
+
+def _string_end(buf, i):
+    """
+    Index just after the closing quote of a string whose content starts at i, or
+    None if the string is not complete yet.
+    """
+    while True:
+        m = _STRING_SPECIAL.search(buf, i)
+        if m is None:
+            return None
+        i = m.start()
+        if buf[i] == '"':
+            return i + 1
+        i += 2
@@ -0,0 +1,215 @@
+"""
+Per-endpoint request metrics of the RSpace API clients, in Prometheus text format.
+"""
+import bisect
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Callable, Sequence, Union
+
+from rspace_client.events import RequestEvent
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Collects latency histograms, request, error, retry and byte counters per HTTP
+    method and normalised endpoint (e.g. ``/samples/{id}``, ``/bulk``, ``/files``)
+    from the request events of one or more clients, and exposes them in the
+    Prometheus text format.
+
+    A registry is an event handler::
+
+        metrics = MetricsRegistry()
+        client = InventoryClient(url, key, event_handlers=[metrics])
+        ...
+        metrics.dump("/var/lib/node_exporter/rspace.prom")
+
+    Latencies are the ``total`` time of each exchange, including retries.
+    Responses served from the response cache without contacting the server are
+    only counted in ``rspace_client_cache_lookups_total``.
+    """
+
+    DEFAULT_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+    )
+
+    def __init__(
+        self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = "rspace_client"
+    ):
+        """
+        :param buckets: upper bounds in seconds of the latency histogram buckets
+        :param prefix: prefix of the metric names, default is 'rspace_client'
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._durations = {}
+            self._requests = defaultdict(int)
+            self._errors = defaultdict(int)
+            self._retries = defaultdict(int)
+            self._sent = defaultdict(int)
+            self._received = defaultdict(int)
+            self._cache = defaultdict(int)
+
+    def __call__(self, event: RequestEvent):
+        self.observe(event)
+
+    def observe(self, event: RequestEvent):
+        """
+        Records a request event.
+        """
+        key = (event.method, event.endpoint)
+        with self._lock:
+            if event.cache is not None:
+                self._cache[(event.endpoint, event.cache)] += 1
+            if event.status is None and event.error is None:
+                # answered from the cache
+                return
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = _Histogram(len(self.buckets))
+            index = bisect.bisect_left(self.buckets, event.total)
+            if index < len(self.buckets):
+                histogram.counts[index] += 1
+            histogram.sum += event.total
+            histogram.count += 1
+            status = str(event.status) if event.status is not None else "none"
+            self._requests[key + (status,)] += 1
+            if event.error is not None:
+                self._errors[key + (type(event.error).__name__,)] += 1
+            elif event.status >= 400:
+                self._errors[key + (status,)] += 1
+            if event.retries:
+                self._retries[key] += event.retries
+            if event.bytes_sent:
+                self._sent[key] += event.bytes_sent
+            if event.bytes_received:
+                self._received[key] += event.bytes_received
+
+    def to_prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format, version 0.0.4.
+        """
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += _header(
+                f"{p}_request_duration_seconds",
+                "histogram",
+                "Time taken by HTTP requests, including retries.",
+            )
+            for (method, endpoint), histogram in sorted(self._durations.items()):
+                labels = _labels(method=method, endpoint=endpoint)
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    le = _labels(method=method, endpoint=endpoint, le=_number(bound))
+                    lines.append(f"{p}_request_duration_seconds_bucket{le} {cumulative}")
+                le = _labels(method=method, endpoint=endpoint, le="+Inf")
+                lines.append(f"{p}_request_duration_seconds_bucket{le} {histogram.count}")
+                lines.append(
+                    f"{p}_request_duration_seconds_sum{labels} {_number(histogram.sum)}"
+                )
+                lines.append(
+                    f"{p}_request_duration_seconds_count{labels} {histogram.count}"
+                )
+            lines += _counter(
+                f"{p}_requests_total",
+                "HTTP requests by response status, 'none' if no response was received.",
+                self._requests,
+                ("method", "endpoint", "status"),
+            )
+            lines += _counter(
+                f"{p}_request_errors_total",
+                "HTTP requests that failed, by error status or exception type.",
+                self._errors,
+                ("method", "endpoint", "error"),
+            )
+            lines += _counter(
+                f"{p}_request_retries_total",
+                "Retries of HTTP requests.",
+                self._retries,
+                ("method", "endpoint"),
+            )
+            lines += _counter(
+                f"{p}_sent_bytes_total",
+                "Bytes of request bodies sent.",
+                self._sent,
+                ("method", "endpoint"),
+            )
+            lines += _counter(
+                f"{p}_received_bytes_total",
+                "Bytes of response bodies received.",
+                self._received,
+                ("method", "endpoint"),
+            )
+            lines += _counter(
+                f"{p}_cache_lookups_total",
+                "Cacheable GET requests by result, 'hit' or 'miss'.",
+                self._cache,
+                ("endpoint", "result"),
+            )
+        return "\n".join(lines) + "\n"
+
+    def dump(self, destination: Union[str, Callable[[str], None]]):
+        """
+        Writes the metrics in the Prometheus text format.
+        :param destination: a file path, e.g. in the directory of the node_exporter
+         textfile collector, which is replaced atomically; or a callable that is
+         passed the text
+        """
+        text = self.to_prometheus()
+        if callable(destination):
+            destination(text)
+            return
+        path = os.path.abspath(os.path.expanduser(destination))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            # mkstemp creates the file readable only by its owner
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def __repr__(self):
+        return f"MetricsRegistry(endpoints={len(self._durations)})"
+
+
+def _header(name, kind, help_text):
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def _counter(name, help_text, values, label_names):
+    lines = _header(name, "counter", help_text)
+    for key, value in sorted(values.items()):
+        lines.append(f"{name}{_labels(**dict(zip(label_names, key)))} {value}")
+    return lines
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
@@ -0,0 +1,275 @@
+"""
+Streaming multipart/form-data bodies for uploads, and progress reports of the
+files sent in them.
+
+``requests`` encodes a multipart body in memory, so uploading a 5GB file needed
+5GB of memory. MultipartEncoder instead reads each file as the body is sent, a
+chunk at a time, so memory use does not depend on the size of the files.
+"""
+import binascii
+import os
+import time
+from typing import Callable, Optional
+
+# bytes of a file read at a time while a body is sent
+CHUNK_SIZE = 256 * 1024
+
+# least seconds between two calls of a progress callback, except for the last
+PROGRESS_INTERVAL = 0.1
+
+_QUOTED = str.maketrans({"\\": "\\\\", '"': "%22", "\r": "%0D", "\n": "%0A"})
+
+
+class MultipartEncoder:
+    """
+    A multipart/form-data request body encoded as requests encodes ``data`` and
+    ``files``, read from the files while it is sent. Its length is known before it
+    is sent, so the request has a Content-Length rather than being chunked.
+    """
+
+    def __init__(
+        self, data=None, files=None, boundary: str = None, chunk_size: int = CHUNK_SIZE
+    ):
+        """
+        :param data: form fields, as a dictionary or sequence of (name, value) pairs,
+         where a value is a string, bytes, a number or a list of them
+        :param files: file fields as for requests, a dictionary or sequence of
+         (name, value) pairs whose value is a file object, or a tuple of filename,
+         file object or bytes and optionally content type and headers
+        :param boundary: the boundary between parts, by default a random one
+        :param chunk_size: bytes of a file read at a time when the body is iterated
+        """
+        self.boundary = boundary or binascii.hexlify(os.urandom(16)).decode("ascii")
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = chunk_size
+        # bytes, or (file, size) tuples of the files read while the body is sent
+        self._parts = []
+        for name, value in _pairs(data):
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for v in values:
+                if v is not None:
+                    self._add_part(name, v, None, None, None)
+        for name, value in _pairs(files):
+            if isinstance(value, tuple):
+                filename, content, content_type, headers = (value + (None, None))[:4]
+            else:
+                filename, content = _filename(value) or name, value
+                content_type = headers = None
+            if content is not None:
+                self._add_part(name, content, filename, content_type, headers)
+        self._parts.append(f"--{self.boundary}--\r\n".encode("latin-1"))
+        self._sizes = [len(p) if isinstance(p, bytes) else p[1] for p in self._parts]
+        #: bytes of the body, or None if the size of a file could not be told, in
+        #: which case the body cannot be streamed
+        self.length = None if None in self._sizes else sum(self._sizes)
+        self._index = 0
+        self._left = self._sizes[0]
+
+    def _add_part(self, name, content, filename, content_type, headers):
+        if isinstance(name, bytes):
+            name = name.decode("utf-8")
+        disposition = f'form-data; name="{_quote(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{_quote(filename)}"'
+        lines = [f"--{self.boundary}", f"Content-Disposition: {disposition}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        lines.extend(f"{k}: {v}" for k, v in (headers or {}).items())
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+        if hasattr(content, "read"):
+            self._parts.append(head)
+            self._parts.append((content, _remaining_size(content)))
+            self._parts.append(b"\r\n")
+            return
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        elif not isinstance(content, (bytes, bytearray)):
+            content = str(content).encode("utf-8")
+        self._parts.append(head + bytes(content) + b"\r\n")
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Reads the next bytes of the body, at most 'size' of them if size is not
+        negative, and fewer only at the end of a part.
+        :raises ValueError: if a file ends before the size it had when the body was
+         created
+        """
+        while self._index < len(self._parts):
+            if self._left == 0:
+                self._index += 1
+                if self._index < len(self._parts):
+                    self._left = self._sizes[self._index]
+                continue
+            part = self._parts[self._index]
+            n = self._left if size < 0 else min(size, self._left)
+            if isinstance(part, bytes):
+                start = len(part) - self._left
+                chunk = part[start:start + n]
+            else:
+                chunk = part[0].read(n)
+                if not chunk:
+                    name = _filename(part[0]) or "A file"
+                    raise ValueError(
+                        f"{name} ended {self._left} bytes short of the size it had "
+                        "when its upload began"
+                    )
+            self._left -= len(chunk)
+            return chunk
+        return b""
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class TransferProgress:
+    """
+    How far the upload of a file has got, passed to progress callbacks.
+    """
+
+    __slots__ = ("bytes_sent", "total", "seconds")
+
+    def __init__(self, bytes_sent: int, total: Optional[int], seconds: float):
+        """
+        :param bytes_sent: bytes of the file sent so far
+        :param total: size of the file, None if it could not be told
+        :param seconds: time since the upload began
+        """
+        self.bytes_sent = bytes_sent
+        self.total = total
+        self.seconds = seconds
+
+    @property
+    def rate(self) -> float:
+        """
+        Bytes sent per second so far.
+        """
+        return self.bytes_sent / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """
+        Estimated seconds until the file is sent at the rate so far, None if the
+        size of the file or the rate is not known.
+        """
+        if self.total is None or not self.rate:
+            return None
+        return max(self.total - self.bytes_sent, 0) / self.rate
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """
+        Fraction of the file sent, between 0 and 1, None if its size is not known.
+        """
+        if self.total is None:
+            return None
+        return self.bytes_sent / self.total if self.total else 1.0
+
+    def __repr__(self):
+        return (
+            f"TransferProgress(bytes_sent={self.bytes_sent}, total={self.total}, "
+            f"seconds={self.seconds:.3f}, rate={self.rate:.0f}, eta={self.eta})"
+        )
+
+
+class ProgressReader:
+    """
+    Reads a binary file, calling a progress callback as its bytes are read, at
+    most every PROGRESS_INTERVAL seconds and once it has all been read. Seeking
+    back to where reading began, as a retried upload does, starts over.
+    """
+
+    def __init__(self, file, callback: Callable[[TransferProgress], None]):
+        """
+        :param file: a binary file object open for reading
+        :param callback: called with a TransferProgress
+        """
+        self._file = file
+        self._callback = callback
+        try:
+            self._start = file.tell()
+        except (AttributeError, OSError, ValueError):
+            self._start = None
+        self.total = _remaining_size(file)
+        name = getattr(file, "name", None)
+        if name is not None:
+            self.name = name
+        self._restart()
+
+    def _restart(self):
+        self.bytes_sent = 0
+        self._started = time.perf_counter()
+        # bytes sent when the callback was last called, and when
+        self._reported = None
+        self._reported_at = self._started
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self.bytes_sent += len(data)
+        now = time.perf_counter()
+        done = not data or self.bytes_sent == self.total
+        if done and self._reported == self.bytes_sent:
+            return data
+        if done or now - self._reported_at >= PROGRESS_INTERVAL:
+            self._reported = self.bytes_sent
+            self._reported_at = now
+            seconds = now - self._started
+            self._callback(TransferProgress(self.bytes_sent, self.total, seconds))
+        return data
+
+    def seekable(self):
+        return self._start is not None and (
+            not hasattr(self._file, "seekable") or self._file.seekable()
+        )
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        position = self._file.seek(offset, whence)
+        if position == self._start:
+            self._restart()
+        return position
+
+    def tell(self):
+        return self._file.tell()
+
+
+def _pairs(fields):
+    if not fields:
+        return []
+    return list(fields.items()) if hasattr(fields, "items") else list(fields)
+
+
+def _filename(file) -> Optional[str]:
+    """
+    The name requests gives the part of a file object: the base name of its path.
+    """
+    name = getattr(file, "name", None)
+    if isinstance(name, str) and name and name[0] != "<" and name[-1] != ">":
+        return os.path.basename(name)
+    return None
+
+
+def _quote(value: str) -> str:
+    """
+    Escapes a parameter value of a Content-Disposition header as browsers, and
+    urllib3, do.
+    """
+    return value.translate(_QUOTED)
+
+
+def _remaining_size(file) -> Optional[int]:
+    """
+    Bytes of a file from its current position to its end, None if it cannot be told.
+    """
+    try:
+        position = file.tell()
+        end = file.seek(0, os.SEEK_END)
+        file.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return max(end - position, 0)
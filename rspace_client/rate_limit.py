@@ -0,0 +1,196 @@
+"""
+Client-side rate limiting of requests made by the RSpace API clients.
+"""
+import math
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    A token bucket allowing ``rate`` requests per second on average, and bursts of up
+    to ``burst`` requests. Callers reserve a token and then wait the returned delay
+    themselves, so one bucket can be shared by threads and coroutines.
+
+    If ``adaptive``, the rate is halved (down to ``min_rate``) when the server
+    responds 429 Too Many Requests, and recovers step by step back to the configured
+    rate as requests succeed.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        adaptive: bool = True,
+        min_rate: float = 0.1,
+        decrease_factor: float = 0.5,
+        recovery_step: Optional[float] = None,
+    ):
+        """
+        :param rate: requests per second
+        :param burst: maximum number of requests that may be sent at once, default is
+         the rate rounded up, and at least 1
+        :param adaptive: whether to adapt the rate to 429 responses, default is True
+        :param min_rate: lowest rate that adaptation will go down to
+        :param decrease_factor: the rate is multiplied by this after a 429
+        :param recovery_step: requests per second added back after each successful
+         request, default is 2% of the configured rate
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be > 0 but was {rate}")
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1, math.ceil(rate))
+        self.adaptive = adaptive
+        self.min_rate = min(min_rate, self.max_rate)
+        self.decrease_factor = decrease_factor
+        self.recovery_step = (
+            recovery_step if recovery_step is not None else self.max_rate * 0.02
+        )
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._last_decrease = None
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+
+    def reserve(self) -> float:
+        """
+        Takes a token.
+        :return: seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def on_throttled(self):
+        """
+        Lowers the rate after a 429 response. Several 429s within one second, e.g.
+        from one burst of concurrent requests, lower it only once.
+        """
+        if not self.adaptive:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._last_decrease is not None and now - self._last_decrease < 1.0:
+                return
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._last_decrease = now
+
+    def on_success(self):
+        if not self.adaptive or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    def __repr__(self):
+        return f"TokenBucket(rate={self.rate:.2f}, max_rate={self.max_rate}, burst={self.burst})"
+
+
+class RateLimiter:
+    """
+    Limits the rate of requests sent by one or more clients, with separate budgets for
+    reads (GET), writes (POST, PUT, DELETE) and file transfers (uploads and downloads).
+    A limit of None leaves that kind of request unlimited.
+
+    Share one RateLimiter between clients, threads and coroutines to keep their
+    combined rate under the server's limit, e.g.
+    ``ELNClient(url, key, rate_limiter=limiter)``.
+    """
+
+    READ = "read"
+    WRITE = "write"
+    TRANSFER = "transfer"
+
+    def __init__(
+        self,
+        reads_per_second: Optional[float] = 10.0,
+        writes_per_second: Optional[float] = 5.0,
+        transfers_per_second: Optional[float] = 2.0,
+        burst: Optional[int] = None,
+        adaptive: bool = True,
+        min_rate: float = 0.1,
+    ):
+        """
+        :param reads_per_second: rate of GET requests, default is 10
+        :param writes_per_second: rate of POST, PUT and DELETE requests, default is 5
+        :param transfers_per_second: rate of file uploads and downloads, default is 2
+        :param burst: maximum burst size of each budget, default is its rate rounded up
+        :param adaptive: whether to lower rates when the server responds 429, and recover
+         them as requests succeed. Default is True
+        :param min_rate: lowest rate that adaptation will go down to
+        """
+        rates = {
+            RateLimiter.READ: reads_per_second,
+            RateLimiter.WRITE: writes_per_second,
+            RateLimiter.TRANSFER: transfers_per_second,
+        }
+        self.buckets = {
+            budget: TokenBucket(rate, burst, adaptive, min_rate)
+            for budget, rate in rates.items()
+            if rate is not None
+        }
+
+    @staticmethod
+    def budget_for(kind: str) -> str:
+        """
+        The budget that a kind of request counts against.
+        :param kind: one of 'read', 'write', 'upload', 'download'
+        """
+        if kind in ("upload", "download"):
+            return RateLimiter.TRANSFER
+        if kind == "read":
+            return RateLimiter.READ
+        return RateLimiter.WRITE
+
+    def reserve(self, kind: str) -> float:
+        """
+        Takes a token from the budget of a kind of request.
+        :return: seconds to wait before sending the request
+        """
+        bucket = self.buckets.get(self.budget_for(kind))
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def acquire(self, kind: str):
+        """
+        Blocks the calling thread until a request of this kind may be sent.
+        """
+        delay = self.reserve(kind)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, kind: str):
+        """
+        Waits, without blocking the event loop, until a request of this kind may be sent.
+        """
+        import asyncio
+
+        delay = self.reserve(kind)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_response(self, kind: str, status_code: int):
+        """
+        Adapts the budget of a kind of request to a response's status.
+        """
+        bucket = self.buckets.get(self.budget_for(kind))
+        if bucket is None:
+            return
+        if status_code == 429:
+            bucket.on_throttled()
+        else:
+            bucket.on_success()
+
+    def __repr__(self):
+        return f"RateLimiter({self.buckets})"
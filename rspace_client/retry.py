@@ -0,0 +1,175 @@
+"""
+Retry policy for requests made by the RSpace API clients.
+"""
+import datetime
+import email.utils
+import random
+import threading
+from typing import Mapping, Optional, Sequence
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request should be retried, and how long to wait first.
+
+    By default only GET requests are retried, after a 429, 502, 503 or 504 response
+    or a connection error, using jittered exponential backoff. A ``Retry-After``
+    header sent by the server takes precedence over the computed backoff.
+
+    Retrying non-idempotent requests (e.g. POST to ``/bulk``) is opt-in, either for
+    every retryable status via ``methods`` or for individual statuses via
+    ``status_methods``. A 429 response means the server did not process the request,
+    so ``status_methods={429: ("GET", "POST", "PUT", "DELETE")}`` is a safe choice.
+    """
+
+    DEFAULT_STATUSES = (429, 502, 503, 504)
+    DEFAULT_METHODS = ("GET",)
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        jitter: bool = True,
+        statuses: Sequence[int] = DEFAULT_STATUSES,
+        methods: Sequence[str] = DEFAULT_METHODS,
+        status_methods: Optional[Mapping[int, Sequence[str]]] = None,
+        retry_connection_errors: bool = True,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 120.0,
+        budget_ratio: float = 0.2,
+        budget_reserve: int = 10,
+    ):
+        """
+        :param max_retries: maximum number of retries of a single request, default is 3
+        :param backoff_factor: base delay in seconds; the n-th retry waits up to
+         backoff_factor * 2**n seconds, default is 0.5
+        :param max_backoff: upper limit in seconds of a computed backoff, default is 30
+        :param jitter: if True (default), waits a random time between 0 and the computed backoff
+        :param statuses: HTTP status codes that are retried for any method in ``methods``
+        :param methods: HTTP methods that are retried, default is GET only
+        :param status_methods: optional per-status overrides, mapping a status code to the
+         methods retried for that status
+        :param retry_connection_errors: whether connection failures are retried for methods
+         in ``methods``, default is True
+        :param respect_retry_after: whether to wait as long as a Retry-After header asks,
+         default is True
+        :param max_retry_after: if a Retry-After asks for a longer wait than this, in seconds,
+         the request is not retried, default is 120
+        :param budget_ratio: retries a client may make per request sent, default is 0.2
+        :param budget_reserve: retries always available to a client on top of the ratio, and
+         the maximum the budget can grow to, default is 10
+        """
+        if max_retries < 0:
+            raise ValueError(f"max_retries must be >= 0 but was {max_retries}")
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.methods = {m.upper() for m in methods}
+        self.status_methods = {s: self.methods for s in statuses}
+        if status_methods is not None:
+            for status, status_m in status_methods.items():
+                self.status_methods[status] = {m.upper() for m in status_m}
+        self.retry_connection_errors = retry_connection_errors
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.budget_ratio = budget_ratio
+        self.budget_reserve = budget_reserve
+
+    @classmethod
+    def never(cls) -> "RetryPolicy":
+        """
+        A policy that never retries.
+        """
+        return cls(max_retries=0)
+
+    def is_retryable_status(self, method: str, status_code: int) -> bool:
+        return method.upper() in self.status_methods.get(status_code, ())
+
+    def is_retryable_error(self, method: str) -> bool:
+        return self.retry_connection_errors and method.upper() in self.methods
+
+    def backoff(self, retry_number: int) -> float:
+        """
+        Seconds to wait before the given retry (0-based).
+        """
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** retry_number))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def delay_for_response(self, retry_number: int, response) -> Optional[float]:
+        """
+        Seconds to wait before retrying after the given response, or None if the
+        server asked for a wait longer than ``max_retry_after``.
+        """
+        if self.respect_retry_after:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                return retry_after
+        return self.backoff(retry_number)
+
+    def new_budget(self) -> "RetryBudget":
+        return RetryBudget(self.budget_ratio, self.budget_reserve)
+
+    def __repr__(self):
+        return (
+            f"RetryPolicy(max_retries={self.max_retries}, backoff_factor={self.backoff_factor}, "
+            f"methods={sorted(self.methods)})"
+        )
+
+
+class RetryBudget:
+    """
+    Caps the retries a client makes, so that a struggling server is not flooded with
+    retries when many requests fail at once. Each request sent adds ``ratio`` to the
+    budget and each retry spends 1; the budget never exceeds ``reserve``.
+    Safe to share between threads.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: int = 10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(float(self.reserve), self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Spends one retry, returning False if the budget is exhausted.
+        """
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header, which is either a number of seconds or an HTTP date.
+    :return: seconds to wait (never negative), or None if absent or unparseable
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (when - now).total_seconds())
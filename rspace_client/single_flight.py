@@ -0,0 +1,139 @@
+"""
+Coalescing of identical requests made concurrently by the RSpace API clients.
+"""
+import threading
+from typing import Awaitable, Callable, Hashable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "shared")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # callers waiting for the call, and the result they copy theirs from
+        self.waiters = 0
+        self.shared = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Threads asking for a key whose call
+    is already in flight wait for it and share its result, or its exception,
+    instead of making the call again. Once a call completes, or is forgotten, the
+    next request for its key makes a new call: results are not cached.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable, share: Callable = None):
+        """
+        :param share: if given, called with the result to copy it, e.g. copy.deepcopy,
+         so that the result of the call of fn is returned to the thread that made it,
+         and each waiting thread gets its own copy. By default all share the result.
+        :return: the result of fn(), or of the call of fn for the same key that was
+         already in flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                # no thread can join the call any more, and none has its result yet
+                if share is not None and call.waiters and call.error is None:
+                    call.shared = share(call.result)
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        if leader or share is None:
+            return call.result
+        return share(call.shared)
+
+    def forget(self, match: Callable[[Hashable], bool]):
+        """
+        Makes later requests for the keys of the calls in flight for which match(key)
+        is true make new calls, e.g. once the resource they read has been changed.
+        Threads already waiting for those calls still share their results.
+        """
+        with self._lock:
+            for key in [k for k in self._calls if match(k)]:
+                del self._calls[key]
+
+    def __repr__(self):
+        return f"SingleFlight(in_flight={len(self._calls)}, coalesced={self.coalesced})"
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio version of SingleFlight, for coroutines of one event loop. The shared
+    call runs as a task, so it is not cancelled when one of its waiters is.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._tasks = {}
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable], share: Callable = None
+    ):
+        import asyncio
+
+        entry = self._tasks.get(key)
+        if entry is not None:
+            self.coalesced += 1
+            task, call = entry
+            call.waiters += 1
+            result = await asyncio.shield(task)
+            return result if share is None else share(call.shared)
+        call = _Call()
+        task = asyncio.ensure_future(self._run(key, fn, call, share))
+        self._tasks[key] = (task, call)
+        task.add_done_callback(lambda _: self._forget_call(key, call))
+        return await asyncio.shield(task)
+
+    async def _run(self, key, fn, call, share):
+        try:
+            result = await fn()
+        finally:
+            self._forget_call(key, call)
+        # copied before any waiter, or the caller that made the call, resumes
+        if share is not None and call.waiters:
+            call.shared = share(result)
+        return result
+
+    def forget(self, match: Callable[[Hashable], bool]):
+        """
+        Asyncio version of SingleFlight.forget.
+        """
+        for key in [k for k in self._tasks if match(k)]:
+            del self._tasks[key]
+
+    def _forget_call(self, key, call):
+        entry = self._tasks.get(key)
+        if entry is not None and entry[1] is call:
+            del self._tasks[key]
+
+    def __repr__(self):
+        return (
+            f"AsyncSingleFlight(in_flight={len(self._tasks)}, "
+            f"coalesced={self.coalesced})"
+        )
@@ -0,0 +1,710 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from rspace_client.cache import ResponseCache
+from rspace_client.client_base import ClientBase, Pagination
+from rspace_client.download import MIN_PART_SIZE
+from rspace_client.eln.async_eln import AsyncELNClient
+from rspace_client.inv.async_inv import AsyncInventoryClient
+from rspace_client.inv.inv import SamplePost
+from rspace_client.retry import RetryPolicy
+from rspace_client.timeouts import deadline
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def with_transport(client, handler):
+    client.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+class AsyncELNClientTest(unittest.TestCase):
+    def test_get_and_create_document(self):
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            if request.method == "GET":
+                return httpx.Response(200, json={"id": 12, "name": "doc"})
+            return httpx.Response(201, json={"id": 13, **json.loads(request.content)})
+
+        async def go():
+            async with with_transport(AsyncELNClient("https://example.com", "key"), handler) as client:
+                doc = await client.get_document("SD12")
+                created = await client.create_document(name="new", tags=["a", "b"])
+                return doc, created
+
+        doc, created = run(go())
+        self.assertEqual("doc", doc["name"])
+        self.assertEqual({"id": 13, "name": "new", "tags": "a,b"}, created)
+        self.assertEqual("https://example.com/api/v1/documents/12", str(requests_seen[0].url))
+        self.assertEqual("key", requests_seen[0].headers["apiKey"])
+
+    def test_stream_documents_follows_next_links(self):
+        def handler(request):
+            page = int(request.url.params["pageNumber"])
+            body = {"documents": [{"id": page * 2}, {"id": page * 2 + 1}], "_links": []}
+            if page < 2:
+                next_url = f"https://example.com/api/v1/documents?pageNumber={page + 1}&pageSize=2"
+                body["_links"].append({"rel": "next", "link": next_url})
+            return httpx.Response(200, json=body)
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            return [d["id"] async for d in client.stream_documents(Pagination(page_size=2))]
+
+        self.assertEqual(list(range(6)), run(go()))
+
+    def test_stream_incrementally_follows_next_links(self):
+        def handler(request):
+            page = int(request.url.params.get("pageNumber", 0))
+            key = "records" if "/folders/tree" in request.url.path else "documents"
+            body = {"_links": [], key: [{"id": page * 2}, {"id": page * 2 + 1}]}
+            if page < 2:
+                next_url = f"{request.url.copy_with(params={'pageNumber': page + 1})}"
+                body["_links"].append({"rel": "next", "link": next_url})
+            return httpx.Response(200, json=body)
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            documents = client.stream_documents(Pagination(page_size=2), incremental=True)
+            records = client.stream_folder_tree(3)
+            return [d["id"] async for d in documents], [r["id"] async for r in records]
+
+        self.assertEqual((list(range(6)), list(range(6))), run(go()))
+
+    def test_upload_file(self):
+        def handler(request):
+            self.assertIn(b"multipart/form-data", request.headers["Content-Type"].encode())
+            self.assertIn(b"file content", request.content)
+            self.assertIn(b'name="folderId"', request.content)
+            return httpx.Response(201, json={"id": 1})
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            return await client.upload_file(BytesIO(b"file content"), folder_id="GF5")
+
+        self.assertEqual({"id": 1}, run(go()))
+
+    def test_api_error(self):
+        def handler(request):
+            return httpx.Response(404, json={"message": "not found", "errors": []})
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            await client.get_document(1)
+
+        with self.assertRaises(ClientBase.ApiError) as ctx:
+            run(go())
+        self.assertEqual(404, ctx.exception.response_status_code)
+
+    @patch("rspace_client.async_client_base.asyncio.sleep")
+    def test_get_retried(self, mock_sleep):
+        statuses = [503, 200]
+
+        async def no_sleep(delay):
+            return None
+
+        mock_sleep.side_effect = no_sleep
+
+        def handler(request):
+            status = statuses.pop(0)
+            return httpx.Response(status, json={"message": "OK", "errors": []})
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            return await client.get_status()
+
+        self.assertEqual("OK", run(go())["message"])
+        mock_sleep.assert_called_once()
+
+    def test_export_and_download(self):
+        statuses = ["RUNNING", "COMPLETED"]
+
+        def handler(request):
+            path = request.url.path
+            if path == "/api/v1/export/xml/user":
+                return httpx.Response(200, json={"id": 7})
+            if path == "/api/v1/jobs/7":
+                status = statuses.pop(0)
+                return httpx.Response(200, json={
+                    "id": 7, "status": status, "percentComplete": 50.0,
+                    "_links": [{"rel": "enclosure", "link": "https://example.com/exports/a.zip"}],
+                })
+            if path == "/exports/a.zip":
+                return httpx.Response(200, content=b"zipdata")
+            return httpx.Response(404, json={"message": path, "errors": []})
+
+        async def go(directory):
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            return await client.export_and_download(
+                "xml", "user", directory, wait_between_requests=0
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = run(go(directory))
+            self.assertEqual(os.path.join(directory, "a.zip"), path)
+            with open(path, "rb") as f:
+                self.assertEqual(b"zipdata", f.read())
+
+    def test_concurrency_is_bounded(self):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json={"id": 1})
+
+        async def go():
+            client = AsyncELNClient("https://example.com", "key", max_concurrency=3)
+            with_transport(client, handler)
+            await asyncio.gather(*[client.get_document(i) for i in range(1, 20)])
+
+        run(go())
+        self.assertEqual(3, peak)
+
+    def test_not_modified_answered_from_cache(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"id": 12, "name": "doc"}, headers={"ETag": '"v1"'})
+
+        async def go():
+            client = with_transport(
+                AsyncELNClient("https://example.com", "key", response_cache=ResponseCache()),
+                handler,
+            )
+            await client.get_document(12)
+            return await client.get_document(12)
+
+        self.assertEqual({"id": 12, "name": "doc"}, run(go()))
+        self.assertEqual([None, '"v1"'], seen)
+
+    def test_stream_documents_prefetch(self):
+        fetched = []
+
+        def handler(request):
+            page = int(request.url.params["pageNumber"])
+            fetched.append(page)
+            body = {"documents": [{"id": page}], "_links": []}
+            if page < 20:
+                next_url = f"https://example.com/api/v1/documents?pageNumber={page + 1}"
+                body["_links"].append({"rel": "next", "link": next_url})
+            return httpx.Response(200, json=body)
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            all_ids = [d["id"] async for d in client.stream_documents(prefetch=3)]
+            fetched.clear()
+            stream = client.stream_documents(prefetch=3)
+            first = (await stream.__anext__())["id"]
+            await asyncio.sleep(0.05)
+            await stream.aclose()
+            return all_ids, first
+
+        all_ids, first = run(go())
+        self.assertEqual(list(range(21)), all_ids)
+        self.assertEqual(0, first)
+        self.assertEqual([0, 1, 2, 3, 4], fetched)
+
+    def test_stream_documents_parallel(self):
+        def handler(request):
+            page = int(request.url.params["pageNumber"])
+            docs = [{"id": page * 2}, {"id": page * 2 + 1}][: 7 - page * 2]
+            return httpx.Response(200, json={"totalHits": 7, "documents": docs, "_links": []})
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            ordered = [
+                d["id"] async for d in client.stream_documents(Pagination(page_size=2), parallel=3)
+            ]
+            unordered = [
+                d["id"]
+                async for d in client.stream_documents(
+                    Pagination(page_size=2), parallel=3, ordered=False
+                )
+            ]
+            return ordered, unordered
+
+        ordered, unordered = run(go())
+        self.assertEqual(list(range(7)), ordered)
+        self.assertEqual(list(range(7)), sorted(unordered))
+
+    def test_sync_context_manager_rejected(self):
+        client = AsyncELNClient("https://example.com", "key")
+        with self.assertRaises(TypeError):
+            with client:
+                pass
+
+    def test_import_tree(self):
+        tree_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tree")
+        posted = []
+
+        def handler(request):
+            endpoint = request.url.path.rsplit("/", 1)[-1]
+            posted.append(endpoint)
+            n = len(posted)
+            if endpoint == "files":
+                return httpx.Response(201, json={"id": n, "created": "2021-11-04"})
+            prefix = "FL" if endpoint == "folders" else "SD"
+            return httpx.Response(201, json={"id": n, "globalId": f"{prefix}{n}"})
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            return await client.import_tree(tree_dir)
+
+        result = run(go())
+        self.assertEqual("OK", result["status"])
+        self.assertEqual(3, posted.count("folders"))
+        self.assertEqual(6, posted.count("files"))
+        self.assertEqual(6, posted.count("documents"))
+        self.assertEqual(9, len(result["path2Id"]))
+
+
+class AsyncInventoryClientTest(unittest.TestCase):
+    def test_bulk_create_sample(self):
+        def handler(request):
+            body = json.loads(request.content)
+            self.assertEqual("CREATE", body["operationType"])
+            results = [{"record": {"name": r["name"]}, "error": None} for r in body["records"]]
+            return httpx.Response(200, json={"status": "COMPLETED", "results": results})
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return await client.bulk_create_sample(SamplePost("s1"), SamplePost("s2"))
+
+        result = run(go())
+        self.assertTrue(result.is_ok())
+        self.assertEqual(2, len(result.success_results()))
+
+    def test_stream_container_locations(self):
+        container = {"id": 1, "locations": [{"id": i} for i in range(50)], "_links": []}
+
+        def handler(request):
+            self.assertEqual("true", request.url.params["includeContent"])
+            return httpx.Response(200, json=container)
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return [loc async for loc in client.stream_container_locations(1)]
+
+        self.assertEqual(container["locations"], run(go()))
+
+    def test_stream_samples(self):
+        def handler(request):
+            return httpx.Response(200, json={"samples": [{"id": 1}, {"id": 2}], "_links": []})
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return [s["id"] async for s in client.stream_samples()]
+
+        self.assertEqual([1, 2], run(go()))
+
+    def test_deletes_are_sent(self):
+        deleted = []
+
+        def handler(request):
+            self.assertEqual("DELETE", request.method)
+            deleted.append(request.url.path)
+            return httpx.Response(200, json={"id": 5, "deleted": True})
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return [
+                await client.delete_sample(5),
+                await client.delete_instrument(5),
+                await client.delete_attachment_by_id(5),
+                await client.delete_sample_template(5),
+                await client.delete_instrument_template(5),
+            ]
+
+        results = run(go())
+        self.assertEqual([{"id": 5, "deleted": True}] * 5, results)
+        self.assertEqual(5, len(deleted))
+        self.assertTrue(all(path.endswith("/5") for path in deleted))
+
+    def test_split_subsample_by_quantity(self):
+        posted = {}
+
+        def handler(request):
+            path = request.url.path
+            if path.endswith("/subSamples/1"):
+                return httpx.Response(200, json={"quantity": {"numericValue": 5, "unitId": 3}})
+            if path.endswith("/actions/split"):
+                return httpx.Response(200, json=[{"id": 2, "globalId": "SS2"}])
+            posted["bulk"] = json.loads(request.content)
+            return httpx.Response(200, json={"status": "COMPLETED", "results": []})
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return await client.split_subsample("SS1", 1, 1.5)
+
+        self.assertTrue(run(go()).is_ok())
+        quantities = [r["quantity"]["numericValue"] for r in posted["bulk"]["records"]]
+        self.assertEqual([3.5, 1.5], quantities)
+
+    def test_duplicate_with_new_name(self):
+        def handler(request):
+            if request.url.path.endswith("/actions/duplicate"):
+                return httpx.Response(200, json={"id": 2, "globalId": "SA2", "name": "copy"})
+            body = json.loads(request.content)
+            return httpx.Response(200, json={"id": 2, "globalId": "SA2", "name": body["name"]})
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return await client.duplicate("SA1", "renamed")
+
+        self.assertEqual("renamed", run(go())["name"])
+
+    def test_get_workbenches(self):
+        def handler(request):
+            return httpx.Response(200, json={"containers": [{"id": 1}, {"id": 2}]})
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return await client.get_workbenches()
+
+        self.assertEqual([{"id": 1}, {"id": 2}], run(go()))
+
+    def test_barcode(self):
+        def handler(request):
+            self.assertEqual("SA1", request.url.params["content"])
+            return httpx.Response(200, content=b"png", headers={"Content-Type": "image/png"})
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return await client.barcode("SA1")
+
+        self.assertEqual(b"png", run(go()))
+
+    def test_datacite_settings(self):
+        settings = {"identifiersSettings": {"igsn": [{"provider": "IGSN_DATACITE", "enabled": "true"}]}}
+
+        def handler(request):
+            if request.url.path.endswith("/testIgsnConnection"):
+                return httpx.Response(200, json=True)
+            return httpx.Response(200, json=settings)
+
+        async def go():
+            client = with_transport(AsyncInventoryClient("https://example.com", "key"), handler)
+            return (
+                await client.get_datacite_settings(),
+                await client.update_datacite_settings(False),
+                await client.test_datacite_connection(),
+            )
+
+        current, updated, connected = run(go())
+        self.assertEqual("true", current["enabled"])
+        self.assertEqual(current, updated)
+        self.assertTrue(connected)
+
+
+class AsyncEventsTest(unittest.TestCase):
+    def test_events_report_operation_status_and_cache(self):
+        def handler(request):
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"id": 1}, headers={"ETag": '"v1"'})
+
+        events = []
+
+        async def go():
+            client = with_transport(
+                AsyncELNClient(
+                    "https://example.com",
+                    "key",
+                    response_cache=ResponseCache(),
+                    event_handlers=[events.append],
+                ),
+                handler,
+            )
+            await asyncio.gather(client.get_form(1), client.get_document(2))
+            await client.get_form(1)
+
+        run(go())
+        self.assertEqual(
+            [("get_form", "/forms/{id}", 200, "miss"),
+             ("get_document", "/documents/{id}", 200, "miss"),
+             ("get_form", "/forms/{id}", 304, "hit")],
+            [(e.operation, e.endpoint, e.status, e.cache) for e in events],
+        )
+        self.assertEqual(len(b'{"id":1}'), events[0].bytes_received)
+        self.assertIsNotNone(events[0].total)
+
+    def test_stream_events_report_stream_method(self):
+        def handler(request):
+            page = int(request.url.params["pageNumber"])
+            body = {"samples": [{"id": page}], "totalHits": 3}
+            return httpx.Response(200, json=body)
+
+        events = []
+
+        async def go():
+            client = with_transport(
+                AsyncInventoryClient(
+                    "https://example.com", "key", event_handlers=[events.append]
+                ),
+                handler,
+            )
+            pagination = Pagination(page_size=1)
+            return [
+                s["id"]
+                async for s in client.stream_samples(pagination, prefetch=1, parallel=2)
+            ]
+
+        self.assertEqual([0, 1, 2], run(go()))
+        self.assertEqual(["stream_samples"] * 3, [e.operation for e in events])
+
+    def test_transfer_events_report_digests(self):
+        content = b"file content" * 1000
+        uploaded = []
+
+        def handler(request):
+            if request.method == "POST":
+                uploaded.append(request.read())
+                return httpx.Response(201, json={"id": 1})
+            return httpx.Response(200, content=content)
+
+        events = []
+
+        async def go():
+            client = with_transport(
+                AsyncELNClient(
+                    "https://example.com", "key", event_handlers=[events.append]
+                ),
+                handler,
+            )
+            response = await client.upload_file(BytesIO(content), digests="sha256")
+            result = await client.download_file(1, BytesIO(), digests="sha256")
+            return response, result
+
+        response, result = run(go())
+        digests = {"sha256": hashlib.sha256(content).hexdigest()}
+        self.assertIn(content, uploaded[0])
+        self.assertEqual(digests, response["digests"])
+        self.assertEqual(digests, result.digests)
+        self.assertEqual([digests, digests], [e.digests for e in events])
+        self.assertEqual(len(content), events[1].bytes_received)
+
+    def test_upload_progress(self):
+        content = b"file content" * 1000
+
+        def handler(request):
+            request.read()
+            return httpx.Response(201, json={"id": 1})
+
+        reports = []
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            await client.upload_file(BytesIO(content), progress=reports.append)
+
+        run(go())
+        self.assertEqual([len(content)], [p.bytes_sent for p in reports])
+        self.assertEqual(0, reports[-1].eta)
+
+
+class AsyncCoalescingTest(unittest.TestCase):
+    def test_download_resumed_after_lost_connection(self):
+        content = bytes(range(256)) * 400
+        ranges = []
+
+        class Cut(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield content[:40_000]
+                raise httpx.RemoteProtocolError("peer closed connection")
+
+        def handler(request):
+            ranges.append(request.headers.get("Range"))
+            headers = {"ETag": '"v1"', "Content-Length": str(len(content))}
+            if request.headers.get("Range") != "bytes=40000-":
+                return httpx.Response(200, headers=headers, stream=Cut())
+            headers["Content-Range"] = f"bytes 40000-{len(content) - 1}/{len(content)}"
+            return httpx.Response(206, headers=headers, content=content[40_000:])
+
+        async def go(path):
+            policy = RetryPolicy(backoff_factor=0.001)
+            client = AsyncELNClient("https://example.com", "key", retry_policy=policy)
+            with_transport(client, handler)
+            return await client.download_file(5, path, resume=True, digests="sha256")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "f.bin")
+            result = run(go(path))
+            with open(path, "rb") as f:
+                self.assertEqual(content, f.read())
+            self.assertEqual([], [n for n in os.listdir(directory) if n != "f.bin"])
+        self.assertEqual([None, "bytes=40000-"], ranges)
+        self.assertEqual(len(content), result.size)
+        self.assertEqual({"sha256": hashlib.sha256(content).hexdigest()}, result.digests)
+
+    def test_download_in_parallel_ranges(self):
+        content = os.urandom(3 * MIN_PART_SIZE + 10)
+        ranges = []
+
+        def handler(request):
+            first, last = request.headers["Range"][len("bytes="):].split("-")
+            first, last = int(first), min(int(last), len(content) - 1)
+            ranges.append((first, last))
+            headers = {
+                "ETag": '"v1"',
+                "Content-Range": f"bytes {first}-{last}/{len(content)}",
+            }
+            return httpx.Response(206, headers=headers, content=content[first:last + 1])
+
+        async def go(path):
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            return await client.download_file(5, path, parallel=2, digests="sha256")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "f.bin")
+            result = run(go(path))
+            with open(path, "rb") as f:
+                self.assertEqual(content, f.read())
+        self.assertEqual(len(content), result.size)
+        self.assertEqual(4, len(ranges))
+        self.assertEqual({"sha256": hashlib.sha256(content).hexdigest()}, result.digests)
+
+    def test_lost_connection_of_single_stream_download(self):
+        class Cut(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield b"partial"
+                raise httpx.RemoteProtocolError("peer closed connection")
+
+        async def go():
+            client = AsyncELNClient("https://example.com", "key")
+            with_transport(client, lambda request: httpx.Response(200, stream=Cut()))
+            await client.download_file(5, BytesIO())
+
+        with self.assertRaises(ClientBase.ConnectionError):
+            run(go())
+
+    def test_parallel_download_without_range_support_resumed(self):
+        content = bytes(range(256)) * 400
+        ranges = []
+
+        class Cut(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield content[:40_000]
+                raise httpx.RemoteProtocolError("peer closed connection")
+
+        def handler(request):
+            ranges.append(request.headers.get("Range"))
+            headers = {"ETag": '"v1"', "Content-Length": str(len(content))}
+            if request.headers.get("Range") != "bytes=40000-":
+                # ranges are ignored, except to resume
+                return httpx.Response(200, headers=headers, stream=Cut())
+            headers["Content-Range"] = f"bytes 40000-{len(content) - 1}/{len(content)}"
+            return httpx.Response(206, headers=headers, content=content[40_000:])
+
+        async def go(path, policy):
+            client = AsyncELNClient("https://example.com", "key", retry_policy=policy)
+            with_transport(client, handler)
+            return await client.download_file(5, path, resume=True, parallel=2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "f.bin")
+            with self.assertRaises(ClientBase.ConnectionError):
+                run(go(path, RetryPolicy.never()))
+            self.assertEqual(40_000, os.path.getsize(path))
+            result = run(go(path, None))
+            with open(path, "rb") as f:
+                self.assertEqual(content, f.read())
+        self.assertEqual([f"bytes=0-{MIN_PART_SIZE - 1}", "bytes=40000-"], ranges)
+        self.assertEqual(40_000, result.offset)
+
+    def test_concurrent_identical_gets_are_sent_once(self):
+        requests_seen = []
+
+        async def handler(request):
+            requests_seen.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"id": 1})
+
+        async def go():
+            client = AsyncELNClient(
+                "https://example.com", "key", coalesce_requests=True, response_cache=cache
+            )
+            with_transport(client, handler)
+            return await asyncio.gather(
+                *[client.get_form(1) for _ in range(5)], client.get_form(2)
+            )
+
+        cache = ResponseCache()
+        results = run(go())
+        self.assertEqual(2, len(requests_seen))
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+        self.assertEqual([{"id": 1}] * 6, results)
+        self.assertEqual(6, len({id(r) for r in results}))
+
+
+class AsyncTimeoutsTest(unittest.TestCase):
+    def test_timeouts_and_deadline(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.extensions["timeout"])
+            return httpx.Response(200, json={"message": "OK"})
+
+        async def go():
+            async with with_transport(AsyncELNClient("https://example.com", "key"), handler) as client:
+                await client.get_status()
+                with deadline(5):
+                    await client.get_status()
+
+        run(go())
+        self.assertEqual({"connect": 10, "read": 60, "write": 60, "pool": None}, seen[0])
+        self.assertLessEqual(seen[1]["read"], 5)
+
+    def test_slow_download_stops_at_deadline(self):
+        async def trickle():
+            while True:
+                yield b"x"
+                await asyncio.sleep(0.02)
+
+        def handler(request):
+            return httpx.Response(200, content=trickle())
+
+        async def go():
+            client = with_transport(AsyncELNClient("https://example.com", "key"), handler)
+            with deadline(0.3):
+                await client.download_link_to_file("https://example.com/f", BytesIO())
+
+        start = time.monotonic()
+        with self.assertRaises(ClientBase.DeadlineExceededError):
+            run(go())
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_timeout_raised_as_connection_error(self):
+        def handler(request):
+            raise httpx.ReadTimeout("slow", request=request)
+
+        async def go():
+            client = AsyncELNClient(
+                "https://example.com", "key", retry_policy=RetryPolicy.never()
+            )
+            async with with_transport(client, handler):
+                await client.get_status()
+
+        with self.assertRaises(ClientBase.ConnectionError):
+            run(go())
@@ -5,8 +5,10 @@ Created on Sat Oct  2 21:55:26 2021
 
 @author: richard
 """
+import json
 import unittest
 import os
+from unittest.mock import MagicMock, PropertyMock
 
 import string
 import random
@@ -30,6 +32,18 @@ def get_any_datafile():
     return get_datafile("fish_method.doc")
 
 
+def mock_json_response():
+    """
+    A MagicMock HTTP response whose body ('content') is the JSON encoding of
+    whatever 'json.return_value' is set to.
+    """
+    response = MagicMock()
+    type(response).content = PropertyMock(
+        side_effect=lambda: json.dumps(response.json.return_value).encode()
+    )
+    return response
+
+
 def random_string(length=10):
     """
     Creates random lowercase string
@@ -0,0 +1,279 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from rspace_client.cache import ResponseCache, SqliteResponseCache
+from rspace_client.eln.eln import ELNClient
+from rspace_client.inv.inv import InventoryClient
+
+
+def cacheable_response(body, status_code=200, **headers):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"Content-Type": "application/json", **headers}
+    response.content = json.dumps(body).encode()
+    response.json.return_value = body
+    return response
+
+
+def not_modified():
+    response = MagicMock()
+    response.status_code = 304
+    response.headers = {}
+    return response
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_lru_eviction_by_entries(self):
+        cache = ResponseCache(max_entries=2)
+        for key in ("a", "b"):
+            cache.store(key, cacheable_response({"k": key}, ETag='"1"'))
+        cache.get("a")
+        cache.store("c", cacheable_response({"k": "c"}, ETag='"1"'))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual({"k": "a"}, cache.get("a").json())
+        self.assertEqual(2, len(cache))
+
+    def test_eviction_by_bytes(self):
+        cache = ResponseCache(max_bytes=30)
+        cache.store("a", cacheable_response({"k": "a" * 10}, ETag='"1"'))
+        cache.store("b", cacheable_response({"k": "b" * 10}, ETag='"1"'))
+        self.assertIsNone(cache.get("a"))
+        self.assertLessEqual(cache.size_bytes, 30)
+        cache.store("c", cacheable_response({"k": "c" * 40}, ETag='"1"'))
+        self.assertIsNone(cache.get("c"))
+
+    def test_not_cacheable(self):
+        cache = ResponseCache()
+        self.assertFalse(cache.store("a", cacheable_response({})))
+        self.assertFalse(
+            cache.store("a", cacheable_response({}, ETag='"1"', **{"Cache-Control": "no-store"}))
+        )
+        self.assertFalse(cache.store("a", cacheable_response({}, 201, ETag='"1"')))
+        self.assertEqual(0, len(cache))
+
+    def test_key_ignores_none_params_and_order(self):
+        cache = ResponseCache()
+        headers = {"apiKey": "k", "Accept": "application/json"}
+        self.assertEqual(
+            cache.key("u", {"a": 1, "b": 2, "c": None}, headers),
+            cache.key("u", {"b": 2, "a": 1}, headers),
+        )
+        self.assertNotEqual(
+            cache.key("u", None, headers),
+            cache.key("u", None, {**headers, "apiKey": "other"}),
+        )
+
+
+class ClientCacheTest(unittest.TestCase):
+    @patch("requests.Session.request")
+    def test_not_modified_returns_cached_body(self, mock_request):
+        doc = {"id": 12, "name": "doc"}
+        mock_request.side_effect = [
+            cacheable_response(doc, ETag='"v1"', **{"Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}),
+            not_modified(),
+        ]
+        cache = ResponseCache()
+        client = ELNClient("https://example.com", "key", response_cache=cache)
+        first = client.get_document(12)
+        first["name"] = "changed by caller"
+        second = client.get_document(12)
+        self.assertEqual({"id": 12, "name": "doc"}, second)
+        headers = mock_request.call_args.kwargs["headers"]
+        self.assertEqual('"v1"', headers["If-None-Match"])
+        self.assertEqual("Wed, 01 Jan 2025 00:00:00 GMT", headers["If-Modified-Since"])
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    @patch("requests.Session.request")
+    def test_changed_resource_replaces_entry(self, mock_request):
+        mock_request.side_effect = [
+            cacheable_response({"id": 1, "name": "v1"}, ETag='"v1"'),
+            cacheable_response({"id": 1, "name": "v2"}, ETag='"v2"'),
+            not_modified(),
+        ]
+        client = InventoryClient("https://example.com", "key", response_cache=ResponseCache())
+        client.get_container_by_id(1)
+        self.assertEqual("v2", client.get_container_by_id(1)["name"])
+        self.assertEqual("v2", client.get_container_by_id(1)["name"])
+        self.assertEqual('"v2"', mock_request.call_args.kwargs["headers"]["If-None-Match"])
+
+    @patch("requests.Session.request")
+    def test_update_invalidates(self, mock_request):
+        mock_request.side_effect = [
+            cacheable_response({"id": 12, "name": "doc"}, ETag='"v1"'),
+            cacheable_response({"id": 12, "name": "renamed"}),
+            cacheable_response({"id": 12, "name": "renamed"}, ETag='"v2"'),
+        ]
+        client = ELNClient("https://example.com", "key", response_cache=ResponseCache())
+        client.get_document(12)
+        client.update_document(12, name="renamed")
+        client.get_document(12)
+        self.assertNotIn("If-None-Match", mock_request.call_args.kwargs["headers"])
+
+    @patch("requests.Session.request")
+    def test_no_cache_by_default(self, mock_request):
+        mock_request.return_value = cacheable_response({"id": 12}, ETag='"v1"')
+        client = ELNClient("https://example.com", "key")
+        client.get_document(12)
+        client.get_document(12)
+        self.assertNotIn("If-None-Match", mock_request.call_args.kwargs["headers"])
+
+
+def store_in_child(path, n):
+    cache = SqliteResponseCache(path)
+    for i in range(20):
+        url = f"https://example.com/api/v1/forms/{n}-{i}"
+        cache.store(cache.key(url, None, {"apiKey": "k"}), cacheable_response({"i": i}))
+    cache.close()
+
+
+class SqliteResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache.db")
+
+    def open_cache(self, **options):
+        cache = SqliteResponseCache(self.path, **options)
+        self.addCleanup(cache.close)
+        return cache
+
+    def open_client(self, cache):
+        client = ELNClient("https://example.com", "key", response_cache=cache)
+        self.addCleanup(client.close)
+        return client
+
+    def test_resource_type(self):
+        self.assertEqual(
+            "forms", SqliteResponseCache.resource_type("https://x.org/api/v1/forms/12")
+        )
+        self.assertEqual(
+            "containers",
+            SqliteResponseCache.resource_type(
+                "https://x.org/api/inventory/v1/containers?includeContent=true"
+            ),
+        )
+
+    def test_api_key_not_stored(self):
+        cache = self.open_cache()
+        key = cache.key("https://x.org/api/v1/forms/1", {"a": 1}, {"apiKey": "secret"})
+        self.assertNotIn("secret", key[1])
+        self.assertNotEqual(
+            key, cache.key("https://x.org/api/v1/forms/1", {"a": 1}, {"apiKey": "other"})
+        )
+
+    @patch("rspace_client.cache.time.time")
+    def test_ttl_per_resource_type(self, mock_time):
+        mock_time.return_value = 1000.0
+        cache = self.open_cache(ttls={"forms": 60}, default_ttl=0)
+        form_key = cache.key("https://x.org/api/v1/forms/1", None, None)
+        doc_key = cache.key("https://x.org/api/v1/documents/1", None, None)
+        self.assertTrue(cache.store(form_key, cacheable_response({"id": 1})))
+        self.assertFalse(cache.store(doc_key, cacheable_response({"id": 1})))
+        self.assertTrue(cache.store(doc_key, cacheable_response({"id": 1}, ETag='"1"')))
+        self.assertTrue(cache.get(form_key).is_fresh())
+        self.assertFalse(cache.get(doc_key).is_fresh())
+        mock_time.return_value = 1061.0
+        self.assertFalse(cache.get(form_key).is_fresh())
+
+    def test_persists_between_instances(self):
+        cache = self.open_cache()
+        key = cache.key("https://x.org/api/v1/forms/1", None, None)
+        cache.store(key, cacheable_response({"id": 1}))
+        cache.close()
+        self.assertEqual({"id": 1}, self.open_cache().get(key).json())
+
+    def test_invalidate_by_resource_type_and_server(self):
+        cache = self.open_cache()
+        urls = [
+            "https://x.org/api/v1/forms/1",
+            "https://x.org/api/v1/forms?pageNumber=0",
+            "https://x.org/api/v1/folders/2",
+            "https://y.org/api/v1/forms/1",
+        ]
+        for url in urls:
+            cache.store(cache.key(url, None, None), cacheable_response({}))
+        cache.invalidate("https://x.org/api/v1/forms/1")
+        remaining = [url for url in urls if cache.get(cache.key(url, None, None))]
+        self.assertEqual(urls[2:], remaining)
+
+    def test_changes_invalidate_listings(self):
+        cache = self.open_cache()
+        tree = "https://x.org/api/v1/folders/tree/2"
+        bench = "https://x.org/api/inventory/v1/workbenches"
+        form = "https://x.org/api/v1/forms/1"
+        cached = lambda url: cache.get(cache.key(url, None, None)) is not None
+
+        def store_all():
+            for url in (tree, bench, form):
+                cache.store(cache.key(url, None, None), cacheable_response({}))
+
+        store_all()
+        cache.invalidate("https://x.org/api/v1/files")
+        self.assertEqual([False, True, True], [cached(u) for u in (tree, bench, form)])
+        store_all()
+        cache.invalidate("https://x.org/api/inventory/v1/bulk")
+        self.assertEqual([True, False, True], [cached(u) for u in (tree, bench, form)])
+        store_all()
+        cache.invalidate("https://x.org/api/v1/documents/3")
+        self.assertEqual([False, True, True], [cached(u) for u in (tree, bench, form)])
+
+    def test_max_entries(self):
+        cache = self.open_cache(max_entries=3)
+        for i in range(5):
+            url = f"https://x.org/api/v1/forms/{i}"
+            cache.store(cache.key(url, None, None), cacheable_response({}))
+        self.assertEqual(3, len(cache))
+
+    def test_several_processes(self):
+        self.open_cache()
+        processes = [
+            multiprocessing.Process(target=store_in_child, args=(self.path, n))
+            for n in range(3)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+            self.assertEqual(0, p.exitcode)
+        self.assertEqual(60, len(self.open_cache()))
+
+    @patch("requests.Session.request")
+    def test_client_uses_fresh_entries_and_invalidates_on_update(self, mock_request):
+        form = {"id": 3, "name": "form"}
+        mock_request.side_effect = [
+            cacheable_response(form),
+            cacheable_response({"id": 3, "name": "renamed"}),
+            cacheable_response(form),
+        ]
+        cache = self.open_cache()
+        client = self.open_client(cache)
+        self.assertEqual(form, client.get_form(3))
+        other_process_client = self.open_client(self.open_cache())
+        self.assertEqual(form, other_process_client.get_form(3))
+        self.assertEqual(1, mock_request.call_count)
+        client.retrieve_api_results("/forms/3", {"name": "renamed"}, request_type="PUT")
+        client.get_form(3)
+        self.assertEqual(3, mock_request.call_count)
+
+    @patch("rspace_client.cache.time.time")
+    @patch("requests.Session.request")
+    def test_client_revalidates_expired_entries(self, mock_request, mock_time):
+        mock_time.return_value = 1000.0
+        mock_request.side_effect = [
+            cacheable_response({"id": 12}, ETag='"v1"'),
+            not_modified(),
+        ]
+        cache = self.open_cache(ttls={"documents": 10})
+        client = self.open_client(cache)
+        client.get_document(12)
+        mock_time.return_value = 1011.0
+        self.assertEqual({"id": 12}, client.get_document(12))
+        self.assertEqual('"v1"', mock_request.call_args.kwargs["headers"]["If-None-Match"])
+        key = cache.key(
+            "https://example.com/api/v1/documents/12", None, client._get_headers()
+        )
+        self.assertTrue(cache.get(key).is_fresh())
@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from rspace_client.cassette import (
+    BODIES,
+    EXCHANGES,
+    CassetteMiss,
+    RecordingTransport,
+    ReplayTransport,
+    request_key,
+)
+from rspace_client.client_base import ClientBase
+from rspace_client.download import RESUME_SUFFIX
+from rspace_client.eln.eln import ELNClient
+from rspace_client.inv.inv import InventoryClient
+from rspace_client.retry import RetryPolicy
+from rspace_client.tests.fake_server import FakeRSpaceServer
+
+TREE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tree")
+
+
+class CassetteTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cassette = os.path.join(tmp.name, "session.cassette")
+
+    def record(self, latency=0.0):
+        """
+        Records a session of both clients with the fake server.
+        :return: the results of the session, and the id of the file downloaded
+        """
+        with FakeRSpaceServer(latency=latency) as server:
+            server.add_samples(25)
+            content = server.random_bytes(100_000)
+            file_id = server.add_file(content)["id"]
+            transport = RecordingTransport(self.cassette)
+            results = self.session(server.url, server.api_key, transport, file_id)
+            transport.close()
+        self.assertEqual(content, results["download"])
+        return results, file_id
+
+    @staticmethod
+    def session(url, api_key, transport, file_id):
+        eln = ELNClient(url, api_key, transport=transport)
+        inv = InventoryClient(url, api_key, transport=transport)
+        download = io.BytesIO()
+        eln.download_file(file_id, download)
+        return {
+            "samples": [s["id"] for s in inv.stream_samples(parallel=3)],
+            "download": download.getvalue(),
+            "again": eln.get_file_info(file_id)["size"],
+            "tree": eln.import_tree(TREE_DIR)["status"],
+        }
+
+    def test_replay_without_server(self):
+        recorded, file_id = self.record()
+        replay = ReplayTransport(self.cassette)
+        replayed = self.session("https://elsewhere.example.com", "key", replay, file_id)
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(0, replay.remaining())
+
+    def test_binary_bodies_stored_out_of_line(self):
+        self.record()
+        with open(os.path.join(self.cassette, EXCHANGES)) as f:
+            records = [json.loads(line) for line in f]
+        binary = [r for r in records if "body" in r]
+        self.assertEqual(1, len(binary))
+        self.assertEqual(100_000, binary[0]["size"])
+        self.assertEqual([binary[0]["body"]], os.listdir(os.path.join(self.cassette, BODIES)))
+        self.assertLess(os.path.getsize(os.path.join(self.cassette, EXCHANGES)), 50_000)
+        self.assertTrue(all("text" in r for r in records if r not in binary))
+        self.assertFalse(any("Date" in r["headers"] for r in records))
+
+    def test_replay_timing(self):
+        _, file_id = self.record(latency=0.02)
+        start = time.monotonic()
+        self.session("https://example.com", "key", ReplayTransport(self.cassette), file_id)
+        fast = time.monotonic() - start
+        start = time.monotonic()
+        self.session("https://example.com", "key", ReplayTransport(self.cassette, timing=1), file_id)
+        timed = time.monotonic() - start
+        self.assertGreater(timed, fast + 0.1)
+
+    def test_unrecorded_request(self):
+        self.record()
+        client = ELNClient("https://example.com", "key", transport=ReplayTransport(self.cassette))
+        with self.assertRaises(CassetteMiss):
+            client.get_status()
+
+    def test_replay_resumed_download(self):
+        part = os.path.join(os.path.dirname(self.cassette), "f.bin")
+        saved = os.path.join(os.path.dirname(self.cassette), "saved")
+        with FakeRSpaceServer() as server:
+            content = server.random_bytes(100_000)
+            file_id = server.add_file(content)["id"]
+            server.fail(endpoint="/file$", cut=0.4)
+            client = ELNClient(server.url, server.api_key, retry_policy=RetryPolicy.never())
+            with self.assertRaises(ClientBase.ConnectionError):
+                client.download_file(file_id, part, resume=True)
+            os.mkdir(saved)
+            for name in (part, part + RESUME_SUFFIX):
+                shutil.copy(name, saved)
+            transport = RecordingTransport(self.cassette)
+            client = ELNClient(server.url, server.api_key, transport=transport)
+            client.download_file(file_id, part, resume=True)
+            client.download_file(file_id, io.BytesIO())
+            transport.close()
+            url = server.url
+        for name in os.listdir(saved):
+            shutil.copy(os.path.join(saved, name), os.path.dirname(part))
+        replay = ReplayTransport(self.cassette)
+        client = ELNClient(url, "key", transport=replay)
+        # replayed in the other order: each request gets the part it asked for
+        whole = io.BytesIO()
+        client.download_file(file_id, whole)
+        result = client.download_file(file_id, part, resume=True)
+        self.assertEqual(content, whole.getvalue())
+        with open(part, "rb") as f:
+            self.assertEqual(content, f.read())
+        self.assertEqual(40_000, result.offset)
+        self.assertEqual(0, replay.remaining())
+
+    def test_request_key(self):
+        self.assertEqual(
+            request_key("get", "https://a.com/api/v1/samples?pageSize=10", {"pageNumber": 2, "x": None}),
+            request_key("GET", "http://b.com/api/v1/samples", {"pageNumber": "2", "pageSize": 10}),
+        )
+        url = "https://a.com/api/v1/files/1/file"
+        self.assertEqual(request_key("GET", url), request_key("GET", url, headers={"apiKey": "k"}))
+        self.assertNotEqual(
+            request_key("GET", url), request_key("GET", url, headers={"range": "bytes=5-"})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
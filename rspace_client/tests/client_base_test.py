@@ -0,0 +1,196 @@
+import contextlib
+import threading
+import time
+import unittest
+from urllib.parse import parse_qs, urlparse
+from unittest.mock import patch, MagicMock
+
+from rspace_client.client_base import ClientBase, Pagination
+from rspace_client.eln.eln import ELNClient
+from rspace_client.inv.inv import InventoryClient
+from rspace_client.tests.base_test import mock_json_response
+
+
+def json_response(body, status_code=200):
+    response = mock_json_response()
+    response.status_code = status_code
+    response.headers = {"Content-Type": "application/json"}
+    response.json.return_value = body
+    return response
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def test_pool_settings_applied_to_adapters(self):
+        client = ELNClient("https://example.com", "key", pool_connections=3, pool_maxsize=7)
+        for prefix in ("http://", "https://"):
+            adapter = client.session.get_adapter(prefix + "example.com")
+            self.assertEqual(3, adapter._pool_connections)
+            self.assertEqual(7, adapter._pool_maxsize)
+        self.assertEqual("keep-alive", client.session.headers["Connection"])
+
+    def test_keep_alive_disabled(self):
+        client = ELNClient("https://example.com", "key", keep_alive=False)
+        self.assertEqual("close", client.session.headers["Connection"])
+
+    @patch("requests.Session.request")
+    def test_requests_share_session(self, mock_request):
+        mock_request.return_value = json_response({"message": "OK"})
+        client = ELNClient("https://example.com/", "key")
+        client.get_status()
+        client.get_document("SD12")
+        self.assertEqual(2, mock_request.call_count)
+        self.assertEqual(
+            "https://example.com/api/v1/documents/12", mock_request.call_args.args[1]
+        )
+
+    @patch("requests.Session.close")
+    def test_context_manager_closes_session(self, mock_close):
+        with InventoryClient("https://example.com", "key") as client:
+            self.assertIsInstance(client, InventoryClient)
+        mock_close.assert_called_once()
+
+
+def page_response(endpoint, page, last_page, page_size=2):
+    items = [{"id": page * page_size + i} for i in range(page_size)]
+    links = []
+    if page < last_page:
+        next_link = f"https://example.com/api/v1/{endpoint}?pageNumber={page + 1}"
+        links.append({"rel": "next", "link": next_link})
+    return json_response({endpoint: items, "_links": links})
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class StreamPrefetchTest(unittest.TestCase):
+    def paged(self, last_page, fetched):
+        def request(method, url, **kwargs):
+            page = len(fetched)
+            fetched.append(threading.current_thread().name)
+            return page_response("documents", page, last_page)
+
+        return request
+
+    @patch("requests.Session.request")
+    def test_prefetch_yields_all_items_in_order(self, mock_request):
+        fetched = []
+        mock_request.side_effect = self.paged(4, fetched)
+        client = ELNClient("https://example.com", "key")
+        ids = [d["id"] for d in client.stream_documents(Pagination(page_size=2), prefetch=2)]
+        self.assertEqual(list(range(10)), ids)
+        self.assertEqual(["rspace-prefetch"] * 5, fetched)
+
+    @patch("requests.Session.request")
+    def test_prefetch_is_bounded(self, mock_request):
+        fetched = []
+        mock_request.side_effect = self.paged(100, fetched)
+        client = ELNClient("https://example.com", "key")
+        stream = client.stream_documents(prefetch=3)
+        next(stream)
+        # the page being consumed, 3 buffered pages and one waiting to be buffered
+        self.assertTrue(wait_for(lambda: len(fetched) == 5))
+        time.sleep(0.1)
+        self.assertEqual(5, len(fetched))
+        stream.close()
+        self.assertTrue(wait_for(lambda: "rspace-prefetch" not in [t.name for t in threading.enumerate()]))
+        self.assertEqual(5, len(fetched))
+
+    @patch("requests.Session.request")
+    def test_prefetch_reraises_errors(self, mock_request):
+        mock_request.side_effect = [
+            page_response("documents", 0, 5),
+            ValueError("boom"),
+        ]
+        client = ELNClient("https://example.com", "key")
+        stream = client.stream_documents(prefetch=2)
+        self.assertEqual([0, 1], [next(stream)["id"], next(stream)["id"]])
+        with self.assertRaisesRegex(ValueError, "boom"):
+            next(stream)
+
+
+class ParallelStreamTest(unittest.TestCase):
+    def listing(self, total_hits, page_size=2, delays=None, totals=None, waits=None):
+        """
+        A fake /samples listing, where 'totals' optionally overrides totalHits per page
+        and 'waits' holds back pages until an event is set
+        """
+        self.requested = []
+
+        def request(method, url, **kwargs):
+            query = parse_qs(urlparse(url).query)
+            page = int(query["pageNumber"][0])
+            self.requested.append((page, query))
+            time.sleep((delays or {}).get(page, 0))
+            if page in (waits or {}):
+                waits[page].wait(5)
+            start = page * page_size
+            items = [{"id": i} for i in range(start, min(start + page_size, total_hits))]
+            body = {
+                "totalHits": (totals or {}).get(page, total_hits),
+                "samples": items,
+                "_links": [],
+            }
+            return json_response(body)
+
+        return request
+
+    @patch("requests.Session.request")
+    def test_ordered(self, mock_request):
+        mock_request.side_effect = self.listing(9, delays={1: 0.05})
+        client = InventoryClient("https://example.com", "key")
+        ids = [s["id"] for s in client.stream_samples(Pagination(page_size=2), parallel=3)]
+        self.assertEqual(list(range(9)), ids)
+        self.assertEqual([0, 1, 2, 3, 4], sorted(p for p, _ in self.requested))
+
+    @patch("requests.Session.request")
+    def test_completion_order(self, mock_request):
+        # page 1 is only answered once the items of page 2 have been yielded
+        page_2_yielded = threading.Event()
+        mock_request.side_effect = self.listing(6, waits={1: page_2_yielded})
+        client = InventoryClient("https://example.com", "key")
+        self.addCleanup(client.close)
+        ids = []
+        stream = client.stream_samples(Pagination(page_size=2), parallel=2, ordered=False)
+        with contextlib.closing(stream):
+            for sample in stream:
+                ids.append(sample["id"])
+                if sample["id"] == 5:
+                    page_2_yielded.set()
+        self.assertEqual([0, 1, 4, 5, 2, 3], ids)
+
+    @patch("requests.Session.request")
+    def test_filters_and_sort_applied_to_every_page(self, mock_request):
+        mock_request.side_effect = self.listing(6)
+        client = InventoryClient("https://example.com", "key")
+        pagination = Pagination(page_size=2, order_by="name")
+        list(client.stream_samples(pagination, parallel=2))
+        for _, query in self.requested:
+            self.assertEqual(["name asc"], query["orderBy"])
+            self.assertEqual(["2"], query["pageSize"])
+
+    @patch("requests.Session.request")
+    def test_drift_detected(self, mock_request):
+        mock_request.side_effect = self.listing(6, totals={2: 7})
+        client = InventoryClient("https://example.com", "key")
+        with self.assertRaises(ClientBase.ListingChangedError):
+            list(client.stream_samples(Pagination(page_size=2), parallel=2))
+
+    @patch("requests.Session.request")
+    def test_without_total_hits_follows_links(self, mock_request):
+        mock_request.side_effect = [page_response("documents", p, 2) for p in range(3)]
+        client = ELNClient("https://example.com", "key")
+        ids = [d["id"] for d in client.stream_documents(parallel=4)]
+        self.assertEqual(list(range(6)), ids)
+
+    def test_pagination_for_page(self):
+        pagination = Pagination(page_number=1, page_size=5, order_by="name")
+        pagination.data["resultType"] = "SAMPLE"
+        other = pagination.for_page(3)
+        self.assertEqual(3, other.page_number)
+        self.assertEqual(1, pagination.page_number)
+        self.assertEqual("SAMPLE", other.data["resultType"])
+        self.assertEqual(3, pagination.page_count(11))
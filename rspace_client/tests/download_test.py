@@ -0,0 +1,484 @@
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+
+import requests
+import urllib3
+from requests.structures import CaseInsensitiveDict
+
+from rspace_client.client_base import ClientBase
+from rspace_client.digests import HashingReader
+from rspace_client.download import (
+    MAX_BUFFER_SIZE,
+    MIN_BUFFER_SIZE,
+    MIN_PART_SIZE,
+    RESUME_SUFFIX,
+    PartialDownload,
+    RangedDownload,
+    copy_response,
+)
+from rspace_client.eln.eln import ELNClient
+from rspace_client.retry import RetryPolicy
+from rspace_client.tests.fake_server import FakeRSpaceServer
+from rspace_client.tests.fake_server_test import FAST_RETRIES, FakeServerTestCase
+
+
+def make_response(raw, headers=None):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.raw = raw
+    return response
+
+
+class CountingReader(io.RawIOBase):
+    """
+    Returns the data in reads as large as the buffer passed, recording their sizes.
+    """
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+        self.reads = []
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self.reads.append(len(buffer))
+        return self._data.readinto(buffer)
+
+
+class ShortWriter(io.RawIOBase):
+    """
+    An unbuffered file writing at most 1000 bytes at a time.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        n = min(len(b), 1000)
+        self.data += bytes(b[:n])
+        return n
+
+
+class CopyResponseTest(unittest.TestCase):
+    def test_buffer_grows_while_reads_fill_it(self):
+        data = os.urandom(3 * MAX_BUFFER_SIZE)
+        reader = CountingReader(data)
+        out = io.BytesIO()
+        result = copy_response(make_response(reader), out)
+        self.assertEqual(data, out.getvalue())
+        self.assertEqual(len(data), result.size)
+        self.assertEqual(MIN_BUFFER_SIZE, reader.reads[0])
+        self.assertEqual(2 * MIN_BUFFER_SIZE, reader.reads[1])
+        self.assertEqual(MAX_BUFFER_SIZE, max(reader.reads))
+        self.assertLess(len(reader.reads), 20)
+
+    def test_buffer_no_larger_than_content_length(self):
+        reader = CountingReader(b"x" * 100)
+        out = io.BytesIO()
+        copy_response(make_response(reader, {"Content-Length": "100"}), out)
+        self.assertEqual(b"x" * 100, out.getvalue())
+        self.assertEqual({101}, set(reader.reads))
+
+    def test_partial_writes(self):
+        data = os.urandom(200_000)
+        out = ShortWriter()
+        copy_response(make_response(io.BytesIO(data)), out)
+        self.assertEqual(data, bytes(out.data))
+
+    def test_encoded_body_is_decoded(self):
+        data = b"some text " * 10_000
+        headers = {"Content-Encoding": "gzip"}
+        raw = urllib3.HTTPResponse(
+            body=io.BytesIO(gzip.compress(data)), headers=headers, preload_content=False
+        )
+        response = make_response(raw, headers)
+        out = io.BytesIO()
+        self.assertEqual(len(data), copy_response(response, out).size)
+        self.assertEqual(data, out.getvalue())
+
+    def test_raw_without_readinto(self):
+        response = make_response(None)
+        response._content = b"abc"
+        response._content_consumed = True
+        out = io.BytesIO()
+        copy_response(response, out)
+        self.assertEqual(b"abc", out.getvalue())
+
+    def test_path_target(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "f.bin")
+            result = copy_response(make_response(io.BytesIO(b"abcdef")), path)
+            with open(path, "rb") as f:
+                self.assertEqual(b"abcdef", f.read())
+        self.assertEqual(6, result.size)
+        self.assertGreater(result.throughput, 0)
+
+
+class DownloadFileTest(FakeServerTestCase):
+    def test_large_file(self):
+        content = self.server.random_bytes(10 * 2**20 + 17)
+        file_id = self.server.add_file(content)["id"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "f.bin")
+            result = self.eln.download_file(file_id, path)
+            with open(path, "rb") as f:
+                self.assertEqual(content, f.read())
+        self.assertEqual(len(content), result.size)
+
+    def test_error_response_is_not_written(self):
+        file_id = self.server.add_file(b"abc")["id"]
+        self.server.fail(404, endpoint="/file$")
+        out = io.BytesIO()
+        with self.assertRaises(ClientBase.ApiError) as context:
+            self.eln.download_file(file_id, out)
+        self.assertEqual(404, context.exception.response_status_code)
+        self.assertEqual(b"", out.getvalue())
+
+
+class ResumeTest(FakeServerTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "f.bin")
+        self.content = self.server.random_bytes(1_000_000)
+        self.file_id = self.server.add_file(self.content)["id"]
+        self.no_retries = ELNClient(
+            self.server.url, self.server.api_key, retry_policy=RetryPolicy.never()
+        )
+
+    def interrupt(self, fraction=0.4):
+        self.server.fail(endpoint="/file$", cut=fraction)
+        with self.assertRaises(ClientBase.ConnectionError):
+            self.no_retries.download_file(self.file_id, self.path, resume=True)
+        self.assertEqual(int(len(self.content) * fraction), os.path.getsize(self.path))
+        self.assertTrue(os.path.exists(self.path + RESUME_SUFFIX))
+
+    def assert_downloaded(self, content):
+        with open(self.path, "rb") as f:
+            self.assertEqual(content, f.read())
+        self.assertFalse(os.path.exists(self.path + RESUME_SUFFIX))
+
+    def test_resumed_by_later_call(self):
+        self.interrupt()
+        result = self.eln.download_file(self.file_id, self.path, resume=True)
+        self.assert_downloaded(self.content)
+        self.assertEqual(400_000, result.offset)
+        self.assertEqual(600_000, result.size)
+
+    def test_resumed_after_lost_connection(self):
+        self.server.fail(endpoint="/file$", cut=0.5, times=2)
+        result = self.eln.download_file(self.file_id, self.path, resume=True)
+        self.assert_downloaded(self.content)
+        self.assertEqual(len(self.content), result.size)
+        self.assertEqual(3, self.server.counts()["GET /files/{id}/file"])
+
+    def test_not_resumed_by_default(self):
+        self.server.fail(endpoint="/file$", cut=0.5)
+        with self.assertRaises(ClientBase.ConnectionError):
+            self.eln.download_file(self.file_id, self.path)
+        self.assertFalse(os.path.exists(self.path + RESUME_SUFFIX))
+
+    def test_changed_content_is_not_spliced(self):
+        self.interrupt()
+        replacement = self.server.random_bytes(len(self.content))
+        self.eln.update_file(io.BytesIO(replacement), self.file_id)
+        result = self.eln.download_file(self.file_id, self.path, resume=True)
+        self.assert_downloaded(replacement)
+        self.assertEqual(0, result.offset)
+
+    def test_partial_file_without_state_is_downloaded_again(self):
+        self.interrupt()
+        os.remove(self.path + RESUME_SUFFIX)
+        result = self.eln.download_file(self.file_id, self.path, resume=True)
+        self.assert_downloaded(self.content)
+        self.assertEqual(len(self.content), result.size)
+
+    def test_state_of_another_url_is_ignored(self):
+        self.interrupt()
+        other_id = self.server.add_file(self.content[::-1])["id"]
+        result = self.eln.download_file(other_id, self.path, resume=True)
+        self.assert_downloaded(self.content[::-1])
+        self.assertEqual(0, result.offset)
+
+    def test_partial_file_resumed_rather_than_downloaded_in_ranges(self):
+        self.interrupt()
+        result = self.eln.download_file(self.file_id, self.path, resume=True, parallel=4)
+        self.assert_downloaded(self.content)
+        self.assertEqual(400_000, result.offset)
+        self.assertEqual(600_000, result.size)
+        self.assertEqual(2, self.server.counts()["GET /files/{id}/file"])
+
+    def test_complete_file_is_not_downloaded_again(self):
+        self.interrupt()
+        with open(self.path, "ab") as f:
+            f.write(self.content[400_000:])
+        result = self.eln.download_file(self.file_id, self.path, resume=True)
+        self.assert_downloaded(self.content)
+        self.assertEqual(0, result.size)
+        self.assertEqual(len(self.content), result.offset)
+
+    def test_export_download_resumed(self):
+        self.server.fail(endpoint="/export/downloads", cut=0.9)
+        path = os.path.join(os.path.dirname(self.path), "export.zip")
+        self.eln.export_and_download("html", "user", path, wait_between_requests=0)
+        job = next(iter(self.server.jobs.values()))
+        with open(path, "rb") as f:
+            self.assertEqual(job["archive"], f.read())
+        downloads = [p for _, p in self.server.requests if "/export/downloads" in p]
+        self.assertEqual(2, len(downloads))
+
+
+class PartialDownloadTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "f.bin")
+        self.url = "https://example.com/api/v1/files/1/file"
+        partial = PartialDownload(self.path, self.url)
+        headers = {"ETag": '"v1"', "Content-Length": "10"}
+        with partial.open(make_response(io.BytesIO(), headers)) as f:
+            f.write(b"01234")
+
+    def partial_response(self, content_range, etag='"v1"'):
+        response = make_response(io.BytesIO(), {"ETag": etag, "Content-Range": content_range})
+        response.status_code = 206
+        return response
+
+    def test_request_headers(self):
+        partial = PartialDownload(self.path, self.url)
+        self.assertEqual({"Range": "bytes=5-", "If-Range": '"v1"'}, partial.request_headers())
+        self.assertEqual({}, PartialDownload(self.path, self.url + "?x=1").request_headers())
+
+    def test_continues(self):
+        partial = PartialDownload(self.path, self.url)
+        self.assertTrue(partial.continues(self.partial_response("bytes 5-9/10")))
+        self.assertFalse(partial.continues(self.partial_response("bytes 4-9/10")))
+        self.assertFalse(partial.continues(self.partial_response("bytes 5-10/11")))
+        self.assertFalse(partial.continues(self.partial_response("bytes 5-9/*")))
+        self.assertFalse(partial.continues(self.partial_response("bytes 5-9/10", '"v2"')))
+        self.assertFalse(partial.continues(self.partial_response("bytes 5-9/10", 'W/"v1"')))
+
+    def test_weak_etag_is_not_a_validator(self):
+        partial = PartialDownload(self.path, self.url)
+        with partial.open(make_response(io.BytesIO(), {"ETag": 'W/"v1"'})) as f:
+            f.write(b"0")
+        self.assertFalse(os.path.exists(self.path + RESUME_SUFFIX))
+        self.assertEqual({}, PartialDownload(self.path, self.url).request_headers())
+
+
+class ParallelDownloadTest(FakeServerTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "f.bin")
+        self.content = self.server.random_bytes(10 * MIN_PART_SIZE + 123)
+        self.file_id = self.server.add_file(self.content)["id"]
+
+    def assert_downloaded(self, content):
+        with open(self.path, "rb") as f:
+            self.assertEqual(content, f.read())
+
+    def downloads(self):
+        return self.server.counts()["GET /files/{id}/file"]
+
+    def test_ranges(self):
+        result = self.eln.download_file(self.file_id, self.path, parallel=3)
+        self.assert_downloaded(self.content)
+        self.assertEqual(len(self.content), result.size)
+        # the first range, then the rest in parts of at least MIN_PART_SIZE
+        self.assertEqual(11, self.downloads())
+
+    def test_small_file(self):
+        file_id = self.server.add_file(b"small")["id"]
+        self.eln.download_file(file_id, self.path, parallel=3)
+        self.assert_downloaded(b"small")
+        self.assertEqual(1, self.downloads())
+
+    def test_empty_file(self):
+        file_id = self.server.add_file(b"")["id"]
+        self.eln.download_file(file_id, self.path, parallel=3)
+        self.assert_downloaded(b"")
+
+    def test_ranges_resumed_after_lost_connection(self):
+        self.server.fail(endpoint="/file$", cut=0.5, times=3, after=1)
+        self.eln.download_file(self.file_id, self.path, parallel=4)
+        self.assert_downloaded(self.content)
+
+    def test_single_stream_without_range_support(self):
+        self.server.ranges = False
+        result = self.eln.download_file(self.file_id, self.path, parallel=4, digests="md5")
+        self.assert_downloaded(self.content)
+        self.assertEqual(len(self.content), result.size)
+        self.assertEqual(hashlib.md5(self.content).hexdigest(), result.digests["md5"])
+        # the response to the request for the first range is the whole file
+        self.assertEqual(1, self.downloads())
+
+    def test_resumable_single_stream_without_range_support(self):
+        self.server.ranges = False
+        self.server.fail(endpoint="/file$", cut=0.5)
+        self.eln.download_file(self.file_id, self.path, parallel=4, resume=True)
+        self.assert_downloaded(self.content)
+        self.assertFalse(os.path.exists(self.path + RESUME_SUFFIX))
+        self.assertEqual(2, self.downloads())
+
+    def test_content_replaced_during_download(self):
+        replacement = self.server.random_bytes(len(self.content))
+        download_file = self.server.download_file
+
+        def replace_after_first_range(request, file_id):
+            response = download_file(request, file_id)
+            record, _ = self.server.files[file_id]
+            self.server.files[file_id] = (dict(record, version=2), replacement)
+            return response
+
+        self.server.download_file = replace_after_first_range
+        self.eln.download_file(self.file_id, self.path, parallel=4)
+        self.assert_downloaded(replacement)
+
+    def test_export_in_parallel(self):
+        server = FakeRSpaceServer(export_size=5 * MIN_PART_SIZE).start()
+        self.addCleanup(server.close)
+        client = ELNClient(server.url, server.api_key, retry_policy=FAST_RETRIES)
+        path = client.export_and_download(
+            "xml", "user", self.path, wait_between_requests=0, parallel=2
+        )
+        with open(path, "rb") as f:
+            self.assertEqual(next(iter(server.jobs.values()))["archive"], f.read())
+        downloads = [p for _, p in server.requests if "/export/downloads/" in p]
+        self.assertEqual(5, len(downloads))
+
+
+class RangedDownloadTest(unittest.TestCase):
+    def test_ranges_cover_the_rest_of_the_file(self):
+        download = RangedDownload("unused", 2)
+        for length, count in [(MIN_PART_SIZE, 0), (3 * MIN_PART_SIZE, 2), (10**9, 8)]:
+            download.length = length
+            ranges = download.ranges()
+            self.assertEqual(count, len(ranges))
+            ends = [MIN_PART_SIZE - 1] + [last for _, last in ranges]
+            self.assertEqual([end + 1 for end in ends[:-1]], [first for first, _ in ranges])
+            self.assertEqual(length - 1, ends[-1])
+
+
+class DigestsTest(FakeServerTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "f.bin")
+        self.content = self.server.random_bytes(3 * MIN_PART_SIZE + 5)
+        self.file_id = self.server.add_file(self.content)["id"]
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def test_download(self):
+        result = self.eln.download_file(self.file_id, self.path, digests=("sha256", "md5"))
+        self.assertEqual(
+            {"sha256": self.sha256, "md5": hashlib.md5(self.content).hexdigest()},
+            result.digests,
+        )
+
+    def test_no_digests_by_default(self):
+        self.assertEqual({}, self.eln.download_file(self.file_id, self.path).digests)
+
+    def test_download_event(self):
+        events = []
+        client = ELNClient(
+            self.server.url, self.server.api_key, event_handlers=[events.append]
+        )
+        client.download_file(self.file_id, self.path, digests="sha256")
+        self.assertEqual([{"sha256": self.sha256}], [e.digests for e in events])
+        self.assertEqual(len(self.content), events[0].bytes_received)
+
+    def test_resumed_download(self):
+        self.server.fail(endpoint="/file$", cut=0.5, times=2)
+        result = self.eln.download_file(
+            self.file_id, self.path, resume=True, digests="sha256"
+        )
+        self.assertEqual({"sha256": self.sha256}, result.digests)
+
+    def test_download_resumed_by_later_call(self):
+        self.server.fail(endpoint="/file$", cut=0.5)
+        no_retries = ELNClient(
+            self.server.url, self.server.api_key, retry_policy=RetryPolicy.never()
+        )
+        with self.assertRaises(ClientBase.ConnectionError):
+            no_retries.download_file(self.file_id, self.path, resume=True)
+        result = self.eln.download_file(
+            self.file_id, self.path, resume=True, digests="sha256"
+        )
+        self.assertLess(result.size, len(self.content))
+        self.assertEqual({"sha256": self.sha256}, result.digests)
+
+    def test_file_complete_on_disk(self):
+        self.server.fail(endpoint="/file$", cut=0.5)
+        no_retries = ELNClient(
+            self.server.url, self.server.api_key, retry_policy=RetryPolicy.never()
+        )
+        with self.assertRaises(ClientBase.ConnectionError):
+            no_retries.download_file(self.file_id, self.path, resume=True)
+        with open(self.path, "ab") as f:
+            f.write(self.content[os.path.getsize(self.path):])
+        result = self.eln.download_file(
+            self.file_id, self.path, resume=True, digests="sha256"
+        )
+        self.assertEqual(0, result.size)
+        self.assertEqual({"sha256": self.sha256}, result.digests)
+
+    def test_parallel_download(self):
+        result = self.eln.download_file(
+            self.file_id, self.path, parallel=3, digests="sha256"
+        )
+        self.assertEqual({"sha256": self.sha256}, result.digests)
+
+    def test_upload(self):
+        content = b"uploaded content" * 1000
+        response = self.eln.upload_file(io.BytesIO(content), digests="sha256")
+        self.assertEqual({"sha256": hashlib.sha256(content).hexdigest()}, response["digests"])
+
+    def test_retried_upload(self):
+        content = b"uploaded content" * 1000
+        self.server.fail(429, endpoint="/files$")
+        policy = RetryPolicy(backoff_factor=0.001, status_methods={429: ("POST",)})
+        client = ELNClient(self.server.url, self.server.api_key, retry_policy=policy)
+        response = client.upload_file(io.BytesIO(content), digests="sha256")
+        self.assertEqual({"sha256": hashlib.sha256(content).hexdigest()}, response["digests"])
+
+    def test_upload_event(self):
+        events = []
+        client = ELNClient(
+            self.server.url, self.server.api_key, event_handlers=[events.append]
+        )
+        client.upload_file(io.BytesIO(b"abc"), digests="md5")
+        self.assertEqual(
+            [{"md5": hashlib.md5(b"abc").hexdigest()}], [e.digests for e in events]
+        )
+
+
+class HashingReaderTest(unittest.TestCase):
+    def test_rewind_starts_digests_over(self):
+        file = io.BytesIO(b"xxabcdef")
+        file.seek(2)
+        reader = HashingReader(file, "sha1")
+        reader.read(3)
+        reader.seek(2)
+        self.assertEqual(b"abcdef", reader.read())
+        self.assertEqual({"sha1": hashlib.sha1(b"abcdef").hexdigest()}, reader.hexdigests())
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            HashingReader(io.BytesIO(), "no-such-digest")
+
+
+if __name__ == "__main__":
+    unittest.main()
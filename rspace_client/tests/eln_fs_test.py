@@ -1,4 +1,5 @@
 from unittest.mock import patch, MagicMock, ANY
+import json
 import unittest
 from rspace_client.eln.fs import (
     path_to_id,
@@ -7,12 +8,26 @@ from rspace_client.eln.fs import (
     classify_media_section,
 )
 from rspace_client.client_base import ClientBase
+from rspace_client.tests.base_test import mock_json_response
 from io import BytesIO
 
 
+def route_by_method(get=None, post=None):
+    """side_effect for a patched requests.Session.request that hands GETs and
+    all other methods to separate mock functions taking (url, ...)."""
+    def request(method, url, *args, **kwargs):
+        handler = get if method == 'GET' else post
+        return handler(url, *args, **kwargs)
+    return request
+
+
+def method_calls(mock_request, method):
+    return [c for c in mock_request.call_args_list if c.args[0] == method]
+
+
 def mock_failed_upload_post(url, *args, **kwargs):
     """A /files upload that the server rejects (e.g. wrong Gallery section)."""
-    mock_response = MagicMock()
+    mock_response = mock_json_response()
     mock_response.status_code = 400
     mock_response.headers = {'Content-Type': 'application/json'}
     mock_response.json.return_value = {
@@ -23,7 +38,7 @@ def mock_failed_upload_post(url, *args, **kwargs):
 
 
 def _ok_file_response(parent_folder_id):
-    mock_response = MagicMock()
+    mock_response = mock_json_response()
     mock_response.status_code = 201
     mock_response.headers = {'Content-Type': 'application/json'}
     mock_response.raise_for_status.return_value = None
@@ -47,7 +62,7 @@ def mock_success_upload_post(url, *args, **kwargs):
     return _ok_file_response(123)
 
 def mock_requests_get(url, *args, **kwargs):
-    mock_response = MagicMock()
+    mock_response = mock_json_response()
     if url.endswith('/folders/tree'):
         mock_response.json.return_value = {
             'records': [
@@ -126,7 +141,7 @@ def mock_requests_get(url, *args, **kwargs):
     return mock_response
 
 def mock_requests_post(url, *args, **kwargs):
-    mock_response = MagicMock()
+    mock_response = mock_json_response()
     mock_response.json.return_value = {
         'id': '456',
         'globalId': 'GF456',
@@ -146,7 +161,7 @@ def mock_requests_post(url, *args, **kwargs):
 
 class ElnFilesystemTest(unittest.TestCase):
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def setUp(self, mock_get) -> None:
         super().setUp()
         self.fs = GalleryFilesystem("https://example.com", "api_key")
@@ -157,84 +172,96 @@ class ElnFilesystemTest(unittest.TestCase):
         self.assertEqual("456", path_to_id("GF123/GF456"))
         self.assertEqual("456", path_to_id("/GF123/GF456"))
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_get_info_folder(self, mock_get):
         folder_info = self.fs.getinfo("GF123")
         self.assertEqual("GF123", folder_info.raw["basic"]["name"])
         self.assertTrue(folder_info.raw["basic"]["is_dir"])
         self.assertEqual(0, folder_info.raw["details"]["size"])
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_get_info_file(self, mock_get):
         file_info = self.fs.getinfo("GL123")
         self.assertEqual("GL123", file_info.raw["basic"]["name"])
         self.assertFalse(file_info.raw["basic"]["is_dir"])
         self.assertEqual(1024, file_info.raw["details"]["size"])
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_listdir_root(self, mock_list_folder_tree):
         result = self.fs.listdir('/')
         expected = ['GF123', 'GL456', 'GF789', 'GL012']
         self.assertEqual(result, expected)
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_listdir_root_specific_folder(self, mock_list_folder_tree):
         expected = ['GF123', 'GL456', 'GF789', 'GL012']
         result = self.fs.listdir('GF123')
         self.assertEqual(result, expected)
 
-    @patch('requests.request', side_effect=mock_requests_post)
-    @patch('requests.get', side_effect=mock_requests_get)
-    def test_makedir(self, mock_get, mock_post):
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get, mock_requests_post))
+    def test_makedir(self, mock_request):
         self.fs.makedir('GF123/newFolder')
-        mock_post.assert_called_once_with(
+        posts = method_calls(mock_request, 'POST')
+        self.assertEqual(1, len(posts))
+        mock_request.assert_any_call(
             'POST',
             'https://example.com/api/v1/folders',
-            json={'name': 'newFolder', 'parentFolderId': 123, 'notebook': False},
-            headers=ANY
+            data=ANY,
+            headers=ANY,
+            timeout=ANY
+        )
+        self.assertEqual(
+            {'name': 'newFolder', 'parentFolderId': 123, 'notebook': False},
+            json.loads(posts[0].kwargs['data'])
         )
 
-    @patch('requests.request', side_effect=mock_requests_post)
-    @patch('requests.get', side_effect=mock_requests_get)
-    def test_removedir(self, mock_get, mock_post):
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get, mock_requests_post))
+    def test_removedir(self, mock_request):
         self.fs.removedir('GF456')
-        mock_post.assert_called_once_with(
+        self.assertEqual(1, len(method_calls(mock_request, 'DELETE')))
+        mock_request.assert_any_call(
             'DELETE',
             'https://example.com/api/v1/folders/456',
-            json=ANY,
-            headers=ANY
+            headers=ANY,
+            timeout=ANY
         )
 
-    @patch('requests.get')
-    def test_download(self, mock_get):
-        mock_response = MagicMock()
+    @patch('requests.Session.request')
+    def test_download(self, mock_request):
+        mock_response = mock_json_response()
+        mock_response.status_code = 200
         mock_response.iter_content = MagicMock(return_value=[b'chunk1', b'chunk2', b'chunk3'])
-        mock_get.return_value = mock_response
+        mock_request.return_value = mock_response
         file_obj = BytesIO()
         self.fs.download('/GL123', file_obj)
         file_obj.seek(0)
         self.assertEqual(file_obj.read(), b'chunk1chunk2chunk3')
-        mock_get.assert_called_once_with(
+        mock_request.assert_called_once_with(
+            'GET',
             'https://example.com/api/v1/files/123/file',
-            headers=ANY
+            stream=True,
+            headers=ANY,
+            timeout=ANY
         )
 
-    @patch('requests.post')
-    def test_upload(self, mock_post):
-        mock_response = MagicMock()
+    @patch('requests.Session.request')
+    def test_upload(self, mock_request):
+        mock_response = mock_json_response()
         mock_response.status_code = 201
         mock_response.headers = {'Content-Type': 'application/json'}
         mock_response.raise_for_status.return_value = None
         # no parentFolderId -> no follow-up folder lookup needed
         mock_response.json.return_value = {'id': '456', 'globalId': 'GL456'}
-        mock_post.return_value = mock_response
+        mock_request.return_value = mock_response
         file_obj = BytesIO(b'test file content')
         self.fs.upload('/GF123', file_obj)
-        mock_post.assert_called_once_with(
+        mock_request.assert_called_once_with(
+            'POST',
             'https://example.com/api/v1/files',
             files={'file': file_obj},
             data={'folderId': 123},
-            headers=ANY
+            headers=ANY,
+            timeout=ANY
         )
 
     def test_classify_media_section(self):
@@ -254,9 +281,8 @@ class ElnFilesystemTest(unittest.TestCase):
         self.assertIsNone(classify_media_section('noextension'))
         self.assertIsNone(classify_media_section(None))
 
-    @patch('requests.get', side_effect=mock_requests_get)
-    @patch('requests.post', side_effect=mock_failed_upload_post)
-    def test_upload_wrong_section_raises_mismatch(self, mock_post, mock_get):
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get, mock_failed_upload_post))
+    def test_upload_wrong_section_raises_mismatch(self, mock_request):
         # Folder GF123 is in the 'Images' section (see mock_requests_get);
         # uploading a PDF there is rejected by the server.
         file_obj = BytesIO(b'%PDF-1.4 fake')
@@ -272,9 +298,8 @@ class ElnFilesystemTest(unittest.TestCase):
         # the original server message is preserved
         self.assertIn('File type not allowed', str(err))
 
-    @patch('requests.get', side_effect=mock_requests_get)
-    @patch('requests.post', side_effect=mock_failed_upload_post)
-    def test_upload_wrong_section_miscellaneous_file(self, mock_post, mock_get):
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get, mock_failed_upload_post))
+    def test_upload_wrong_section_miscellaneous_file(self, mock_request):
         # A .zip has no specialised section; it belongs in Miscellaneous, so
         # uploading it into the Images folder is a mismatch.
         file_obj = BytesIO(b'PK\x03\x04')
@@ -286,8 +311,8 @@ class ElnFilesystemTest(unittest.TestCase):
         self.assertEqual('Miscellaneous', err.file_media_type)
         self.assertIn('Miscellaneous', str(err))
 
-    @patch('requests.post', side_effect=mock_failed_upload_post)
-    def test_upload_no_folder_reraises_original(self, mock_post):
+    @patch('requests.Session.request', side_effect=route_by_method(post=mock_failed_upload_post))
+    def test_upload_no_folder_reraises_original(self, mock_request):
         # With no target folder the server auto-routes; a failure here is not a
         # section mismatch and must surface unchanged.
         file_obj = BytesIO(b'x')
@@ -295,9 +320,8 @@ class ElnFilesystemTest(unittest.TestCase):
             self.fs.upload('', file_obj)
         self.assertNotIsInstance(ctx.exception, GallerySectionMismatch)
 
-    @patch('requests.get', side_effect=mock_requests_get)
-    @patch('requests.post', side_effect=mock_success_upload_post)
-    def test_upload_success_returns_placement(self, mock_post, mock_get):
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get, mock_success_upload_post))
+    def test_upload_success_returns_placement(self, mock_request):
         file_obj = BytesIO(b'x')
         file_obj.name = 'a.pdf'
         placement = self.fs.upload('/GF123', file_obj)
@@ -307,9 +331,8 @@ class ElnFilesystemTest(unittest.TestCase):
         self.assertEqual('GF123', placement.folder_global_id)
         self.assertEqual('/GF123', placement.requested_path)
 
-    @patch('requests.get', side_effect=mock_requests_get)
-    @patch('requests.post', side_effect=mock_reroute_upload_post)
-    def test_upload_reroute_per_call_override(self, mock_post, mock_get):
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get, mock_reroute_upload_post))
+    def test_upload_reroute_per_call_override(self, mock_request):
         # self.fs defaults to "raise"; override to "reroute" on the call.
         file_obj = BytesIO(b'%PDF-1.4 fake')
         file_obj.name = 'data.pdf'
@@ -321,13 +344,13 @@ class ElnFilesystemTest(unittest.TestCase):
         self.assertEqual('/GF123', placement.requested_path)
         self.assertEqual('Gallery/Documents/Api Inbox', placement.path)
         # first attempt targets the folder, retry drops folderId
-        self.assertEqual(2, mock_post.call_count)
-        self.assertEqual({'folderId': 123}, mock_post.call_args_list[0].kwargs['data'])
-        self.assertEqual({}, mock_post.call_args_list[1].kwargs['data'])
+        posts = method_calls(mock_request, 'POST')
+        self.assertEqual(2, len(posts))
+        self.assertEqual({'folderId': 123}, posts[0].kwargs['data'])
+        self.assertEqual({}, posts[1].kwargs['data'])
 
-    @patch('requests.get', side_effect=mock_requests_get)
-    @patch('requests.post', side_effect=mock_reroute_upload_post)
-    def test_upload_reroute_constructor_policy(self, mock_post, mock_get):
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get, mock_reroute_upload_post))
+    def test_upload_reroute_constructor_policy(self, mock_request):
         reroute_fs = GalleryFilesystem('https://example.com', 'api_key', on_mismatch='reroute')
         file_obj = BytesIO(b'%PDF-1.4 fake')
         file_obj.name = 'data.pdf'
@@ -346,7 +369,7 @@ class ElnFilesystemTest(unittest.TestCase):
         self.assertEqual('Gallery', placement.path)
         self.fs.eln_client.upload_file.assert_called_once()
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_invalid_constructor_policy_rejected(self, mock_get):
         with self.assertRaises(ValueError):
             GalleryFilesystem('https://example.com', 'api_key', on_mismatch='bogus')
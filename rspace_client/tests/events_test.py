@@ -0,0 +1,223 @@
+import io
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rspace_client.cache import ResponseCache
+from rspace_client.client_base import Pagination
+from rspace_client.eln.eln import ELNClient
+from rspace_client.events import RequestEvent, _TimedConnectionMixin, endpoint_template
+from rspace_client.retry import RetryPolicy
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.paths.append(self.path)
+        if self.path.startswith("/api/v1/documents/503") and server.failures:
+            server.failures -= 1
+            return self._reply(503, {"message": "busy"})
+        if self.path.startswith("/api/v1/forms/"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._reply(304, None)
+            return self._reply(200, {"id": 1}, {"ETag": '"v1"'})
+        if self.path.startswith("/api/v1/documents?"):
+            page = int(self.path.split("pageNumber=")[1].split("&")[0])
+            body = {"documents": [{"id": page}], "totalHits": 3, "_links": []}
+            if page < 2:
+                next_link = f"{server.url}/api/v1/documents?pageNumber={page + 1}&pageSize=1"
+                body["_links"].append({"rel": "next", "link": next_link})
+            return self._reply(200, body)
+        self._reply(200, {"id": 12, "name": "doc"})
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.server.uploaded = self.rfile.read(length)
+        self._reply(201, {"id": 3})
+
+    def _reply(self, status, body, headers=None):
+        content = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class EventsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.paths = []
+        self.server.failures = 0
+        self.server.url = f"http://localhost:{self.server.server_port}"
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        self.events = []
+        self.client = ELNClient(
+            self.server.url,
+            "key",
+            retry_policy=RetryPolicy(backoff_factor=0.01, jitter=False),
+            event_handlers=[self.events.append],
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_endpoint_template(self):
+        base = "https://example.com/api"
+        self.assertEqual("/documents/{id}", endpoint_template(f"{base}/v1/documents/12"))
+        self.assertEqual(
+            "/samples/{id}/actions/duplicate",
+            endpoint_template(f"{base}/inventory/v1/samples/SA12/actions/duplicate"),
+        )
+        self.assertEqual("/bulk", endpoint_template(f"{base}/inventory/v1/bulk?x=1"))
+        self.assertEqual("/", endpoint_template(f"{base}/v1"))
+
+    def test_event_of_get(self):
+        self.client.get_document(12)
+        self.client.get_document("SD12")
+
+        first, second = self.events
+        self.assertEqual("GET", first.method)
+        self.assertEqual("/documents/{id}", first.endpoint)
+        self.assertEqual("read", first.kind)
+        self.assertEqual("get_document", first.operation)
+        self.assertEqual(200, first.status)
+        self.assertEqual(len(json.dumps({"id": 12, "name": "doc"})), first.bytes_received)
+        self.assertEqual(0, first.bytes_sent)
+        self.assertEqual(0, first.retries)
+        self.assertIsNone(first.cache)
+        self.assertIsNone(first.error)
+        self.assertIsNone(first.dns)
+        self.assertGreater(first.connect, 0)
+        self.assertGreaterEqual(first.ttfb, first.connect)
+        self.assertGreaterEqual(first.total, first.ttfb)
+        # the pooled connection is reused
+        self.assertEqual(0, second.dns)
+        self.assertEqual(0, second.connect)
+
+    def test_retries_are_counted(self):
+        self.server.failures = 2
+        self.client.get_document(503)
+        (event,) = self.events
+        self.assertEqual(200, event.status)
+        self.assertEqual(2, event.retries)
+
+    def test_multipart_upload(self):
+        self.client.upload_file(io.BytesIO(b"x" * 1000), caption="c")
+        (event,) = self.events
+        self.assertEqual("POST", event.method)
+        self.assertEqual("/files", event.endpoint)
+        self.assertEqual("upload", event.kind)
+        self.assertEqual("upload_file", event.operation)
+        self.assertEqual(len(self.server.uploaded), event.bytes_sent)
+        self.assertGreater(event.bytes_sent, 1000)
+
+    def test_download(self):
+        self.client.download_file(4, io.BytesIO())
+        (event,) = self.events
+        self.assertEqual("/files/{id}/file", event.endpoint)
+        self.assertEqual("download", event.kind)
+        self.assertEqual("download_file", event.operation)
+
+    def test_cache_hits_and_misses(self):
+        self.client.response_cache = ResponseCache()
+        self.client.get_form(1)
+        self.client.get_form(1)
+        miss, revalidated = self.events
+        self.assertEqual("miss", miss.cache)
+        self.assertEqual("hit", revalidated.cache)
+        self.assertEqual(304, revalidated.status)
+
+    def test_fresh_cache_hit_has_no_status(self):
+        cache = ResponseCache()
+        cache.get = lambda key: _FreshEntry()
+        self.client.response_cache = cache
+        self.assertEqual({"id": 5}, self.client.get_form(5))
+        (event,) = self.events
+        self.assertEqual("hit", event.cache)
+        self.assertIsNone(event.status)
+        self.assertEqual("get_form", event.operation)
+        self.assertEqual([], self.server.paths)
+
+    def test_connection_error(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.client.retry_policy = RetryPolicy.never()
+        with self.assertRaises(ELNClient.ConnectionError):
+            self.client.get_document(12)
+        (event,) = self.events
+        self.assertIsNone(event.status)
+        self.assertIsNotNone(event.error)
+
+    def test_connections_are_timed_through_public_connect_only(self):
+        # private urllib3 methods such as _new_conn differ between its versions
+        self.assertEqual(
+            {"connect"},
+            {name for name in vars(_TimedConnectionMixin) if not name.startswith("__")},
+        )
+        self.client.get_document(12)
+        (event,) = self.events
+        self.assertIsNone(event.dns)
+        self.assertGreater(event.connect, 0)
+
+    def test_outermost_public_method_is_reported(self):
+        class Client(ELNClient):
+            def get_two(self):
+                return self.get_document(1), self.get_document(2)
+
+        client = Client(self.server.url, "key", event_handlers=[self.events.append])
+        client.get_two()
+        client.close()
+        self.assertEqual(["get_two", "get_two"], [e.operation for e in self.events])
+
+    def test_streams_report_their_method_from_worker_threads(self):
+        for options in [{}, {"prefetch": 2}, {"parallel": 2}]:
+            self.events.clear()
+            documents = list(self.client.stream_documents(Pagination(0, 1), **options))
+            self.assertEqual([0, 1, 2], [d["id"] for d in documents])
+            self.assertEqual(
+                ["stream_documents"] * 3, [e.operation for e in self.events], options
+            )
+
+    def test_failing_handler_does_not_fail_request(self):
+        def fail(event):
+            raise RuntimeError("broken handler")
+
+        self.client.add_event_handler(fail)
+        with self.assertLogs("rspace_client.events", "ERROR"):
+            self.assertEqual("doc", self.client.get_document(12)["name"])
+        self.assertEqual(1, len(self.events))
+        self.client.remove_event_handler(fail)
+        self.client.remove_event_handler(self.events.append)
+        self.client.get_document(12)
+        self.assertEqual(1, len(self.events))
+
+    def test_event_repr(self):
+        event = RequestEvent("GET", "https://x/api/v1/forms/3", "read", status=200)
+        self.assertIn("GET /forms/{id} status=200", repr(event))
+
+
+class _FreshEntry:
+    def is_fresh(self):
+        return True
+
+    def json(self, loads):
+        return {"id": 5}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,1199 @@
+"""
+An in-process stand-in for an RSpace server, for offline tests and load tests of
+the clients.
+
+It serves the endpoints the clients use from in-memory records over real HTTP on
+127.0.0.1, so connection pooling, retries, timeouts, streaming and concurrency
+behave as they do against a live server::
+
+    with FakeRSpaceServer(latency=0.005) as server:
+        server.add_samples(1000)
+        client = InventoryClient(server.url, server.api_key)
+        samples = list(client.stream_samples(parallel=4))
+        print(server.counts())
+
+Implemented are:
+
+- ELN: status, documents, folders and folders/tree, files (upload, download and
+  replace), export jobs with their downloads, and Word import
+- Inventory: samples, subSamples, containers, attachments (files), /bulk
+  (CREATE, UPDATE, DELETE, CHANGE_OWNER and MOVE), listOfMaterials and CSV import
+
+Records have the fields the clients read, not every field of the real API.
+File, attachment and export downloads send an ETag and honour Range requests,
+with If-Range.
+Latency, bandwidth, pagination and failures are configurable, and random choices
+use a seeded generator, so that runs are repeatable.
+"""
+import csv
+import email.parser
+import email.policy
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Mapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from rspace_client.events import endpoint_template
+
+ELN_API = "/api/v1"
+INVENTORY_API = "/api/inventory/v1"
+
+
+class FailureRule:
+    """
+    Makes matching requests fail, see FakeRSpaceServer.fail.
+    """
+
+    def __init__(
+        self, status, method, endpoint, times, probability, retry_after, drop, after, cut
+    ):
+        self.status = status
+        self.method = method.upper() if method else None
+        self.endpoint = re.compile(endpoint) if endpoint else None
+        self.remaining = times
+        self.probability = probability
+        self.retry_after = retry_after
+        self.drop = drop
+        self.after = after
+        self.cut = cut
+        self.matched = 0
+        self.triggered = 0
+
+    def applies(self, method, endpoint, rng) -> bool:
+        if self.method is not None and method != self.method:
+            return False
+        if self.endpoint is not None and not self.endpoint.search(endpoint):
+            return False
+        self.matched += 1
+        if self.matched <= self.after:
+            return False
+        if self.remaining is not None and self.remaining <= 0:
+            return False
+        if self.probability < 1 and rng.random() >= self.probability:
+            return False
+        if self.remaining is not None:
+            self.remaining -= 1
+        self.triggered += 1
+        return True
+
+    def __repr__(self):
+        return (
+            f"FailureRule(status={self.status}, method={self.method}, "
+            f"remaining={self.remaining}, triggered={self.triggered})"
+        )
+
+
+class _Request:
+    def __init__(self, handler, method, body):
+        parts = urlsplit(handler.path)
+        self.method = method
+        # servers collapse repeated slashes, as in /api/v1//documents/1
+        self.path = re.sub("/{2,}", "/", parts.path)
+        self.query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        self.headers = handler.headers
+        self.body = body
+        self.base_url = f"http://{handler.headers.get('Host', 'localhost')}"
+        self.args = ()
+
+    def json(self):
+        return json.loads(self.body) if self.body else {}
+
+    def form(self) -> dict:
+        """
+        multipart/form-data fields: name -> (filename, content bytes)
+        """
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            header + self.body
+        )
+        fields = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        return fields
+
+
+class FakeRSpaceServer:
+    """
+    A fake RSpace server listening on a free port of 127.0.0.1.
+
+    Failures are injected with ``fail()``; every request is recorded in
+    ``requests`` as a (method, path) tuple and counted per endpoint by
+    ``counts()``; ``connections`` counts the TCP connections accepted.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latencies: Mapping[str, float] = None,
+        jitter: float = 0.0,
+        bandwidth: Optional[int] = None,
+        ranges: bool = True,
+        max_page_size: Optional[int] = None,
+        total_hits: bool = True,
+        export_polls: int = 2,
+        export_size: int = 65536,
+        api_key: str = "fake-api-key",
+        seed: int = 0,
+    ):
+        """
+        :param latency: seconds each request takes before it is answered
+        :param latencies: latency per endpoint, overriding 'latency', keyed by
+         method and endpoint template, e.g. {"POST /bulk": 0.2, "GET /samples/{id}": 0.01}
+         or by endpoint template alone
+        :param jitter: latencies vary randomly by up to this fraction, e.g. 0.1 for ±10%
+        :param bandwidth: bytes per second at which file and export downloads are
+         sent over each connection, default is unlimited
+        :param ranges: whether downloads honour Range requests
+        :param max_page_size: largest page size served by listings, whatever the
+         pageSize requested
+        :param total_hits: whether listings report 'totalHits'; without it clients
+         can only follow 'next' links
+        :param export_polls: number of job status requests answered RUNNING before
+         an export job completes
+        :param export_size: size in bytes of export archives
+        :param api_key: the API key clients must send
+        :param seed: seed of the random generator used for jitter, failure
+         probabilities and file contents
+        """
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.ranges = ranges
+        self.max_page_size = max_page_size
+        self.total_hits = total_hits
+        self.export_polls = export_polls
+        self.export_size = export_size
+        self.api_key = api_key
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1001)
+        self._rules = []
+        self.requests = []
+        self.connections = 0
+        self.documents = {}
+        self.folders = {}
+        self.files = {}
+        self.jobs = {}
+        self.samples = {}
+        self.subsamples = {}
+        self.containers = {}
+        self.attachments = {}
+        self.lists_of_materials = {}
+        self._contents = {}
+        self._httpd = None
+        self.home_folder = self._add_folder("Home", None)
+        self.gallery_folder = self._add_folder("Gallery", self.home_folder["id"])
+        self.api_inbox = self._add_folder("Api Inbox", self.home_folder["id"])
+
+    # lifecycle
+
+    def start(self) -> "FakeRSpaceServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.request_queue_size = 128
+        self._httpd.fake = self
+        threading.Thread(
+            target=self._httpd.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        return self
+
+    def close(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    # failures and statistics
+
+    def fail(
+        self,
+        status: int = 503,
+        method: str = None,
+        endpoint: str = None,
+        times: Optional[int] = 1,
+        probability: float = 1.0,
+        retry_after: Optional[float] = None,
+        drop: bool = False,
+        after: int = 0,
+        cut: Optional[float] = None,
+    ) -> FailureRule:
+        """
+        Makes matching requests fail.
+        :param status: HTTP status of the error responses
+        :param method: only fail requests of this method
+        :param endpoint: only fail requests whose endpoint template matches this
+         regular expression, e.g. '^/samples/{id}$' or '/bulk'
+        :param times: number of requests to fail, None for every matching request
+        :param probability: chance that a matching request fails
+        :param retry_after: value of a Retry-After header sent with the errors
+        :param drop: close the connection without responding instead, as a crashed
+         server or proxy would
+        :param after: let this many matching requests succeed first
+        :param cut: answer normally but close the connection after sending this
+         fraction of the body, e.g. 0.9, as a connection lost during a download
+         would; 'status' is not used
+        :return: the rule, whose 'triggered' attribute counts the failed requests
+        """
+        rule = FailureRule(
+            status, method, endpoint, times, probability, retry_after, drop, after, cut
+        )
+        with self._lock:
+            self._rules.append(rule)
+        return rule
+
+    def clear_failures(self):
+        with self._lock:
+            self._rules = []
+
+    def counts(self) -> Counter:
+        """
+        Number of requests received per 'METHOD /endpoint/{id}'.
+        """
+        with self._lock:
+            return Counter(f"{m} {endpoint_template(p)}" for m, p in self.requests)
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = []
+            self.connections = 0
+            for rule in self._rules:
+                rule.matched = rule.triggered = 0
+
+    # data
+
+    def add_documents(self, count: int, name: str = "document") -> list:
+        return [self._add_document({"name": f"{name}-{i}"}) for i in range(count)]
+
+    def add_samples(self, count: int, subsamples: int = 1, name: str = "sample") -> list:
+        return [
+            self._add_sample({"name": f"{name}-{i}", "newSampleSubSamplesCount": subsamples})
+            for i in range(count)
+        ]
+
+    def add_file(self, content: bytes, name: str = "file.bin") -> dict:
+        return self._add_file(name, content, None)
+
+    def random_bytes(self, size: int) -> bytes:
+        with self._lock:
+            return self._random.getrandbits(8 * size).to_bytes(size, "little") if size else b""
+
+    # request handling
+
+    def _handle(self, handler, method: str):
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        request = _Request(handler, method, body)
+        endpoint = endpoint_template(request.path)
+        with self._lock:
+            self.requests.append((method, request.path))
+            rule = next(
+                (r for r in self._rules if r.applies(method, endpoint, self._random)), None
+            )
+            delay = self._delay(method, endpoint)
+        if delay:
+            time.sleep(delay)
+        if rule is not None and rule.cut is None:
+            if rule.drop:
+                handler.close_connection = True
+                return
+            headers = {}
+            if rule.retry_after is not None:
+                headers["Retry-After"] = str(rule.retry_after)
+            return self._write(
+                handler,
+                request,
+                *_error(rule.status, f"Injected failure {rule.status}", headers),
+            )
+        if handler.headers.get("apiKey") != self.api_key:
+            return self._write(handler, request, *_error(401, "Invalid API key"))
+        route = self._route(method, request)
+        if route is None:
+            result = _error(404, f"No endpoint {method} {request.path}")
+        else:
+            with self._lock:
+                result = route(request)
+        self._write(handler, request, *result, cut=rule.cut if rule else None)
+
+    def _delay(self, method, endpoint):
+        delay = self.latencies.get(
+            f"{method} {endpoint}", self.latencies.get(endpoint, self.latency)
+        )
+        if delay and self.jitter:
+            delay *= 1 + self.jitter * (2 * self._random.random() - 1)
+        return delay
+
+    def _route(self, method, request):
+        for route_method, pattern, name in _ROUTES:
+            if route_method != method:
+                continue
+            match = pattern.match(request.path)
+            if match:
+                request.args = tuple(
+                    int(g) if g.isdigit() else g for g in match.groups()
+                )
+                return lambda r: getattr(self, name)(r, *r.args)
+        return None
+
+    def _write(self, handler, request, status, body, headers, cut=None):
+        if isinstance(body, (bytes, bytearray)):
+            content = bytes(body)
+            content_type = headers.pop("Content-Type", "application/octet-stream")
+            if request.method == "GET" and status == 200 and self.ranges:
+                status, content = _byte_range(request, content, headers)
+        elif body is None:
+            content = b""
+            content_type = None
+        else:
+            content = json.dumps(body).encode()
+            content_type = "application/json"
+            if request.method == "GET" and status == 200:
+                etag = '"' + hashlib.md5(content).hexdigest() + '"'
+                headers["ETag"] = etag
+                if request.headers.get("If-None-Match") == etag:
+                    status, content, content_type = 304, b"", None
+        handler.send_response(status)
+        if content_type is not None:
+            handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        if cut is not None:
+            content = content[: int(len(content) * cut)]
+            handler.close_connection = True
+        if content_type == "application/octet-stream" and self.bandwidth:
+            self._send_throttled(handler.wfile, content)
+        else:
+            handler.wfile.write(content)
+
+    def _send_throttled(self, out, content):
+        chunk = max(1, self.bandwidth // 100)
+        for start in range(0, len(content), chunk):
+            try:
+                out.write(content[start:start + chunk])
+            except (BrokenPipeError, ConnectionResetError):
+                # the client stopped reading, e.g. at a deadline
+                return
+            time.sleep(len(content[start:start + chunk]) / self.bandwidth)
+
+    def _listing(self, request, key, records):
+        """
+        A page of a listing, as selected by pageNumber, pageSize and orderBy.
+        """
+        page_number = int(request.query.get("pageNumber", 0))
+        page_size = int(request.query.get("pageSize", 20))
+        if self.max_page_size is not None:
+            page_size = min(page_size, self.max_page_size)
+        records = list(records)
+        order_by = request.query.get("orderBy")
+        if order_by:
+            field, _, direction = order_by.partition(" ")
+            records.sort(key=lambda r: str(r.get(field, "")), reverse=direction == "desc")
+        start = page_number * page_size
+        page = {
+            "pageNumber": page_number,
+            key: [_summary(r) for r in records[start:start + page_size]],
+            "_links": [],
+        }
+        if self.total_hits:
+            page["totalHits"] = len(records)
+        query = dict(request.query, pageSize=page_size)
+        for rel, number in (("prev", page_number - 1), ("next", page_number + 1)):
+            if 0 <= number and number * page_size < len(records):
+                link = f"{request.base_url}{request.path}?{urlencode(dict(query, pageNumber=number))}"
+                page["_links"].append({"rel": rel, "link": link})
+        return _ok(page)
+
+    def _next_id(self):
+        return next(self._ids)
+
+    # ELN
+
+    def get_status(self, request):
+        return _ok({"message": "OK", "rspaceVersion": "fake"})
+
+    def list_documents(self, request):
+        return self._listing(request, "documents", self.documents.values())
+
+    def create_document(self, request):
+        return _ok(self._add_document(request.json()), 201)
+
+    def _add_document(self, data):
+        doc_id = self._next_id()
+        fields = data.get("fields") or [{"content": ""}]
+        tags = data.get("tags")
+        doc = {
+            "id": doc_id,
+            "globalId": f"SD{doc_id}",
+            "name": data.get("name") or "Untitled document",
+            "tags": ",".join(tags) if isinstance(tags, list) else tags,
+            "created": _now(),
+            "lastModified": _now(),
+            "parentFolderId": data.get("parentFolderId", self.api_inbox["id"]),
+            "form": {"id": data.get("form", {}).get("id", 1), "globalId": "FM1"},
+            "fields": [
+                self._new_field(f"Field {i}", field.get("content", ""))
+                for i, field in enumerate(fields)
+            ],
+        }
+        doc["_links"] = [_self_link(f"{ELN_API}/documents/{doc_id}")]
+        self.documents[doc_id] = doc
+        self._contents.setdefault(doc["parentFolderId"], []).append(doc)
+        return doc
+
+    def _new_field(self, name, content):
+        field_id = self._next_id()
+        return {
+            "id": field_id,
+            "globalId": f"FD{field_id}",
+            "name": name,
+            "type": "text",
+            "content": content,
+        }
+
+    def get_document(self, request, doc_id):
+        return self._found(self.documents, doc_id, "document")
+
+    def update_document(self, request, doc_id):
+        doc = self.documents.get(doc_id)
+        if doc is None:
+            return _not_found("document", doc_id)
+        data = request.json()
+        for key in ("name", "tags"):
+            if key in data:
+                doc[key] = data[key]
+        for i, update in enumerate(data.get("fields") or []):
+            field = next(
+                (f for f in doc["fields"] if f["id"] == update.get("id")),
+                doc["fields"][i] if i < len(doc["fields"]) else None,
+            )
+            if field is not None:
+                field["content"] = update.get("content", field["content"])
+        doc["lastModified"] = _now()
+        return _ok(doc)
+
+    def delete_document(self, request, doc_id):
+        doc = self.documents.pop(doc_id, None)
+        if doc is None:
+            return _not_found("document", doc_id)
+        self._contents.get(doc["parentFolderId"], []).remove(doc)
+        return 204, None, {}
+
+    def create_folder(self, request):
+        data = request.json()
+        parent = data.get("parentFolderId", self.home_folder["id"])
+        if parent not in self.folders:
+            return _not_found("folder", parent)
+        return _ok(self._add_folder(data["name"], parent, data.get("notebook", False)), 201)
+
+    def _add_folder(self, name, parent_id, notebook=False):
+        folder_id = self._next_id()
+        folder = {
+            "id": folder_id,
+            "globalId": f"{'NB' if notebook else 'FL'}{folder_id}",
+            "name": name,
+            "notebook": notebook,
+            "type": "NOTEBOOK" if notebook else "FOLDER",
+            "parentFolderId": parent_id,
+            "created": _now(),
+            "lastModified": _now(),
+        }
+        self.folders[folder_id] = folder
+        if parent_id is not None:
+            self._contents.setdefault(parent_id, []).append(folder)
+        return folder
+
+    def get_folder(self, request, folder_id):
+        return self._found(self.folders, folder_id, "folder")
+
+    def delete_folder(self, request, folder_id):
+        folder = self.folders.pop(folder_id, None)
+        if folder is None:
+            return _not_found("folder", folder_id)
+        self._contents.get(folder["parentFolderId"], []).remove(folder)
+        return 204, None, {}
+
+    def list_folder_tree(self, request, folder_id=None):
+        folder_id = self.home_folder["id"] if folder_id is None else folder_id
+        if folder_id not in self.folders:
+            return _not_found("folder", folder_id)
+        records = self._contents.get(folder_id, [])
+        types = request.query.get("typesToInclude")
+        if types:
+            wanted = {t.upper() for t in types.split(",")}
+            records = [r for r in records if r.get("type", "DOCUMENT") in wanted]
+        return self._listing(request, "records", records)
+
+    def list_files(self, request):
+        return self._listing(request, "files", self.files.values())
+
+    def upload_file(self, request):
+        form = request.form()
+        filename, content = form["file"]
+        folder_id = form.get("folderId", (None, None))[1]
+        caption = form.get("caption", (None, None))[1]
+        record = self._add_file(
+            filename or "upload.bin",
+            content,
+            int(folder_id) if folder_id else None,
+            caption.decode() if caption else None,
+        )
+        return _ok(record, 201)
+
+    def _add_file(self, name, content, folder_id, caption=None):
+        file_id = self._next_id()
+        folder_id = folder_id or self.gallery_folder["id"]
+        record = {
+            "id": file_id,
+            "globalId": f"GL{file_id}",
+            "name": name,
+            "caption": caption,
+            "parentFolderId": folder_id,
+            "contentType": "application/octet-stream",
+            "size": len(content),
+            "version": 1,
+            "created": _now(),
+            "type": "MEDIA_FILE",
+            "_links": [
+                {"rel": "enclosure", "link": f"{ELN_API}/files/{file_id}/file"}
+            ],
+        }
+        self.files[file_id] = (record, content)
+        self._contents.setdefault(folder_id, []).append(record)
+        return record
+
+    def get_file(self, request, file_id):
+        if file_id not in self.files:
+            return _not_found("file", file_id)
+        return _ok(self.files[file_id][0])
+
+    def download_file(self, request, file_id):
+        if file_id not in self.files:
+            return _not_found("file", file_id)
+        record, content = self.files[file_id]
+        return 200, content, {"ETag": f'"{file_id}-{record["version"]}"'}
+
+    def replace_file(self, request, file_id):
+        if file_id not in self.files:
+            return _not_found("file", file_id)
+        record, _ = self.files[file_id]
+        filename, content = request.form()["file"]
+        record.update(
+            name=filename or record["name"], size=len(content), version=record["version"] + 1
+        )
+        self.files[file_id] = (record, content)
+        return _ok(record)
+
+    def start_export(self, request, export_format, *scope):
+        job_id = self._next_id()
+        job = {"id": job_id, "status": "STARTING", "percentComplete": 0.0, "polls": 0}
+        job["format"] = export_format
+        self.jobs[job_id] = job
+        return _ok(_job_view(job, request.base_url))
+
+    def get_job(self, request, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return _not_found("job", job_id)
+        job["polls"] += 1
+        if job["polls"] > self.export_polls:
+            job["status"] = "COMPLETED"
+            job["percentComplete"] = 100.0
+        else:
+            job["status"] = "RUNNING"
+            job["percentComplete"] = 100.0 * job["polls"] / (self.export_polls + 1)
+        return _ok(_job_view(job, request.base_url))
+
+    def download_export(self, request, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] != "COMPLETED":
+            return _not_found("export", job_id)
+        if "archive" not in job:
+            job["archive"] = self.random_bytes(self.export_size)
+        return 200, job["archive"], {"ETag": f'"export-{job_id}"'}
+
+    def import_word(self, request):
+        form = request.form()
+        filename, _ = form["file"]
+        folder_id = form.get("folderId", (None, None))[1]
+        data = {"name": (filename or "imported").rsplit(".", 1)[0]}
+        if folder_id:
+            data["parentFolderId"] = int(folder_id)
+        return _ok(self._add_document(data), 201)
+
+    # Inventory
+
+    def list_samples(self, request):
+        return self._listing(request, "samples", self.samples.values())
+
+    def list_subsamples(self, request):
+        return self._listing(request, "subSamples", self.subsamples.values())
+
+    def list_containers(self, request):
+        top_level = [c for c in self.containers.values() if not c["parentContainers"]]
+        return self._listing(request, "containers", top_level)
+
+    def create_sample(self, request):
+        return _ok(self._add_sample(request.json()), 201)
+
+    def _add_sample(self, data):
+        sample_id = self._next_id()
+        sample = self._inventory_record("SAMPLE", "SA", sample_id, data)
+        sample.update(
+            templateId=data.get("templateId"),
+            fields=data.get("fields", []),
+            quantity=data.get("quantity", {"numericValue": 1, "unitId": 3}),
+            expiryDate=data.get("expiryDate"),
+            subSamples=[],
+        )
+        self.samples[sample_id] = sample
+        count = data.get("newSampleSubSamplesCount") or 1
+        for i in range(count):
+            self._add_subsample(sample, {"name": f"{sample['name']}.{i + 1:02d}"})
+        sample["subSamplesCount"] = count
+        return sample
+
+    def _add_subsample(self, sample, data):
+        subsample_id = self._next_id()
+        subsample = self._inventory_record("SUBSAMPLE", "SS", subsample_id, data)
+        subsample["sample"] = {
+            "id": sample["id"],
+            "globalId": sample["globalId"],
+            "name": sample["name"],
+        }
+        subsample["quantity"] = data.get("quantity", sample["quantity"])
+        self.subsamples[subsample_id] = subsample
+        sample["subSamples"].append(_summary(subsample))
+        return subsample
+
+    def _inventory_record(self, record_type, prefix, record_id, data):
+        return {
+            "id": record_id,
+            "globalId": f"{prefix}{record_id}",
+            "type": record_type,
+            "name": data.get("name"),
+            "description": data.get("description"),
+            "tags": data.get("tags", []),
+            "extraFields": [self._new_extra_field(f) for f in data.get("extraFields", [])],
+            "barcodes": data.get("barcodes", []),
+            "owner": {"username": "user1a"},
+            "created": _now(),
+            "lastModified": _now(),
+            "parentContainers": [],
+            "parentLocation": None,
+            "attachments": [],
+            "_links": [],
+        }
+
+    def _new_extra_field(self, field):
+        return dict(field, id=self._next_id(), newFieldRequest=None)
+
+    def get_sample(self, request, sample_id):
+        return self._found(self.samples, sample_id, "sample")
+
+    def get_subsample(self, request, subsample_id):
+        return self._found(self.subsamples, subsample_id, "subsample")
+
+    def get_container(self, request, container_id):
+        container = self.containers.get(container_id)
+        if container is None:
+            return _not_found("container", container_id)
+        if request.query.get("includeContent", "false").lower() == "true":
+            return _ok(dict(container, locations=self._locations(container)))
+        return _ok(container)
+
+    def update_item(self, request, endpoint, item_id):
+        record, error = self._update(_TYPES_BY_ENDPOINT[endpoint], item_id, request.json())
+        return _ok(record) if error is None else (404, error, {})
+
+    def change_owner(self, request, endpoint, item_id):
+        record, error = self._change_owner(
+            _TYPES_BY_ENDPOINT[endpoint], item_id, request.json()
+        )
+        return _ok(record) if error is None else (404, error, {})
+
+    def delete_item(self, request, endpoint, item_id):
+        record, error = self._delete(_TYPES_BY_ENDPOINT[endpoint], item_id)
+        return _ok(record) if error is None else (404, error, {})
+
+    def create_container(self, request):
+        return _ok(self._add_container(request.json()), 201)
+
+    def _add_container(self, data):
+        container_id = self._next_id()
+        container = self._inventory_record("CONTAINER", "IC", container_id, data)
+        container.update(
+            cType=data.get("cType", "LIST"),
+            gridLayout=data.get("gridLayout"),
+            canStoreContainers=data.get("canStoreContainers", True),
+            canStoreSamples=data.get("canStoreSamples", True),
+            locationsImage=None,
+        )
+        self.containers[container_id] = container
+        parents = data.get("parentContainers") or []
+        if parents:
+            self._move(container, {"parentContainers": parents[:1], "parentLocation": data.get("parentLocation")})
+        return container
+
+    def _locations(self, container):
+        items = [
+            r
+            for store in (self.subsamples, self.containers)
+            for r in store.values()
+            if r["parentContainers"] and r["parentContainers"][0]["id"] == container["id"]
+        ]
+        locations = []
+        for i, item in enumerate(items):
+            location = dict(item["parentLocation"] or {}, id=container["id"] * 1000 + i)
+            location["content"] = _summary(item)
+            locations.append(location)
+        return locations
+
+    def _record(self, record_type, record_id):
+        store = {
+            "SAMPLE": self.samples,
+            "SUBSAMPLE": self.subsamples,
+            "CONTAINER": self.containers,
+        }.get(record_type)
+        return None if store is None else store.get(record_id)
+
+    def _update(self, record_type, record_id, data):
+        record = self._record(record_type, record_id)
+        if record is None:
+            return None, _error_body(404, f"{record_type} {record_id} not found")
+        for key, value in data.items():
+            if key in ("id", "type", "globalId"):
+                continue
+            if key == "extraFields":
+                record["extraFields"] = record["extraFields"] + [
+                    self._new_extra_field(f) for f in value
+                ]
+            else:
+                record[key] = value
+        record["lastModified"] = _now()
+        return record, None
+
+    def _change_owner(self, record_type, record_id, data):
+        record = self._record(record_type, record_id)
+        if record is None:
+            return None, _error_body(404, f"{record_type} {record_id} not found")
+        record["owner"] = {"username": data["owner"]["username"]}
+        return record, None
+
+    def _delete(self, record_type, record_id):
+        record = self._record(record_type, record_id)
+        if record is None:
+            return None, _error_body(404, f"{record_type} {record_id} not found")
+        store = self._record_store(record_type)
+        del store[record_id]
+        if record_type == "SAMPLE":
+            for subsample in record["subSamples"]:
+                self.subsamples.pop(subsample["id"], None)
+        return dict(record, deleted=True), None
+
+    def _record_store(self, record_type):
+        return {
+            "SAMPLE": self.samples,
+            "SUBSAMPLE": self.subsamples,
+            "CONTAINER": self.containers,
+        }[record_type]
+
+    def _move(self, record, data):
+        parents = data.get("parentContainers")
+        location = data.get("parentLocation")
+        if parents:
+            target = self.containers.get(parents[0]["id"])
+            if target is None:
+                return _error_body(404, f"container {parents[0]['id']} not found")
+        elif location and "id" in location:
+            target = self.containers.get(location["id"] // 1000)
+            if target is None:
+                return _error_body(404, f"location {location['id']} not found")
+        else:
+            return _error_body(400, "no target container given")
+        record["parentContainers"] = [
+            {"id": target["id"], "globalId": target["globalId"], "name": target["name"]}
+        ]
+        record["parentLocation"] = location
+        record["lastMoveDate"] = _now()
+        return None
+
+    def bulk(self, request):
+        data = request.json()
+        operation = data.get("operationType")
+        results = []
+        for item in data.get("records", []):
+            record, error = self._bulk_one(operation, item)
+            results.append({"record": record, "error": error})
+        errors = sum(1 for r in results if r["error"] is not None)
+        return _ok(
+            {
+                "status": "COMPLETED" if errors == 0 else "FAILED",
+                "successCount": len(results) - errors,
+                "errorCount": errors,
+                "results": results,
+            }
+        )
+
+    def _bulk_one(self, operation, item):
+        record_type = item.get("type", "SAMPLE")
+        if operation == "CREATE":
+            if record_type == "SAMPLE":
+                return self._add_sample(item), None
+            if record_type == "CONTAINER":
+                return self._add_container(item), None
+        elif operation == "UPDATE":
+            return self._update(record_type, item.get("id"), item)
+        elif operation == "CHANGE_OWNER":
+            return self._change_owner(record_type, item.get("id"), item)
+        elif operation == "DELETE":
+            return self._delete(record_type, item.get("id"))
+        elif operation == "MOVE":
+            record = self._record(record_type, item.get("id"))
+            if record is None:
+                return None, _error_body(404, f"{record_type} {item.get('id')} not found")
+            error = self._move(record, item)
+            return (None, error) if error else (record, None)
+        return None, _error_body(400, f"{operation} of {record_type} is not supported")
+
+    def upload_attachment(self, request):
+        form = request.form()
+        filename, content = form["file"]
+        settings = json.loads(form["fileSettings"][1])
+        parent = settings["parentGlobalId"]
+        file_id = self._next_id()
+        record = {
+            "id": file_id,
+            "globalId": f"IF{file_id}",
+            "name": filename or "attachment.bin",
+            "parentGlobalId": parent,
+            "size": len(content),
+            "contentMimeType": "application/octet-stream",
+            "created": _now(),
+            "_links": [
+                {"rel": "enclosure", "link": f"{INVENTORY_API}/files/{file_id}/file"}
+            ],
+        }
+        self.attachments[file_id] = (record, content)
+        owner = self._record(
+            {"SA": "SAMPLE", "SS": "SUBSAMPLE", "IC": "CONTAINER"}.get(parent[:2]),
+            int(parent[2:]),
+        )
+        if owner is not None:
+            owner["attachments"].append(record)
+        return _ok(record, 201)
+
+    def get_attachment(self, request, file_id):
+        if file_id not in self.attachments:
+            return _not_found("attachment", file_id)
+        return _ok(self.attachments[file_id][0])
+
+    def download_attachment(self, request, file_id):
+        if file_id not in self.attachments:
+            return _not_found("attachment", file_id)
+        return 200, self.attachments[file_id][1], {"ETag": f'"{file_id}"'}
+
+    def delete_attachment(self, request, file_id):
+        record, _ = self.attachments.pop(file_id, (None, None))
+        if record is None:
+            return _not_found("attachment", file_id)
+        return _ok(dict(record, deleted=True))
+
+    def create_list_of_materials(self, request):
+        data = request.json()
+        lom_id = self._next_id()
+        materials = []
+        for material in data.get("materials", []):
+            inv_rec = material["invRec"]
+            record = self._record(inv_rec.get("type"), inv_rec["id"])
+            if record is None:
+                return _error(404, f"{inv_rec.get('type')} {inv_rec['id']} not found")
+            materials.append(
+                {"invRec": _summary(record), "usedQuantity": material.get("usedQuantity")}
+            )
+        lom = {
+            "id": lom_id,
+            "name": data.get("name"),
+            "description": data.get("description"),
+            "elnFieldId": data.get("elnFieldId"),
+            "materials": materials,
+        }
+        self.lists_of_materials[lom_id] = lom
+        return _ok(lom, 201)
+
+    def get_list_of_materials(self, request, lom_id):
+        return self._found(self.lists_of_materials, lom_id, "list of materials")
+
+    def update_list_of_materials(self, request, lom_id):
+        lom = self.lists_of_materials.get(lom_id)
+        if lom is None:
+            return _not_found("list of materials", lom_id)
+        data = request.json()
+        for key in ("name", "description"):
+            if key in data:
+                lom[key] = data[key]
+        return _ok(lom)
+
+    def delete_list_of_materials(self, request, lom_id):
+        if self.lists_of_materials.pop(lom_id, None) is None:
+            return _not_found("list of materials", lom_id)
+        return 204, None, {}
+
+    def lists_of_materials_for_field(self, request, field_id):
+        return _ok([l for l in self.lists_of_materials.values() if l["elnFieldId"] == field_id])
+
+    def lists_of_materials_for_document(self, request, doc_id):
+        doc = self.documents.get(doc_id)
+        if doc is None:
+            return _not_found("document", doc_id)
+        field_ids = {f["id"] for f in doc["fields"]}
+        return _ok(
+            [l for l in self.lists_of_materials.values() if l["elnFieldId"] in field_ids]
+        )
+
+    def parse_import_file(self, request):
+        form = request.form()
+        rows = _csv_rows(form["file"][1])
+        columns = list(rows[0].keys()) if rows else []
+        mapping = {c: c.lower() for c in columns}
+        result = {
+            "columnNames": columns,
+            "fieldNameForColumnName": mapping,
+            "fieldMappings": mapping,
+            "columnsWithoutBlankValue": [c for c in columns if all(r[c] for r in rows)],
+            "rowsCount": len(rows),
+        }
+        if form.get("recordType", (None, b""))[1] == b"SAMPLES":
+            result["templateInfo"] = {"name": "Imported samples", "fields": []}
+            result["radioOptionsForColumn"] = {}
+            result["quantityUnitForColumn"] = {}
+        return _ok(result)
+
+    def import_files(self, request):
+        form = request.form()
+        settings = json.loads(form["importSettings"][1])
+        result = {"status": "COMPLETED"}
+        for file_key, settings_key, results_key, create in (
+            ("containersFile", "containerSettings", "containerResults", self._add_container),
+            ("samplesFile", "sampleSettings", "sampleResults", self._add_sample),
+            ("subSamplesFile", "subSampleSettings", "subSampleResults", None),
+        ):
+            if file_key not in form:
+                continue
+            mappings = settings.get(settings_key, {}).get("fieldMappings", {})
+            results = []
+            for row in _csv_rows(form[file_key][1]):
+                data = {mappings[c]: v for c, v in row.items() if mappings.get(c)}
+                if create is None:
+                    sample = self.samples.get(_numeric_id(data.get("parent sample global id")))
+                    if sample is None:
+                        results.append({"record": None, "error": _error_body(400, "no parent sample")})
+                        continue
+                    record = self._add_subsample(sample, data)
+                else:
+                    record = create(data)
+                results.append({"record": _summary(record), "error": None})
+            errors = sum(1 for r in results if r["error"] is not None)
+            result[results_key] = {
+                "status": "COMPLETED" if errors == 0 else "FAILED",
+                "successCount": len(results) - errors,
+                "errorCount": errors,
+                "results": results,
+            }
+            if errors:
+                result["status"] = "FAILED"
+        return _ok(result)
+
+    def _found(self, store, record_id, kind):
+        record = store.get(record_id)
+        return _not_found(kind, record_id) if record is None else _ok(record)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately: without TCP_NODELAY each response
+    # would wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.fake._lock:
+            self.server.fake.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.fake._handle(self, "GET")
+
+    def do_POST(self):
+        self.server.fake._handle(self, "POST")
+
+    def do_PUT(self):
+        self.server.fake._handle(self, "PUT")
+
+    def do_DELETE(self):
+        self.server.fake._handle(self, "DELETE")
+
+
+def _routes(api, routes):
+    return [(method, re.compile(f"^{api}{path}$"), name) for method, path, name in routes]
+
+
+_ITEMS = r"/(samples|subSamples|containers)/(\d+)"
+
+_ROUTES = _routes(
+    ELN_API,
+    [
+        ("GET", "/status", "get_status"),
+        ("GET", "/documents", "list_documents"),
+        ("POST", "/documents", "create_document"),
+        ("GET", r"/documents/(\d+)", "get_document"),
+        ("PUT", r"/documents/(\d+)", "update_document"),
+        ("DELETE", r"/documents/(\d+)", "delete_document"),
+        ("POST", "/folders", "create_folder"),
+        ("GET", "/folders/tree", "list_folder_tree"),
+        ("GET", r"/folders/tree/(\d+)", "list_folder_tree"),
+        ("GET", r"/folders/(\d+)", "get_folder"),
+        ("DELETE", r"/folders/(\d+)", "delete_folder"),
+        ("GET", "/files", "list_files"),
+        ("POST", "/files", "upload_file"),
+        ("GET", r"/files/(\d+)", "get_file"),
+        ("GET", r"/files/(\d+)/file", "download_file"),
+        ("POST", r"/files/(\d+)/file", "replace_file"),
+        ("POST", r"/export/(xml|html)/(selection|user|group)(?:/\d+)?", "start_export"),
+        ("GET", r"/jobs/(\d+)", "get_job"),
+        ("GET", r"/export/downloads/rspace-export-(\d+)\.zip", "download_export"),
+        ("POST", "/import/word", "import_word"),
+    ],
+) + _routes(
+    INVENTORY_API,
+    [
+        ("GET", "/samples", "list_samples"),
+        ("POST", "/samples", "create_sample"),
+        ("GET", r"/samples/(\d+)", "get_sample"),
+        ("GET", "/subSamples", "list_subsamples"),
+        ("GET", r"/subSamples/(\d+)", "get_subsample"),
+        ("GET", "/containers", "list_containers"),
+        ("POST", "/containers", "create_container"),
+        ("GET", r"/containers/(\d+)", "get_container"),
+        ("PUT", _ITEMS, "update_item"),
+        ("PUT", _ITEMS + "/actions/changeOwner", "change_owner"),
+        ("DELETE", _ITEMS, "delete_item"),
+        ("POST", "/bulk", "bulk"),
+        ("POST", "/files", "upload_attachment"),
+        ("GET", r"/files/(\d+)", "get_attachment"),
+        ("GET", r"/files/(\d+)/file", "download_attachment"),
+        ("DELETE", r"/files/(\d+)", "delete_attachment"),
+        ("POST", "/listOfMaterials", "create_list_of_materials"),
+        ("GET", r"/listOfMaterials/(\d+)", "get_list_of_materials"),
+        ("PUT", r"/listOfMaterials/(\d+)", "update_list_of_materials"),
+        ("DELETE", r"/listOfMaterials/(\d+)", "delete_list_of_materials"),
+        ("GET", r"/listOfMaterials/forField/(\d+)", "lists_of_materials_for_field"),
+        ("GET", r"/listOfMaterials/forDocument/(\d+)", "lists_of_materials_for_document"),
+        ("POST", "/import/parseFile", "parse_import_file"),
+        ("POST", "/import/importFiles", "import_files"),
+    ],
+)
+
+_TYPES_BY_ENDPOINT = {"samples": "SAMPLE", "subSamples": "SUBSAMPLE", "containers": "CONTAINER"}
+
+_SUMMARY_KEYS = (
+    "id", "globalId", "name", "type", "created", "lastModified", "tags",
+    "parentFolderId", "notebook", "size", "owner", "parentContainers",
+)
+
+
+def _summary(record):
+    return {k: record[k] for k in _SUMMARY_KEYS if k in record}
+
+
+def _job_view(job, base_url):
+    view = {k: v for k, v in job.items() if k not in ("polls", "archive", "format")}
+    view["result"] = None
+    view["_links"] = []
+    if job["status"] == "COMPLETED":
+        link = f"{base_url}{ELN_API}/export/downloads/rspace-export-{job['id']}.zip"
+        view["_links"].append({"rel": "enclosure", "link": link})
+    return view
+
+
+def _self_link(path):
+    return {"rel": "self", "link": path}
+
+
+def _csv_rows(content: bytes):
+    return list(csv.DictReader(io.StringIO(content.decode("utf-8-sig"))))
+
+
+def _numeric_id(global_id):
+    match = re.match(r"^(?:[A-Z]{2})?(\d+)$", str(global_id or ""))
+    return int(match.group(1)) if match else None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _ok(body, status=200):
+    return status, body, {}
+
+
+def _byte_range(request, content, headers):
+    """
+    Selects the part of a binary body asked for by a Range header, as
+    'bytes=first-', 'bytes=first-last' or 'bytes=-suffix length', unless an
+    If-Range header does not match its ETag.
+    :return: the status and content of the response; Content-Range is added to headers
+    """
+    headers["Accept-Ranges"] = "bytes"
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", request.headers.get("Range", "").strip())
+    if_range = request.headers.get("If-Range")
+    if match is None or match.groups() == ("", ""):
+        return 200, content
+    if if_range is not None and if_range != headers.get("ETag"):
+        return 200, content
+    first, last = match.groups()
+    size = len(content)
+    if not first:
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        headers["Content-Range"] = f"bytes */{size}"
+        return 416, b""
+    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return 206, content[first:last + 1]
+
+
+def _error_body(status, message):
+    return {"status": status, "httpCode": status, "message": message, "errors": [message]}
+
+
+def _error(status, message, headers=None):
+    return status, _error_body(status, message), dict(headers or {})
+
+
+def _not_found(kind, record_id):
+    return _error(404, f"No {kind} with id {record_id}")
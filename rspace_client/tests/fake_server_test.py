@@ -0,0 +1,206 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+
+import requests
+
+from rspace_client.cache import ResponseCache
+from rspace_client.client_base import ClientBase
+from rspace_client.eln.eln import ELNClient
+from rspace_client.inv.inv import InventoryClient
+from rspace_client.retry import RetryPolicy
+from rspace_client.tests.fake_server import FakeRSpaceServer
+
+FAST_RETRIES = RetryPolicy(backoff_factor=0.001, jitter=False)
+
+
+class FakeServerTestCase(unittest.TestCase):
+    server_options = {}
+
+    def setUp(self):
+        self.server = FakeRSpaceServer(**self.server_options).start()
+        self.addCleanup(self.server.close)
+        self.eln = ELNClient(self.server.url, self.server.api_key, retry_policy=FAST_RETRIES)
+        self.inv = InventoryClient(
+            self.server.url, self.server.api_key, retry_policy=FAST_RETRIES
+        )
+
+
+class FakeServerELNTest(FakeServerTestCase):
+    def test_documents(self):
+        doc = self.eln.create_document("doc", tags=["a", "b"], fields=[{"content": "x"}])
+        self.assertEqual("SD{}".format(doc["id"]), doc["globalId"])
+        self.eln.append_content(doc["id"], "<p>more</p>")
+        self.assertEqual("x<p>more</p>", self.eln.get_document(doc["globalId"])["fields"][0]["content"])
+        self.eln.delete_document(doc["id"])
+        with self.assertRaises(ClientBase.ApiError) as ctx:
+            self.eln.get_document(doc["id"])
+        self.assertEqual(404, ctx.exception.response_status_code)
+
+    def test_rejects_wrong_api_key(self):
+        client = ELNClient(self.server.url, "wrong")
+        with self.assertRaises(ClientBase.AuthenticationError):
+            client.get_status()
+
+    def test_folders_and_files(self):
+        folder = self.eln.create_folder("data")
+        uploaded = self.eln.upload_file(io.BytesIO(b"content"), folder["id"], caption="c")
+        tree = self.eln.list_folder_tree(folder["id"])
+        self.assertEqual([uploaded["id"]], [r["id"] for r in tree["records"]])
+        self.eln.update_file(io.BytesIO(b"new content"), uploaded["id"])
+        out = io.BytesIO()
+        self.eln.download_file(uploaded["id"], out)
+        self.assertEqual(b"new content", out.getvalue())
+        names = [r["name"] for r in self.eln.list_folder_tree()["records"]]
+        self.assertIn("Gallery", names)
+
+    def test_export_and_download(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.eln.export_and_download("xml", "user", tmp, wait_between_requests=0)
+            self.assertEqual(self.server.export_size, os.path.getsize(path))
+        self.assertEqual(3, self.server.counts()["GET /jobs/{id}"])
+
+    def test_retries_injected_failures(self):
+        rule = self.server.fail(503, method="GET", endpoint="^/status$", times=2)
+        self.assertEqual("OK", self.eln.get_status()["message"])
+        self.assertEqual(2, rule.triggered)
+        self.assertEqual(3, self.server.counts()["GET /status"])
+
+    def test_retries_dropped_connection(self):
+        self.server.fail(endpoint="^/status$", drop=True)
+        self.assertEqual("OK", self.eln.get_status()["message"])
+
+    def test_error_after_retries(self):
+        self.server.fail(500, endpoint="^/documents$", times=None)
+        with self.assertRaises(ClientBase.ApiError) as ctx:
+            self.eln.get_documents()
+        self.assertEqual(500, ctx.exception.response_status_code)
+
+    def test_latency_per_endpoint(self):
+        self.server.latencies = {"GET /status": 0.2}
+        start = time.monotonic()
+        self.eln.get_status()
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_etag_revalidation(self):
+        client = ELNClient(
+            self.server.url, self.server.api_key, response_cache=ResponseCache()
+        )
+        doc = self.eln.create_document("doc")
+        self.assertEqual(client.get_document(doc["id"]), client.get_document(doc["id"]))
+        url = f"{self.server.url}/api/v1/documents/{doc['id']}"
+        headers = {"apiKey": self.server.api_key}
+        etag = requests.get(url, headers=headers).headers["ETag"]
+        headers["If-None-Match"] = etag
+        self.assertEqual(304, requests.get(url, headers=headers).status_code)
+
+    def test_range_requests(self):
+        content = self.server.random_bytes(1000)
+        file_id = self.server.add_file(content)["id"]
+        url = f"{self.server.url}/api/v1/files/{file_id}/file"
+        headers = {"apiKey": self.server.api_key}
+        etag = requests.get(url, headers=headers).headers["ETag"]
+        response = requests.get(url, headers={**headers, "Range": "bytes=900-", "If-Range": etag})
+        self.assertEqual(206, response.status_code)
+        self.assertEqual("bytes 900-999/1000", response.headers["Content-Range"])
+        self.assertEqual(content[900:], response.content)
+        response = requests.get(url, headers={**headers, "Range": "bytes=-10"})
+        self.assertEqual(content[-10:], response.content)
+        response = requests.get(url, headers={**headers, "Range": "bytes=900-", "If-Range": '"x"'})
+        self.assertEqual((200, content), (response.status_code, response.content))
+        response = requests.get(url, headers={**headers, "Range": "bytes=1000-"})
+        self.assertEqual((416, "bytes */1000"), (response.status_code, response.headers["Content-Range"]))
+
+    def test_cut_download(self):
+        file_id = self.server.add_file(self.server.random_bytes(100_000))["id"]
+        self.server.fail(endpoint="/file$", cut=0.5)
+        with self.assertRaises(ClientBase.ConnectionError):
+            ELNClient(
+                self.server.url, self.server.api_key, retry_policy=RetryPolicy.never()
+            ).download_file(file_id, io.BytesIO())
+
+
+class FakeServerPaginationTest(FakeServerTestCase):
+    server_options = {"max_page_size": 7}
+
+    def test_stream_follows_capped_pages(self):
+        self.server.add_documents(30)
+        docs = list(self.eln.stream_documents())
+        self.assertEqual(30, len({d["id"] for d in docs}))
+        self.assertEqual(5, self.server.counts()["GET /documents"])
+
+    def test_incremental_stream_follows_capped_pages(self):
+        self.server.add_documents(30)
+        docs = list(self.eln.stream_documents(incremental=True))
+        self.assertEqual(30, len({d["id"] for d in docs}))
+        self.assertEqual(5, self.server.counts()["GET /documents"])
+        folder_id = docs[0]["parentFolderId"]
+        records = list(self.eln.stream_folder_tree(folder_id, ["document"]))
+        self.assertEqual({d["id"] for d in docs}, {r["id"] for r in records})
+        with self.assertRaises(ValueError):
+            self.eln.stream_documents(incremental=True, prefetch=2)
+
+    def test_listing_without_total_hits(self):
+        self.server.total_hits = False
+        self.server.add_samples(20)
+        samples = list(self.inv.stream_samples(parallel=4))
+        self.assertEqual(20, len(samples))
+
+
+class FakeServerInventoryTest(FakeServerTestCase):
+    def test_parallel_stream(self):
+        self.server.add_samples(50)
+        samples = list(self.inv.stream_samples(parallel=4))
+        self.assertEqual(50, len({s["id"] for s in samples}))
+        self.assertEqual(5, self.server.counts()["GET /samples"])
+
+    def test_samples(self):
+        sample = self.inv.create_sample("s1", subsample_count=3)
+        self.assertEqual(3, len(sample["subSamples"]))
+        self.inv.rename(sample["globalId"], "renamed")
+        self.assertEqual("renamed", self.inv.get_sample_by_id(sample["id"])["name"])
+        subsample = self.inv.get_subsample_by_id(sample["subSamples"][0]["id"])
+        self.assertEqual(sample["id"], subsample["sample"]["id"])
+
+    def test_batch_and_containers(self):
+        with self.inv.batch(max_records=4) as batch:
+            futures = [batch.create_sample(f"s{i}") for i in range(10)]
+        samples = [f.result() for f in futures]
+        self.assertEqual(3, self.server.counts()["POST /bulk"])
+        container = self.inv.create_list_container("box")
+        subsample_ids = [s["subSamples"][0]["globalId"] for s in samples[:3]]
+        result = self.inv.add_items_to_list_container(container["globalId"], *subsample_ids)
+        self.assertTrue(result.is_ok())
+        content = self.inv.get_container_by_id(container["id"], include_content=True)
+        self.assertEqual(3, len(content["locations"]))
+
+    def test_list_of_materials(self):
+        doc = self.eln.create_document("doc")
+        field_id = doc["fields"][0]["id"]
+        sample = self.inv.create_sample("s1")
+        lom = self.inv.create_list_of_materials(field_id, "lom", sample["globalId"])
+        self.assertEqual(lom, self.inv.get_list_of_materials(lom["id"]))
+        self.assertEqual([lom], self.inv.get_list_of_materials_for_document(doc["id"]))
+
+    def test_attachments(self):
+        sample = self.inv.create_sample("s1")
+        attachment = self.inv.upload_attachment(sample, io.BytesIO(b"data"))
+        self.assertEqual(sample["globalId"], attachment["parentGlobalId"])
+        self.assertEqual(attachment["id"], self.inv.get_attachment_by_id(attachment["id"])["id"])
+
+    def test_csv_import(self):
+        csv_file = io.BytesIO(b"Name,Description\nA,first\nB,second\n")
+        parsed = self.inv.parse_csv_import_file(csv_file, "SAMPLES")
+        self.assertEqual(2, parsed["rowsCount"])
+        csv_file.seek(0)
+        result = self.inv.import_samples_csv(
+            csv_file, {"Name": "name", "Description": "description"}, template_id=1
+        )
+        self.assertEqual("COMPLETED", result["status"])
+        self.assertEqual(2, len(self.server.samples))
+
+
+if __name__ == "__main__":
+    unittest.main()
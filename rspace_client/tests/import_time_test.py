@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+
+def modules_loaded_by(statement, candidates):
+    """
+    The modules among 'candidates' that 'statement' loads in a new interpreter.
+    """
+    probe = (
+        f"import json, sys\n{statement}\n"
+        f"print(json.dumps([m for m in {candidates!r} if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+class ImportTimeTest(unittest.TestCase):
+    """
+    Guards the lazy imports of the package: see benchmarks/import_time.py for timings.
+    """
+
+    HEAVY = ["requests", "asyncio", "bs4", "fs", "httpx", "rspace_client.inv.inv"]
+
+    def test_package_import_loads_no_dependencies(self):
+        self.assertEqual([], modules_loaded_by("import rspace_client", self.HEAVY))
+
+    def test_eln_client_loads_only_requests(self):
+        self.assertEqual(
+            ["requests"], modules_loaded_by("from rspace_client import ELNClient", self.HEAVY)
+        )
+
+    def test_inventory_client_does_not_load_bs4(self):
+        self.assertEqual(
+            ["requests", "rspace_client.inv.inv"],
+            modules_loaded_by("from rspace_client import InventoryClient", self.HEAVY),
+        )
+
+    def test_lazy_names_and_submodules(self):
+        import rspace_client
+        import rspace_client.eln as eln
+
+        for name in rspace_client.__all__:
+            self.assertIsNotNone(getattr(rspace_client, name), name)
+        self.assertIn("ELNClient", dir(rspace_client))
+        self.assertIs(rspace_client.FieldContent, eln.field_content.FieldContent)
+        self.assertTrue(callable(rspace_client.utils.createInventoryClient))
+        with self.assertRaises(AttributeError):
+            rspace_client.no_such_name
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,9 +4,10 @@ from io import BytesIO
 from rspace_client.inv.attachment_fs import InventoryAttachmentFilesystem
 import json
 from rspace_client.tests import base_test
+from rspace_client.tests.base_test import mock_json_response
 
 def mock_requests_get(url, *args, **kwargs):
-    mock_response = MagicMock()
+    mock_response = mock_json_response()
     if url.endswith('/files/123'):
         mock_response.json.return_value = {
             'id': 32768,
@@ -49,75 +50,91 @@ def mock_requests_get(url, *args, **kwargs):
     mock_response.headers = {'Content-Type': 'application/json'}
     return mock_response
 
+def route_by_method(get=None, other=None):
+    """side_effect for a patched requests.Session.request that hands GETs and
+    all other methods to separate mock functions taking (url, ...)."""
+    def request(method, url, *args, **kwargs):
+        handler = get if method == 'GET' else other
+        return handler(url, *args, **kwargs)
+    return request
+
 def mock_requests(url, *args, **kwargs):
-    mock_response = MagicMock()
+    mock_response = mock_json_response()
     mock_response.json.return_value = {}
     mock_response.headers = {'Content-Type': 'application/json'}
     return mock_response
 
 class InvAttachmentFilesystemTest(unittest.TestCase):
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def setUp(self, mock_get) -> None:
         super().setUp()
         self.fs = InventoryAttachmentFilesystem("https://example.com", "api_key")
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_get_info_folder(self, mock_get):
         folder_info = self.fs.getinfo("IF123")
         self.assertEqual("IF123", folder_info.raw["basic"]["name"])
         self.assertFalse(folder_info.raw["basic"]["is_dir"])
         self.assertEqual(40721, folder_info.raw["details"]["size"])
 
-    @patch('requests.request', side_effect=mock_requests)
+    @patch('requests.Session.request', side_effect=route_by_method(other=mock_requests))
     def test_remove(self, mock_request):
         self.fs.remove("IF123")
-        mock_request.assert_called_with('DELETE', 'https://example.com/api/inventory/v1/files/123', json=None, headers=ANY)
+        mock_request.assert_called_with('DELETE', 'https://example.com/api/inventory/v1/files/123', headers=ANY, timeout=ANY)
 
-    @patch('requests.get')
-    def test_download(self, mock_get):
-        mock_response = MagicMock()
+    @patch('requests.Session.request')
+    def test_download(self, mock_request):
+        mock_response = mock_json_response()
+        mock_response.status_code = 200
         mock_response.iter_content = MagicMock(return_value=[b'chunk1', b'chunk2', b'chunk3'])
-        mock_get.return_value = mock_response
+        mock_request.return_value = mock_response
         file_obj = BytesIO()
         self.fs.download('/IF123', file_obj)
         file_obj.seek(0)
         self.assertEqual(file_obj.read(), b'chunk1chunk2chunk3')
-        mock_get.assert_called_once_with(
+        mock_request.assert_called_once_with(
+            'GET',
             'https://example.com/api/inventory/v1/files/123/file',
-            headers=ANY
+            stream=True,
+            headers=ANY,
+            timeout=ANY
         )
 
-    @patch('requests.post')
-    def test_upload(self, mock_post):
-        mock_response = MagicMock()
+    @patch('requests.Session.request')
+    def test_upload(self, mock_request):
+        mock_response = mock_json_response()
         mock_response.json.return_value = {'id': '456'}
-        mock_post.return_value = mock_response
+        mock_request.return_value = mock_response
         file_obj = BytesIO(b'test file content')
         self.fs.upload('/SS123', file_obj)
-        mock_post.assert_called_once_with(
+        mock_request.assert_called_once_with(
+            'POST',
             'https://example.com/api/inventory/v1/files',
-            data={'fileSettings': '{"parentGlobalId": "SS123"}'},
+            data={'fileSettings': ANY},
             files={'file': file_obj},
-            headers=ANY
+            headers=ANY,
+            timeout=ANY
         )
+        file_settings = mock_request.call_args.kwargs['data']['fileSettings']
+        self.assertEqual({"parentGlobalId": "SS123"}, json.loads(file_settings))
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_listdir_container(self, mock_get):
         result = self.fs.listdir('/IC123')
         self.assertEqual(result, ['IF32772'])
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_listdir_sample(self, mock_get):
         result = self.fs.listdir('/SA123')
         self.assertEqual(result, ['IF32772'])
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_listdir_subsample(self, mock_get):
         result = self.fs.listdir('/SS123')
         self.assertEqual(result, ['IF32772'])
 
-    @patch('requests.get', side_effect=mock_requests_get)
+    @patch('requests.Session.request', side_effect=route_by_method(mock_requests_get))
     def test_listdir_sample_template(self, mock_get):
         result = self.fs.listdir('/IT123')
         self.assertEqual(result, ['IF32772'])
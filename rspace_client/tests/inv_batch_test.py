@@ -0,0 +1,157 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from rspace_client.client_base import ClientBase
+from rspace_client.inv.inv import ExtraField, InventoryClient
+from rspace_client.tests.base_test import mock_json_response
+
+
+def bulk_server(posts, fail_names=()):
+    """
+    A fake /bulk endpoint recording posted bodies, echoing each record back with
+    an id, or an error if its name is in fail_names.
+    """
+
+    def request(method, url, **kwargs):
+        body = json.loads(kwargs["data"])
+        posts.append(body)
+        results = []
+        for i, record in enumerate(body["records"]):
+            if record.get("name") in fail_names:
+                results.append({"record": None, "error": {"message": "bad name", "errors": ["x"]}})
+            else:
+                results.append({"record": {"id": 100 + i, **record}, "error": None})
+        response = mock_json_response()
+        response.status_code = 200
+        response.headers = {"Content-Type": "application/json"}
+        response.json.return_value = {"status": "COMPLETED", "results": results}
+        return response
+
+    return request
+
+
+class InventoryBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client = InventoryClient("https://example.com", "key")
+        self.posts = []
+
+    @patch("requests.Session.request")
+    def test_operations_are_grouped_by_type(self, mock_request):
+        mock_request.side_effect = bulk_server(self.posts)
+        with self.client.batch() as b:
+            created = b.create_sample("s1")
+            renamed = b.rename("SA1", "new name")
+            fields = b.add_extra_fields("SA1", ExtraField("f", content="v"))
+            other = b.rename("SS2", "ss")
+            owner = b.transfer_sample_owner(3, "bob")
+            deleted = b.delete_sample("SA4")
+            moved = b.add_items_to_list_container("IC5", "SS6", "IC7")
+            self.assertEqual(0, mock_request.call_count)
+            self.assertEqual(7, len(b))  # the two updates of SA1 are merged
+
+        self.assertEqual(
+            ["CREATE", "UPDATE", "CHANGE_OWNER", "DELETE", "MOVE"],
+            [p["operationType"] for p in self.posts],
+        )
+        update = self.posts[1]["records"]
+        self.assertEqual(2, len(update))
+        self.assertEqual({"id": 1, "type": "SAMPLE"}, {k: update[0][k] for k in ("id", "type")})
+        self.assertEqual("new name", update[0]["name"])
+        self.assertEqual("f", update[0]["extraFields"][0]["name"])
+        self.assertEqual(
+            [{"id": 3, "type": "SAMPLE", "owner": {"username": "bob"}}],
+            self.posts[2]["records"],
+        )
+        self.assertEqual([{"id": 4, "type": "SAMPLE"}], self.posts[3]["records"])
+        self.assertEqual(
+            [{"id": 6, "type": "SUBSAMPLE", "parentContainers": [{"id": 5}]},
+             {"id": 7, "type": "CONTAINER", "parentContainers": [{"id": 5}]}],
+            self.posts[4]["records"],
+        )
+        self.assertEqual("s1", created.result()["name"])
+        self.assertIs(renamed.result(), fields.result())
+        self.assertEqual("ss", other.result()["name"])
+        self.assertEqual({"username": "bob"}, owner.result()["owner"])
+        self.assertEqual(4, deleted.result()["id"])
+        self.assertEqual([6, 7], [m.result()["id"] for m in moved])
+
+    @patch("requests.Session.request")
+    def test_requests_are_split_and_flushed_when_full(self, mock_request):
+        mock_request.side_effect = bulk_server(self.posts)
+        with self.client.batch(max_records=2) as b:
+            futures = [b.rename(f"SA{i}", f"n{i}") for i in range(5)]
+            self.assertEqual(2, mock_request.call_count)
+        self.assertEqual([2, 2, 1], [len(p["records"]) for p in self.posts])
+        self.assertEqual([f"n{i}" for i in range(5)], [f.result()["name"] for f in futures])
+
+    @patch("requests.Session.request")
+    def test_per_record_errors(self, mock_request):
+        mock_request.side_effect = bulk_server(self.posts, fail_names=["bad"])
+        with self.client.batch() as b:
+            good = b.create_sample("good")
+            bad = b.create_sample("bad")
+        self.assertEqual("good", good.result()["name"])
+        with self.assertRaises(ClientBase.ApiError) as cm:
+            bad.result()
+        self.assertIn("bad name", str(cm.exception))
+
+    @patch("requests.Session.request")
+    def test_failed_request_fails_its_futures(self, mock_request):
+        mock_request.side_effect = ConnectionError("down")
+        b = self.client.batch()
+        future = b.rename("SA1", "x")
+        with self.assertRaises(ConnectionError):
+            b.flush()
+        self.assertIsInstance(future.exception(), ConnectionError)
+
+    @patch("requests.Session.request")
+    def test_exception_in_block_discards_queue(self, mock_request):
+        with self.assertRaises(RuntimeError):
+            with self.client.batch() as b:
+                future = b.rename("SA1", "x")
+                raise RuntimeError()
+        self.assertTrue(future.cancelled())
+        mock_request.assert_not_called()
+
+    def test_invalid_arguments(self):
+        b = self.client.batch()
+        self.assertRaises(ValueError, self.client.batch, 101)
+        self.assertRaises(ValueError, b.create_sample, "s", attachments=[object()])
+        self.assertRaises(ValueError, b.add_items_to_list_container, "IC1", "SA2")
+
+
+class AsyncInventoryBatchTest(unittest.TestCase):
+    def test_async_batch(self):
+        import asyncio
+
+        httpx = __import__("pytest").importorskip("httpx")
+        from rspace_client.inv.async_inv import AsyncInventoryClient
+
+        posts = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            posts.append(body)
+            results = [{"record": {"id": 1, **r}, "error": None} for r in body["records"]]
+            return httpx.Response(200, json={"status": "COMPLETED", "results": results})
+
+        async def go():
+            client = AsyncInventoryClient("https://example.com", "key")
+            client.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            with self.assertRaises(TypeError):
+                with client.batch():
+                    pass
+            async with client.batch(max_records=2) as b:
+                futures = [b.rename(f"SA{i}", f"n{i}") for i in range(3)]
+                created = b.create_sample("s")
+            return futures, created
+
+        futures, created = asyncio.run(go())
+        self.assertEqual(["UPDATE", "UPDATE", "CREATE"], [p["operationType"] for p in posts])
+        self.assertEqual(["n0", "n1", "n2"], [f.result()["name"] for f in futures])
+        self.assertEqual("s", created.result()["name"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import json
+import sys
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+from rspace_client.inv.inv import InventoryClient, SamplePost
+from rspace_client.json_codec import JsonCodec, OrjsonCodec, default_codec
+from rspace_client.tests.base_test import mock_json_response
+
+
+class RecordingCodec(JsonCodec):
+    def __init__(self):
+        self.calls = []
+
+    def dumps(self, obj):
+        self.calls.append("dumps")
+        return super().dumps(obj)
+
+    def loads(self, data):
+        self.calls.append("loads")
+        return super().loads(data)
+
+
+class JsonCodecTest(unittest.TestCase):
+    def test_round_trip(self):
+        codec = JsonCodec()
+        obj = {"name": "é", "values": [1, 2.5, None, True]}
+        self.assertEqual(obj, codec.loads(codec.dumps(obj)))
+        self.assertEqual(obj, codec.loads(codec.dumps(obj).decode()))
+
+    def test_nan_rejected_as_by_requests(self):
+        with self.assertRaises(ValueError):
+            JsonCodec().dumps({"x": float("nan")})
+
+    def test_default_codec_without_orjson(self):
+        with patch.dict(sys.modules, {"orjson": None}):
+            self.assertIs(JsonCodec, type(default_codec()))
+            with self.assertRaises(ImportError):
+                OrjsonCodec()
+
+
+class OrjsonCodecTest(unittest.TestCase):
+    def setUp(self):
+        pytest.importorskip("orjson")
+        self.codec = OrjsonCodec()
+
+    def test_default_codec(self):
+        self.assertIsInstance(default_codec(), OrjsonCodec)
+
+    def test_compatible_with_stdlib(self):
+        obj = {"name": "é ☃", 1: [1, 2.5, None, True], "nested": {"a": []}}
+        self.assertEqual(json.loads(json.dumps(obj)), self.codec.loads(self.codec.dumps(obj)))
+
+    def test_falls_back_for_big_integers(self):
+        big = {"n": 2 ** 70}
+        self.assertEqual(big, self.codec.loads(self.codec.dumps(big)))
+
+
+class ClientCodecTest(unittest.TestCase):
+    @patch("requests.Session.request")
+    def test_codec_used_for_bulk_requests_and_responses(self, mock_request):
+        response = mock_json_response()
+        response.status_code = 200
+        response.headers = {"Content-Type": "application/json"}
+        response.json.return_value = {"status": "COMPLETED", "results": []}
+        mock_request.return_value = response
+        codec = RecordingCodec()
+        client = InventoryClient("https://example.com", "key", json_codec=codec)
+        client.bulk_create_sample(SamplePost("s1"))
+        self.assertEqual(["dumps", "loads"], codec.calls)
+        kwargs = mock_request.call_args.kwargs
+        self.assertEqual("application/json", kwargs["headers"]["Content-Type"])
+        self.assertEqual("CREATE", json.loads(kwargs["data"])["operationType"])
+
+    @patch("requests.Session.request")
+    def test_codec_used_for_import_settings(self, mock_request):
+        response = mock_json_response()
+        response.headers = {"Content-Type": "application/json"}
+        response.json.return_value = {"status": "COMPLETED"}
+        mock_request.return_value = response
+        codec = RecordingCodec()
+        client = InventoryClient("https://example.com", "key", json_codec=codec)
+        settings = {"containerSettings": {"fieldMappings": {"Name": "name"}}}
+        client.import_csv_files(settings, containers_file=io.BytesIO(b"Name\nbox"))
+        self.assertEqual(["dumps", "loads"], codec.calls)
+        import_settings = mock_request.call_args.kwargs["data"]["importSettings"]
+        self.assertEqual(settings, json.loads(import_settings))
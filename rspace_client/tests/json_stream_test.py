@@ -0,0 +1,143 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from rspace_client.client_base import ClientBase
+from rspace_client.eln.eln import ELNClient
+from rspace_client.inv.inv import InventoryClient
+from rspace_client.json_stream import JsonArrayParser
+
+CONTAINER = {
+    "id": 1,
+    "name": 'freezer "A" \\ é',
+    "extraFields": [{"name": "x", "content": "]}["}],
+    "locations": [
+        {"id": 10, "content": {"name": "s1", "tags": ["a", "b"]}},
+        {"id": 11, "content": None},
+        12345,
+        "text",
+        [],
+        {},
+    ],
+    "_links": [{"rel": "self", "link": "https://example.com"}],
+}
+
+
+def parse_in_chunks(text: bytes, key, chunk_size):
+    parser = JsonArrayParser(key)
+    items = []
+    for i in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[i : i + chunk_size]))
+    items.extend(parser.close())
+    return items
+
+
+def streamed_response(body, status_code=200):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response.headers["Content-Type"] = "application/json"
+    response.raw = io.BytesIO(json.dumps(body).encode())
+    return response
+
+
+class JsonArrayParserTest(unittest.TestCase):
+    def test_any_chunking(self):
+        for indent in (None, 2):
+            text = json.dumps(CONTAINER, indent=indent, ensure_ascii=False).encode()
+            for chunk_size in (1, 2, 5, 64, len(text)):
+                self.assertEqual(
+                    CONTAINER["locations"], parse_in_chunks(text, "locations", chunk_size)
+                )
+
+    def test_elements_yielded_as_they_complete(self):
+        parser = JsonArrayParser("samples")
+        self.assertEqual([{"id": 1}], parser.feed(b'{"totalHits": 3, "samples": [{"id": 1}, {"i'))
+        self.assertEqual([{"id": 2}], parser.feed(b'd": 2}, 3'))
+        self.assertEqual([3], parser.feed(b"]}"))
+        self.assertEqual([], parser.close())
+
+    def test_empty_array(self):
+        self.assertEqual([], parse_in_chunks(b'{"records": []}', "records", 3))
+
+    def test_missing_key(self):
+        with self.assertRaises(KeyError):
+            parse_in_chunks(json.dumps(CONTAINER).encode(), "records", 10)
+
+    def test_incomplete_document(self):
+        with self.assertRaises(ValueError):
+            parse_in_chunks(json.dumps(CONTAINER).encode()[:-10], "locations", 10)
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            parse_in_chunks(b'{"locations": 3}', "locations", 10)
+
+    def test_buffer_stays_small(self):
+        skipped = "x" * 500000
+        samples = [{"id": i, "name": "n" * 100} for i in range(5000)]
+        text = json.dumps({"big": skipped, "samples": samples}).encode()
+        parser = JsonArrayParser("samples")
+        count = 0
+        for i in range(0, len(text), 4096):
+            count += len(parser.feed(text[i : i + 4096]))
+            self.assertLess(len(parser._buf), 200000)
+        count += len(parser.close())
+        self.assertEqual(5000, count)
+
+    def test_kept_values(self):
+        text = json.dumps({**CONTAINER, "big": "x" * 100000}).encode()
+        for chunk_size in (1, 7, 4096, len(text)):
+            parser = JsonArrayParser("locations", keep=("_links", "name", "missing"))
+            items = []
+            for i in range(0, len(text), chunk_size):
+                items.extend(parser.feed(text[i : i + chunk_size]))
+            items.extend(parser.close())
+            self.assertEqual(CONTAINER["locations"], items)
+            self.assertEqual(
+                {"_links": CONTAINER["_links"], "name": CONTAINER["name"]}, parser.values
+            )
+
+
+class StreamApiArrayTest(unittest.TestCase):
+    @patch("requests.Session.request")
+    def test_stream_container_locations(self, mock_request):
+        mock_request.return_value = streamed_response(CONTAINER)
+        client = InventoryClient("https://example.com", "key")
+        locations = list(client.stream_container_locations("IC1"))
+        self.assertEqual(CONTAINER["locations"], locations)
+        args, kwargs = mock_request.call_args
+        self.assertEqual("https://example.com/api/inventory/v1/containers/1", args[1])
+        self.assertEqual({"includeContent": "true"}, kwargs["params"])
+        self.assertTrue(kwargs["stream"])
+
+    @patch("requests.Session.request")
+    def test_stream_folder_tree_follows_next_links(self, mock_request):
+        next_url = "https://example.com/api/v1/folders/tree/5?pageNumber=1"
+        mock_request.side_effect = [
+            streamed_response(
+                {"records": [{"id": 1}, {"id": 2}], "_links": [{"rel": "next", "link": next_url}]}
+            ),
+            streamed_response({"_links": [], "records": [{"id": 3}]}),
+        ]
+        client = ELNClient("https://example.com", "key")
+        records = list(client.stream_folder_tree(5, typesToInclude=["document"]))
+        self.assertEqual([1, 2, 3], [r["id"] for r in records])
+        (first_args, first), (next_args, second) = mock_request.call_args_list
+        self.assertEqual("https://example.com/api/v1/folders/tree/5", first_args[1])
+        self.assertEqual({"typesToInclude": "document"}, first["params"])
+        self.assertEqual(next_url, next_args[1])
+        self.assertTrue(second["stream"])
+
+    def test_stream_folder_tree_checks_types(self):
+        with self.assertRaises(ValueError):
+            ELNClient("https://example.com", "key").stream_folder_tree(typesToInclude=["x"])
+
+    @patch("requests.Session.request")
+    def test_error_response(self, mock_request):
+        mock_request.return_value = streamed_response({"message": "Not found"}, 404)
+        client = InventoryClient("https://example.com", "key")
+        with self.assertRaises(ClientBase.ApiError) as ctx:
+            list(client.stream_api_array("/containers/1", "locations"))
+        self.assertEqual(404, ctx.exception.response_status_code)
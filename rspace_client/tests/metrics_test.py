@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from rspace_client.eln.eln import ELNClient
+from rspace_client.events import RequestEvent
+from rspace_client.metrics import MetricsRegistry
+from rspace_client.tests.base_test import mock_json_response
+
+API = "https://example.com/api/inventory/v1"
+
+
+def event(url, total, method="GET", status=200, **kwargs):
+    return RequestEvent(method, url, "read", status=status, total=total, **kwargs)
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry(buckets=[0.1, 1.0])
+
+    def test_histogram_per_endpoint(self):
+        self.metrics(event(f"{API}/samples/SA1", 0.05))
+        self.metrics(event(f"{API}/samples/2", 0.5))
+        self.metrics(event(f"{API}/samples/3", 5.0))
+        self.metrics(event(f"{API}/bulk", 0.1, method="POST"))
+
+        text = self.metrics.to_prometheus()
+        self.assertIn("# TYPE rspace_client_request_duration_seconds histogram", text)
+        labels = 'method="GET",endpoint="/samples/{id}"'
+        for line in [
+            f'rspace_client_request_duration_seconds_bucket{{{labels},le="0.1"}} 1',
+            f'rspace_client_request_duration_seconds_bucket{{{labels},le="1.0"}} 2',
+            f'rspace_client_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3',
+            f"rspace_client_request_duration_seconds_sum{{{labels}}} 5.55",
+            f"rspace_client_request_duration_seconds_count{{{labels}}} 3",
+            'rspace_client_request_duration_seconds_bucket{method="POST",endpoint="/bulk",le="0.1"} 1',
+            f'rspace_client_requests_total{{{labels},status="200"}} 3',
+        ]:
+            self.assertIn(line + "\n", text)
+
+    def test_errors_retries_and_bytes(self):
+        self.metrics(event(f"{API}/files", 0.2, "POST", 500, retries=2, bytes_sent=100))
+        self.metrics(
+            event(f"{API}/files", 0.2, "POST", None, error=ConnectionError("refused"))
+        )
+        self.metrics(event(f"{API}/files/3", 0.2, bytes_received=10))
+        self.metrics(event(f"{API}/files/4", 0.2, bytes_received=5))
+
+        text = self.metrics.to_prometheus()
+        for line in [
+            'rspace_client_request_errors_total{method="POST",endpoint="/files",error="500"} 1',
+            'rspace_client_request_errors_total{method="POST",endpoint="/files",error="ConnectionError"} 1',
+            'rspace_client_requests_total{method="POST",endpoint="/files",status="none"} 1',
+            'rspace_client_request_retries_total{method="POST",endpoint="/files"} 2',
+            'rspace_client_sent_bytes_total{method="POST",endpoint="/files"} 100',
+            'rspace_client_received_bytes_total{method="GET",endpoint="/files/{id}"} 15',
+        ]:
+            self.assertIn(line + "\n", text)
+
+    def test_cache_hits_without_request_are_not_timed(self):
+        self.metrics(event(f"{API}/forms/1", 0.0, status=None, cache="hit"))
+        self.metrics(event(f"{API}/forms/1", 0.3, status=304, cache="hit"))
+        self.metrics(event(f"{API}/forms/1", 0.3, cache="miss"))
+        text = self.metrics.to_prometheus()
+        self.assertIn(
+            'rspace_client_cache_lookups_total{endpoint="/forms/{id}",result="hit"} 2\n', text
+        )
+        self.assertIn(
+            'rspace_client_request_duration_seconds_count{method="GET",endpoint="/forms/{id}"} 2\n',
+            text,
+        )
+
+    def test_label_values_are_escaped(self):
+        self.metrics(event('https://example.com/api/v1/a"b\\c', 0.1))
+        self.assertIn('endpoint="/a\\"b\\\\c"', self.metrics.to_prometheus())
+
+    def test_dump_to_file_and_callback(self):
+        self.metrics(event(f"{API}/samples", 0.1))
+        received = []
+        self.metrics.dump(received.append)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rspace.prom")
+            self.metrics.dump(path)
+            with open(path) as f:
+                self.assertEqual(received[0], f.read())
+            self.assertEqual(["rspace.prom"], os.listdir(tmp))
+
+    def test_reset(self):
+        self.metrics(event(f"{API}/samples", 0.1))
+        self.metrics.reset()
+        self.assertNotIn("/samples", self.metrics.to_prometheus())
+
+    @patch("requests.Session.request")
+    def test_as_event_handler_of_client(self, mock_request):
+        response = mock_json_response()
+        response.status_code = 200
+        response.headers = {"Content-Type": "application/json"}
+        response.request.headers = {}
+        response.json.return_value = {"id": 1}
+        mock_request.return_value = response
+        metrics = MetricsRegistry()
+        client = ELNClient("https://example.com", "key", event_handlers=[metrics])
+        client.get_document(1)
+        client.get_document(2)
+        self.assertIn(
+            'rspace_client_requests_total{method="GET",endpoint="/documents/{id}",status="200"} 2\n',
+            metrics.to_prometheus(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import io
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from rspace_client import multipart
+from rspace_client.eln.eln import ELNClient
+from rspace_client.multipart import MultipartEncoder, ProgressReader, TransferProgress
+from rspace_client.retry import RetryPolicy
+from rspace_client.tests.fake_server_test import FakeServerTestCase
+
+
+class RecordingReader(io.RawIOBase):
+    """
+    A binary file recording the sizes of its reads, optionally not seekable.
+    """
+
+    def __init__(self, data, seekable=True):
+        self._data = io.BytesIO(data)
+        self._seekable = seekable
+        self.reads = []
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return self._data.read(size)
+
+    def seekable(self):
+        return self._seekable
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if not self._seekable:
+            raise io.UnsupportedOperation("seek")
+        return self._data.seek(offset, whence)
+
+    def tell(self):
+        return self._data.tell()
+
+
+def requests_body(data, files, boundary):
+    with patch("urllib3.filepost.choose_boundary", return_value=boundary):
+        request = requests.Request("POST", "http://example.com", data=data, files=files)
+        return request.prepare().body
+
+
+class MultipartEncoderTest(unittest.TestCase):
+    def test_body_is_encoded_as_requests_encodes_it(self):
+        named = io.BytesIO(b"named content")
+        named.name = "/tmp/some dir/a \"quoted\" name.txt"
+
+        def fields():
+            named.seek(0)
+            data = {"folderId": 12, "caption": "caption", "tags": ["a", "b"], "none": None}
+            files = {
+                "file": named,
+                "plain": io.BytesIO(b"\x00\x01binary"),
+                "fileSettings": (None, '{"a": 1}', "application/json"),
+                "custom": ("c.bin", b"bytes", "text/plain", {"X-Extra": "1"}),
+            }
+            return data, files
+
+        expected = requests_body(*fields(), "b0undary")
+        encoder = MultipartEncoder(*fields(), boundary="b0undary")
+        self.assertEqual(len(expected), len(encoder))
+        self.assertEqual(expected, b"".join(encoder))
+        self.assertEqual("multipart/form-data; boundary=b0undary", encoder.content_type)
+
+    def test_files_are_read_in_chunks(self):
+        reader = RecordingReader(b"x" * 1_000_000)
+        encoder = MultipartEncoder(files={"file": reader}, chunk_size=65536)
+        body = b"".join(encoder)
+        self.assertEqual(len(encoder), len(body))
+        self.assertLessEqual(max(reader.reads), 65536)
+
+    def test_read_from_file_position(self):
+        file = io.BytesIO(b"skipped|sent")
+        file.seek(8)
+        body = b"".join(MultipartEncoder(files={"file": ("f", file)}, boundary="b"))
+        self.assertIn(b"\r\n\r\nsent\r\n--b--", body)
+        self.assertNotIn(b"skipped", body)
+
+    def test_length_of_unseekable_file_is_unknown(self):
+        encoder = MultipartEncoder(files={"file": RecordingReader(b"abc", seekable=False)})
+        self.assertIsNone(encoder.length)
+
+    def test_file_shorter_than_its_size(self):
+        file = io.BytesIO(b"abcdef")
+        encoder = MultipartEncoder(files={"file": file})
+        file.truncate(3)
+        with self.assertRaises(ValueError):
+            b"".join(encoder)
+
+
+class ProgressTest(unittest.TestCase):
+    def test_progress_properties(self):
+        progress = TransferProgress(250, 1000, 0.5)
+        self.assertEqual(500, progress.rate)
+        self.assertEqual(1.5, progress.eta)
+        self.assertEqual(0.25, progress.fraction)
+        unknown = TransferProgress(250, None, 0.0)
+        self.assertEqual(0, unknown.rate)
+        self.assertIsNone(unknown.eta)
+        self.assertIsNone(unknown.fraction)
+
+    def test_reports_are_rate_limited_except_the_last(self):
+        reports = []
+        reader = ProgressReader(io.BytesIO(b"x" * 100), reports.append)
+        while reader.read(10):
+            pass
+        self.assertEqual([(100, 100)], [(p.bytes_sent, p.total) for p in reports])
+        self.assertEqual(0, reports[-1].eta)
+
+    def test_rewind_starts_over(self):
+        reports = []
+        file = io.BytesIO(b"..abcdef")
+        file.seek(2)
+        reader = ProgressReader(file, reports.append)
+        with patch.object(multipart, "PROGRESS_INTERVAL", 0):
+            reader.read(4)
+            reader.seek(2)
+            reader.read()
+        self.assertEqual([4, 6], [p.bytes_sent for p in reports])
+        self.assertEqual({6}, {p.total for p in reports})
+
+
+class StreamingUploadTest(FakeServerTestCase):
+    def test_upload_streams_the_file(self):
+        content = self.server.random_bytes(3_000_000)
+        reader = RecordingReader(content)
+        file = self.eln.upload_file(reader, caption="streamed")
+        self.assertEqual(content, self.server.files[file["id"]][1])
+        self.assertEqual("streamed", file["caption"])
+        self.assertLessEqual(max(reader.reads), multipart.CHUNK_SIZE)
+
+    def test_unseekable_file(self):
+        reader = RecordingReader(b"not seekable", seekable=False)
+        file = self.eln.upload_file(reader)
+        self.assertEqual(b"not seekable", self.server.files[file["id"]][1])
+
+    def test_progress(self):
+        content = self.server.random_bytes(1_000_000)
+        reports = []
+        with patch.object(multipart, "PROGRESS_INTERVAL", 0):
+            self.eln.upload_file(io.BytesIO(content), progress=reports.append)
+        sent = [p.bytes_sent for p in reports]
+        self.assertGreater(len(sent), 1)
+        self.assertEqual(sorted(sent), sent)
+        self.assertEqual(len(content), sent[-1])
+        self.assertEqual({len(content)}, {p.total for p in reports})
+
+    def test_progress_of_retried_upload(self):
+        content = self.server.random_bytes(100_000)
+        self.server.fail(429, endpoint="/files$")
+        policy = RetryPolicy(backoff_factor=0.001, status_methods={429: ("POST",)})
+        client = ELNClient(self.server.url, self.server.api_key, retry_policy=policy)
+        reports = []
+        response = client.upload_file(
+            io.BytesIO(content), progress=reports.append, digests="sha1"
+        )
+        self.assertEqual([len(content)] * 2, [p.bytes_sent for p in reports])
+        self.assertEqual(content, self.server.files[response["id"]][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+
+from rspace_client.client_base import RequestKind
+from rspace_client.eln.eln import ELNClient
+from rspace_client.rate_limit import RateLimiter, TokenBucket
+from rspace_client.tests.base_test import mock_json_response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@patch("rspace_client.rate_limit.time.monotonic", new_callable=FakeClock)
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_rate(self, clock):
+        bucket = TokenBucket(rate=2, burst=2)
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertAlmostEqual(0.5, bucket.reserve())
+        self.assertAlmostEqual(1.0, bucket.reserve())
+        clock.now += 1.5
+        self.assertEqual(0, bucket.reserve())
+
+    def test_throttling_halves_rate_once_per_second(self, clock):
+        bucket = TokenBucket(rate=8)
+        bucket.on_throttled()
+        bucket.on_throttled()
+        self.assertEqual(4, bucket.rate)
+        clock.now += 1
+        bucket.on_throttled()
+        self.assertEqual(2, bucket.rate)
+
+    def test_rate_recovers_on_success(self, clock):
+        bucket = TokenBucket(rate=10, recovery_step=1)
+        bucket.on_throttled()
+        for _ in range(3):
+            bucket.on_success()
+        self.assertEqual(8, bucket.rate)
+        for _ in range(10):
+            bucket.on_success()
+        self.assertEqual(10, bucket.rate)
+
+    def test_min_rate(self, clock):
+        bucket = TokenBucket(rate=1, min_rate=0.5)
+        for _ in range(5):
+            bucket.on_throttled()
+            clock.now += 1
+        self.assertEqual(0.5, bucket.rate)
+
+    def test_not_adaptive(self, clock):
+        bucket = TokenBucket(rate=1, adaptive=False)
+        bucket.on_throttled()
+        self.assertEqual(1, bucket.rate)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_budgets(self):
+        self.assertEqual(RateLimiter.READ, RateLimiter.budget_for(RequestKind.READ))
+        self.assertEqual(RateLimiter.WRITE, RateLimiter.budget_for(RequestKind.WRITE))
+        self.assertEqual(RateLimiter.TRANSFER, RateLimiter.budget_for(RequestKind.UPLOAD))
+        self.assertEqual(RateLimiter.TRANSFER, RateLimiter.budget_for(RequestKind.DOWNLOAD))
+
+    def test_unlimited_budget(self):
+        limiter = RateLimiter(reads_per_second=None)
+        self.assertNotIn(RateLimiter.READ, limiter.buckets)
+        for _ in range(100):
+            self.assertEqual(0, limiter.reserve("read"))
+
+    def test_429_lowers_only_its_budget(self):
+        limiter = RateLimiter(reads_per_second=10, writes_per_second=10)
+        limiter.on_response("write", 429)
+        self.assertEqual(5, limiter.buckets[RateLimiter.WRITE].rate)
+        self.assertEqual(10, limiter.buckets[RateLimiter.READ].rate)
+
+    @patch("asyncio.sleep")
+    def test_acquire_async(self, mock_sleep):
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        mock_sleep.side_effect = fake_sleep
+        limiter = RateLimiter(reads_per_second=1)
+
+        async def go():
+            await limiter.acquire_async("read")
+            await limiter.acquire_async("read")
+
+        asyncio.run(go())
+        self.assertEqual(1, len(delays))
+        self.assertAlmostEqual(1.0, delays[0], places=2)
+
+
+class ClientRateLimitTest(unittest.TestCase):
+    @patch("requests.Session.request")
+    def test_client_acquires_per_kind(self, mock_request):
+        response = mock_json_response()
+        response.status_code = 200
+        response.headers = {"Content-Type": "application/json"}
+        response.json.return_value = {}
+        mock_request.return_value = response
+        limiter = MagicMock()
+        client = ELNClient("https://example.com", "key", rate_limiter=limiter)
+        client.get_status()
+        client.create_folder("f")
+        client.upload_file(MagicMock())
+        client.download_file(1, MagicMock())
+        kinds = [c.args[0] for c in limiter.acquire.call_args_list]
+        self.assertEqual(["read", "write", "upload", "download"], kinds)
+        limiter.on_response.assert_called_with(RequestKind.DOWNLOAD, 200)
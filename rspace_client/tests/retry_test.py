@@ -0,0 +1,143 @@
+import datetime
+import email.utils
+import unittest
+from io import BytesIO
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from rspace_client.client_base import ClientBase
+from rspace_client.eln.eln import ELNClient
+from rspace_client.inv.inv import InventoryClient
+from rspace_client.retry import RetryPolicy, RetryBudget, parse_retry_after
+from rspace_client.tests.base_test import mock_json_response
+
+
+def response(status_code, headers=None, body=None):
+    resp = mock_json_response()
+    resp.status_code = status_code
+    resp.headers = {"Content-Type": "application/json", **(headers or {})}
+    resp.json.return_value = body if body is not None else {"message": "x", "errors": []}
+    if status_code >= 400:
+        resp.raise_for_status.side_effect = requests.exceptions.HTTPError(str(status_code))
+    return resp
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_default_retries_get_only(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable_status("GET", 503))
+        self.assertFalse(policy.is_retryable_status("POST", 503))
+        self.assertFalse(policy.is_retryable_status("GET", 500))
+        self.assertTrue(policy.is_retryable_error("get"))
+        self.assertFalse(policy.is_retryable_error("POST"))
+
+    def test_per_status_methods(self):
+        policy = RetryPolicy(status_methods={429: ("GET", "POST")})
+        self.assertTrue(policy.is_retryable_status("POST", 429))
+        self.assertFalse(policy.is_retryable_status("POST", 503))
+
+    def test_backoff_is_exponential_and_capped(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+        self.assertEqual([1, 2, 4, 5], [policy.backoff(n) for n in range(4)])
+        jittered = RetryPolicy(backoff_factor=1, max_backoff=5)
+        for n in range(4):
+            self.assertTrue(0 <= jittered.backoff(n) <= min(5, 2 ** n))
+
+    def test_retry_after(self):
+        policy = RetryPolicy(max_retry_after=60)
+        self.assertEqual(7, policy.delay_for_response(0, response(429, {"Retry-After": "7"})))
+        self.assertIsNone(policy.delay_for_response(0, response(429, {"Retry-After": "61"})))
+
+    def test_parse_retry_after_date(self):
+        when = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+        delay = parse_retry_after(email.utils.format_datetime(when, usegmt=True))
+        self.assertTrue(25 < delay <= 30)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.5, reserve=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+
+@patch("rspace_client.client_base.time.sleep")
+class ClientRetryTest(unittest.TestCase):
+    def setUp(self):
+        self.client = ELNClient("https://example.com", "key")
+
+    @patch("requests.Session.request")
+    def test_get_retried_until_success(self, mock_request, mock_sleep):
+        mock_request.side_effect = [
+            response(503),
+            response(429, {"Retry-After": "2"}),
+            response(200, body={"message": "OK"}),
+        ]
+        self.assertEqual("OK", self.client.get_status()["message"])
+        self.assertEqual(3, mock_request.call_count)
+        self.assertEqual(2, mock_sleep.call_args_list[1].args[0])
+
+    @patch("requests.Session.request")
+    def test_gives_up_after_max_retries(self, mock_request, mock_sleep):
+        mock_request.return_value = response(502)
+        with self.assertRaises(ClientBase.ApiError) as ctx:
+            self.client.get_status()
+        self.assertEqual(502, ctx.exception.response_status_code)
+        self.assertEqual(4, mock_request.call_count)
+
+    @patch("requests.Session.request")
+    def test_post_not_retried_by_default(self, mock_request, mock_sleep):
+        mock_request.return_value = response(503)
+        with self.assertRaises(ClientBase.ApiError):
+            self.client.create_document(name="x")
+        self.assertEqual(1, mock_request.call_count)
+        mock_sleep.assert_not_called()
+
+    @patch("requests.Session.request")
+    def test_connection_error_retried(self, mock_request, mock_sleep):
+        mock_request.side_effect = [
+            requests.exceptions.ConnectionError("reset"),
+            response(200, body={"message": "OK"}),
+        ]
+        self.assertEqual("OK", self.client.get_status()["message"])
+
+    @patch("requests.Session.request")
+    def test_connection_error_raised_when_not_retryable(self, mock_request, mock_sleep):
+        client = ELNClient("https://example.com", "key", retry_policy=RetryPolicy.never())
+        mock_request.side_effect = requests.exceptions.ConnectionError("reset")
+        with self.assertRaises(ClientBase.ConnectionError):
+            client.get_status()
+        self.assertEqual(1, mock_request.call_count)
+
+    @patch("requests.Session.request")
+    def test_opt_in_post_rewinds_upload(self, mock_request, mock_sleep):
+        client = InventoryClient(
+            "https://example.com", "key", retry_policy=RetryPolicy(methods=("GET", "POST"))
+        )
+        sent = []
+
+        def upload(method, url, files=None, **kwargs):
+            sent.append(files["file"].read())
+            return response(503) if len(sent) == 1 else response(201, body={"id": 1})
+
+        mock_request.side_effect = upload
+        client.upload_attachment("SA1", BytesIO(b"content"))
+        self.assertEqual([b"content", b"content"], sent)
+
+    @patch("requests.Session.request")
+    def test_budget_limits_retries(self, mock_request, mock_sleep):
+        client = ELNClient(
+            "https://example.com", "key", retry_policy=RetryPolicy(budget_reserve=1, budget_ratio=0)
+        )
+        mock_request.return_value = response(503)
+        with self.assertRaises(ClientBase.ApiError):
+            client.get_status()
+        self.assertEqual(2, mock_request.call_count)
+        with self.assertRaises(ClientBase.ApiError):
+            client.get_status()
+        self.assertEqual(3, mock_request.call_count)
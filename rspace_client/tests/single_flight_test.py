@@ -0,0 +1,227 @@
+import asyncio
+import copy
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from rspace_client.cache import ResponseCache
+from rspace_client.eln.eln import ELNClient
+from rspace_client.single_flight import AsyncSingleFlight, SingleFlight
+from rspace_client.tests.base_test import mock_json_response
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_calls_are_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        with ThreadPoolExecutor(5) as executor:
+            futures = [executor.submit(flight.do, "key", fn) for _ in range(5)]
+            wait_until(lambda: flight.coalesced == 4)
+            release.set()
+            self.assertEqual(["result"] * 5, [f.result() for f in futures])
+        self.assertEqual(1, len(calls))
+        # completed calls are not cached
+        self.assertEqual("result", flight.do("key", fn))
+        self.assertEqual(2, len(calls))
+
+    def test_waiters_get_copies(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        result = {"id": 1}
+
+        def fn():
+            release.wait(5)
+            return result
+
+        with ThreadPoolExecutor(3) as executor:
+            futures = [
+                executor.submit(flight.do, "key", fn, copy.deepcopy) for _ in range(3)
+            ]
+            wait_until(lambda: flight.coalesced == 2)
+            release.set()
+            results = [f.result() for f in futures]
+        self.assertEqual([result] * 3, results)
+        self.assertEqual(1, sum(r is result for r in results))
+        self.assertEqual(3, len({id(r) for r in results}))
+
+    def test_exceptions_are_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fn():
+            release.wait(5)
+            raise ValueError("failed")
+
+        with ThreadPoolExecutor(3) as executor:
+            futures = [executor.submit(flight.do, "key", fn) for _ in range(3)]
+            wait_until(lambda: flight.coalesced == 2)
+            release.set()
+            for future in futures:
+                self.assertRaises(ValueError, future.result)
+
+    def test_async_calls_are_shared(self):
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def go():
+            flight = AsyncSingleFlight()
+            results = await asyncio.gather(*[flight.do("key", fn) for _ in range(5)])
+            return flight, results
+
+        flight, results = asyncio.run(go())
+        self.assertEqual(["result"] * 5, results)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(4, flight.coalesced)
+
+    def test_forgotten_calls_are_made_again(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            number = len(calls)
+            if number == 1:
+                release.wait(5)
+            return number
+
+        with ThreadPoolExecutor(1) as executor:
+            first = executor.submit(flight.do, "key", fn)
+            wait_until(lambda: calls)
+            flight.forget(lambda key: key == "key")
+            self.assertEqual(2, flight.do("key", fn))
+            release.set()
+            self.assertEqual(1, first.result())
+        self.assertEqual(3, flight.do("key", fn))
+
+    def test_async_cancelled_waiter_does_not_cancel_call(self):
+        async def fn():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def go():
+            flight = AsyncSingleFlight()
+            first = asyncio.ensure_future(flight.do("key", fn))
+            second = asyncio.ensure_future(flight.do("key", fn))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual("result", asyncio.run(go()))
+
+
+class ClientCoalescingTest(unittest.TestCase):
+    @patch("requests.Session.request")
+    def test_identical_gets_are_sent_once(self, mock_request):
+        release = threading.Event()
+        response = mock_json_response()
+        response.status_code = 200
+        response.headers = {"Content-Type": "application/json", "ETag": '"v1"'}
+        response.json.return_value = {"id": 1, "name": "folder"}
+
+        def request(*args, **kwargs):
+            release.wait(5)
+            return response
+
+        mock_request.side_effect = request
+        cache = ResponseCache()
+        client = ELNClient(
+            "https://example.com", "key", coalesce_requests=True, response_cache=cache
+        )
+        cache.store = MagicMock(wraps=cache.store)
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(client.get_folder, 1) for _ in range(4)]
+            wait_until(lambda: client._in_flight.coalesced == 3)
+            release.set()
+            folders = [f.result() for f in futures]
+        self.assertEqual(1, mock_request.call_count)
+        self.assertEqual([{"id": 1, "name": "folder"}] * 4, folders)
+        # the response is only handled by the caller that sent the request
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+        self.assertEqual(1, cache.store.call_count)
+        # each caller gets its own copy
+        self.assertEqual(4, len({id(f) for f in folders}))
+
+    @patch("requests.Session.request")
+    def test_different_requests_and_writes_are_not_coalesced(self, mock_request):
+        release = threading.Event()
+        response = mock_json_response()
+        response.status_code = 200
+        response.headers = {"Content-Type": "application/json"}
+        response.json.return_value = {"id": 1}
+
+        def request(*args, **kwargs):
+            release.wait(5)
+            return response
+
+        mock_request.side_effect = request
+        client = ELNClient("https://example.com", "key", coalesce_requests=True)
+        with ThreadPoolExecutor(4) as executor:
+            futures = [
+                executor.submit(client.get_folder, 1),
+                executor.submit(client.get_folder, 2),
+                executor.submit(client.create_folder, "a"),
+                executor.submit(client.create_folder, "a"),
+            ]
+            wait_until(lambda: mock_request.call_count == 4)
+            release.set()
+            for future in futures:
+                future.result()
+        self.assertEqual(0, client._in_flight.coalesced)
+
+    @patch("requests.Session.request")
+    def test_reads_after_a_write_are_not_coalesced_with_earlier_ones(self, mock_request):
+        release = threading.Event()
+        gets = []
+
+        def request(method, url, **kwargs):
+            response = mock_json_response()
+            response.status_code = 200
+            response.headers = {"Content-Type": "application/json"}
+            response.json.return_value = {"id": 1, "read": len(gets)}
+            if method == "GET":
+                gets.append(url)
+                if len(gets) == 1:
+                    release.wait(5)
+            return response
+
+        mock_request.side_effect = request
+        client = ELNClient("https://example.com", "key", coalesce_requests=True)
+        with ThreadPoolExecutor(1) as executor:
+            before = executor.submit(client.get_document, 1)
+            wait_until(lambda: len(gets) == 1)
+            client.retrieve_api_results("/documents/1", {"name": "x"}, request_type="PUT")
+            after = client.get_document(1)
+            self.assertEqual(2, len(gets))
+            release.set()
+            self.assertEqual(0, before.result()["read"])
+        self.assertEqual(1, after["read"])
+        self.assertEqual(0, client._in_flight.coalesced)
+
+    def test_off_by_default(self):
+        self.assertIsNone(ELNClient("https://example.com", "key")._in_flight)
+
+
+if __name__ == "__main__":
+    unittest.main()
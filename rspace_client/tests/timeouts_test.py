@@ -0,0 +1,194 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from unittest.mock import patch
+
+import requests
+
+from rspace_client.client_base import ClientBase
+from rspace_client.eln.eln import ELNClient
+from rspace_client.retry import RetryPolicy
+from rspace_client.tests.fake_server import FakeRSpaceServer
+from rspace_client.tests.retry_test import response
+from rspace_client.timeouts import Timeouts, capped, deadline, remaining
+
+
+class TimeoutsTest(unittest.TestCase):
+    def test_endpoint_class(self):
+        api = "https://example.com/api/v1"
+        self.assertEqual(Timeouts.METADATA, Timeouts.endpoint_class("read", f"{api}/documents/1"))
+        self.assertEqual(Timeouts.METADATA, Timeouts.endpoint_class("write", f"{api}/documents"))
+        self.assertEqual(Timeouts.UPLOAD, Timeouts.endpoint_class("upload", f"{api}/files"))
+        self.assertEqual(
+            Timeouts.DOWNLOAD, Timeouts.endpoint_class("download", f"{api}/files/1/file")
+        )
+        self.assertEqual(Timeouts.EXPORT_POLLING, Timeouts.endpoint_class("read", f"{api}/jobs/3"))
+
+    def test_values(self):
+        timeouts = Timeouts(connect=2, read=5, upload=(4, 100), download=None)
+        self.assertEqual((2, 5), timeouts.get(Timeouts.METADATA))
+        self.assertEqual((4, 100), timeouts.get(Timeouts.UPLOAD))
+        self.assertEqual((2, None), timeouts.get(Timeouts.DOWNLOAD))
+        self.assertEqual((2, 30), timeouts.get(Timeouts.EXPORT_POLLING))
+        self.assertEqual((None, None), Timeouts.none().get(Timeouts.UPLOAD))
+
+    def test_nested_deadlines_only_shorten(self):
+        self.assertIsNone(remaining())
+        self.assertEqual(30, capped(30))
+        with deadline(10):
+            with deadline(100):
+                self.assertLessEqual(remaining(), 10)
+            with deadline(1):
+                self.assertLessEqual(capped(30), 1)
+            with deadline(None):
+                self.assertLessEqual(remaining(), 10)
+        self.assertIsNone(remaining())
+
+
+@patch("requests.Session.request")
+class ClientTimeoutsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = ELNClient("https://example.com", "key")
+
+    def test_timeout_per_endpoint_class(self, mock_request):
+        mock_request.return_value = response(200, body={"id": 1, "status": "RUNNING"})
+        self.client.get_status()
+        self.client.get_job_status(1)
+        self.client.upload_file(BytesIO(b"x"))
+        self.client.download_file(1, BytesIO())
+        self.assertEqual(
+            [(10, 60), (10, 30), (10, 300), (10, 300)],
+            [c.kwargs["timeout"] for c in mock_request.call_args_list],
+        )
+
+    def test_configured_timeouts(self, mock_request):
+        client = ELNClient("https://example.com", "key", timeouts=Timeouts(connect=1, read=2))
+        mock_request.return_value = response(200, body={"message": "OK"})
+        client.get_status()
+        self.assertEqual((1, 2), mock_request.call_args.kwargs["timeout"])
+
+    def test_deadline_bounds_timeouts(self, mock_request):
+        mock_request.return_value = response(200, body={"message": "OK"})
+        with deadline(5):
+            self.client.get_status()
+        connect, read = mock_request.call_args.kwargs["timeout"]
+        self.assertTrue(0 < connect <= 5 and 0 < read <= 5)
+
+    def test_passed_deadline_raises(self, mock_request):
+        with deadline(0):
+            with self.assertRaises(ClientBase.DeadlineExceededError) as ctx:
+                self.client.get_status()
+        self.assertIsInstance(ctx.exception, TimeoutError)
+        mock_request.assert_not_called()
+
+    @patch("rspace_client.client_base.time.sleep")
+    def test_no_retry_past_deadline(self, mock_sleep, mock_request):
+        mock_request.return_value = response(429, {"Retry-After": "10"})
+        with deadline(5):
+            with self.assertRaises(ClientBase.ApiError):
+                self.client.get_status()
+        self.assertEqual(1, mock_request.call_count)
+        mock_sleep.assert_not_called()
+
+    @patch("rspace_client.client_base.time.sleep")
+    def test_read_timeout_retried(self, mock_sleep, mock_request):
+        mock_request.side_effect = [
+            requests.exceptions.ReadTimeout("slow"),
+            response(200, body={"message": "OK"}),
+        ]
+        self.assertEqual("OK", self.client.get_status()["message"])
+
+    def test_read_timeout_raised_as_connection_error(self, mock_request):
+        client = ELNClient("https://example.com", "key", retry_policy=RetryPolicy.never())
+        mock_request.side_effect = requests.exceptions.ReadTimeout("slow")
+        with self.assertRaises(ClientBase.ConnectionError):
+            client.get_status()
+
+    def test_export_polling_stops_at_deadline(self, mock_request):
+        mock_request.return_value = response(
+            200, body={"id": 3, "status": "RUNNING", "percentComplete": 10.0}
+        )
+        start = time.monotonic()
+        with self.assertRaises(ClientBase.DeadlineExceededError):
+            self.client.export_and_download(
+                "xml", "user", "export.zip", wait_between_requests=30, deadline=0.2
+            )
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertGreaterEqual(mock_request.call_count, 2)
+
+    def test_import_tree_stops_at_deadline(self, mock_request):
+        def slow_create_folder(method, url, **kwargs):
+            time.sleep(0.1)
+            return response(201, body={"id": 1, "globalId": "FL1"})
+
+        mock_request.side_effect = slow_create_folder
+        with tempfile.TemporaryDirectory() as tree:
+            with open(os.path.join(tree, "a.txt"), "w") as f:
+                f.write("a")
+            with self.assertRaises(ClientBase.DeadlineExceededError):
+                self.client.import_tree(tree, deadline=0.05)
+        self.assertEqual(1, mock_request.call_count)
+
+
+
+class TricklingHandler(BaseHTTPRequestHandler):
+    """
+    Sends a body a byte at a time, so that no read of it times out.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", "1000")
+        self.end_headers()
+        try:
+            while not self.server.release.wait(0.02):
+                self.wfile.write(b"x")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadDeadlineTest(unittest.TestCase):
+    def test_trickling_body_stops_at_deadline(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), TricklingHandler)
+        server.release = threading.Event()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.addCleanup(server.release.set)
+        client = ELNClient(f"http://127.0.0.1:{server.server_address[1]}", "key")
+        self.addCleanup(client.close)
+        out = BytesIO()
+        start = time.monotonic()
+        with self.assertRaises(ClientBase.DeadlineExceededError):
+            with deadline(0.3):
+                client.download_link_to_file(client._get_api_url() + "/files/1/file", out)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_slow_body_stops_at_deadline(self):
+        with FakeRSpaceServer(bandwidth=100_000) as server:
+            file = server.add_file(server.random_bytes(1_000_000))
+            client = ELNClient(server.url, server.api_key)
+            self.addCleanup(client.close)
+            out = BytesIO()
+            start = time.monotonic()
+            with self.assertRaises(ClientBase.DeadlineExceededError):
+                with deadline(0.3):
+                    client.download_file(file["id"], out)
+            self.assertLess(time.monotonic() - start, 2)
+            self.assertLess(0, len(out.getvalue()))
+            self.assertLess(len(out.getvalue()), 1_000_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import io
+import json
+import unittest
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from rspace_client.client_base import ClientBase
+from rspace_client.eln.eln import ELNClient
+from rspace_client.retry import RetryPolicy
+from rspace_client.tests.fake_server import FakeRSpaceServer
+from rspace_client.transport import RequestsTransport, Transport
+
+
+class Unreachable(Exception):
+    pass
+
+
+class InMemoryTransport(Transport):
+    """
+    Answers requests from a list of (status, body) tuples, recording the requests.
+    """
+
+    connection_errors = (Unreachable,)
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.sent = []
+        self.closed = False
+
+    def send(self, method, url, **kwargs):
+        self.sent.append((method, url, kwargs))
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        status, body = answer
+        response = requests.Response()
+        response.status_code = status
+        if isinstance(body, bytes):
+            response.raw = io.BytesIO(body)
+            response.headers = CaseInsensitiveDict({"Content-Type": "application/octet-stream"})
+        else:
+            response.raw = io.BytesIO(json.dumps(body).encode())
+            response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+        response.request = requests.Request(method, url, headers=kwargs.get("headers")).prepare()
+        return response
+
+    def close(self):
+        self.closed = True
+
+
+class TransportTest(unittest.TestCase):
+    def client(self, transport):
+        return ELNClient(
+            "https://example.com",
+            "key",
+            transport=transport,
+            retry_policy=RetryPolicy(backoff_factor=0.001),
+        )
+
+    def test_api_calls_downloads_and_uploads_use_transport(self):
+        transport = InMemoryTransport(
+            (200, {"message": "OK"}), (200, b"content"), (201, {"id": 1})
+        )
+        client = self.client(transport)
+        self.assertEqual("OK", client.get_status()["message"])
+        out = io.BytesIO()
+        client.download_file(1, out)
+        self.assertEqual(b"content", out.getvalue())
+        self.assertEqual(1, client.upload_file(io.BytesIO(b"x"))["id"])
+        self.assertEqual(
+            ["https://example.com/api/v1/status", "https://example.com/api/v1/files/1/file",
+             "https://example.com/api/v1/files"],
+            [url for _, url, _ in transport.sent],
+        )
+        method, _, kwargs = transport.sent[2]
+        self.assertEqual("POST", method)
+        self.assertIn("file", kwargs["files"])
+        self.assertEqual("key", kwargs["headers"]["apiKey"])
+        self.assertEqual((10, 60), transport.sent[0][2]["timeout"])
+        client.close()
+        self.assertTrue(transport.closed)
+
+    def test_connection_errors_of_transport_are_retried(self):
+        transport = InMemoryTransport(Unreachable(), (200, {"message": "OK"}))
+        self.assertEqual("OK", self.client(transport).get_status()["message"])
+        self.assertEqual(2, len(transport.sent))
+
+    def test_connection_errors_of_transport_raised_as_connection_error(self):
+        transport = InMemoryTransport(*[Unreachable()] * 4)
+        with self.assertRaises(ClientBase.ConnectionError):
+            self.client(transport).get_status()
+
+    def test_error_responses(self):
+        transport = InMemoryTransport((404, {"message": "not found", "errors": []}))
+        with self.assertRaises(ClientBase.ApiError) as ctx:
+            self.client(transport).get_document(1)
+        self.assertEqual(404, ctx.exception.response_status_code)
+
+    def test_default_transport(self):
+        client = ELNClient("https://example.com", "key", pool_maxsize=3)
+        self.assertIsInstance(client.transport, RequestsTransport)
+        self.assertIs(client.session, client.transport.session)
+        with FakeRSpaceServer() as server:
+            transport = RequestsTransport(keep_alive=False)
+            client = ELNClient(server.url, server.api_key, transport=transport)
+            self.assertEqual("OK", client.get_status()["message"])
+            self.assertEqual("OK", client.get_status()["message"])
+            self.assertEqual(2, server.connections)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Request timeouts and operation deadlines of the RSpace API clients.
+"""
+import contextlib
+import contextvars
+import re
+import time
+from typing import Optional, Tuple, Union
+
+# time.monotonic() by which the running operation must complete, set by deadline()
+_deadline = contextvars.ContextVar("rspace_deadline", default=None)
+
+_JOBS = re.compile(r"/api/v\d+/jobs/")
+
+TimeoutValue = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+
+class DeadlineExceededError(TimeoutError):
+    """
+    Raised when a request would be made, or a response read, after the current
+    deadline. Also available as ClientBase.DeadlineExceededError.
+    """
+
+
+class Timeouts:
+    """
+    Connect and read timeouts of a client's requests, per endpoint class:
+
+    - METADATA: JSON API calls
+    - UPLOAD: multipart file uploads
+    - DOWNLOAD: file and export downloads
+    - EXPORT_POLLING: export job status requests
+
+    The connect timeout bounds establishing a connection, the read timeout the
+    wait for each piece of the response (and, in the asyncio clients, for each
+    piece of the request body to be sent), not the total duration of a request.
+    A timed-out request is retried as allowed by the client's RetryPolicy, and
+    otherwise raises ClientBase.ConnectionError.
+
+    ``Timeouts.none()`` waits forever, as clients did before timeouts existed.
+    """
+
+    METADATA = "metadata"
+    UPLOAD = "upload"
+    DOWNLOAD = "download"
+    EXPORT_POLLING = "export_polling"
+
+    def __init__(
+        self,
+        connect: Optional[float] = 10.0,
+        read: Optional[float] = 60.0,
+        upload: TimeoutValue = 300.0,
+        download: TimeoutValue = 300.0,
+        export_polling: TimeoutValue = 30.0,
+    ):
+        """
+        :param connect: seconds to wait for a connection, default is 10
+        :param read: seconds to wait for data of JSON API calls, default is 60
+        :param upload: read timeout of uploads, or a (connect, read) tuple, default is 300
+        :param download: read timeout of downloads, or a (connect, read) tuple, default
+         is 300
+        :param export_polling: read timeout of export job status requests, or a
+         (connect, read) tuple, default is 30
+        None means no timeout.
+        """
+        self.timeouts = {
+            Timeouts.METADATA: (connect, read),
+            Timeouts.UPLOAD: self._pair(upload, connect),
+            Timeouts.DOWNLOAD: self._pair(download, connect),
+            Timeouts.EXPORT_POLLING: self._pair(export_polling, connect),
+        }
+
+    @staticmethod
+    def _pair(value: TimeoutValue, connect):
+        if isinstance(value, tuple):
+            return value
+        return connect, value
+
+    @classmethod
+    def none(cls) -> "Timeouts":
+        return cls(None, None, None, None, None)
+
+    @staticmethod
+    def endpoint_class(kind: str, url: str) -> str:
+        """
+        The endpoint class of a request.
+        :param kind: 'read', 'write', 'upload' or 'download'
+        """
+        if kind == "upload":
+            return Timeouts.UPLOAD
+        if kind == "download":
+            return Timeouts.DOWNLOAD
+        if _JOBS.search(url):
+            return Timeouts.EXPORT_POLLING
+        return Timeouts.METADATA
+
+    def get(self, endpoint_class: str) -> Tuple[Optional[float], Optional[float]]:
+        """
+        :return: (connect, read) timeouts of an endpoint class
+        """
+        return self.timeouts[endpoint_class]
+
+    def __repr__(self):
+        return f"Timeouts({self.timeouts})"
+
+
+@contextlib.contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Context manager setting a deadline for all requests made within it, by any
+    client, including from the threads and tasks that streams use. Each request
+    is sent with its timeouts reduced to the time remaining, no retry is attempted
+    that would end after the deadline, and once it has passed any further request
+    raises ClientBase.DeadlineExceededError. Nested deadlines can only shorten the
+    time remaining. A deadline of None has no effect.
+    """
+    if seconds is None:
+        yield
+        return
+    end = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(end if current is None else min(current, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds until the current deadline, which may be negative, or None if there is
+    no deadline.
+    """
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def capped(seconds: float) -> float:
+    """
+    A wait of 'seconds', shortened so that it does not last beyond the current
+    deadline.
+    """
+    left = remaining()
+    return seconds if left is None else max(0.0, min(seconds, left))
+
+
+def time_left(activity: str) -> Optional[float]:
+    """
+    Seconds until the current deadline, or None if there is no deadline.
+    :param activity: what is being done, for the message of the error
+    :raises DeadlineExceededError: if the deadline has passed
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError(f"The deadline passed {activity}")
+    return left
+
+
+def bounded(timeout: Tuple[Optional[float], Optional[float]], left: Optional[float]):
+    """
+    (connect, read) timeouts no longer than the time left until the deadline.
+    """
+    if left is None:
+        return timeout
+    return tuple(left if t is None else min(t, left) for t in timeout)
@@ -0,0 +1,148 @@
+"""
+Transports send the HTTP requests of the synchronous clients.
+"""
+from typing import Optional, Tuple
+
+import requests
+import urllib3
+
+from rspace_client.events import TimedHTTPAdapter
+from rspace_client.multipart import CHUNK_SIZE, MultipartEncoder
+
+
+class Transport:
+    """
+    Sends the HTTP requests of a client. Every request of a client, including API
+    calls, downloads and multipart uploads, is sent by its transport, after the
+    client has applied its rate limiter, deadline and response cache, and the
+    client retries failed requests as allowed by its retry policy.
+
+    Subclass it and pass an instance as the ``transport`` option of a client to
+    send requests with another HTTP library, or to record, replay or answer them
+    in memory.
+
+    The response returned by ``send`` must behave as a ``requests.Response``:
+    ``status_code``, case-insensitive ``headers``, ``content``, ``text``,
+    ``json()``, ``raise_for_status()``, ``iter_content(chunk_size)``, ``close()``
+    and use as a context manager, and ``request.headers`` giving the headers sent.
+    Downloads read the body with ``raw.readinto`` if ``raw`` is an ``io.IOBase``
+    giving the body as sent, else with ``iter_content``.
+    """
+
+    #: exceptions raised when a request could not be sent or its response could not
+    #: be read, e.g. connection failures and timeouts. The client retries them as
+    #: connection errors, and raises them as ClientBase.ConnectionError from API calls.
+    connection_errors: Tuple[type, ...] = ()
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: dict = None,
+        params: dict = None,
+        data=None,
+        files=None,
+        stream: bool = False,
+        timeout: Tuple[Optional[float], Optional[float]] = (None, None),
+    ):
+        """
+        Sends a request and returns its response.
+        :param method: 'GET', 'PUT', 'POST' or 'DELETE'
+        :param url: full URL of the request
+        :param headers: request headers
+        :param params: query parameters; those whose value is None are left out
+        :param data: the request body as bytes, or a dictionary of form fields sent
+         with 'files'
+        :param files: files of a multipart/form-data request, as for requests: a
+         dictionary of field name to file object or (filename, file object) tuple
+        :param stream: if True, the response body is read as it is iterated with
+         iter_content, or read from raw, rather than before send returns
+        :param timeout: (connect, read) timeouts in seconds, None to wait forever
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Releases the connections of the transport.
+        """
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+
+
+class RequestsTransport(Transport):
+    """
+    The default transport, sending requests with a pooled keep-alive
+    ``requests.Session``, so TCP and TLS connections are reused between requests.
+    Multipart uploads are streamed with a MultipartEncoder, reading the files as
+    they are sent, unless the size of a file cannot be told, e.g. of a pipe.
+    """
+
+    connection_errors = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError,
+        requests.exceptions.Timeout,
+        # raised while a streamed body is read from response.raw
+        urllib3.exceptions.ProtocolError,
+        urllib3.exceptions.ReadTimeoutError,
+    )
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+    ):
+        """
+        :param pool_connections: number of per-host connection pools to keep, default is 10
+        :param pool_maxsize: maximum number of connections kept open to a single host, default is 10
+        :param pool_block: if True, block when all connections to a host are busy rather than
+         opening extra connections that are discarded after use, default is False
+        :param keep_alive: if False, connections are closed after each request, default is True
+        """
+        self.session = _StreamingSession()
+        adapter = _StreamingAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def send(self, method, url, *, timeout=(None, None), **kwargs):
+        return self.session.request(method, url, timeout=timeout, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class _StreamingSession(requests.Session):
+    """
+    A Session sending the files of multipart requests with a MultipartEncoder,
+    rather than encoding the whole body in memory first.
+    """
+
+    def prepare_request(self, request):
+        if request.files:
+            body = MultipartEncoder(request.data, request.files)
+            if body.length is not None:
+                request.data, request.files = body, None
+                request.headers = dict(request.headers or {})
+                request.headers["Content-Type"] = body.content_type
+        return super().prepare_request(request)
+
+
+class _StreamingAdapter(TimedHTTPAdapter):
+    """
+    An adapter whose connections send streamed bodies in blocks of CHUNK_SIZE,
+    rather than the 8 or 16KiB of http.client and urllib3, so large uploads take
+    fewer reads and system calls.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("blocksize", CHUNK_SIZE)
+        super().init_poolmanager(*args, **kwargs)
@@ -1,6 +1,4 @@
 import argparse
-import rspace_client.eln.eln as eln
-import rspace_client.inv.inv as inv
 
 
 def _parse_args():
@@ -21,8 +19,10 @@ def createELNClient():
     """
     Parses command line arguments: server, apiKey
     """
+    from rspace_client.eln.eln import ELNClient
+
     args = _parse_args()
-    client = eln.ELNClient(args.server, args.apiKey)
+    client = ELNClient(args.server, args.apiKey)
     return client
 
 
@@ -30,6 +30,8 @@ def createInventoryClient():
     """
     Parses command line arguments: server, apiKey
     """
+    from rspace_client.inv.inv import InventoryClient
+
     args = _parse_args()
-    client = inv.InventoryClient(args.server, args.apiKey)
+    client = InventoryClient(args.server, args.apiKey)
     return client